@@ -411,7 +411,7 @@ function AssetPreviewBox({
   if (asset.asset_type === 'image') {
     return (
       <Image
-        src={fileUrl}
+        src={toUrl(asset.thumbnail_url || '') || fileUrl}
         alt={asset.name}
         objectFit="cover"
         width="100%"
@@ -492,7 +492,8 @@ function AssetPreviewBox({
   }
 
   if (asset.asset_type === '3d_model') {
-    const fu = toUrl((asset as any).file_url || asset.file);
+    // Grid cards always use the server-built lightweight preview when it exists
+    const fu = toUrl(asset.preview_model_url || (asset as any).file_url || asset.file);
     if (isObjOrMtl(fu)) {
       return <ThreeObjMtlViewer srcUrl={fu} />;
     }
@@ -13,6 +13,7 @@ import {
   AssetVersion,
   getAssetById,
   getPreviewUrl,
+  getStreamInfo,
   getAssetVersions,
   uploadNewVersion,
   restoreVersion,
@@ -124,6 +125,7 @@ export default function PreviewPage() {
 
   const [asset, setAsset] = useState<AssetItem | null>(null);
   const [fileUrl, setFileUrl] = useState<string>('');
+  const [videoSrc, setVideoSrc] = useState<string>('');
   const [versions, setVersions] = useState<AssetVersion[]>([]);
   const [versionsNote, setVersionsNote] = useState<string>('');
   const [activeTab, setActiveTab] = useState<TabKey>('history');
@@ -184,6 +186,27 @@ export default function PreviewPage() {
   // Load PDF as Blob (with Authorization header) and embed via objectURL.
   // This avoids inline <object>/<iframe> failing when the server requires Bearer token.
   const kind = useMemo(() => inferKind(fileUrl, asset?.type ?? asset?.asset_type, asset?.mime_type), [fileUrl, asset]);
+
+  // Video: prefer the transcoded HLS ladder (native HLS) or the small MP4 preview,
+  // fall back to the original upload until transcoding has finished.
+  useEffect(() => {
+    let cancelled = false;
+    setVideoSrc('');
+    if (kind !== 'video' || !assetId || Number.isNaN(assetId)) return;
+    (async () => {
+      try {
+        const info = await getStreamInfo(assetId);
+        if (cancelled) return;
+        const probe = document.createElement('video');
+        const nativeHls = !!probe.canPlayType('application/vnd.apple.mpegurl');
+        const src = (nativeHls && info.hls_url) || info.preview_url || '';
+        setVideoSrc(ensureAbsolute(src));
+      } catch {
+        // keep the original file
+      }
+    })();
+    return () => { cancelled = true; };
+  }, [kind, assetId, fileUrl]);
   useEffect(() => {
     let cancelled = false;
 
@@ -382,7 +405,7 @@ export default function PreviewPage() {
             )}
 
             {!loadingPreview && fileUrl && kind === 'video' && (
-              <video src={fileUrl} controls style={{ maxHeight: 560, width: '100%', borderRadius: 12 }} />
+              <video src={videoSrc || fileUrl} controls style={{ maxHeight: 560, width: '100%', borderRadius: 12 }} />
             )}
 
             {!loadingPreview && kind === 'pdf' && (
@@ -411,9 +434,9 @@ export default function PreviewPage() {
               </Box>
             )}
 
-            {!loadingPreview && fileUrl && kind === '3d' && (ext(fileUrl) === 'glb' || ext(fileUrl) === 'gltf') && (
+            {!loadingPreview && fileUrl && kind === '3d' && (asset?.preview_model_url || ext(fileUrl) === 'glb' || ext(fileUrl) === 'gltf') && (
               <div style={{ height: 560, width: '100%' }}>
-                <ThreeDPreview fileUrl={fileUrl} />
+                <ThreeDPreview fileUrl={fileUrl} previewUrl={ensureAbsolute(asset?.preview_model_url ?? '') || null} />
               </div>
             )}
 
@@ -14,8 +14,7 @@ import {
 import { useState, useRef, useEffect, useMemo } from 'react';
 import { useRouter } from 'next/navigation';
 import { permissions } from '@/utils/permissions';
-import { apiRequest } from '@/lib/api';
-import { listTags } from '@/services/assets';
+import { listTags, uploadAssetDirect } from '@/services/assets';
 
 type Tag = { id: number; name: string; color?: string };
 
@@ -210,7 +209,8 @@ export default function UploadPage() {
 
       selectedTagIds.forEach((id) => fd.append('tag_ids', String(id)));
 
-      await apiRequest('/api/assets/', { method: 'POST', body: fd, isFormData: true });
+      // Object storage: straight to the bucket; otherwise a normal multipart POST /api/assets/
+      await uploadAssetDirect(fd);
 
       setSelectedFile(null);
       setAssetData({ name: '', description: '', brand: '', assetNo: '' });
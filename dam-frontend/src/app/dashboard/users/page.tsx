@@ -15,6 +15,7 @@ import {
 } from '@chakra-ui/react';
 import { permissions } from '@/utils/permissions';
 import { apiRequest } from '@/lib/api';
+import { fetchUsers as fetchUserPage, bulkUpdateUsers } from '@/services/user';
 
 // ---------------- Theme Tokens (粉色玻璃拟态) ----------------
 const PINK_BG = 'rgba(253, 242, 248, 0.80)';         // 粉-50 ~ 80% 透明
@@ -50,6 +51,16 @@ export default function UsersPage() {
   const [users, setUsers] = useState<UserRow[]>([]);
   const [loadingUsers, setLoadingUsers] = useState<boolean>(true);
   const [userErr, setUserErr] = useState<string | null>(null);
+  // 服务端分页 / 检索 / 过滤
+  const [nextUrl, setNextUrl] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState<boolean>(false);
+  const [search, setSearch] = useState('');
+  const [roleFilter, setRoleFilter] = useState<Role | ''>('');
+  const [activeFilter, setActiveFilter] = useState<'' | 'true' | 'false'>('');
+  // 批量操作
+  const [selected, setSelected] = useState<Set<number>>(new Set());
+  const [bulkRole, setBulkRole] = useState<Role>('viewer');
+  const [bulkPending, setBulkPending] = useState<boolean>(false);
 
   // 新增用户表单显隐
   const [showAdd, setShowAdd] = useState<boolean>(false);
@@ -71,19 +82,23 @@ export default function UsersPage() {
   const canManage = useMemo(() => permissions.canManageUsers(), []);
 
   // ====================== Users ======================
+  const userQuery = () => ({
+    search,
+    role: roleFilter || undefined,
+    is_active: activeFilter === '' ? undefined : activeFilter === 'true',
+    page_size: 50,
+  });
+
+  // 重新加载第一页（筛选条件变化 / 增删改之后）
   const fetchUsers = async () => {
     if (!canManage) return;
     setLoadingUsers(true);
     setUserErr(null);
     try {
-      const data = await apiRequest<UserRow[]>('/api/admin/users/');
-      const arr = Array.isArray(data) ? data : [];
-      setUsers(
-        arr.map((u) => ({
-          ...u,
-          role: (u.role || '').toString().toLowerCase() as Role,
-        }))
-      );
+      const page = await fetchUserPage(userQuery());
+      setUsers(page.results);
+      setNextUrl(page.next);
+      setSelected(new Set());
     } catch (e: any) {
       setUserErr(e?.message || 'Failed to load users');
     } finally {
@@ -91,14 +106,36 @@ export default function UsersPage() {
     }
   };
 
+  // 追加下一页
+  const loadMoreUsers = async () => {
+    if (!nextUrl) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchUserPage({}, nextUrl);
+      setUsers((prev) => [...prev, ...page.results]);
+      setNextUrl(page.next);
+    } catch (e: any) {
+      alert(e?.data?.detail || e?.message || 'Failed to load more users');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     if (canManage) {
-      fetchUsers();
       fetchTags();
     }
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [canManage]);
 
+  // 用户列表：首次进入立即查；筛选条件变化时输入停顿 300ms 后再查
+  useEffect(() => {
+    if (!canManage) return;
+    const t = setTimeout(fetchUsers, search ? 300 : 0);
+    return () => clearTimeout(t);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [canManage, search, roleFilter, activeFilter]);
+
   if (!canManage) {
     return (
       <VStack align="stretch" gap={6}>
@@ -190,6 +227,32 @@ export default function UsersPage() {
     }
   };
 
+  // 勾选 / 取消勾选
+  const toggleSelected = (id: number) => {
+    setSelected((prev) => {
+      const next = new Set(prev);
+      next.has(id) ? next.delete(id) : next.add(id);
+      return next;
+    });
+  };
+
+  // 批量修改（角色 / 启用状态）
+  const onBulkUpdate = async (patch: Partial<{ role: Role; is_active: boolean }>) => {
+    if (selected.size === 0) return;
+    const what = patch.role ? `role → ${patch.role}` : patch.is_active ? 'activate' : 'deactivate';
+    if (!confirm(`${what} for ${selected.size} user(s)?`)) return;
+    setBulkPending(true);
+    try {
+      const res = await bulkUpdateUsers(Array.from(selected), patch);
+      await fetchUsers();
+      alert(`Updated ${res.updated} user(s)`);
+    } catch (e: any) {
+      alert(e?.data?.detail || e?.message || 'Bulk update failed');
+    } finally {
+      setBulkPending(false);
+    }
+  };
+
   // ====================== Tags (CRUD) ======================
 
   // 拉取 tag 列表
@@ -409,6 +472,79 @@ export default function UsersPage() {
           </Box>
         )}
 
+        {/* 检索 / 过滤 / 批量操作 */}
+        <HStack gap={3} mb={4} flexWrap="wrap">
+          <Input
+            value={search}
+            onChange={(e) => setSearch(e.target.value)}
+            placeholder="username or email prefix"
+            bg="white"
+            maxW="320px"
+          />
+          <select
+            value={roleFilter}
+            onChange={(e: React.ChangeEvent<HTMLSelectElement>) => setRoleFilter(e.target.value as Role | '')}
+            style={
+                    height: '40px',
+                    padding: '8px',
+                    borderRadius: '6px',
+                    border: '1px solid #E2E8F0',
+                    background: 'white',
+                  }}
+          >
+            <option value="">all roles</option>
+            <option value="viewer">viewer</option>
+            <option value="editor">editor</option>
+            <option value="admin">admin</option>
+          </select>
+          <select
+            value={activeFilter}
+            onChange={(e: React.ChangeEvent<HTMLSelectElement>) =>
+              setActiveFilter(e.target.value as '' | 'true' | 'false')
+            }
+            style={
+                    height: '40px',
+                    padding: '8px',
+                    borderRadius: '6px',
+                    border: '1px solid #E2E8F0',
+                    background: 'white',
+                  }}
+          >
+            <option value="">active + inactive</option>
+            <option value="true">active</option>
+            <option value="false">inactive</option>
+          </select>
+          {selected.size > 0 && (
+            <>
+              <Text color="white">{selected.size} selected</Text>
+              <select
+                value={bulkRole}
+                onChange={(e: React.ChangeEvent<HTMLSelectElement>) => setBulkRole(e.target.value as Role)}
+                style={
+                    height: '40px',
+                    padding: '8px',
+                    borderRadius: '6px',
+                    border: '1px solid #E2E8F0',
+                    background: 'white',
+                  }}
+              >
+                <option value="viewer">viewer</option>
+                <option value="editor">editor</option>
+                <option value="admin">admin</option>
+              </select>
+              <Button size="sm" onClick={() => onBulkUpdate({ role: bulkRole })} disabled={bulkPending}>
+                Set Role
+              </Button>
+              <Button size="sm" onClick={() => onBulkUpdate({ is_active: true })} disabled={bulkPending}>
+                Activate
+              </Button>
+              <Button size="sm" colorScheme="red" onClick={() => onBulkUpdate({ is_active: false })} disabled={bulkPending}>
+                Deactivate
+              </Button>
+            </>
+          )}
+        </HStack>
+
         {/* 列表卡片 —— 粉色玻璃表格 */}
         <Box
           bg={PINK_BG}
@@ -421,12 +557,13 @@ export default function UsersPage() {
           {/* 表头（深色保持对比） */}
           <Box
             display="grid"
-            gridTemplateColumns="1fr 1fr 1fr 1fr"
+            gridTemplateColumns="40px 1fr 1fr 1fr 1fr"
             bg="#0b0f2b"
             color="#E2E8F0"
             p={4}
             fontWeight="bold"
           >
+            <Box />
             <Box>Username</Box>
             <Box>Role</Box>
             <Box>Date Joined</Box>
@@ -451,12 +588,20 @@ export default function UsersPage() {
               <Box
                 key={u.id}
                 display="grid"
-                gridTemplateColumns="1fr 1fr 1fr 1fr"
+                gridTemplateColumns="40px 1fr 1fr 1fr 1fr"
                 p={4}
                 borderTop={`1px solid ${PINK_BORDER}`}
                 alignItems="center"
                 bg={idx % 2 === 0 ? PINK_BG_ALT : PINK_BG}
+                opacity={u.is_active === false ? 0.6 : 1}
               >
+                <Box>
+                  <input
+                    type="checkbox"
+                    checked={selected.has(u.id)}
+                    onChange={() => toggleSelected(u.id)}
+                  />
+                </Box>
                 <Box fontWeight="medium" color="#1A202C">{u.username}</Box>
 
                 <Box>
@@ -490,6 +635,15 @@ export default function UsersPage() {
               </Box>
             ))
           )}
+
+          {/* 下一页（键集分页，追加到列表末尾） */}
+          {!loadingUsers && nextUrl && (
+            <Box p={4} textAlign="center" borderTop={`1px solid ${PINK_BORDER}`}>
+              <Button size="sm" variant="outline" onClick={loadMoreUsers} disabled={loadingMore}>
+                {loadingMore ? 'Loading…' : 'Load more'}
+              </Button>
+            </Box>
+          )}
         </Box>
       </Box>
 
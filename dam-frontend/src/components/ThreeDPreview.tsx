@@ -9,6 +9,7 @@ import { OBJLoader } from 'three/examples/jsm/loaders/OBJLoader.js';
 
 type Props = {
   fileUrl: string;         // 主模型文件 URL
+  previewUrl?: string | null; // 服务端生成的轻量预览（GLB），有则先加载它
   style?: React.CSSProperties;
 };
 
@@ -23,9 +24,14 @@ const isOBJ = (url: string) => /\.obj(\?|#|$)/i.test(url);
  * - .glb/.gltf 走 <model-viewer>
  * - .obj（自动尝试同名 .mtl）走 Three.js (OBJLoader+MTLLoader)
  */
-export default function ThreeDPreview({ fileUrl, style }: Props) {
+export default function ThreeDPreview({ fileUrl: originalUrl, previewUrl, style }: Props) {
   const containerRef = useRef<HTMLDivElement | null>(null);
   const [error, setError] = useState<string | null>(null);
+  // 先看轻量预览，需要时再切换到原始模型
+  const [showFull, setShowFull] = useState(false);
+  useEffect(() => { setShowFull(false); }, [originalUrl, previewUrl]);
+  const usingPreview = !!previewUrl && !showFull;
+  const fileUrl = usingPreview ? (previewUrl as string) : originalUrl;
 
   const mtlUrl = useMemo(() => {
     if (!isOBJ(fileUrl)) return null;
@@ -136,15 +142,37 @@ export default function ThreeDPreview({ fileUrl, style }: Props) {
   // glTF 走 model-viewer（你 layout.tsx 已经注入了脚本）
   if (isGLTFLike(fileUrl)) {
     return (
-      <ModelViewer
-        src={fileUrl}
-        style={{ width: '100%', height: '100%', background: 'transparent', ...style }}
-        camera-controls
-        auto-rotate
-        shadow-intensity="0.5"
-        crossorigin="anonymous"
-        exposure="1"
-      />
+      <div style={{ width: '100%', height: '100%', position: 'relative', ...style }}>
+        <ModelViewer
+          src={fileUrl}
+          style={{ width: '100%', height: '100%', background: 'transparent' }}
+          camera-controls
+          auto-rotate
+          shadow-intensity="0.5"
+          crossorigin="anonymous"
+          exposure="1"
+        />
+        {usingPreview && (
+          <button
+            type="button"
+            onClick={() => setShowFull(true)}
+            style={{
+              position: 'absolute',
+              right: 8,
+              bottom: 8,
+              background: '#fff',
+              border: '1px solid #e2e8f0',
+              padding: '4px 8px',
+              borderRadius: 6,
+              fontSize: 12,
+              color: '#4a5568',
+              cursor: 'pointer',
+            }}
+          >
+            Preview quality · Load full model
+          </button>
+        )}
+      </div>
     );
   }
 
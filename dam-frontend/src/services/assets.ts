@@ -3,6 +3,7 @@
 // Collection endpoints include a trailing slash by default.
 
 import { apiRequest, BASE_URL } from '@/lib/api';
+import { authService } from '@/services/auth';
 
 // -------------------- Types --------------------
 
@@ -33,7 +34,10 @@ export type AssetItem = {
   file?: string;
   file_url?: string;
 
+  // Detected from the file's magic bytes at upload time
   mime_type?: string;
+  // SHA-256 of the current file, computed while the upload streams in
+  content_hash?: string;
 
   tags: Tag[];
 
@@ -44,6 +48,11 @@ export type AssetItem = {
   download_count?: number;
   view_count?: number;
   uploaded_by?: MiniUser;
+
+  // Lightweight web preview for 3D models (null until the server has built it)
+  preview_model_url?: string | null;
+  // Resized, cacheable rendition for image assets (null for other types)
+  thumbnail_url?: string | null;
 };
 
 // Alias used elsewhere
@@ -173,6 +182,75 @@ export async function createAsset(form: FormData): Promise<AssetItem> {
   });
 }
 
+// -------------------- Direct upload (object storage) --------------------
+// With STORAGE_BACKEND=s3 the browser PUTs the file straight to the bucket via
+// presigned URLs; the API only signs and registers it. Falls back to createAsset
+// when the server stores files itself: /api/me/ reports `direct_upload`, so the
+// ticket request is skipped entirely in that case. The bucket CORS must expose ETag.
+
+type PresignedUpload = {
+  key: string;
+  token: string;
+  expires_in: number;
+  method?: 'PUT';
+  url?: string;
+  headers?: Record<string, string>;
+  upload_id?: string;
+  part_size?: number;
+  parts?: { part_number: number; url: string }[];
+};
+
+const PART_CONCURRENCY = 4;
+
+async function putToBucket(url: string, body: Blob, headers?: Record<string, string>): Promise<string> {
+  const resp = await fetch(url, { method: 'PUT', body, headers });
+  if (!resp.ok) {
+    const err: any = new Error(`Storage upload failed (HTTP ${resp.status})`);
+    err.status = resp.status;
+    throw err;
+  }
+  return resp.headers.get('ETag') || '';
+}
+
+export async function uploadAssetDirect(form: FormData): Promise<AssetItem> {
+  const file = form.get('file');
+  if (!(file instanceof File) || authService.getCurrentUser()?.direct_upload === false) return createAsset(form);
+
+  let ticket: PresignedUpload;
+  try {
+    ticket = await apiRequest<PresignedUpload>('/api/assets/upload_url/', {
+      method: 'POST',
+      body: { filename: file.name, size: file.size, content_type: file.type || undefined },
+    });
+  } catch (e: any) {
+    if (e?.data?.code === 'direct_upload_unavailable') return createAsset(form);
+    throw e;
+  }
+
+  const done: { part_number: number; etag: string }[] = [];
+  if (ticket.url) {
+    await putToBucket(ticket.url, file, ticket.headers);
+  } else {
+    const parts = [...(ticket.parts || [])];
+    const size = ticket.part_size || file.size;
+    const worker = async () => {
+      for (let p = parts.shift(); p; p = parts.shift()) {
+        const start = (p.part_number - 1) * size;
+        const etag = await putToBucket(p.url, file.slice(start, start + size));
+        done.push({ part_number: p.part_number, etag });
+      }
+    };
+    await Promise.all(Array.from({ length: PART_CONCURRENCY }, worker));
+  }
+
+  // Remaining form fields (name, brand, tag_ids, ...) go along with the token
+  const fields = new FormData();
+  form.forEach((v, k) => { if (k !== 'file') fields.append(k, v); });
+  fields.append('token', ticket.token);
+  if (done.length) fields.append('parts', JSON.stringify(done));
+  return await apiRequest<AssetItem>('/api/assets/upload_complete/', { method: 'POST', body: fields });
+}
+
 // Update (PATCH)
 export async function updateAsset(
   id: number | string,
@@ -202,6 +280,21 @@ export async function getPreviewUrl(id: number | string): Promise<string> {
   return detail?.file_url || detail?.file || '';
 }
 
+// Video playback sources. hls_url/preview_url are null until background transcoding
+// has finished; fallback_url (the original upload) is always present.
+export type StreamInfo = {
+  status: 'ready' | 'pending' | 'processing' | 'failed' | 'none';
+  hls_url: string | null;
+  playlist_url?: string | null;
+  preview_url: string | null;
+  fallback_url: string;
+  renditions?: { height: number; video_kbps: number }[];
+};
+
+export async function getStreamInfo(id: number | string): Promise<StreamInfo> {
+  return await apiRequest<StreamInfo>(`/api/assets/${id}/stream/`);
+}
+
 // -------------------- Download (minimal logic, more robust) --------------------
 
 // Read token from storage/cookie without changing your login flow
@@ -13,6 +13,8 @@ export type CurrentUser = {
   username?: string;
   first_name?: string;
   role?: "admin" | "editor" | "viewer";
+  /** 服务器支持浏览器直传对象存储（/api/me/ 返回） */
+  direct_upload?: boolean;
 };
 
 const STORAGE_USER = "currentUser";
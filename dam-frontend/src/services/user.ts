@@ -20,10 +20,48 @@ function normalizeRole(raw: unknown): Role | undefined {
   return (['admin', 'editor', 'viewer'] as const).includes(r as Role) ? (r as Role) : undefined;
 }
 
-export async function fetchUsers(): Promise<UserRow[]> {
-  const data = await apiRequest<UserRow[]>('/api/admin/users/');
-  const arr = Array.isArray(data) ? data : [];
-  return arr.map((u) => ({ ...u, role: normalizeRole(u.role) ?? 'viewer' }));
+export type UserPage = {
+  results: UserRow[];
+  next: string | null;
+  previous: string | null;
+};
+
+export type UserQuery = {
+  search?: string;       // 用户名 / 邮箱前缀
+  role?: Role;
+  is_active?: boolean;
+  page_size?: number;
+};
+
+// 键集分页：第一页用 query 拼，后续直接传后端给的 next / previous 链接
+export async function fetchUsers(query: UserQuery = {}, pageUrl?: string | null): Promise<UserPage> {
+  let url = pageUrl || '';
+  if (!url) {
+    const params = new URLSearchParams();
+    if (query.search?.trim()) params.set('search', query.search.trim());
+    if (query.role) params.set('role', query.role);
+    if (query.is_active !== undefined) params.set('is_active', String(query.is_active));
+    if (query.page_size) params.set('page_size', String(query.page_size));
+    const qs = params.toString();
+    url = `/api/admin/users/${qs ? `?${qs}` : ''}`;
+  }
+  const data = await apiRequest<any>(url);
+  const arr: UserRow[] = Array.isArray(data) ? data : data?.results ?? [];
+  return {
+    results: arr.map((u) => ({ ...u, role: normalizeRole(u.role) ?? 'viewer' })),
+    next: data?.next ?? null,
+    previous: data?.previous ?? null,
+  };
+}
+
+export async function bulkUpdateUsers(
+  ids: number[],
+  patch: Partial<{ role: Role; is_active: boolean }>
+): Promise<{ updated: number; missing: number[] }> {
+  return apiRequest('/api/admin/users/bulk/', {
+    method: 'POST',
+    body: { ids, ...patch },
+  });
 }
 
 export async function createUser(payload: {
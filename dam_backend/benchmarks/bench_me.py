@@ -0,0 +1,126 @@
+# benchmarks/bench_me.py —— 测 /api/me/、/api/ping/ 的吞吐（对比连接池开/关）
+"""
+用法（先分别用两种配置启动后端，再跑本脚本；都关掉限流，否则 read 桶的 burst 用完后全算成错误）：
+
+    # 1) 不复用连接（每个请求新建 PostgreSQL 连接）
+    THROTTLE_ENABLED=0 DB_CONN_MAX_AGE=0 DB_POOL=0 python manage.py runserver --noreload 8000
+    python benchmarks/bench_me.py --username admin --password ***
+
+    # 2) 持久连接 + 健康检查
+    THROTTLE_ENABLED=0 DB_CONN_MAX_AGE=60 DB_POOL=0 python manage.py runserver --noreload 8000
+
+    # 3) psycopg3 连接池（需 pip install "psycopg[binary,pool]"）
+    THROTTLE_ENABLED=0 DB_POOL=1 DB_POOL_MAX_SIZE=10 python manage.py runserver --noreload 8000
+
+只依赖标准库；每个线程一条 keep-alive HTTP 连接，尽量让客户端开销不干扰结果。
+"""
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+import urllib.parse
+
+
+def obtain_token(base, username, password):
+    u = urllib.parse.urlsplit(base)
+    conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=30)
+    body = json.dumps({"username": username, "password": password})
+    conn.request("POST", "/api/token/", body=body, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    data = json.loads(resp.read() or b"{}")
+    conn.close()
+    if resp.status != 200 or "access" not in data:
+        raise SystemExit(f"token request failed: {resp.status} {data}")
+    return data["access"]
+
+
+def worker(base, path, headers, deadline, latencies, errors, lock):
+    u = urllib.parse.urlsplit(base)
+    conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=30)
+    local, failed = [], 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                failed += 1
+        except (OSError, http.client.HTTPException):
+            failed += 1
+            conn.close()
+            conn = http.client.HTTPConnection(u.hostname, u.port or 80, timeout=30)
+            continue
+        local.append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        latencies.extend(local)
+        errors[0] += failed
+
+
+def run(base, path, headers, concurrency, seconds):
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + seconds
+    threads = [
+        threading.Thread(target=worker, args=(base, path, headers, deadline, latencies, errors, lock))
+        for _ in range(concurrency)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+
+    latencies.sort()
+
+    def pct(p):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+    return {
+        "path": path,
+        "requests": len(latencies),
+        "errors": errors[0],
+        "seconds": round(elapsed, 2),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else None,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base", default="http://127.0.0.1:8000")
+    ap.add_argument("--username", required=True)
+    ap.add_argument("--password", required=True)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=15)
+    ap.add_argument("--label", default="", help="写进结果里，方便对比（例如 pool / no-pool）")
+    ap.add_argument("--out", help="结果追加写入的 JSON Lines 文件")
+    args = ap.parse_args()
+
+    token = obtain_token(args.base, args.username, args.password)
+    results = [
+        run(args.base, "/api/ping/", {}, args.concurrency, args.seconds),
+        run(args.base, "/api/me/", {"Authorization": f"Bearer {token}"}, args.concurrency, args.seconds),
+    ]
+    for r in results:
+        r["label"] = args.label
+        r["concurrency"] = args.concurrency
+        print(f"[{args.label or '-'}] {r['path']:<12} {r['rps']:>8} req/s  p50={r['p50_ms']}ms  "
+              f"p99={r['p99_ms']}ms  errors={r['errors']}")
+
+    if args.out:
+        with open(args.out, "a", encoding="utf-8") as fh:
+            for r in results:
+                fh.write(json.dumps(r) + "\n")
+
+
+if __name__ == "__main__":
+    main()
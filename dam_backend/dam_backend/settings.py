@@ -3,6 +3,8 @@ import os
 from datetime import timedelta
 import mimetypes
 
+from django.core.exceptions import ImproperlyConfigured
+
 # ✅ 常见模型/文档类型
 mimetypes.add_type("model/gltf-binary", ".glb")
 mimetypes.add_type("model/gltf+json", ".gltf")
@@ -32,11 +34,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",  # 放最前
+    "myassets.profiling.RequestProfilingMiddleware",  # 可选：慢请求剖析（未开启时不加载）
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "myassets.db_routing.ReplicaRoutingMiddleware",  # 只读副本路由（未配置副本时无影响）
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -61,18 +65,72 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "dam_backend.wsgi.application"
 
-# PostgreSQL
+# PostgreSQL（默认值与原来一致；部署时用环境变量覆盖）
+# 连接复用两种模式：
+# - DB_POOL=1 且安装了 psycopg3 + psycopg_pool：Django 原生连接池（min/max/timeout/健康检查）
+# - 否则：持久连接 CONN_MAX_AGE 秒 + CONN_HEALTH_CHECKS（复用前先探活）
+DB_ENGINE = os.getenv("DB_ENGINE", "django.db.backends.postgresql")
+
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
-        "NAME": "dam_db",
-        "USER": "postgres",
-        "PASSWORD": "123456",
-        "HOST": "127.0.0.1",
-        "PORT": "5432",
+        "ENGINE": DB_ENGINE,
+        "NAME": os.getenv("DB_NAME", "dam_db"),
+        "USER": os.getenv("DB_USER", "postgres"),
+        "PASSWORD": os.getenv("DB_PASSWORD", "123456"),
+        "HOST": os.getenv("DB_HOST", "127.0.0.1"),
+        "PORT": os.getenv("DB_PORT", "5432"),
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "1") == "1",
+        "OPTIONS": {},
     }
 }
 
+if DB_ENGINE.endswith("sqlite3"):
+    # 本地替身（例如不装 PostgreSQL 时跑 benchmark / 演示）
+    DATABASES["default"].update({
+        "NAME": os.getenv("DB_NAME", os.path.join(BASE_DIR, "db.sqlite3")),
+        "CONN_MAX_AGE": 0,
+    })
+else:
+    DATABASES["default"]["OPTIONS"]["connect_timeout"] = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+
+    if os.getenv("DB_POOL", "0") == "1":
+        try:
+            import psycopg  # noqa: F401  psycopg3
+            from psycopg_pool import ConnectionPool
+        except ImportError:
+            ConnectionPool = None  # 没装 psycopg3 连接池：退回持久连接
+
+        if ConnectionPool is not None:
+            DATABASES["default"]["OPTIONS"]["pool"] = {
+                "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),         # 等待空闲连接的最长秒数
+                "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),      # 空闲连接回收
+                "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "1800")),
+                "check": ConnectionPool.check_connection,                   # 借出前健康检查
+            }
+            # Django 原生连接池要求 CONN_MAX_AGE=0（连接由池管理）
+            DATABASES["default"]["CONN_MAX_AGE"] = 0
+
+# 只读副本：DB_REPLICAS=host1,host2[:port]（SQLite 替身时填数据库文件路径），其余参数同 default
+# SAFE 请求（资产/标签/用户资料）读副本；写后 DB_REPLICA_STICKY_SECONDS 秒内该用户读主库（需要 REDIS_URL，见缓存一节）
+DATABASE_REPLICAS = []
+for _i, _target in enumerate([t.strip() for t in os.getenv("DB_REPLICAS", "").split(",") if t.strip()], start=1):
+    _alias = f"replica{_i}"
+    _conf = {**DATABASES["default"], "OPTIONS": {**DATABASES["default"]["OPTIONS"]}}
+    if DB_ENGINE.endswith("sqlite3"):
+        _conf["NAME"] = _target
+    else:
+        _host, _, _port = _target.partition(":")
+        _conf.update({"HOST": _host, "PORT": _port or DATABASES["default"]["PORT"]})
+    _conf["TEST"] = {"MIRROR": "default"}  # 测试时副本指向主库，避免读不到刚写的数据
+    DATABASES[_alias] = _conf
+    DATABASE_REPLICAS.append(_alias)
+
+DATABASE_ROUTERS = ["myassets.db_routing.ReplicaRouter"]
+DB_REPLICA_STICKY_SECONDS = int(os.getenv("DB_REPLICA_STICKY_SECONDS", "10"))
+
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
     {"NAME": "django.contrib.auth.password_validation.MinimumLengthValidator"},
@@ -80,6 +138,33 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
+# ---- 登录 / 密码哈希（myassets/passwords.py）----
+AUTHENTICATION_BACKENDS = ["myassets.passwords.PooledModelBackend"]  # 哈希放进有界线程池
+LOGIN_HASH_WORKERS = int(os.getenv("LOGIN_HASH_WORKERS", str(os.cpu_count() or 2)))  # 同时算哈希的线程数
+LOGIN_HASH_QUEUE = int(os.getenv("LOGIN_HASH_QUEUE", "64"))           # 再多的登录直接 503
+LOGIN_HASH_TIMEOUT_SECONDS = float(os.getenv("LOGIN_HASH_TIMEOUT_SECONDS", "30"))
+# 首选哈希：pbkdf2（默认，迭代次数 PBKDF2_ITERATIONS 可调）/ argon2 / bcrypt / scrypt；
+# 换了首选或调高迭代次数，用户下次登录时自动重新哈希（低于 Django 默认的迭代次数按默认算，不降级）
+PBKDF2_ITERATIONS = int(os.getenv("PBKDF2_ITERATIONS", "0")) or None  # 不设 = Django 默认
+_PREFERRED_HASHER = {
+    "pbkdf2": "myassets.passwords.TunedPBKDF2PasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",      # 需要 argon2-cffi
+    "bcrypt": "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",  # 需要 bcrypt
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+}[os.getenv("PASSWORD_HASHER", "pbkdf2")]
+PASSWORD_HASHERS = [_PREFERRED_HASHER] + [h for h in (
+    "myassets.passwords.TunedPBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+) if h != _PREFERRED_HASHER]
+
+# 会话存储：db（默认）/ cached_db / cache（多机需 REDIS_URL）/ signed_cookies（不落库）
+SESSION_ENGINE = "django.contrib.sessions.backends." + {
+    "db": "db", "cached_db": "cached_db", "cache": "cache", "signed_cookies": "signed_cookies",
+}[os.getenv("SESSION_BACKEND", "db")]
+
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "Asia/Kuala_Lumpur"
 USE_I18N = True
@@ -92,12 +177,22 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")] if os.path.isdir(os.path.j
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# 存储：default = 主存储（MEDIA_ROOT）；cold = 历史版本冷存储（tiering.py，本地目录即可替代对象存储）
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "cold": {
+        "BACKEND": os.getenv("COLD_STORAGE_BACKEND", "django.core.files.storage.FileSystemStorage"),
+        "OPTIONS": {"location": os.getenv("COLD_STORAGE_ROOT", os.path.join(BASE_DIR, "cold_storage"))},
+    },
+}
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # ★ 强烈建议：保留 Session 只用于 /admin/ 后台；业务 API 以 JWT 为主（顺序：JWT 优先）
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",   # ★ 放前面
+        "myassets.authentication.TokenUserJWTAuthentication",   # ★ 放前面（只读接口不查 User，见 authentication.py）
         "rest_framework.authentication.SessionAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
@@ -108,14 +203,182 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ),
+    # orjson 渲染（未安装时自动退回标准 JSONRenderer）
+    "DEFAULT_RENDERER_CLASSES": (
+        "myassets.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    # 令牌桶限流（预算见下面的 THROTTLING）
+    "DEFAULT_THROTTLE_CLASSES": (
+        "myassets.throttling.BucketThrottle",
+    ),
+    "NUM_PROXIES": int(os.environ["NUM_PROXIES"]) if os.getenv("NUM_PROXIES") else None,  # 按 X-Forwarded-For 取客户端 IP
+}
+
+# 缓存：配置了 REDIS_URL 就用 Redis（多台机器共享限流桶 / 并发计数），否则进程内存（只在本进程有效）
+if os.getenv("REDIS_URL"):
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache",
+                          "LOCATION": os.environ["REDIS_URL"]}}
+else:
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# 副本的“写后粘主库”标记（db_routing.pin_to_primary）存在上面的 cache 里：进程内存各 worker 互相看不见，
+# 用户的下一次读落到别的进程就会读到落后的副本。配了副本就必须有共享 cache（REDIS_URL）；
+# 单进程服务（runserver / SQLite 替身）可以用 DB_REPLICA_LOCAL_PINS=1 明确放行
+if DATABASE_REPLICAS and not os.getenv("REDIS_URL") and os.getenv("DB_REPLICA_LOCAL_PINS") != "1":
+    raise ImproperlyConfigured("DB_REPLICAS needs a shared cache for read-your-writes pins: set REDIS_URL "
+                               "(or DB_REPLICA_LOCAL_PINS=1 for a single-process server)")
+
+# ---- 两级缓存（myassets/caching.py：进程内 LRU + 上面的共享 cache，失效经 pg_notify 广播）----
+TWO_TIER_CACHE = {
+    "LOCAL_MAX_ITEMS": int(os.getenv("CACHE_LOCAL_MAX_ITEMS", "2048")),
+    "LOCAL_TTL": int(os.getenv("CACHE_LOCAL_TTL", "30")),      # 进程内副本最长保留秒数（漏掉通知时的兜底）
+    "SHARED_TTL": int(os.getenv("CACHE_SHARED_TTL", "300")),
+    "LOCK_TTL": int(os.getenv("CACHE_LOCK_TTL", "30")),        # 回源锁：持有者崩溃后多久失效
+    "WAIT_SECONDS": int(os.getenv("CACHE_WAIT_SECONDS", "5")), # 等别的节点回源的最长时间
+}
+
+# ---- 限流 / 过载保护（myassets/throttling.py）----
+MB = 1024 * 1024
+THROTTLING = {
+    "ENABLED": os.getenv("THROTTLE_ENABLED", "1") == "1",
+    # 每个用户（匿名按 IP）一个桶：每秒补充 rate，最多攒 burst；download / upload 以字节计
+    "BUCKETS": {
+        "read": {"rate": float(os.getenv("THROTTLE_READ_RATE", "20")),
+                 "burst": int(os.getenv("THROTTLE_READ_BURST", "200"))},
+        "search": {"rate": float(os.getenv("THROTTLE_SEARCH_RATE", "2")),
+                   "burst": int(os.getenv("THROTTLE_SEARCH_BURST", "20"))},
+        "download": {"rate": float(os.getenv("THROTTLE_DOWNLOAD_MBPS", "20")) * MB,
+                     "burst": int(os.getenv("THROTTLE_DOWNLOAD_BURST_MB", "2048")) * MB},
+        "upload": {"rate": float(os.getenv("THROTTLE_UPLOAD_MBPS", "10")) * MB,
+                   "burst": int(os.getenv("THROTTLE_UPLOAD_BURST_MB", "2048")) * MB},
+    },
+    "MAX_INFLIGHT": int(os.getenv("THROTTLE_MAX_INFLIGHT", "32")),   # 下载 / 检索 / 缩放等重操作的全局并发上限
+    "RETRY_AFTER": int(os.getenv("THROTTLE_RETRY_AFTER", "5")),      # 超过上限时 503 的 Retry-After 秒数
+    "INFLIGHT_TTL": int(os.getenv("THROTTLE_INFLIGHT_TTL", "600")),  # 单个并发名额最长占用秒数（进程崩溃漏还的名额到时空出来）
 }
+# 限流桶和并发名额存在上面的 cache 里：进程内存时每个 worker 各算各的，N 个进程就是 N 倍预算 / N 倍并发。
+# 正式部署（DEBUG=0）开着限流就必须有共享 cache（REDIS_URL）；确实只跑一个进程可以用 THROTTLE_LOCAL=1 明确放行
+if THROTTLING["ENABLED"] and not DEBUG and not os.getenv("REDIS_URL") and os.getenv("THROTTLE_LOCAL") != "1":
+    raise ImproperlyConfigured("THROTTLING needs a shared cache so limits hold across worker processes: set REDIS_URL "
+                               "(or THROTTLE_LOCAL=1 for a single-process server, or THROTTLE_ENABLED=0)")
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=6),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
+    "TOKEN_OBTAIN_SERIALIZER": "myassets.authentication.RoleTokenObtainPairSerializer",  # 载荷带 username / role
     # 可按需补充其他选项
 }
 
+# ---- 请求剖析（默认关闭；结果在 /api/admin/profiles/ 与 Django admin 查看）----
+REQUEST_PROFILING = {
+    "ENABLED": os.getenv("PROFILING_ENABLED", "0") == "1",
+    "SAMPLE_RATE": float(os.getenv("PROFILING_SAMPLE_RATE", "0")),   # 0~1，按比例 cProfile
+    "SLOW_MS": float(os.getenv("PROFILING_SLOW_MS", "1000")),        # 超过即保存栈采样；0=关闭
+    "INTERVAL_MS": float(os.getenv("PROFILING_INTERVAL_MS", "5")),
+    "SAMPLE_AFTER": float(os.getenv("PROFILING_SAMPLE_AFTER", "0.5")),  # 跑过 SLOW_MS 的这个比例才开始采样 / 记 SQL
+    "MAX_QUERIES": int(os.getenv("PROFILING_MAX_QUERIES", "500")),
+    "SKIP_PREFIXES": ["/static/", "/media/", "/api/admin/profiles/"],
+}
+
+# ---- 后台任务队列（manage.py run_worker）----
+JOB_LOCK_TIMEOUT = int(os.getenv("JOB_LOCK_TIMEOUT", str(30 * 60)))      # running 超过该秒数没续租视为 worker 已死
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "3600"))
+# 周期任务：worker 每分钟看一次，距上次入队超过间隔（秒）就补一个；0 = 不自动跑（版本转冷默认手动）
+JOB_SCHEDULE = {
+    "jobs.purge_finished": int(os.getenv("JOB_PURGE_INTERVAL", str(24 * 3600))),
+    "changes.compact": int(os.getenv("CHANGES_COMPACT_INTERVAL", str(24 * 3600))),
+    "versions.tier": int(os.getenv("TIER_INTERVAL", "0")),
+}
+
+# ---- 历史版本分层（manage.py tier_versions / prune_versions）----
+VERSION_TIERING = {
+    "OLDER_THAN_DAYS": int(os.getenv("TIER_OLDER_THAN_DAYS", "30")),  # 早于 N 天的历史版本转冷
+    "KEEP_LAST": int(os.getenv("TIER_KEEP_LAST", "3")),              # 每个资产最近 K 个版本留在主存储
+    "ZSTD_LEVEL": int(os.getenv("TIER_ZSTD_LEVEL", "10")),
+    "MIN_SAVING": float(os.getenv("TIER_MIN_SAVING", "0.1")),        # 压缩省不到 10% 就原样存
+}
+
+# ---- 文档版本差量存储（可选；manage.py delta_versions）----
+VERSION_DELTAS = {
+    "ENABLED": os.getenv("VERSION_DELTAS_ENABLED", "0") == "1",
+    "ASSET_TYPES": ["document", "pdf"],
+    "KEYFRAME_INTERVAL": int(os.getenv("DELTA_KEYFRAME_INTERVAL", "10")),  # 每个关键帧后最多 N 个差量版本
+    "MAX_RATIO": float(os.getenv("DELTA_MAX_RATIO", "0.5")),               # 差量超过原文件一半就改存完整关键帧
+}
+
+# ---- 媒体处理（后台任务调用的本地命令行工具）----
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+FFPROBE_BINARY = os.getenv("FFPROBE_BINARY", "ffprobe")
+# HLS 码率阶梯：高度:视频码率(kbps)，只生成不高于原片的档位
+HLS_LADDER = [
+    tuple(int(x) for x in item.split(":"))
+    for item in os.getenv("HLS_LADDER", "1080:5000,720:2800,480:1400,360:800").split(",") if item.strip()
+]
+HLS_SEGMENT_SECONDS = int(os.getenv("HLS_SEGMENT_SECONDS", "6"))
+HLS_PREVIEW_HEIGHT = int(os.getenv("HLS_PREVIEW_HEIGHT", "720"))       # 不支持 HLS 的浏览器用的 MP4 预览
+# 一个转码任务（HLS + MP4 预览两遍 ffmpeg）的总时限；worker 执行期间续租，不必小于 JOB_LOCK_TIMEOUT
+HLS_TIMEOUT_SECONDS = int(os.getenv("HLS_TIMEOUT_SECONDS", str(25 * 60)))
+# 3D 网页预览：{input} / {output} 会被替换；默认用 gltf-transform（网格简化 + 贴图缩小 + 顶点量化）
+MODEL_PREVIEW_COMMAND = os.getenv(
+    "MODEL_PREVIEW_COMMAND",
+    "gltf-transform optimize {input} {output} --compress quantize --texture-compress webp "
+    "--texture-size 1024 --simplify-ratio 0.5",
+)
+MODEL_OBJ_CONVERT_COMMAND = os.getenv("MODEL_OBJ_CONVERT_COMMAND", "obj2gltf -i {input} -o {output} --binary")
+MODEL_PREVIEW_TIMEOUT_SECONDS = int(os.getenv("MODEL_PREVIEW_TIMEOUT_SECONDS", str(10 * 60)))
+
+# ---- 图片缩略图（/api/assets/{id}/render/，结果缓存在本地磁盘）----
+RENDER_CACHE_DIR = os.getenv("RENDER_CACHE_DIR", os.path.join(BASE_DIR, "render_cache"))
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_MB", "2048")) * 1024 * 1024   # 超过后按最近使用时间淘汰
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "2"))                 # 缩放进程池大小（每个 Web 进程）
+RENDER_MAX_DIMENSION = int(os.getenv("RENDER_MAX_DIMENSION", "4096"))
+RENDER_TIMEOUT_SECONDS = int(os.getenv("RENDER_TIMEOUT_SECONDS", "60"))
+
+# ---- 上传（myassets/uploads.py：边接收边算 sha256、识别类型，暂存在 MEDIA_ROOT 下，保存时只改名）----
+UPLOAD_STAGING_DIR = os.getenv("UPLOAD_STAGING_DIR", os.path.join(MEDIA_ROOT, ".uploads"))  # 需与 MEDIA_ROOT 同一文件系统
+UPLOAD_MAX_BYTES = {  # 按识别出的类型限制大小，超过返回 413
+    "image": int(os.getenv("UPLOAD_MAX_IMAGE_MB", "200")) * 1024 * 1024,
+    "video": int(os.getenv("UPLOAD_MAX_VIDEO_MB", "10240")) * 1024 * 1024,
+    "pdf": int(os.getenv("UPLOAD_MAX_PDF_MB", "500")) * 1024 * 1024,
+    "document": int(os.getenv("UPLOAD_MAX_DOCUMENT_MB", "500")) * 1024 * 1024,
+    "3d_model": int(os.getenv("UPLOAD_MAX_3D_MODEL_MB", "2048")) * 1024 * 1024,
+}
+
+# ---- 存储用量 / 配额（myassets/quotas.py；报表 /api/admin/storage/，旧数据先跑 manage.py recompute_usage --fill-sizes）----
+# 默认配额（GB，0 = 不限）；单个用户 / 品牌可在报表接口或 Django admin 里另设 quota_bytes
+STORAGE_QUOTAS = {
+    "user": int(float(os.getenv("STORAGE_QUOTA_USER_GB", "0")) * 1024 ** 3) or None,
+    "brand": int(float(os.getenv("STORAGE_QUOTA_BRAND_GB", "0")) * 1024 ** 3) or None,
+}
+
+# ---- 对象存储（myassets/objectstore.py；需要 boto3）----
+# STORAGE_BACKEND=s3：资产 / 版本文件存 S3 兼容对象存储，应用节点不再依赖本机磁盘；
+# 本地联调：manage.py s3_standin 起替身，再设 S3_ENDPOINT_URL=http://127.0.0.1:9000
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "filesystem")
+S3_BUCKET = os.getenv("S3_BUCKET", "dam-assets")
+S3_STANDIN_ROOT = os.getenv("S3_STANDIN_ROOT", os.path.join(BASE_DIR, "s3_standin"))
+if STORAGE_BACKEND == "s3":
+    STORAGES["default"] = {
+        "BACKEND": "myassets.objectstore.S3Storage",
+        "OPTIONS": {
+            "bucket": S3_BUCKET,
+            "endpoint_url": os.getenv("S3_ENDPOINT_URL"),            # 不设 = AWS
+            "region": os.getenv("S3_REGION"),
+            "access_key": os.getenv("S3_ACCESS_KEY_ID"),
+            "secret_key": os.getenv("S3_SECRET_ACCESS_KEY"),
+            "location": os.getenv("S3_PREFIX", ""),                  # 桶内前缀
+            "addressing_style": os.getenv("S3_ADDRESSING_STYLE", "path"),
+            "multipart_threshold": int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "64")) * MB,  # 超过就分片并行上传
+            "multipart_chunksize": int(os.getenv("S3_MULTIPART_CHUNK_MB", "16")) * MB,
+            "max_concurrency": int(os.getenv("S3_MAX_CONCURRENCY", "8")),                   # 每个文件的并行分片数
+            "max_pool_connections": int(os.getenv("S3_MAX_POOL_CONNECTIONS", "32")),        # 每个进程的连接池
+            "url_expires": int(os.getenv("S3_URL_EXPIRES", "3600")),                       # 预签名地址有效期（秒）
+            "redirect_downloads": os.getenv("S3_REDIRECT_DOWNLOADS", "0") == "1",          # 下载直接 302 到预签名地址
+        },
+    }
+
 # ---- CORS / CSRF（允许跨域；你前端用 JWT，不走 Cookie，但保留无害）----
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOWED_ORIGINS = [
@@ -1,7 +1,8 @@
 # myassets/admin.py
 from django.contrib import admin
 from django.contrib.auth.models import User
-from .models import Asset, Tag, UserProfile, AssetVersion
+from .models import Asset, Tag, UserProfile, AssetVersion, RequestProfile, AssetChange, Job, StorageUsage
+from . import jobs
 
 # ---------- Tag ----------
 @admin.register(Tag)
@@ -37,6 +38,70 @@ class AssetVersionAdmin(admin.ModelAdmin):
     autocomplete_fields = ("asset", "uploaded_by")
     ordering = ("-version", "-created_at")
 
+# ---------- RequestProfile（只读：慢请求剖析结果） ----------
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ("id", "created_at", "method", "path", "status_code", "duration_ms", "query_count", "trigger")
+    list_filter = ("trigger", "method", "created_at")
+    search_fields = ("path",)
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+    readonly_fields = [f.name for f in RequestProfile._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+# ---------- AssetChange（只读：增量同步日志） ----------
+@admin.register(AssetChange)
+class AssetChangeAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "asset_id", "tag_id", "version", "created_at")
+    list_filter = ("kind", "created_at")
+    search_fields = ("=asset_id",)
+    ordering = ("-id",)
+    readonly_fields = [f.name for f in AssetChange._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+# ---------- StorageUsage（存储用量汇总；数字由 quotas.py 维护，这里只改配额） ----------
+@admin.register(StorageUsage)
+class StorageUsageAdmin(admin.ModelAdmin):
+    list_display = ("id", "scope", "key", "user", "bytes", "assets", "quota_bytes", "updated_at")
+    list_filter = ("scope",)
+    search_fields = ("key", "user__username")
+    ordering = ("-bytes",)
+    readonly_fields = ("scope", "key", "user", "bytes", "assets", "updated_at")
+
+    def has_add_permission(self, request):
+        return False
+
+# ---------- Job（后台任务队列） ----------
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "priority", "attempts", "max_attempts", "run_at", "locked_by", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "dedupe_key")
+    date_hierarchy = "created_at"
+    ordering = ("-id",)
+    readonly_fields = ("attempts", "locked_by", "locked_at", "created_at", "finished_at", "last_error")
+    actions = ("retry_jobs", "cancel_jobs")
+
+    @admin.action(description="重新排队（失败任务）")
+    def retry_jobs(self, request, queryset):
+        n = jobs.retry(list(queryset.values_list("id", flat=True)))
+        self.message_user(request, f"{n} job(s) re-queued")
+
+    @admin.action(description="取消（排队中的任务）")
+    def cancel_jobs(self, request, queryset):
+        n = queryset.filter(status="queued").update(status="failed", last_error="cancelled by admin")
+        self.message_user(request, f"{n} job(s) cancelled")
+
 # ---------- User & Profile ----------
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
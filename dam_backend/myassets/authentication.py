@@ -0,0 +1,106 @@
+# myassets/authentication.py —— JWT 认证：只读接口用轻量的令牌用户，不查 User / UserProfile
+"""
+- 默认的 JWTAuthentication 每个请求查一次 User，判断角色时再查一次 UserProfile
+- 视图集设置 token_user_reads = True 后，它的 GET / HEAD / OPTIONS 请求拿到的是 TokenRoleUser：
+  id / username 来自令牌，角色和启用状态来自两级缓存（caching.user_state，命中时零查询），
+  User / UserProfile 保存时失效。user.userprofile.role、is_staff 等原有写法不用改
+- 写请求（上传时要 uploaded_by=request.user 等）仍然是完整的 User
+- 签发令牌时把 username / role 写进载荷（前端可以直接用；权限判断以缓存里的角色为准）
+"""
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from . import caching
+
+
+def _load_state(user_id):
+    row = (User.objects.filter(pk=user_id)
+           .values("username", "is_active", "is_staff", "is_superuser", "userprofile__role").first())
+    if row is None:
+        return None
+    row["role"] = (row.pop("userprofile__role") or "viewer").lower()
+    return row
+
+
+def user_state(user_id):
+    """{username, role, is_active, is_staff, is_superuser}；用户不存在返回 None"""
+    return caching.user_state.get_or_compute(user_id, lambda: _load_state(user_id))
+
+
+class TokenRoleUser(TokenUser):
+    def __init__(self, token, state):
+        super().__init__(token)
+        self._user_state = state
+
+    @cached_property
+    def id(self):
+        # 载荷里的 user_id 是字符串；和 User.id 一样用整数，比较 / 拼缓存键时才一致
+        raw = self.token[jwt_settings.USER_ID_CLAIM]
+        return int(raw) if str(raw).isdigit() else raw
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @property
+    def username(self):
+        return self.token.get("username") or self._user_state["username"]
+
+    @property
+    def is_active(self):
+        return self._user_state["is_active"]
+
+    @property
+    def is_staff(self):
+        return self._user_state["is_staff"]
+
+    @property
+    def is_superuser(self):
+        return self._user_state["is_superuser"]
+
+    @property
+    def userprofile(self):
+        return SimpleNamespace(role=self._user_state["role"])
+
+
+class TokenUserJWTAuthentication(JWTAuthentication):
+    """DEFAULT_AUTHENTICATION_CLASSES 里替代 JWTAuthentication"""
+
+    def authenticate(self, request):
+        view = (getattr(request, "parser_context", None) or {}).get("view")
+        self._token_user = (request.method in SAFE_METHODS and getattr(view, "token_user_reads", False)
+                            and not jwt_settings.CHECK_REVOKE_TOKEN)  # 吊销检查要比对密码哈希，只能查库
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if not getattr(self, "_token_user", False):
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+        state = user_state(user_id)
+        if state is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not state["is_active"]:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return TokenRoleUser(validated_token, state)
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token["username"] = user.get_username()
+        state = user_state(user.pk)  # 走缓存，通常不用再查 UserProfile
+        token["role"] = state["role"] if state else "viewer"
+        return token
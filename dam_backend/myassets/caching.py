@@ -0,0 +1,272 @@
+# myassets/caching.py —— 两级缓存（进程内 LRU + 共享 cache）+ 跨节点失效广播 + 回源合并
+"""
+- 读：进程内 LRU（LOCAL_TTL 秒）→ 共享 cache（Django default cache，多节点时配 Redis）→ 回源
+- 版本号：每个键在共享 cache 里有一个代数 gen，值存在 "{键}@{gen}" 下；
+  失效 = gen + 1（原子 incr），回源期间发生的失效只会让结果写到旧代数下，永远读不到；
+  回源一律读主库（primary_reads）：失效在主库提交后才 +1，此后开始的回源若去读落后的副本，
+  会把提交前的旧数据写在新代数下，留到 SHARED_TTL 过期
+- 广播：失效在事务提交后执行，并 pg_notify('dam_cache', 键列表)；每个进程一个监听线程，
+  收到后丢掉本地副本。监听断线重连时清空本地层（可能漏了通知）；
+  非 PostgreSQL（本地 SQLite 替身）时只清本进程，其他进程靠 LOCAL_TTL 兜底
+- 回源合并（single-flight）：同一进程内同一个键只有一个线程回源，其他线程等它的结果；
+  跨进程用共享 cache 里的短锁，没拿到锁的轮询共享层等结果，等太久再自己回源
+- 同一个键可以有多个变体（variant，例如带域名的绝对 URL），失效时一起失效
+"""
+import json
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.core.cache import cache as shared
+from django.db import connections, transaction
+
+from .db_routing import PRIMARY_DB, primary_reads
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "dam_cache"
+POLL_INTERVAL = 0.02
+NOTIFY_BATCH = 200  # 每条通知最多带多少个键（键都很短）
+
+DEFAULTS = {
+    "LOCAL_MAX_ITEMS": 2048,
+    "LOCAL_TTL": 30,
+    "SHARED_TTL": 300,
+    "LOCK_TTL": 30,
+    "WAIT_SECONDS": 5,
+}
+
+
+def _config(name):
+    return (getattr(settings, "TWO_TIER_CACHE", None) or {}).get(name, DEFAULTS[name])
+
+
+class TwoTierCache:
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self._local = OrderedDict()  # 键 → (过期时间, gen, {variant: 值})
+        self._lock = threading.Lock()
+        self._inflight = {}
+        _registry[namespace] = self
+
+    # ---------- 键 ----------
+    def _gen_key(self, key):
+        return f"tt:{self.namespace}:{key}:gen"
+
+    def _value_key(self, key, gen, variant):
+        return f"tt:{self.namespace}:{key}@{gen}|{variant}"
+
+    def _gen(self, key):
+        gen = shared.get(self._gen_key(key))
+        if gen is None:
+            # 用时间做初值：代数被淘汰后重新开始也不会撞上以前的值
+            shared.add(self._gen_key(key), time.time_ns(), None)
+            gen = shared.get(self._gen_key(key))
+        return gen
+
+    # ---------- 本地层 ----------
+    def _local_get(self, key, variant):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires, gen, values = entry
+            if expires < time.monotonic():
+                del self._local[key]
+                return None
+            if variant not in values:
+                return None
+            self._local.move_to_end(key)
+            return values[variant], gen
+
+    def _local_put(self, key, gen, variant, value):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None or entry[1] != gen:
+                entry = (time.monotonic() + _config("LOCAL_TTL"), gen, {})
+                self._local[key] = entry
+            entry[2][variant] = value
+            self._local.move_to_end(key)
+            while len(self._local) > _config("LOCAL_MAX_ITEMS"):
+                self._local.popitem(last=False)
+
+    def drop_local(self, key=None):
+        with self._lock:
+            if key is None:
+                self._local.clear()
+            else:
+                self._local.pop(key, None)
+
+    # ---------- 读 ----------
+    def get_or_compute(self, key, compute, variant=""):
+        key = str(key)
+        _ensure_listener()
+        hit = self._local_get(key, variant)
+        if hit is not None:
+            return hit[0]
+
+        flight = (key, variant)
+        with self._lock:
+            pending = self._inflight.get(flight)
+            leader = pending is None
+            if leader:
+                pending = self._inflight[flight] = Future()
+        if not leader:
+            return pending.result(timeout=_config("WAIT_SECONDS") + _config("LOCK_TTL"))
+
+        try:
+            value = self._load(key, variant, compute)
+            pending.set_result(value)
+            return value
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(flight, None)
+
+    def _load(self, key, variant, compute):
+        compute = _on_primary(compute)
+        gen = self._gen(key)
+        value_key = self._value_key(key, gen, variant)
+        found = shared.get(value_key, _MISSING)
+        if found is _MISSING:
+            found = self._compute_once(value_key, compute)
+        if self._gen(key) == gen:  # 回源期间没有被失效才放进本地层
+            self._local_put(key, gen, variant, found)
+        return found
+
+    def _compute_once(self, value_key, compute):
+        lock_key = value_key + ":lock"
+        deadline = time.monotonic() + _config("WAIT_SECONDS")
+        while not shared.add(lock_key, 1, _config("LOCK_TTL")):
+            # 别的节点正在回源：等它写进共享层
+            time.sleep(POLL_INTERVAL)
+            found = shared.get(value_key, _MISSING)
+            if found is not _MISSING:
+                return found
+            if time.monotonic() > deadline:
+                logger.warning("gave up waiting for %s to be computed elsewhere", value_key)
+                return compute()
+        try:
+            value = compute()
+            shared.set(value_key, value, _config("SHARED_TTL"))
+            return value
+        finally:
+            shared.delete(lock_key)
+
+    # ---------- 失效 ----------
+    def invalidate(self, *keys):
+        """事务提交后让这些键在所有节点上失效"""
+        keys = [str(k) for k in keys]
+        if keys:
+            transaction.on_commit(lambda: self._invalidate_now(keys), using=PRIMARY_DB, robust=True)
+
+    def _invalidate_now(self, keys):
+        for key in keys:
+            try:
+                shared.incr(self._gen_key(key))
+            except ValueError:  # 从没缓存过 / 被淘汰了：下次读会重新生成代数
+                pass
+            self.drop_local(key)
+        _broadcast(self.namespace, keys)
+
+
+_MISSING = object()
+_registry = {}
+
+
+def _on_primary(compute):
+    def run():
+        with primary_reads():
+            return compute()
+    return run
+
+
+# ---------------- 广播 ----------------
+def _broadcast(namespace, keys):
+    conn = connections[PRIMARY_DB]
+    if conn.vendor != "postgresql":
+        return
+    with conn.cursor() as cur:
+        # pg_notify 单条 payload 上限 8000 字节
+        for start in range(0, len(keys), NOTIFY_BATCH):
+            payload = json.dumps({"ns": namespace, "keys": keys[start:start + NOTIFY_BATCH]}, separators=(",", ":"))
+            cur.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
+
+
+def _deliver(payload):
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        return
+    target = _registry.get(message.get("ns"))
+    if target is not None:
+        for key in message.get("keys") or ():
+            target.drop_local(key)
+
+
+def _drop_all_local():
+    for target in list(_registry.values()):
+        target.drop_local()
+
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _ensure_listener():
+    global _listener
+    if _listener is not None and _listener.is_alive():
+        return
+    if connections[PRIMARY_DB].vendor != "postgresql":
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen_forever, name="dam-cache-listener", daemon=True)
+            _listener.start()
+
+
+def _listen_forever():
+    backoff = 1.0
+    while True:
+        raw = None
+        try:
+            wrapper = connections[PRIMARY_DB]
+            raw = wrapper.Database.connect(**wrapper.get_connection_params())
+            raw.autocommit = True
+            with raw.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")
+            _drop_all_local()  # 开始监听之前的通知收不到：本地层从头来
+            backoff = 1.0
+            if hasattr(raw, "poll"):  # psycopg2
+                while True:
+                    if select.select([raw], [], [], 5.0) == ([], [], []):
+                        continue
+                    raw.poll()
+                    while raw.notifies:
+                        _deliver(raw.notifies.pop(0).payload)
+            else:  # psycopg3
+                for note in raw.notifies():
+                    _deliver(note.payload)
+        except Exception:
+            logger.exception("cache invalidation listener failed; retrying in %.0fs", backoff)
+            _drop_all_local()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+        finally:
+            if raw is not None:
+                try:
+                    raw.close()
+                except Exception:
+                    pass
+
+
+# ---------------- 现有用途 ----------------
+tag_list = TwoTierCache("tags")        # 键 "all"：GET /api/tags/ 的完整结果
+asset_detail = TwoTierCache("asset")   # 键 = 资产 id；变体 = 站点根 URL（序列化结果里是绝对地址）
+user_state = TwoTierCache("user")      # 键 = 用户 id：用户名 / 角色 / 启用状态（authentication.py）
@@ -0,0 +1,150 @@
+# myassets/changefeed.py —— 资产增量变更日志（"changes since cursor"）
+"""
+写入：signals.py 在 Asset / AssetVersion / Tag 的保存、删除、标签变更时调用 record_change()，
+与业务写入处于同一事务（视图里用 transaction.atomic 包住）。
+
+游标单调性：PostgreSQL 上写日志前先拿一个事务级 advisory lock，
+让变更日志的写事务串行提交 —— 这样 id 顺序 == 提交顺序，客户端按 id 追就不会漏。
+
+读取：changes_since() 把一页日志按资产/标签折叠成“最新状态”，
+未删除的返回完整行（upsert），已删除的返回墓碑（delete）。
+
+保留/压缩：manage.py compact_changes
+- 压缩：同一资产/标签只保留最新一条
+- 保留：早于 N 天的全部删掉，留一条 horizon 记录；游标早于 horizon 的客户端需要全量重拉
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import AssetChange
+
+# pg_advisory_xact_lock 的 key（任意固定整数）
+_FEED_LOCK_KEY = 703_311_031
+
+# compact() 存“每个 key 的最新 id”的临时表（连接级，用完即删）
+_KEEP_TABLE = "dam_changefeed_keep"
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+def _serialize_feed_writes():
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cur:
+            cur.execute("SELECT pg_advisory_xact_lock(%s)", [_FEED_LOCK_KEY])
+
+
+def record_change(kind, asset_id=None, tag_id=None, version=None):
+    with transaction.atomic():
+        _serialize_feed_writes()
+        return AssetChange.objects.create(kind=kind, asset_id=asset_id, tag_id=tag_id, version=version)
+
+
+def current_cursor() -> int:
+    return AssetChange.objects.aggregate(mx=Max("id")).get("mx") or 0
+
+
+def horizon() -> int:
+    row = AssetChange.objects.filter(kind="horizon").order_by("-id").values_list("id", flat=True).first()
+    return row or 0
+
+
+class CursorExpired(Exception):
+    def __init__(self, horizon_id):
+        super().__init__(f"cursor is older than retention horizon {horizon_id}")
+        self.horizon = horizon_id
+
+
+def changes_since(since: int, limit: int = DEFAULT_PAGE_SIZE):
+    """
+    返回 (rows, next_cursor, has_more)
+    rows: 按 id 排序、已折叠的变更（每个资产/标签只出现一次，取该页内最后一条）
+    """
+    h = horizon()
+    if since < h:
+        raise CursorExpired(h)
+
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    page = list(
+        AssetChange.objects.filter(id__gt=since)
+        .exclude(kind="horizon")
+        .order_by("id")[: limit + 1]
+    )
+    has_more = len(page) > limit
+    page = page[:limit]
+    next_cursor = page[-1].id if page else since
+
+    latest = {}
+    for row in page:
+        key = ("tag", row.tag_id) if row.kind in ("tag", "tag_delete") else ("asset", row.asset_id)
+        latest[key] = row
+    rows = sorted(latest.values(), key=lambda r: r.id)
+    return rows, next_cursor, has_more
+
+
+def compact(retain_days=None, batch_size=10_000):
+    """
+    压缩 + 保留；返回 {"compacted": n, "expired": m, "horizon": id}
+    """
+    stats = {"compacted": 0, "expired": 0, "horizon": horizon()}
+
+    # 1) 压缩：每个资产 / 每个标签只保留最新一条
+    for field, kinds in (("asset_id", None), ("tag_id", ("tag", "tag_delete"))):
+        base = AssetChange.objects.exclude(kind="horizon").filter(**{f"{field}__isnull": False})
+        if kinds:
+            base = base.filter(kind__in=kinds)
+        else:
+            base = base.exclude(kind__in=("tag", "tag_delete"))
+        stats["compacted"] += _compact_pass(base, field, batch_size)
+    # 2) 保留期：早于 cutoff 的全部删除，最后一条改成 horizon
+    if retain_days is not None:
+        cutoff = timezone.now() - timedelta(days=int(retain_days))
+        last_old = (
+            AssetChange.objects.filter(created_at__lt=cutoff)
+            .order_by("-id").values_list("id", flat=True).first()
+        )
+        if last_old and last_old > stats["horizon"]:
+            with transaction.atomic():
+                _serialize_feed_writes()
+                AssetChange.objects.filter(pk=last_old).update(
+                    kind="horizon", asset_id=None, tag_id=None, version=None
+                )
+                while True:
+                    ids = list(AssetChange.objects.filter(id__lt=last_old).values_list("id", flat=True)[:batch_size])
+                    if not ids:
+                        break
+                    stats["expired"] += AssetChange.objects.filter(id__in=ids).delete()[0]
+            stats["horizon"] = last_old
+
+    return stats
+
+
+def _compact_pass(base, field, batch_size):
+    """
+    每个 key 的最新 id 只算一次（GROUP BY 结果放进临时表，按 key 建主键），
+    再按 id 区间分段删掉比它旧的行：每段只扫这一段，总代价 O(N)，而不是每批重跑一遍 GROUP BY。
+    扫描开始之后写入的新行 id 更大，不会被删
+    """
+    table = connection.ops.quote_name(AssetChange._meta.db_table)
+    column = connection.ops.quote_name(field)
+    keep_sql, keep_params = base.values(field).annotate(mx=Max("id")).values_list(field, "mx").query.sql_with_params()
+    bounds = base.aggregate(lo=Min("id"), hi=Max("id"))
+    if bounds["lo"] is None:
+        return 0
+
+    deleted = 0
+    with connection.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {_KEEP_TABLE}")
+        cur.execute(f"CREATE TEMPORARY TABLE {_KEEP_TABLE} (k BIGINT PRIMARY KEY, mx BIGINT NOT NULL)")
+        try:
+            cur.execute(f"INSERT INTO {_KEEP_TABLE} (k, mx) {keep_sql}", keep_params)
+            newest = RawSQL(f"SELECT mx FROM {_KEEP_TABLE} WHERE k = {table}.{column}", [])
+            for lo in range(bounds["lo"], bounds["hi"] + 1, batch_size):
+                deleted += base.filter(id__gte=lo, id__lt=lo + batch_size).filter(id__lt=newest).delete()[0]
+        finally:
+            cur.execute(f"DROP TABLE IF EXISTS {_KEEP_TABLE}")
+    return deleted
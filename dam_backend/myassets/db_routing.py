@@ -0,0 +1,116 @@
+# myassets/db_routing.py —— 只读副本路由（主库写、副本读、写后短暂粘主库）
+"""
+- ReplicaRouter：只有在“本请求允许读副本”时 db_for_read 才返回副本别名；
+  写永远走 default；处在 default 的事务里时读也留在主库
+- ReplicaReadMixin：挂在视图集上，SAFE 方法且用户不在“粘主库”窗口内时开启副本读
+  （放在 initial() 里，是因为 JWT 用户要到 DRF 认证之后才知道）
+- ReplicaRoutingMiddleware：每个请求重置路由状态；非 SAFE 请求成功后把用户
+  粘在主库 DB_REPLICA_STICKY_SECONDS 秒，保证“刚上传的马上能看到”；
+  粘主库标记存在共享 cache 里，所有 worker 都看得到（settings 里配了副本没配 REDIS_URL 会拒绝启动）
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+PRIMARY_DB = DEFAULT_DB_ALIAS
+
+# 当前请求选中的副本别名；None 表示读主库
+_read_alias = contextvars.ContextVar("dam_read_alias", default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, "DATABASE_REPLICAS", []) or [])
+
+
+def _sticky_seconds() -> int:
+    return int(getattr(settings, "DB_REPLICA_STICKY_SECONDS", 10))
+
+
+def _pin_key(user_id) -> str:
+    return f"dbpin:{user_id}"
+
+
+def pin_to_primary(user) -> None:
+    """写操作之后调用：该用户在接下来几秒内的读都走主库"""
+    uid = getattr(user, "id", None)
+    if uid is not None and getattr(user, "is_authenticated", False) and replica_aliases():
+        cache.set(_pin_key(uid), 1, _sticky_seconds())
+
+
+def is_pinned(user) -> bool:
+    uid = getattr(user, "id", None)
+    return uid is not None and bool(cache.get(_pin_key(uid)))
+
+
+def read_from_replica() -> None:
+    """为当前请求随机挑一个副本（请求内保持同一个，避免读到不同进度的数据）"""
+    aliases = replica_aliases()
+    if aliases:
+        _read_alias.set(random.choice(aliases))
+
+
+def current_read_alias():
+    return _read_alias.get()
+
+
+@contextmanager
+def primary_reads():
+    """块内的读回到主库（例如要写进共享缓存的回源，不能拿副本上的旧数据）"""
+    token = _read_alias.set(None)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None:
+            return None  # 交给 Django 默认逻辑（default / 实例所在库）
+        if connections[PRIMARY_DB].in_atomic_block:
+            return PRIMARY_DB
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # 副本与主库是同一份数据
+        dbs = {PRIMARY_DB, *replica_aliases()}
+        if obj1._state.db in dbs and obj2._state.db in dbs:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
+
+
+class ReplicaReadMixin:
+    """视图集混入：认证完成后决定本请求的读是否可以走副本"""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request.user):
+            read_from_replica()
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _read_alias.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_alias.reset(token)
+
+        if request.method not in SAFE_METHODS and getattr(response, "status_code", 500) < 400:
+            pin_to_primary(getattr(request, "user", None))
+        return response
@@ -0,0 +1,373 @@
+# myassets/deltas.py —— 文档历史版本的差量存储（可选：settings.VERSION_DELTAS["ENABLED"]）
+"""
+- 只处理历史版本：资产当前文件（Asset.file）始终是完整文件，下载 / 抽取 / 预览照旧
+- 每个资产按版本号顺序：关键帧（完整文件）之后的版本存成相对这个关键帧的差量；
+  距关键帧已有 KEYFRAME_INTERVAL 个差量、或差量超过原文件 MAX_RATIO 时，改存新的关键帧。
+  差量总是直接对着关键帧（不串在上一个差量后面），重建只需要关键帧 + 一个差量文件
+- 差量算法：内容定义分块（48 字节窗口和哈希找切点，插入 / 删除之后切点会重新对齐），
+  目标文件的块在关键帧里找得到就记 COPY(offset, length)，找不到就存原始字节；
+  有 NumPy 时切点计算向量化
+- 重建是流式的（DeltaReader，内存里只有一个块）：下载 / 版本文件接口直接流式输出，
+  恢复版本时写回原文件名（ensure_full）
+- 以文件名为单位处理（恢复出来的版本与旧版本共用文件名）；冷存储里的版本不参与
+"""
+import bisect
+import hashlib
+import io
+import logging
+import struct
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .fileutils import CHUNK_SIZE
+from .jobs import enqueue
+from .models import Asset, AssetVersion
+
+try:  # 可选：切点计算向量化
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+logger = logging.getLogger(__name__)
+
+WINDOW = 48
+MIN_CHUNK = 1024
+MAX_CHUNK = 32 * 1024
+CUT_MASK = (1 << 12) - 1   # 平均块长 ≈ MIN_CHUNK + 4 KiB
+
+MAGIC = b"DAMDELTA\x01"
+_HEADER = struct.Struct(">Q32s")   # 重建后的大小、sha256
+_COPY = struct.Struct(">QQ")       # b"C" + 关键帧里的 offset、length
+_LITERAL = struct.Struct(">Q")     # b"L" + 长度 + 原始字节
+DELTA_SUFFIX = ".delta"
+
+
+class DeltaError(Exception):
+    pass
+
+
+def _config():
+    cfg = {"ENABLED": False, "ASSET_TYPES": ["document", "pdf"], "KEYFRAME_INTERVAL": 10, "MAX_RATIO": 0.5}
+    cfg.update(getattr(settings, "VERSION_DELTAS", {}) or {})
+    return cfg
+
+
+def asset_types():
+    return list(_config()["ASSET_TYPES"])
+
+
+def enabled_for(asset_type):
+    cfg = _config()
+    return bool(cfg["ENABLED"]) and asset_type in cfg["ASSET_TYPES"]
+
+
+# ---------------- 内容定义分块 ----------------
+_GEAR = [int.from_bytes(hashlib.sha256(bytes([i])).digest()[:8], "big") for i in range(256)]
+_GEAR_NP = np.array(_GEAR, dtype=np.uint64) if np is not None else None
+
+
+def _hits(buf):
+    """窗口和哈希命中的切点（切在该位置之前），升序"""
+    if len(buf) < WINDOW:
+        return []
+    if np is not None:
+        c = np.cumsum(_GEAR_NP[np.frombuffer(buf, dtype=np.uint8)], dtype=np.uint64)
+        s = c[WINDOW - 1:].copy()
+        s[1:] -= c[:-WINDOW]
+        return (np.nonzero((s & np.uint64(CUT_MASK)) == 0)[0] + WINDOW).tolist()
+    gear, out, h = _GEAR, [], 0
+    for i, b in enumerate(buf):
+        h += gear[b]
+        if i >= WINDOW:
+            h -= gear[buf[i - WINDOW]]
+        if i >= WINDOW - 1 and not (h & CUT_MASK):
+            out.append(i + 1)
+    return out
+
+
+def iter_chunks(fh):
+    """流式分块；切点只取决于前 48 字节的内容，和读取块大小无关"""
+    buf, eof = b"", False
+    while buf or not eof:
+        if not eof:
+            block = fh.read(CHUNK_SIZE)
+            if block:
+                buf += block
+            else:
+                eof = True
+            if len(buf) < MAX_CHUNK and not eof:
+                continue
+        hits, start, i = _hits(buf), 0, 0
+        while start < len(buf):
+            i = bisect.bisect_left(hits, start + MIN_CHUNK, i)
+            if i < len(hits) and hits[i] <= start + MAX_CHUNK:
+                cut = hits[i]
+            elif start + MAX_CHUNK <= len(buf):
+                cut = start + MAX_CHUNK
+            elif eof:
+                cut = len(buf)
+            else:
+                break
+            yield buf[start:cut]
+            start = cut
+        buf = buf[start:]
+
+
+def _digest(chunk):
+    return hashlib.blake2b(chunk, digest_size=16).digest()
+
+
+# ---------------- 编码 / 重建 ----------------
+def encode(base_fh, target_fh, out):
+    """把 target 写成相对 base 的差量（out 需可 seek）；返回 target 的字节数"""
+    index, offset = {}, 0
+    for chunk in iter_chunks(base_fh):
+        index.setdefault(_digest(chunk), (offset, len(chunk)))
+        offset += len(chunk)
+
+    start = out.tell()
+    out.write(MAGIC + _HEADER.pack(0, bytes(32)))
+    sha, size = hashlib.sha256(), 0
+    copy, literal = None, bytearray()
+
+    def flush():
+        nonlocal copy
+        if copy:
+            out.write(b"C" + _COPY.pack(*copy))
+            copy = None
+        if literal:
+            out.write(b"L" + _LITERAL.pack(len(literal)))
+            out.write(literal)
+            literal.clear()
+
+    for chunk in iter_chunks(target_fh):
+        sha.update(chunk)
+        size += len(chunk)
+        hit = index.get(_digest(chunk))
+        if hit is None:
+            if copy:
+                flush()
+            literal += chunk
+            if len(literal) >= CHUNK_SIZE:
+                flush()
+        elif copy and copy[0] + copy[1] == hit[0]:
+            copy[1] += hit[1]  # 连续的块合并成一次 COPY
+        else:
+            flush()
+            copy = list(hit)
+    flush()
+
+    end = out.tell()
+    out.seek(start + len(MAGIC))
+    out.write(_HEADER.pack(size, sha.digest()))
+    out.seek(end)
+    return size
+
+
+class DeltaReader(io.RawIOBase):
+    """按顺序执行差量里的 COPY / LITERAL，边读边输出"""
+
+    def __init__(self, delta_fh, base_fh):
+        super().__init__()
+        if delta_fh.read(len(MAGIC)) != MAGIC:
+            raise DeltaError("not a delta file")
+        self.size, self.sha256 = _HEADER.unpack(delta_fh.read(_HEADER.size))
+        self._delta, self._base = delta_fh, base_fh
+        self._source, self._remaining = None, 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._remaining:
+            tag = self._delta.read(1)
+            if not tag:
+                return 0
+            if tag == b"C":
+                offset, self._remaining = _COPY.unpack(self._delta.read(_COPY.size))
+                self._base.seek(offset)
+                self._source = self._base
+            elif tag == b"L":
+                (self._remaining,) = _LITERAL.unpack(self._delta.read(_LITERAL.size))
+                self._source = self._delta
+            else:
+                raise DeltaError(f"corrupt delta (op {tag!r})")
+        data = self._source.read(min(len(b), self._remaining))
+        if not data:
+            raise DeltaError("truncated delta")
+        b[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        for fh in (self._delta, self._base):
+            try:
+                fh.close()
+            except Exception:
+                pass
+        super().close()
+
+
+def open_version(version):
+    """打开版本文件（差量版本返回流式重建的文件对象，.raw.size 是重建后的大小）"""
+    if not version.delta_name:
+        return default_storage.open(version.file.name, "rb")
+    base = AssetVersion.objects.only("file").get(pk=version.delta_base_id)
+    delta_fh = default_storage.open(version.delta_name, "rb")
+    try:
+        base_fh = default_storage.open(base.file.name, "rb")
+    except Exception:
+        delta_fh.close()
+        raise
+    return io.BufferedReader(DeltaReader(delta_fh, base_fh), CHUNK_SIZE)
+
+
+def open_name(name):
+    """按文件名打开：主存储里没有时找同名的差量版本重建"""
+    if default_storage.exists(name):
+        return default_storage.open(name, "rb")
+    version = AssetVersion.objects.filter(file=name).exclude(delta_name="").first()
+    if version is None:
+        raise FileNotFoundError(name)
+    return open_version(version)
+
+
+def ensure_full(version):
+    """差量版本写回主存储原文件名（同名的其他版本一起改回完整文件）"""
+    if not version.delta_name:
+        return version
+    name = version.file.name
+    with transaction.atomic():
+        rows = list(AssetVersion.objects.select_for_update().filter(file=name).exclude(delta_name="")
+                    .values_list("id", "delta_name"))
+        if rows:
+            delta_name = rows[0][1]
+            if not default_storage.exists(name):
+                current = AssetVersion.objects.get(pk=rows[0][0])
+                with open_version(current) as reader, tempfile.TemporaryFile(prefix="dam-delta-") as tmp:
+                    sha = hashlib.sha256()
+                    for block in iter(lambda: reader.read(CHUNK_SIZE), b""):
+                        sha.update(block)
+                        tmp.write(block)
+                    if sha.digest() != reader.raw.sha256:
+                        raise DeltaError(f"checksum mismatch rebuilding {name}")
+                    tmp.seek(0)
+                    saved = default_storage.save(name, File(tmp))
+                if saved != name:  # 不应发生：前面确认过原文件名空着
+                    default_storage.delete(saved)
+                    raise DeltaError(f"could not restore {name} to its original name")
+            AssetVersion.objects.filter(pk__in=[r[0] for r in rows]).update(
+                delta_base=None, delta_name="", delta_size=None)
+            transaction.on_commit(lambda: default_storage.delete(delta_name))
+    version.delta_base_id, version.delta_name, version.delta_size = None, "", None
+    return version
+
+
+# ---------------- 按资产编码 ----------------
+def enqueue_for_asset(asset_id):
+    return enqueue("versions.delta", {"asset_id": asset_id}, priority=-20, dedupe_key=f"delta:{asset_id}")
+
+
+def run_for_asset(asset_id):
+    """把资产还没处理过的历史版本编成差量；返回 {"encoded": n, "keyframes": n}"""
+    cfg = _config()
+    stats = {"encoded": 0, "keyframes": 0}
+    asset = Asset.objects.filter(pk=asset_id).only("id", "asset_type", "file").first()
+    if asset is None or asset.asset_type not in cfg["ASSET_TYPES"]:
+        return stats
+    interval = max(1, int(cfg["KEYFRAME_INTERVAL"]))
+    by_id = {}
+    keyframe, since, seen = None, 0, set()
+    for v in AssetVersion.objects.filter(asset_id=asset_id).order_by("version"):
+        name = v.file.name
+        if not name or name in seen:
+            continue
+        seen.add(name)
+        by_id[v.pk] = v
+        if v.delta_name:
+            keyframe = by_id.get(v.delta_base_id) or AssetVersion.objects.get(pk=v.delta_base_id)
+            since += 1
+            continue
+        if v.storage_tier != "hot":
+            continue
+        if name == asset.file.name:
+            keyframe, since = v, 0  # 当前文件不编码，暂时当关键帧（不记 full_size，以后还能编成差量）
+            continue
+        if keyframe is None or since >= interval or v.full_size is not None:
+            # full_size 已有 = 之前评估过、选成了关键帧
+            _mark_keyframe(v)
+            keyframe, since = v, 0
+            stats["keyframes"] += 1
+            continue
+        outcome = _encode_version(v, keyframe, float(cfg["MAX_RATIO"]))
+        if outcome == "encoded":
+            since += 1
+            stats["encoded"] += 1
+        elif outcome == "keyframe":
+            keyframe, since = v, 0
+            stats["keyframes"] += 1
+    return stats
+
+
+def _mark_keyframe(version, size=None):
+    if version.full_size is None:
+        if size is None:
+            try:
+                size = default_storage.size(version.file.name)
+            except Exception:
+                return
+        AssetVersion.objects.filter(file=version.file.name, delta_name="").update(full_size=size)
+        version.full_size = size
+
+
+def _encode_version(version, keyframe, max_ratio):
+    name = version.file.name
+    if not default_storage.exists(name) or not default_storage.exists(keyframe.file.name):
+        return "skipped"
+    with default_storage.open(keyframe.file.name, "rb") as base_fh, default_storage.open(name, "rb") as fh, \
+            tempfile.TemporaryFile(prefix="dam-delta-") as tmp:
+        full = encode(base_fh, fh, tmp)
+        size = tmp.tell()
+        if size > max_ratio * full:
+            _mark_keyframe(version, full)
+            return "keyframe"
+        tmp.seek(0)
+        delta_name = default_storage.save(name + DELTA_SUFFIX, File(tmp))
+
+    with transaction.atomic():
+        locked = list(AssetVersion.objects.select_for_update()
+                      .filter(file=name, delta_name="", storage_tier="hot").values_list("id", flat=True))
+        base_ok = AssetVersion.objects.select_for_update().filter(
+            pk=keyframe.pk, delta_name="", storage_tier="hot").exists()
+        # 扫描之后可能刚被恢复成当前文件 / 关键帧被转冷
+        if not locked or not base_ok or Asset.objects.filter(file=name).exists():
+            transaction.on_commit(lambda: default_storage.delete(delta_name))
+            return "skipped"
+        AssetVersion.objects.filter(pk__in=locked).update(
+            delta_base=keyframe, delta_name=delta_name, delta_size=size, full_size=full)
+        # 持锁时删除：ensure_full 要等这把锁
+        default_storage.delete(name)
+    return "encoded"
+
+
+# ---------------- 统计 ----------------
+def space_report(asset_ids=None):
+    """每个资产差量存储省下的空间：[{"asset_id", "delta_versions", "full_bytes", "stored_bytes", "saved_bytes"}]"""
+    qs = AssetVersion.objects.exclude(delta_name="")
+    if asset_ids is not None:
+        qs = qs.filter(asset_id__in=asset_ids)
+    report = {}
+    rows = qs.order_by("asset_id").values_list("asset_id", "delta_name", "full_size", "delta_size").distinct()
+    for asset_id, _name, full, stored in rows.iterator(chunk_size=2000):
+        r = report.setdefault(asset_id, {"asset_id": asset_id, "delta_versions": 0,
+                                         "full_bytes": 0, "stored_bytes": 0, "saved_bytes": 0})
+        r["delta_versions"] += 1
+        r["full_bytes"] += full or 0
+        r["stored_bytes"] += stored or 0
+        r["saved_bytes"] = r["full_bytes"] - r["stored_bytes"]
+    return list(report.values())
+
@@ -0,0 +1,55 @@
+# myassets/derivatives.py —— 派生文件（转码结果、3D 预览等）的存放与状态记录
+import logging
+import os
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from .models import AssetDerivative, AssetVersion
+
+logger = logging.getLogger(__name__)
+
+
+def output_prefix(asset):
+    """派生文件目录：与当前文件所属版本放在一起（没有版本记录的原始上传放在 assets/{id}/）"""
+    version = (
+        AssetVersion.objects.filter(asset_id=asset.pk, file=asset.file.name)
+        .order_by("-version").values_list("version", flat=True).first()
+    )
+    return f"assets/{asset.pk}/v{version}" if version else f"assets/{asset.pk}"
+
+
+def upload_dir(local_dir, prefix):
+    """把本地目录整体写入存储（同名先删，保证文件名不被存储改写）；返回存储里的文件名"""
+    saved = []
+    for root, _dirs, names in os.walk(local_dir):
+        for name in sorted(names):
+            full = os.path.join(root, name)
+            rel = os.path.relpath(full, local_dir).replace(os.sep, "/")
+            target = f"{prefix}/{rel}"
+            if default_storage.exists(target):
+                default_storage.delete(target)
+            with open(full, "rb") as fh:
+                saved.append(default_storage.save(target, File(fh)))
+    return saved
+
+
+def delete_files(names):
+    for name in names or ():
+        try:
+            default_storage.delete(name)
+        except Exception:
+            logger.warning("could not delete derivative file %s", name)
+
+
+def mark(asset_id, kind, **fields):
+    obj, _ = AssetDerivative.objects.update_or_create(asset_id=asset_id, kind=kind, defaults=fields)
+    return obj
+
+
+def replace(asset_id, kind, old, files, **fields):
+    """记录新结果，返回上一份结果里不再使用的文件（调用方在事务提交后删除）"""
+    mark(asset_id, kind, files=files, **fields)
+    if old is None:
+        return []
+    return [f for f in old.files if f not in files]
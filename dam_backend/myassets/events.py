@@ -0,0 +1,291 @@
+# myassets/events.py —— 资产/版本事件总线（PostgreSQL LISTEN/NOTIFY）+ SSE 推送
+"""
+发布：publish() 在事务提交后执行 pg_notify('dam_events', json)。
+      所有应用节点都 LISTEN 同一频道，因此任何节点上的写入都会推到所有节点的连接上。
+      非 PostgreSQL（本地 SQLite 替身）时退化为进程内直接分发。
+
+订阅：每个进程一个后台监听线程（首个订阅者出现时才启动），负责把通知扇出给本进程内的
+      SSE 连接。每个连接一个有界队列：慢消费者队列满时不再阻塞总线，而是标记溢出，
+      连接随后收到 `event: resync` 并被关闭，由前端重新拉取（/api/assets/changes/）后重连。
+
+过滤：?types=image,video（asset_type） / ?tags=1,2（任一命中）/ ?events=asset.created,...
+"""
+import asyncio
+import json
+import logging
+import queue
+import select
+import threading
+import time
+
+from django.db import connections, transaction
+
+from . import caching
+from .db_routing import PRIMARY_DB
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "dam_events"
+SUBSCRIBER_QUEUE_SIZE = 256
+HEARTBEAT_SECONDS = 15
+# pg_notify 单条 payload 上限 8000 字节，事件只放 id / 类型 / 标签等小字段
+_MAX_PAYLOAD = 7900
+
+
+# ---------------- 发布 ----------------
+def publish(event_type: str, _build=None, **data):
+    """
+    事务提交后发出事件；_build 是可选的回调，在提交后才计算附加字段
+    （例如新建资产时 tags 要等 m2m 写完才能拿到）
+    """
+    def send():
+        event = {"type": event_type, "ts": round(time.time(), 3), **data}
+        if _build is not None:
+            event.update(_build())
+        payload = json.dumps(event, separators=(",", ":"), default=str)
+        if len(payload.encode("utf-8")) > _MAX_PAYLOAD:
+            event.pop("tags", None)
+            payload = json.dumps(event, separators=(",", ":"), default=str)
+        _send(event, payload)
+
+    # 只在提交后发：回滚的写入不会产生事件，订阅者收到事件时一定能查到数据
+    transaction.on_commit(send, using=PRIMARY_DB, robust=True)
+
+
+def publish_asset(event_type: str, asset, with_tags=True, invalidate=True, **data):
+    asset_id, asset_type = asset.pk, asset.asset_type
+    # 资产有事件就说明详情变了（queryset.update() 改的字段、抽取结果）：顺便让详情缓存失效。
+    # 浏览 / 下载计数不失效（invalidate=False）：越热门的资产计数变得越勤，每次都失效等于热门详情永远不命中；
+    # 缓存里的计数最多落后 SHARED_TTL，实时值走 asset.counters 事件和接口返回
+    if invalidate:
+        caching.asset_detail.invalidate(asset_id)
+
+    def build():
+        out = {"asset_id": asset_id, "asset_type": asset_type}
+        if with_tags:
+            from .models import Asset
+            out["tags"] = list(
+                Asset.tags.through.objects.using(PRIMARY_DB)
+                .filter(asset_id=asset_id).values_list("tag_id", flat=True)
+            )
+        return out
+
+    publish(event_type, _build=build, **data)
+
+
+def _send(event, payload):
+    conn = connections[PRIMARY_DB]
+    if conn.vendor == "postgresql":
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_notify(%s, %s)", [CHANNEL, payload])
+    else:
+        bus.dispatch(event)
+
+
+# ---------------- 订阅者 ----------------
+def _csv(raw):
+    return {p.strip() for p in str(raw or "").split(",") if p.strip()}
+
+
+class Subscription:
+    """一个 SSE 连接；offer() 在监听线程里调用，绝不阻塞"""
+
+    def __init__(self, types=None, tags=None, events=None, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.types = set(types or ())
+        self.tags = {int(t) for t in (tags or ()) if str(t).isdigit()}
+        self.events = set(events or ())
+        self.maxsize = maxsize
+        self.overflowed = False
+        self._queue = queue.Queue(maxsize=maxsize)
+
+    @classmethod
+    def from_query(cls, params, **kwargs):
+        return cls(_csv(params.get("types")), _csv(params.get("tags")), _csv(params.get("events")), **kwargs)
+
+    def matches(self, event) -> bool:
+        if event.get("type") in ("resync",):
+            return True
+        if self.events and event.get("type") not in self.events:
+            return False
+        if self.types and event.get("asset_type") not in self.types:
+            return False
+        tags = event.get("tags")
+        # 没带标签信息的事件（例如删除）不过滤，交给前端判断
+        if self.tags and tags is not None and not self.tags.intersection(tags):
+            return False
+        return True
+
+    def offer(self, event):
+        if self.overflowed or not self.matches(event):
+            return
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        return self._queue.get(timeout=timeout)
+
+
+class AsyncSubscription(Subscription):
+    """ASGI 下使用：事件通过 call_soon_threadsafe 投递到事件循环里的 asyncio.Queue"""
+
+    def __init__(self, *args, loop=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._loop = loop or asyncio.get_running_loop()
+        self._aqueue = asyncio.Queue(maxsize=self.maxsize)
+
+    def offer(self, event):
+        if self.overflowed or not self.matches(event):
+            return
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        try:
+            self._aqueue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def aget(self, timeout):
+        return await asyncio.wait_for(self._aqueue.get(), timeout)
+
+
+# ---------------- 进程内总线 + LISTEN 线程 ----------------
+class EventBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = set()
+        self._listener = None
+
+    def subscribe(self, sub):
+        with self._lock:
+            self._subs.add(sub)
+        self._ensure_listener()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs.discard(sub)
+
+    def dispatch(self, event):
+        with self._lock:
+            subs = list(self._subs)
+        for sub in subs:
+            try:
+                sub.offer(event)
+            except RuntimeError:
+                # 事件循环已关闭的 AsyncSubscription
+                self.unsubscribe(sub)
+
+    def _ensure_listener(self):
+        if connections[PRIMARY_DB].vendor != "postgresql":
+            return
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen_forever, name="dam-event-listener", daemon=True)
+            self._listener.start()
+
+    def _has_subscribers(self):
+        with self._lock:
+            return bool(self._subs)
+
+    def _listen_forever(self):
+        backoff = 1.0
+        while True:
+            # 与 _ensure_listener 在同一把锁下判断，避免“线程刚退出、新订阅者没人监听”
+            with self._lock:
+                if not self._subs:
+                    self._listener = None
+                    return
+            raw = None
+            try:
+                wrapper = connections[PRIMARY_DB]
+                raw = wrapper.Database.connect(**wrapper.get_connection_params())
+                raw.autocommit = True
+                with raw.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                backoff = 1.0
+                self._pump(raw)
+            except Exception:
+                logger.exception("event listener connection failed; retrying in %.0fs", backoff)
+                # 断线期间可能漏事件：让所有连接重新同步
+                self.dispatch({"type": "resync", "reason": "listener reconnect"})
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+
+    def _pump(self, raw):
+        if hasattr(raw, "poll"):  # psycopg2
+            while self._has_subscribers():
+                if select.select([raw], [], [], 5.0) == ([], [], []):
+                    continue
+                raw.poll()
+                while raw.notifies:
+                    self._deliver(raw.notifies.pop(0).payload)
+        else:  # psycopg3
+            while self._has_subscribers():
+                for note in raw.notifies(timeout=5.0):
+                    self._deliver(note.payload)
+
+    def _deliver(self, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            return
+        self.dispatch(event)
+
+
+bus = EventBus()
+
+
+# ---------------- SSE 编码 ----------------
+def sse_frame(event) -> bytes:
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, separators=(',', ':'))}\n\n".encode("utf-8")
+
+
+SSE_PREAMBLE = b"retry: 3000\n: connected\n\n"
+SSE_HEARTBEAT = b": ping\n\n"
+SSE_RESYNC = sse_frame({"type": "resync", "reason": "slow consumer"})
+
+
+def sync_stream(params):
+    # 第一次迭代时才订阅：响应没被真正发送时不会留下孤儿订阅
+    sub = bus.subscribe(Subscription.from_query(params))
+    try:
+        yield SSE_PREAMBLE
+        while True:
+            if sub.overflowed:
+                yield SSE_RESYNC
+                return
+            try:
+                event = sub.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield SSE_HEARTBEAT
+                continue
+            yield sse_frame(event)
+    finally:
+        bus.unsubscribe(sub)
+
+
+async def async_stream(params):
+    sub = bus.subscribe(AsyncSubscription.from_query(params))
+    try:
+        yield SSE_PREAMBLE
+        while True:
+            if sub.overflowed:
+                yield SSE_RESYNC
+                return
+            try:
+                event = await sub.aget(timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield SSE_HEARTBEAT
+                continue
+            yield sse_frame(event)
+    finally:
+        bus.unsubscribe(sub)
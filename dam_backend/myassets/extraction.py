@@ -0,0 +1,372 @@
+# myassets/extraction.py —— 文件正文 + 技术元数据抽取（后台任务 assets.extract 调用）
+"""
+extract(path, asset_type, filename) -> (metadata: dict, text: str)
+
+- image   ：尺寸、格式、色彩模式、帧数；EXIF 相机/镜头/拍摄时间/曝光；XMP 标题
+- pdf     ：页数、标题/作者；正文（需要可选依赖 pypdf，没有时只数页）
+- document：docx / pptx / xlsx（标准库 zipfile 解析）、txt / md / csv / json
+- video   ：时长、分辨率、编码、帧率（需要本机 ffprobe，没有则跳过）
+- 3d_model：GLB / GLTF 网格/图元/顶点/三角形/材质/贴图数量；OBJ 顶点/面数量
+
+同一个任务里顺便算文件 sha256（Asset / AssetVersion.content_hash），
+图片 / 视频还会计算感知哈希（similarity.py）。
+
+所有解析都是“尽力而为”：任何一步失败只会少几个字段，不会让任务失败。
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import struct
+import subprocess
+import zipfile
+from xml.etree import ElementTree
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import events, similarity
+from .changefeed import record_change
+from .fileutils import local_path, sha256_file
+from .jobs import enqueue
+from .models import Asset, AssetVersion
+
+logger = logging.getLogger(__name__)
+
+# 可以按范围过滤（?meta__width__gte=1920）的数值字段；PostgreSQL 上各有一个 btree 表达式索引（0018 迁移）
+RANGE_KEYS = ("width", "height", "duration", "fps", "page_count", "word_count", "slide_count",
+              "vertex_count", "polygon_count")
+
+TEXT_EXTENSIONS = {".txt", ".md", ".csv", ".json", ".xml", ".html", ".htm", ".rtf"}
+
+
+def _max_chars() -> int:
+    return int(getattr(settings, "EXTRACT_TEXT_MAX_CHARS", 200_000))
+
+
+def _clean_text(text: str) -> str:
+    # PostgreSQL text 不接受 NUL；顺便压缩空白
+    text = (text or "").replace("\x00", " ")
+    text = re.sub(r"[ \t\r\f\v]+", " ", text)
+    text = re.sub(r"\n\s*\n+", "\n", text)
+    return text.strip()[: _max_chars()]
+
+
+def extract(path, asset_type, filename=""):
+    ext = os.path.splitext(filename or path)[1].lower()
+    meta = {"size_bytes": os.path.getsize(path), "extension": ext.lstrip(".")}
+    text = ""
+
+    handlers = {
+        "image": _extract_image,
+        "pdf": _extract_pdf,
+        "document": _extract_document,
+        "video": _extract_video,
+        "3d_model": _extract_3d,
+    }
+    handler = handlers.get(asset_type)
+    # 扩展名比 asset_type 更可靠的情况（例如“文档”类型下传了 PDF）
+    if ext == ".pdf":
+        handler = _extract_pdf
+    elif ext in TEXT_EXTENSIONS:
+        handler = _extract_document
+    if handler is not None:
+        try:
+            extra_meta, text = handler(path, ext)
+            meta.update({k: v for k, v in extra_meta.items() if v not in (None, "", [], {})})
+        except Exception:
+            logger.exception("extraction failed for %s (%s)", filename or path, asset_type)
+    return meta, _clean_text(text)
+
+
+# ---------------- image ----------------
+_EXIF_TAGS = {
+    0x010F: "camera_make",
+    0x0110: "camera_model",
+    0x0132: "datetime",
+    0x9003: "datetime_original",
+    0xA434: "lens_model",
+    0x829A: "exposure_time",
+    0x829D: "f_number",
+    0x8827: "iso",
+    0x920A: "focal_length",
+}
+
+
+def _exif_value(v):
+    if isinstance(v, bytes):
+        return v.decode("utf-8", "ignore").strip("\x00 ")
+    if isinstance(v, str):
+        return v.strip("\x00 ")
+    try:
+        return float(v) if not isinstance(v, int) else v
+    except (TypeError, ValueError):
+        return str(v)
+
+
+def _extract_image(path, ext):
+    from PIL import Image
+
+    meta = {}
+    with Image.open(path) as img:
+        meta.update({
+            "width": img.width,
+            "height": img.height,
+            "format": img.format,
+            "mode": img.mode,
+            "frames": getattr(img, "n_frames", 1),
+        })
+        try:
+            exif = img.getexif()
+            merged = dict(exif)
+            merged.update(exif.get_ifd(0x8769))  # Exif 子 IFD：曝光、镜头等
+            for tag, key in _EXIF_TAGS.items():
+                if tag in merged:
+                    meta[key] = _exif_value(merged[tag])
+        except Exception:
+            pass
+
+        xmp = img.info.get("xmp") or img.info.get("XML:com.adobe.xmp")
+        if xmp:
+            if isinstance(xmp, bytes):
+                xmp = xmp.decode("utf-8", "ignore")
+            m = re.search(r"<dc:title>.*?<rdf:li[^>]*>(.*?)</rdf:li>", xmp, re.S)
+            if m:
+                meta["xmp_title"] = m.group(1).strip()
+            m = re.search(r"<dc:description>.*?<rdf:li[^>]*>(.*?)</rdf:li>", xmp, re.S)
+            if m:
+                meta["xmp_description"] = m.group(1).strip()
+
+    text = " ".join(str(meta[k]) for k in ("xmp_title", "xmp_description") if meta.get(k))
+    return meta, text
+
+
+# ---------------- pdf ----------------
+def _extract_pdf(path, ext):
+    try:
+        from pypdf import PdfReader  # 可选依赖
+    except ImportError:
+        PdfReader = None
+
+    if PdfReader is None:
+        # 没有 pypdf：只统计页数（/Type /Page，不含 /Pages）
+        with open(path, "rb") as fh:
+            data = fh.read()
+        pages = len(re.findall(rb"/Type\s*/Page(?![a-zA-Z])", data))
+        return {"page_count": pages or None}, ""
+
+    reader = PdfReader(path)
+    meta = {"page_count": len(reader.pages)}
+    info = reader.metadata or {}
+    for src, key in (("/Title", "title"), ("/Author", "author"), ("/Producer", "producer")):
+        if info.get(src):
+            meta[key] = str(info.get(src))
+
+    parts, budget = [], _max_chars()
+    for page in reader.pages:
+        if budget <= 0:
+            break
+        try:
+            chunk = page.extract_text() or ""
+        except Exception:
+            continue
+        parts.append(chunk)
+        budget -= len(chunk)
+    return meta, "\n".join(parts)
+
+
+# ---------------- office / text ----------------
+def _xml_text(data, tag_suffix):
+    root = ElementTree.fromstring(data)
+    return [el.text for el in root.iter() if el.tag.endswith(tag_suffix) and el.text]
+
+
+def _extract_document(path, ext):
+    if ext == ".pdf":
+        return _extract_pdf(path, ext)
+    if ext in TEXT_EXTENSIONS:
+        with open(path, "r", encoding="utf-8", errors="ignore") as fh:
+            text = fh.read(_max_chars())
+        return {"line_count": text.count("\n") + 1}, text
+    if not zipfile.is_zipfile(path):
+        return {}, ""
+
+    meta, parts = {}, []
+    with zipfile.ZipFile(path) as zf:
+        names = zf.namelist()
+        if "docProps/core.xml" in names:
+            root = ElementTree.fromstring(zf.read("docProps/core.xml"))
+            for el in root.iter():
+                local = el.tag.rsplit("}", 1)[-1]
+                if local in ("title", "creator", "subject") and el.text:
+                    meta[local if local != "creator" else "author"] = el.text
+        if "docProps/app.xml" in names:
+            root = ElementTree.fromstring(zf.read("docProps/app.xml"))
+            for el in root.iter():
+                local = el.tag.rsplit("}", 1)[-1]
+                if local in ("Pages", "Words", "Slides") and el.text and el.text.isdigit():
+                    meta[{"Pages": "page_count", "Words": "word_count", "Slides": "slide_count"}[local]] = int(el.text)
+
+        if "word/document.xml" in names:
+            meta["format"] = "docx"
+            parts = _xml_text(zf.read("word/document.xml"), "}t")
+        elif any(n.startswith("ppt/slides/slide") for n in names):
+            meta["format"] = "pptx"
+            slides = sorted(n for n in names if re.match(r"ppt/slides/slide\d+\.xml$", n))
+            meta.setdefault("slide_count", len(slides))
+            for n in slides:
+                parts.extend(_xml_text(zf.read(n), "}t"))
+        elif "xl/sharedStrings.xml" in names:
+            meta["format"] = "xlsx"
+            parts = _xml_text(zf.read("xl/sharedStrings.xml"), "}t")
+            meta["sheet_count"] = len([n for n in names if re.match(r"xl/worksheets/sheet\d+\.xml$", n)])
+    return meta, " ".join(parts)
+
+
+# ---------------- video ----------------
+def _extract_video(path, ext):
+    return probe_video(path), ""
+
+
+def probe_video(path) -> dict:
+    """ffprobe 读时长/分辨率/编码；没有 ffprobe 时返回 {}"""
+    ffprobe = shutil.which(getattr(settings, "FFPROBE_BINARY", "ffprobe"))
+    if not ffprobe:
+        return {}
+    out = subprocess.run(
+        [ffprobe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        capture_output=True, timeout=120, check=True,
+    ).stdout
+    info = json.loads(out or b"{}")
+    fmt = info.get("format", {})
+    meta = {"duration": float(fmt["duration"]) if fmt.get("duration") else None,
+            "container": fmt.get("format_name"),
+            "bit_rate": int(fmt["bit_rate"]) if str(fmt.get("bit_rate", "")).isdigit() else None}
+    for stream in info.get("streams", []):
+        if stream.get("codec_type") == "video" and "width" not in meta:
+            meta.update({"width": stream.get("width"), "height": stream.get("height"),
+                         "video_codec": stream.get("codec_name")})
+            rate = stream.get("avg_frame_rate") or ""
+            if "/" in rate:
+                num, den = rate.split("/", 1)
+                if den not in ("", "0"):
+                    meta["fps"] = round(float(num) / float(den), 3)
+        elif stream.get("codec_type") == "audio" and "audio_codec" not in meta:
+            meta["audio_codec"] = stream.get("codec_name")
+    return meta
+
+
+# ---------------- 3D ----------------
+def read_gltf_json(path, ext):
+    """返回 glTF JSON（GLB 取第一个 JSON chunk）"""
+    with open(path, "rb") as fh:
+        if ext == ".glb":
+            magic, _version, _length = struct.unpack("<4sII", fh.read(12))
+            if magic != b"glTF":
+                raise ValueError("not a GLB file")
+            chunk_len, chunk_type = struct.unpack("<I4s", fh.read(8))
+            if chunk_type != b"JSON":
+                raise ValueError("GLB first chunk is not JSON")
+            return json.loads(fh.read(chunk_len))
+        return json.load(fh)
+
+
+def gltf_stats(doc) -> dict:
+    accessors = doc.get("accessors", [])
+    vertices = triangles = primitives = 0
+    for mesh in doc.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            primitives += 1
+            pos = prim.get("attributes", {}).get("POSITION")
+            count = accessors[pos]["count"] if pos is not None and pos < len(accessors) else 0
+            vertices += count
+            mode = prim.get("mode", 4)
+            if mode == 4:  # TRIANGLES
+                idx = prim.get("indices")
+                n = accessors[idx]["count"] if idx is not None and idx < len(accessors) else count
+                triangles += n // 3
+    return {
+        "mesh_count": len(doc.get("meshes", [])),
+        "primitive_count": primitives,
+        "vertex_count": vertices,
+        "polygon_count": triangles,
+        "material_count": len(doc.get("materials", [])),
+        "texture_count": len(doc.get("textures", [])),
+        "image_count": len(doc.get("images", [])),
+        "node_count": len(doc.get("nodes", [])),
+        "animation_count": len(doc.get("animations", [])),
+        "generator": doc.get("asset", {}).get("generator"),
+    }
+
+
+def obj_stats(path) -> dict:
+    vertices = faces = triangles = 0
+    groups = set()
+    with open(path, "rb") as fh:
+        for line in fh:
+            if line.startswith(b"v "):
+                vertices += 1
+            elif line.startswith(b"f "):
+                faces += 1
+                triangles += max(len(line.split()) - 3, 1)  # n 边形 = n-2 个三角形
+            elif line.startswith((b"o ", b"g ")):
+                groups.add(line[2:].strip())
+    return {"vertex_count": vertices, "face_count": faces, "polygon_count": triangles, "mesh_count": len(groups) or 1}
+
+
+def _extract_3d(path, ext):
+    if ext in (".glb", ".gltf"):
+        return gltf_stats(read_gltf_json(path, ext)), ""
+    if ext == ".obj":
+        return obj_stats(path), ""
+    return {}, ""
+
+
+# ---------------- 资产级入口（任务 assets.extract） ----------------
+def enqueue_for_asset(asset_id, force=False):
+    return enqueue("assets.extract", {"asset_id": asset_id, "force": force}, dedupe_key=f"extract:{asset_id}")
+
+
+def run_for_asset(asset_id, force=False, max_rounds=3):
+    """
+    抽取并写回 metadata / content_text。
+    结果用 queryset.update() 写入，不触发 post_save（不会再次入队）；
+    文件没变（metadata.source 相同）且不是 force 时直接跳过。
+    """
+    for _ in range(max_rounds):
+        asset = Asset.objects.filter(pk=asset_id).only("id", "asset_type", "file", "metadata", "extracted_at").first()
+        if asset is None or not asset.file:
+            return None
+        if not force and asset.extracted_at and (asset.metadata or {}).get("source") == asset.file.name:
+            return asset.metadata
+
+        source = asset.file.name
+        hashes = None
+        with local_path(asset.file) as path:
+            digest = sha256_file(path)
+            meta, text = extract(path, asset.asset_type, source)
+            # 同一次下载顺便算感知哈希（相似图 / 近重复检测）
+            if asset.asset_type in similarity.HASHED_TYPES:
+                try:
+                    hashes = similarity.compute_hashes(path, asset.asset_type)
+                except Exception:
+                    logger.exception("perceptual hashing failed for asset %s", asset_id)
+        meta["source"] = source
+
+        with transaction.atomic():
+            updated = Asset.objects.filter(pk=asset_id, file=source).update(
+                metadata=meta, content_text=text, extracted_at=timezone.now(), content_hash=digest,
+            )
+            if updated:
+                AssetVersion.objects.filter(asset_id=asset_id, file=source, content_hash="").update(content_hash=digest)
+                if hashes is not None:
+                    similarity.store(asset_id, hashes)
+                record_change("update", asset_id=asset_id)
+                events.publish_asset("asset.updated", asset, extracted=True)
+        if updated:
+            return meta
+        # 抽取期间文件又被替换（同 dedupe_key 的新任务会被本任务吞掉）：重新读一遍
+        force = False
+    return None
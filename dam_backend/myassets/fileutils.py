@@ -0,0 +1,43 @@
+# myassets/fileutils.py —— 文件处理的公共小工具（后台任务共用）
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@contextmanager
+def local_path(field_file):
+    """
+    拿到 FieldFile 的本地路径：本地存储直接用 .path；
+    远端存储（没有 .path）时先流式下载到临时文件，用完删除。
+    """
+    try:
+        path = field_file.path
+    except (NotImplementedError, AttributeError, ValueError):
+        path = None
+    if path and os.path.exists(path):
+        yield path
+        return
+
+    suffix = os.path.splitext(field_file.name or "")[1]
+    fd, tmp = tempfile.mkstemp(prefix="dam-", suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as out, field_file.storage.open(field_file.name, "rb") as src:
+            shutil.copyfileobj(src, out, CHUNK_SIZE)
+        yield tmp
+    finally:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+
+
+def sha256_file(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(CHUNK_SIZE), b""):
+            h.update(block)
+    return h.hexdigest()
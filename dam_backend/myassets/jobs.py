@@ -0,0 +1,233 @@
+# myassets/jobs.py —— 数据库任务队列（不需要 Redis / RabbitMQ 等外部 broker）
+"""
+用法：
+
+    from myassets.jobs import task, enqueue
+
+    @task("assets.extract", max_attempts=3)
+    def extract(asset_id):
+        ...
+
+    enqueue("assets.extract", {"asset_id": 1}, priority=5, dedupe_key="extract:1")
+
+- enqueue() 写在调用方的事务里：事务回滚任务也不会出现（天然的 outbox）
+- claim() 用 SELECT ... FOR UPDATE SKIP LOCKED，多个 worker 进程互不阻塞
+- 失败按指数退避重试（带抖动），超过 max_attempts 置为 failed
+- dedupe_key：同一 key 同时只能有一个 queued/running 任务，重复 enqueue 直接返回已有任务
+- 租约：run() 开始前把 locked_at 刷成当前时间（批量认领的任务排队等待时不会先过期），
+  执行期间后台线程每 JOB_LOCK_TIMEOUT / 3 秒续一次；worker 崩溃遗留的 running 任务
+  超过 JOB_LOCK_TIMEOUT 秒没续租，由 reap_stale() 放回队列
+- 周期任务（清理已完成任务、压缩变更日志等）：worker 每分钟调 enqueue_periodic()，
+  按 settings.JOB_SCHEDULE 补入到期的任务，不需要额外的 cron / 调度进程
+- 收尾的状态更新只认自己的租约（locked_by + status=running）：已被回收 / 被别的 worker 重新认领的任务，
+  旧 worker 跑完也不会覆盖新一轮的状态
+
+任务处理函数统一放在 myassets/tasks.py（worker 启动时导入）。
+"""
+import logging
+import random
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_REGISTRY = {}
+
+
+class UnknownTask(Exception):
+    pass
+
+
+def task(name, max_attempts=None):
+    """注册任务处理函数；处理函数以 payload 作为关键字参数调用"""
+    def decorator(fn):
+        _REGISTRY[name] = fn
+        fn.task_name = name
+        fn.max_attempts = max_attempts
+        return fn
+    return decorator
+
+
+def registered():
+    return dict(_REGISTRY)
+
+
+def autodiscover():
+    from . import tasks  # noqa: F401  触发 @task 注册
+
+
+def _lock_timeout() -> int:
+    return int(getattr(settings, "JOB_LOCK_TIMEOUT", 30 * 60))
+
+
+def _backoff_seconds(attempts: int) -> float:
+    base = float(getattr(settings, "JOB_RETRY_BASE_SECONDS", 10))
+    cap = float(getattr(settings, "JOB_RETRY_MAX_SECONDS", 3600))
+    delay = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+# ---------------- 入队 ----------------
+def enqueue(name, payload=None, priority=0, dedupe_key=None, run_at=None, delay=None, max_attempts=None):
+    if run_at is None:
+        run_at = timezone.now() + timedelta(seconds=delay or 0)
+    fn = _REGISTRY.get(name)
+    if max_attempts is None:
+        max_attempts = getattr(fn, "max_attempts", None) or 5
+
+    job = Job(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        dedupe_key=dedupe_key,
+        run_at=run_at,
+        max_attempts=max_attempts,
+    )
+    if not dedupe_key:
+        job.save()
+        return job
+
+    try:
+        with transaction.atomic():
+            job.save()
+        return job
+    except IntegrityError:
+        existing = Job.objects.filter(dedupe_key=dedupe_key, status__in=("queued", "running")).first()
+        if existing is None:
+            raise
+        # 已有同 key 任务：必要时提升优先级，不重复入队
+        if priority > existing.priority and existing.status == "queued":
+            Job.objects.filter(pk=existing.pk, status="queued").update(priority=priority)
+            existing.priority = priority
+        return existing
+
+
+# ---------------- 认领 / 执行 ----------------
+def claim(worker_id, batch=1, names=None):
+    now = timezone.now()
+    with transaction.atomic():
+        qs = Job.objects.select_for_update(skip_locked=True).filter(status="queued", run_at__lte=now)
+        if names:
+            qs = qs.filter(name__in=names)
+        jobs = list(qs.order_by("-priority", "run_at", "id")[:batch])
+        if not jobs:
+            return []
+        Job.objects.filter(pk__in=[j.pk for j in jobs]).update(
+            status="running", locked_by=worker_id, locked_at=now, attempts=F("attempts") + 1,
+        )
+    for j in jobs:
+        j.status, j.locked_by, j.locked_at, j.attempts = "running", worker_id, now, j.attempts + 1
+    return jobs
+
+
+def _leased(job):
+    return Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status="running")
+
+
+def _heartbeat(job, stop):
+    """执行期间定期续租；租约已经丢了（被回收）就停"""
+    interval = max(1.0, _lock_timeout() / 3)
+    try:
+        while not stop.wait(interval):
+            try:
+                if not _leased(job).update(locked_at=timezone.now()):
+                    logger.warning("job %s (%s) lost its lease while running", job.pk, job.name)
+                    return
+            except DatabaseError:
+                logger.warning("job %s heartbeat failed", job.pk, exc_info=True)
+    finally:
+        connections.close_all()  # 只关本线程的连接
+
+
+def run(job):
+    """执行一个已认领的任务，返回最终状态；租约已经被回收的返回 "lost"（不执行 / 不改状态）"""
+    if not _leased(job).update(locked_at=timezone.now()):
+        logger.warning("job %s (%s) was reclaimed before it started", job.pk, job.name)
+        return "lost"
+    fn = _REGISTRY.get(job.name)
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(job, stop), name=f"job-{job.pk}-heartbeat", daemon=True)
+    beat.start()
+    try:
+        if fn is None:
+            raise UnknownTask(f"no handler registered for {job.name!r}")
+        fn(**(job.payload or {}))
+    except Exception as e:
+        err = traceback.format_exc()
+        logger.warning("job %s (%s) failed on attempt %s: %s", job.pk, job.name, job.attempts, e)
+        if isinstance(e, UnknownTask) or job.attempts >= job.max_attempts:
+            return _finish(job, "failed", last_error=err, finished_at=timezone.now())
+        return _finish(job, "queued", last_error=err,
+                       run_at=timezone.now() + timedelta(seconds=_backoff_seconds(job.attempts)))
+    finally:
+        stop.set()
+        beat.join()
+
+    return _finish(job, "done", finished_at=timezone.now(), last_error="")
+
+
+def _finish(job, status, **changes):
+    if not _leased(job).update(status=status, locked_by="", locked_at=None, **changes):
+        logger.warning("job %s (%s) finished as %s after losing its lease; state left to the new owner",
+                       job.pk, job.name, status)
+        return "lost"
+    return status
+
+
+def reap_stale():
+    """把超时仍 running 的任务（worker 崩溃）放回队列；次数用尽的置为 failed"""
+    cutoff = timezone.now() - timedelta(seconds=_lock_timeout())
+    stale = Job.objects.filter(status="running", locked_at__lt=cutoff)
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status="failed", last_error="lock timeout (worker died?)", finished_at=timezone.now(),
+        locked_by="", locked_at=None,
+    )
+    requeued = stale.update(status="queued", locked_by="", locked_at=None, run_at=timezone.now())
+    return requeued, failed
+
+
+def retry(job_ids):
+    """Admin 用：把失败任务重新排队（attempts 清零）"""
+    count = 0
+    for pk in job_ids:
+        try:
+            with transaction.atomic():
+                count += Job.objects.filter(pk=pk, status="failed").update(
+                    status="queued", attempts=0, run_at=timezone.now(), finished_at=None, last_error="",
+                )
+        except IntegrityError:
+            # 同 dedupe_key 已经有排队中的任务，跳过
+            continue
+    return count
+
+
+def purge_finished(older_than_days=7):
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    return Job.objects.filter(status__in=("done", "failed"), finished_at__lt=cutoff).delete()[0]
+
+
+# ---------------- 周期任务 ----------------
+def enqueue_periodic(schedule=None):
+    """
+    schedule（默认 settings.JOB_SCHEDULE）：任务名 → 间隔秒，0 / 空 = 不跑。
+    最近一个间隔内入过队的跳过；几个 worker 同时补时 dedupe_key 保证只排进一个。返回入队 / 已在排队的任务
+    """
+    if schedule is None:
+        schedule = getattr(settings, "JOB_SCHEDULE", None) or {}
+    now = timezone.now()
+    out = []
+    for name, every in schedule.items():
+        if not every or name not in _REGISTRY:
+            continue
+        if Job.objects.filter(name=name, created_at__gt=now - timedelta(seconds=every)).exists():
+            continue
+        out.append(enqueue(name, priority=-20, dedupe_key=f"periodic:{name}"))
+    return out
@@ -0,0 +1,573 @@
+# myassets/loadtest.py —— 端到端压测：造数据 + 按流量配比回放 + 分接口统计（manage.py loadtest）
+"""
+- 造数据：loadtest- 前缀的用户 / 标签，LT- 编号的资产（每个带 v1 版本）；
+  文件按大小档位从一小池样本里取（同档同类型共用文件，磁盘占用可控），
+  bulk_create 写入，不触发信号（不会排一堆抽取 / 转码任务），存储用量按批直接记账；已有同规模数据时直接复用
+- 热度：资产和标签按 Zipf 分布抽取（少数热门资产 / 标签占大多数请求）；写操作只挑文档类资产，均匀抽
+- 回放：闭环压测，每个工作线程一条 keep-alive 连接，按权重随机挑操作；预热期的结果不计
+- 统计：每个操作的请求数、吞吐、p50 / p95 / p99、错误率（429 / 503 单独记为被限流），
+  结果连同提交号、参数、数据规模写成 JSON，--compare 和上一次的结果逐项对比
+"""
+import hashlib
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+from bisect import bisect
+from itertools import accumulate
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+
+from . import quotas
+from .models import Asset, AssetVersion, Tag, UserProfile
+
+USER_PREFIX = "loadtest-"
+TAG_PREFIX = "loadtest-"
+ASSET_PREFIX = "LT-"
+POOL_DIR = "loadtest"
+PASSWORD = "loadtest-Pa55word"
+
+BRANDS = ["Aurora", "Borealis", "Cobalt", "Delta", "Ember", "Fjord", "Granite", "Halcyon"]
+WORDS = ["banner", "catalog", "hero", "logo", "packshot", "poster", "brochure", "teaser", "lookbook",
+         "campaign", "flyer", "storyboard", "mockup", "label", "manual", "spec", "render", "icon",
+         "keyvisual", "billboard", "newsletter", "datasheet", "showreel", "moodboard"]
+KINDS = {  # asset_type -> (扩展名, MIME, 文件头)
+    "image": (".png", "image/png", b"\x89PNG\r\n\x1a\n"),
+    "pdf": (".pdf", "application/pdf", b"%PDF-1.7\n"),
+    "video": (".mp4", "video/mp4", b"\x00\x00\x00\x18ftypisom\x00\x00\x02\x00"),
+    "document": (".txt", "text/plain", b""),
+}
+KIND_WEIGHTS = {"image": 45, "document": 25, "pdf": 20, "video": 10}
+
+# 默认流量配比（相对权重；--mix 覆盖，0 = 不跑）
+DEFAULT_MIX = {
+    "list": 12,
+    "list_tags_or": 10,
+    "list_tags_and": 8,
+    "search": 12,
+    "detail": 22,
+    "track_view": 14,
+    "download": 14,
+    "version_upload": 4,
+    "restore": 4,
+}
+DEFAULT_SIZES = "16k:60,256k:28,2m:10,16m:2"
+THROTTLED = (429, 503)
+
+
+# ---------------- 参数解析 ----------------
+def parse_bytes(text):
+    text = str(text).strip().lower()
+    units = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def parse_weights(spec, base=None, key=str):
+    """"a=3,b=1" / "16k:60,2m:10" → {key(a): 3.0, ...}；base 给出时只覆盖其中的项"""
+    weights = dict(base or {})
+    for item in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, sep, value = item.replace(":", "=").partition("=")
+        if not sep:
+            raise ValueError(f"bad weight {item!r} (expected name=weight)")
+        name = key(name.strip())
+        if base is not None and name not in base:
+            raise ValueError(f"unknown operation {name!r}; choose from {', '.join(base)}")
+        weights[name] = float(value)
+    return {k: w for k, w in weights.items() if w > 0}
+
+
+def size_label(size):
+    for unit, div in (("g", 1024 ** 3), ("m", 1024 ** 2), ("k", 1024)):
+        if size >= div and size % div == 0:
+            return f"{size // div}{unit}"
+    return str(size)
+
+
+class Zipf:
+    """0..n-1 上的 Zipf 抽样（秩越靠前越热门）"""
+
+    def __init__(self, n, s=1.1):
+        self.cum = list(accumulate(1.0 / (i + 1) ** s for i in range(n)))
+
+    def pick(self, rng):
+        return bisect(self.cum, rng.random() * self.cum[-1])
+
+
+# ---------------- 造数据 ----------------
+def sample_bytes(kind, size, index):
+    """指定大小的样本文件：真实文件头 + 可重现的填充（每个样本内容不同）"""
+    magic = KINDS[kind][2]
+    if kind == "document":
+        rng = random.Random(f"{size}-{index}")
+        words, out, total = WORDS + BRANDS, [], 0
+        while total < size:
+            line = " ".join(rng.choice(words) for _ in range(12)) + "\n"
+            out.append(line)
+            total += len(line)
+        return "".join(out).encode()[:size]
+    seed = hashlib.sha256(f"{kind}-{size}-{index}".encode()).digest()
+    block = seed * (65536 // len(seed))
+    body = (block * (size // len(block) + 1))[:max(0, size - len(magic))]
+    return magic + body
+
+
+def ensure_pool(sizes, per_class):
+    """每个 (类型, 大小档) 备 per_class 个样本文件，返回 {(kind, size): [(name, sha256), ...]}"""
+    pool = {}
+    for kind, (ext, _, _) in KINDS.items():
+        for size in sizes:
+            files = []
+            for i in range(per_class):
+                name = f"{POOL_DIR}/{kind}-{size_label(size)}-{i}{ext}"
+                data = sample_bytes(kind, size, i)
+                if not default_storage.exists(name) or default_storage.size(name) != size:
+                    if default_storage.exists(name):
+                        default_storage.delete(name)
+                    name = default_storage.save(name, ContentFile(data))
+                files.append((name, hashlib.sha256(data).hexdigest()))
+            pool[(kind, size)] = files
+    return pool
+
+
+def seed(assets=1000, tags=40, users=8, editors=2, sizes=None, per_class=2, rng_seed=1, log=print):
+    """造（或复用）压测数据集；返回数据集描述（写进结果 JSON）"""
+    sizes = sizes or parse_weights(DEFAULT_SIZES, key=parse_bytes)
+    rng = random.Random(rng_seed)
+    t0 = time.perf_counter()
+    pool = ensure_pool(sorted(sizes), per_class)
+
+    encoded = make_password(PASSWORD)
+    names = [f"{USER_PREFIX}{'editor' if i < editors else 'viewer'}-{i}" for i in range(users)]
+    existing = set(User.objects.filter(username__in=names).values_list("username", flat=True))
+    User.objects.bulk_create([User(username=n, password=encoded) for n in names if n not in existing])
+    User.objects.filter(username__in=names).update(password=encoded, is_active=True)
+    user_ids = dict(User.objects.filter(username__in=names).values_list("username", "id"))
+    for name, uid in user_ids.items():
+        UserProfile.objects.update_or_create(user_id=uid, defaults={"role": name.split("-")[1]})
+
+    tag_names = [f"{TAG_PREFIX}{rng.choice(WORDS)}-{i}" for i in range(tags)]
+    if Tag.objects.filter(name__startswith=TAG_PREFIX).count() != tags:
+        Tag.objects.filter(name__startswith=TAG_PREFIX).delete()
+        Tag.objects.bulk_create([Tag(name=n) for n in tag_names])
+    tag_ids = list(Tag.objects.filter(name__startswith=TAG_PREFIX).order_by("id").values_list("id", flat=True))
+
+    have = Asset.objects.filter(asset_no__startswith=ASSET_PREFIX).count()
+    if have != assets:
+        if have:
+            clean(files=False, users=False, tags=False, log=log)
+        uploader_ids = [user_ids[n] for n in names[:max(1, editors)]]
+        kinds, kind_w = zip(*KIND_WEIGHTS.items())
+        size_list, size_w = zip(*sorted(sizes.items()))
+        tag_zipf = Zipf(len(tag_ids))
+        batch = []
+        for i in range(assets):
+            kind = rng.choices(kinds, kind_w)[0]
+            size = rng.choices(size_list, size_w)[0]
+            name, digest = rng.choice(pool[(kind, size)])
+            words = rng.sample(WORDS, 3)
+            batch.append((Asset(
+                name=f"{words[0].title()} {words[1]} {i}",
+                asset_no=f"{ASSET_PREFIX}{i:07d}",
+                brand=rng.choice(BRANDS),
+                asset_type=kind,
+                file=name,
+                description=" ".join(words + rng.sample(WORDS, 5)),
+                uploaded_by_id=rng.choice(uploader_ids),
+                content_hash=digest,
+                mime_type=KINDS[kind][1],
+                size_bytes=size,
+            ), {tag_ids[tag_zipf.pick(rng)] for _ in range(rng.randint(1, 4))}))
+            if len(batch) >= 1000 or i == assets - 1:
+                _insert_assets(batch)
+                batch = []
+        log(f"seeded {assets} assets in {time.perf_counter() - t0:.1f}s")
+    else:
+        log(f"reusing {assets} seeded assets")
+
+    return {
+        "assets": assets, "tags": tags, "users": users, "editors": editors,
+        "sizes": {size_label(s): w for s, w in sorted(sizes.items())}, "files_per_class": per_class,
+    }
+
+
+def _insert_assets(batch):
+    with transaction.atomic():
+        created = Asset.objects.bulk_create([a for a, _ in batch])
+        if created and created[0].pk is None:  # 拿不回主键的后端（MySQL）按编号再查一次
+            ids = dict(Asset.objects.filter(asset_no__in=[a.asset_no for a in created]).values_list("asset_no", "id"))
+            for a in created:
+                a.pk = ids[a.asset_no]
+        AssetVersion.objects.bulk_create([
+            AssetVersion(asset_id=a.pk, version=1, file=a.file.name, uploaded_by_id=a.uploaded_by_id,
+                         content_hash=a.content_hash, mime_type=a.mime_type, size_bytes=a.size_bytes)
+            for a in created
+        ])
+        Through = Asset.tags.through
+        Through.objects.bulk_create([Through(asset_id=a.pk, tag_id=t) for a, (_, tags) in zip(created, batch)
+                                     for t in tags])
+        usage = {}  # 绕过了信号，用量按 (所有者, 品牌) 合并后直接记
+        for a in created:
+            entry = usage.setdefault((a.uploaded_by_id, a.brand), [0, 0])
+            entry[0] += a.size_bytes or 0
+            entry[1] += 1
+        for (owner, brand), (nbytes, n) in usage.items():
+            quotas.add(owner, brand, nbytes, n)
+
+
+def clean(files=True, users=True, tags=True, log=print):
+    """删掉压测数据：资产（连同压测中上传的版本文件）、标签、用户、样本池"""
+    assets = Asset.objects.filter(asset_no__startswith=ASSET_PREFIX)
+    uploaded = set(AssetVersion.objects.filter(asset__in=assets).exclude(file__startswith=f"{POOL_DIR}/")
+                   .values_list("file", flat=True))
+    uploaded |= set(assets.exclude(file__startswith=f"{POOL_DIR}/").values_list("file", flat=True))
+    n = assets.count()
+    for ids in _chunks(list(assets.values_list("id", flat=True)), 500):
+        with transaction.atomic():
+            Asset.objects.filter(pk__in=ids).delete()
+    for name in uploaded:
+        default_storage.delete(name)
+    log(f"removed {n} assets, {len(uploaded)} uploaded files")
+    if tags:
+        Tag.objects.filter(name__startswith=TAG_PREFIX).delete()
+    if users:
+        User.objects.filter(username__startswith=USER_PREFIX).delete()
+    if files:
+        try:
+            _, names = default_storage.listdir(POOL_DIR)
+        except (FileNotFoundError, NotImplementedError):
+            names = []
+        for name in names:
+            default_storage.delete(f"{POOL_DIR}/{name}")
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# ---------------- 本地服务 ----------------
+def free_port(host="127.0.0.1"):
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+def start_server(command=None, host="127.0.0.1", throttle=False, log_file=None, timeout=60):
+    """
+    起一个后端进程压测（默认 runserver --noreload；command 里的 {addr} / {host} / {port} 会被替换，
+    例如 "gunicorn dam_backend.wsgi -b {addr} -w 4"）。返回 (Popen, base_url)
+    """
+    port = free_port(host)
+    addr = f"{host}:{port}"
+    if command:
+        argv = [a.format(addr=addr, host=host, port=port) for a in command.split()]
+    else:
+        argv = [sys.executable, "manage.py", "runserver", "--noreload", addr]
+    env = dict(os.environ)
+    if not throttle:
+        env["THROTTLE_ENABLED"] = "0"  # 压的是处理能力，不是限流预算
+    out = open(log_file, "ab") if log_file else subprocess.DEVNULL
+    proc = subprocess.Popen(argv, cwd=settings.BASE_DIR, env=env, stdout=out, stderr=subprocess.STDOUT)
+    base = f"http://{addr}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with {proc.returncode}: {' '.join(argv)}")
+        try:
+            status, _, _ = Http(base).request("GET", "/api/ping/")
+            if status == 200:
+                return proc, base
+        except OSError:
+            pass
+        time.sleep(0.25)
+    stop_server(proc)
+    raise RuntimeError(f"server did not answer /api/ping/ within {timeout}s")
+
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+# ---------------- HTTP ----------------
+class Http:
+    """一条 keep-alive 连接；出错后自动重连"""
+
+    def __init__(self, base, timeout=120):
+        u = urllib.parse.urlsplit(base)
+        self.host, self.port, self.timeout = u.hostname, u.port or 80, timeout
+        self.conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        """返回 (状态码, 响应字节数, 解析后的 JSON 或 None)"""
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            resp = self.conn.getresponse()
+            if "json" in (resp.getheader("Content-Type") or ""):
+                raw = resp.read()
+                size, data = len(raw), (json.loads(raw) if raw else None)
+            else:
+                size, data = 0, None
+                while chunk := resp.read(1 << 20):
+                    size += len(chunk)
+            if resp.will_close:
+                self.close()
+            return resp.status, size, data
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def multipart(fields, file_field, filename, data, content_type):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for k, v in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+                 f'Content-Type: {content_type}\r\n\r\n'.encode() + data + b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+# ---------------- 流量回放 ----------------
+class Workload:
+    """压测时要用到的数据集快照 + 各操作怎么发请求"""
+
+    def __init__(self, upload_bytes=256 * 1024):
+        rows = list(Asset.objects.filter(asset_no__startswith=ASSET_PREFIX).order_by("asset_no")
+                    .values_list("id", "asset_type", "file"))
+        if not rows:
+            raise RuntimeError("no load-test dataset; run with seeding enabled first")
+        rng = random.Random(7)
+        rng.shuffle(rows)  # 热度和编号无关
+        self.asset_ids = [r[0] for r in rows]
+        self.documents = [r[0] for r in rows if r[1] == "document"]
+        sizes = {}
+        for name in {r[2] for r in rows}:
+            try:
+                sizes[name] = default_storage.size(name)
+            except (FileNotFoundError, OSError):
+                pass
+        self.by_size = {}
+        for aid, _, name in rows:
+            if name in sizes:
+                self.by_size.setdefault(size_label(sizes[name]), []).append(aid)
+        self.tag_ids = list(Tag.objects.filter(name__startswith=TAG_PREFIX).order_by("id").values_list("id", flat=True))
+        self.asset_zipf = Zipf(len(self.asset_ids))
+        self.tag_zipf = Zipf(len(self.tag_ids)) if self.tag_ids else None
+        self.size_weights = {label: len(ids) for label, ids in self.by_size.items()}
+        self.upload = sample_bytes("document", upload_bytes, 9999)
+        self.users = list(User.objects.filter(username__startswith=USER_PREFIX).order_by("username")
+                          .values_list("username", flat=True))
+        if not any("-editor-" in u for u in self.users):
+            raise RuntimeError("the load-test dataset has no editor user")
+
+    def hot_asset(self, rng):
+        return self.asset_ids[self.asset_zipf.pick(rng)]
+
+    def tag_pair(self, rng):
+        a = self.tag_ids[self.tag_zipf.pick(rng)]
+        b = self.tag_ids[self.tag_zipf.pick(rng)]
+        return a, (b if b != a else self.tag_ids[(self.tag_ids.index(a) + 1) % len(self.tag_ids)])
+
+    def build(self, op, rng):
+        """→ (统计名, 方法, 路径, 请求体, 额外头, 是否写操作)"""
+        if op == "list":
+            return op, "GET", "/api/assets/?ordering=-upload_date", None, {}, False
+        if op == "list_tags_or":
+            a, b = self.tag_pair(rng)
+            return op, "GET", f"/api/assets/?tags={a},{b}", None, {}, False
+        if op == "list_tags_and":
+            a, b = self.tag_pair(rng)
+            return op, "GET", f"/api/assets/?tags={a}&tags={b}", None, {}, False
+        if op == "search":
+            term = urllib.parse.quote(rng.choice(WORDS))
+            return op, "GET", f"/api/assets/?search={term}", None, {}, False
+        if op == "detail":
+            return op, "GET", f"/api/assets/{self.hot_asset(rng)}/", None, {}, False
+        if op == "track_view":
+            return op, "POST", f"/api/assets/{self.hot_asset(rng)}/track_view/", b"", {}, False
+        if op == "download":
+            labels, weights = zip(*self.size_weights.items())
+            label = rng.choices(labels, weights)[0]
+            aid = rng.choice(self.by_size[label])
+            return f"download:{label}", "GET", f"/api/assets/{aid}/download/", None, {}, False
+        if op == "version_upload":
+            aid = rng.choice(self.documents)
+            body, ctype = multipart({"note": "loadtest"}, "file", "loadtest.txt", self.upload, "text/plain")
+            return op, "POST", f"/api/assets/{aid}/versions/", body, {"Content-Type": ctype}, True
+        if op == "restore":
+            aid = rng.choice(self.documents)
+            return op, "POST", f"/api/assets/{aid}/versions/1/restore/", b"", {}, True
+        raise ValueError(op)
+
+    def ops_available(self, mix):
+        missing = set()
+        if not self.documents:
+            missing |= {"version_upload", "restore"}
+        if not self.by_size:
+            missing.add("download")
+        return {k: w for k, w in mix.items() if k not in missing}
+
+
+def obtain_tokens(base, usernames):
+    tokens = {}
+    http_ = Http(base)
+    for name in usernames:
+        status, _, data = http_.request("POST", "/api/token/", json.dumps({"username": name, "password": PASSWORD}),
+                                        {"Content-Type": "application/json"})
+        if status != 200 or not data or "access" not in data:
+            raise RuntimeError(f"token for {name} failed: HTTP {status} {data}")
+        tokens[name] = data["access"]
+    http_.close()
+    return tokens
+
+
+def run(base, workload, mix, concurrency=16, duration=60.0, warmup=5.0, rng_seed=1, log=print):
+    """闭环回放 duration 秒（另加 warmup 秒预热不计），返回 [(统计名, 开始时刻, 耗时, 状态码, 字节数)]"""
+    tokens = obtain_tokens(base, workload.users)
+    editors = [u for u in workload.users if "-editor-" in u]
+    ops, weights = zip(*mix.items())
+    started = time.perf_counter()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+    samples, lock = [], threading.Lock()
+
+    def worker(n):
+        rng = random.Random(rng_seed * 1000 + n)
+        reader = workload.users[n % len(workload.users)]
+        writer = editors[n % len(editors)]
+        conn, local = Http(base), []
+        while (now := time.perf_counter()) < deadline:
+            name, method, path, body, headers, write = workload.build(rng.choices(ops, weights)[0], rng)
+            headers = {**headers, "Authorization": f"Bearer {tokens[writer if write else reader]}"}
+            t0 = time.perf_counter()
+            try:
+                status, size, _ = conn.request(method, path, body, headers)
+            except (OSError, http.client.HTTPException):
+                status, size = 0, 0
+            if now >= measure_from:
+                local.append((name, t0 - measure_from, time.perf_counter() - t0, status, size))
+        conn.close()
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(n,), daemon=True) for n in range(concurrency)]
+    for t in threads:
+        t.start()
+    log(f"running {len(threads)} workers for {warmup:g}s warm-up + {duration:g}s against {base}")
+    for t in threads:
+        t.join()
+    return samples
+
+
+# ---------------- 统计 / 结果 ----------------
+def _pct(sorted_values, p):
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))] * 1000, 2)
+
+
+def summarize(samples, duration):
+    groups = {}
+    for name, _, elapsed, status, size in samples:
+        groups.setdefault(name, []).append((elapsed, status, size))
+    groups["ALL"] = [(e, s, b) for _, _, e, s, b in samples]
+
+    out = {}
+    for name, rows in sorted(groups.items()):
+        lat = sorted(e for e, _, _ in rows)
+        throttled = sum(1 for _, s, _ in rows if s in THROTTLED)
+        errors = sum(1 for _, s, _ in rows if not 200 <= s < 400 and s not in THROTTLED)
+        statuses = {}
+        for _, s, _ in rows:
+            statuses[str(s)] = statuses.get(str(s), 0) + 1
+        out[name] = {
+            "requests": len(rows),
+            "rps": round(len(rows) / duration, 2) if duration else None,
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0,
+            "throttled": throttled,
+            "mean_ms": round(statistics.fmean(lat) * 1000, 2) if lat else None,
+            "p50_ms": _pct(lat, 0.50),
+            "p95_ms": _pct(lat, 0.95),
+            "p99_ms": _pct(lat, 0.99),
+            "max_ms": round(lat[-1] * 1000, 2) if lat else None,
+            "mb_per_s": round(sum(b for _, _, b in rows) / duration / 1024 ** 2, 2) if duration else None,
+            "status": dict(sorted(statuses.items())),
+        }
+    return out
+
+
+def git_revision():
+    try:
+        cwd = settings.BASE_DIR
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True,
+                             text=True, timeout=10).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd,
+                               capture_output=True, text=True, timeout=30).stdout.strip()
+        return (rev + ("-dirty" if dirty else "")) if rev else ""
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def environment():
+    return {
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "db": connection.vendor,
+        "storage": default_storage.__class__.__name__,
+        "host": platform.node(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def format_table(endpoints, baseline=None):
+    """结果表；给了 baseline（上一次结果的 endpoints）就附上 p50 / p95 / rps 的变化百分比"""
+    head = f"{'endpoint':<18}{'reqs':>8}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'err%':>7}{'thr':>6}"
+    if baseline:
+        head += f"{'Δp50':>9}{'Δp95':>9}{'Δrps':>9}"
+    lines = [head]
+
+    def delta(new, old):
+        if new is None or not old:
+            return "-"
+        return f"{(new - old) / old * 100:+.0f}%"
+
+    for name, r in endpoints.items():
+        line = (f"{name:<18}{r['requests']:>8}{r['rps'] or 0:>9.1f}{r['p50_ms'] or 0:>9.1f}"
+                f"{r['p95_ms'] or 0:>9.1f}{r['p99_ms'] or 0:>9.1f}{r['error_rate'] * 100:>7.1f}{r['throttled']:>6}")
+        if baseline:
+            old = baseline.get(name) or {}
+            line += (f"{delta(r['p50_ms'], old.get('p50_ms')):>9}{delta(r['p95_ms'], old.get('p95_ms')):>9}"
+                     f"{delta(r['rps'], old.get('rps')):>9}")
+        lines.append(line)
+    return "\n".join(lines)
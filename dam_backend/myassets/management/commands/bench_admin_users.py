@@ -0,0 +1,109 @@
+# manage.py bench_admin_users [--users 50000] [--page-size 100] [--keep]
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from myassets.models import UserProfile
+
+PREFIX = "bench-admin-"
+ROLES = ("viewer", "viewer", "viewer", "editor", "admin")
+BATCH = 5000
+
+
+class Command(BaseCommand):
+    help = "用户管理压测：灌入大量用户，逐页翻完 /api/admin/users/，对比各深度的页耗时（键集分页 vs OFFSET）和检索 / 过滤耗时"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=50000, help="灌入的用户数（已存在的测试用户会复用）")
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--keep", action="store_true", help="保留测试用户（下次直接复用）")
+
+    def handle(self, *args, **opts):
+        total, size = max(1, opts["users"]), max(1, opts["page_size"])
+        self._seed(total)
+        root, _ = User.objects.get_or_create(username=f"{PREFIX}root", defaults={"is_staff": True})
+        UserProfile.objects.update_or_create(user=root, defaults={"role": "admin"})
+
+        client = Client()
+        client.force_login(root)
+        # 压测自己的请求不该被令牌桶挡住
+        throttling = {**getattr(settings, "THROTTLING", {}), "ENABLED": False}
+        try:
+            with override_settings(THROTTLING=throttling):
+                self._walk(client, size)
+                self._offset(size)
+                self._lookups(client, size, total)
+        finally:
+            if not opts["keep"]:
+                self.stdout.write("cleaning up…")
+                User.objects.filter(username__startswith=PREFIX).delete()
+
+    def _seed(self, total):
+        existing = User.objects.filter(username__startswith=PREFIX).exclude(username=f"{PREFIX}root").count()
+        started = time.perf_counter()
+        for start in range(existing, total, BATCH):
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(username=f"{PREFIX}{i:07d}", email=f"{PREFIX}{i:07d}@example.com",
+                         password="!", is_active=i % 10 != 0)
+                    for i in range(start, min(total, start + BATCH))
+                ])
+                if not all(u.pk for u in users):  # 不支持 RETURNING 的后端
+                    users = User.objects.filter(username__in=[u.username for u in users])
+                UserProfile.objects.bulk_create(
+                    [UserProfile(user_id=u.pk, role=ROLES[u.pk % len(ROLES)]) for u in users])
+        if total > existing:
+            self.stdout.write(f"seeded {total - existing} users in {time.perf_counter() - started:.1f}s")
+
+    def _timed_get(self, client, url):
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            resp = client.get(url)
+        return resp, (time.perf_counter() - started) * 1000, len(queries)
+
+    def _walk(self, client, size):
+        """按 next 链接翻完所有测试用户，打印首页 / 25% / 50% / 75% / 末页的耗时"""
+        url = f"/api/admin/users/?search={PREFIX}&page_size={size}"
+        pages = []
+        while url:
+            resp, ms, queries = self._timed_get(client, url)
+            data = resp.json()
+            pages.append((ms, queries, len(data["results"])))
+            url = data["next"]
+        rows = sum(n for _, _, n in pages)
+        self.stdout.write(f"cursor pages: {len(pages)} pages / {rows} rows, page_size={size}")
+        for label, idx in self._marks(len(pages)):
+            ms, queries, _ = pages[idx]
+            self.stdout.write(f"  {label:>5} page #{idx + 1:<6} {ms:7.1f} ms  {queries} queries")
+
+    def _offset(self, size):
+        """同样深度用 OFFSET 取一页（改造前分页的做法），作对比"""
+        qs = User.objects.filter(username__startswith=PREFIX).select_related("userprofile").order_by("id")
+        count = qs.count()
+        pages = max(1, -(-count // size))
+        self.stdout.write("offset pages (for comparison):")
+        for label, idx in self._marks(pages):
+            started = time.perf_counter()
+            list(qs[idx * size:(idx + 1) * size])
+            self.stdout.write(f"  {label:>5} page #{idx + 1:<6} {(time.perf_counter() - started) * 1000:7.1f} ms")
+
+    def _lookups(self, client, size, total):
+        last = f"{PREFIX}{total - 1:07d}"
+        for label, url in (
+            ("prefix search", f"/api/admin/users/?search={last[:-2]}&page_size={size}"),
+            ("email search", f"/api/admin/users/?search={last.upper()}@&page_size={size}"),
+            ("role=editor", f"/api/admin/users/?role=editor&page_size={size}"),
+            ("role=viewer&active", f"/api/admin/users/?role=viewer&is_active=true&page_size={size}"),
+        ):
+            resp, ms, queries = self._timed_get(client, url)
+            found = len(resp.json()["results"]) if resp.status_code == 200 else resp.status_code
+            self.stdout.write(f"{label:>20}: {ms:7.1f} ms  {queries} queries  {found} rows")
+
+    @staticmethod
+    def _marks(n):
+        return [("first", 0), ("25%", n // 4), ("50%", n // 2), ("75%", 3 * n // 4), ("last", n - 1)]
@@ -0,0 +1,90 @@
+# manage.py bench_login [--users 20] [--requests 200] [--concurrency 32] [--endpoint token|login] [--url http://127.0.0.1:8000]
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+
+PREFIX = "bench-login-"
+PASSWORD = "bench-login-Pa55word"
+PATHS = {"token": "/api/token/", "login": "/api/login/"}
+
+
+class Command(BaseCommand):
+    help = "登录压测：并发模拟一波登录（上班高峰），输出吞吐量和延迟分位数；测试用户用完即删"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20, help="测试用户数（轮流登录）")
+        parser.add_argument("--requests", type=int, default=200, help="总登录次数")
+        parser.add_argument("--concurrency", type=int, default=32, help="同时发起的登录数")
+        parser.add_argument("--endpoint", choices=sorted(PATHS), default="token", help="token = /api/token/，login = /api/login/（会话）")
+        parser.add_argument("--url", help="压测已启动的服务（例如 http://127.0.0.1:8000）；不给则在本进程内用测试客户端")
+        parser.add_argument("--keep", action="store_true", help="保留测试用户")
+
+    def handle(self, *args, **opts):
+        names = [f"{PREFIX}{i}" for i in range(max(1, opts["users"]))]
+        encoded = make_password(PASSWORD)  # 按当前首选哈希参数生成一次，所有测试用户共用
+        existing = set(User.objects.filter(username__in=names).values_list("username", flat=True))
+        User.objects.bulk_create([User(username=n, password=encoded) for n in names if n not in existing])
+        User.objects.filter(username__in=names).update(password=encoded, is_active=True)
+
+        path = PATHS[opts["endpoint"]]
+        local = threading.local()
+
+        def login(i):
+            body = {"username": names[i % len(names)], "password": PASSWORD}
+            started = time.perf_counter()
+            if opts["url"]:
+                req = urllib.request.Request(opts["url"].rstrip("/") + path, data=json.dumps(body).encode(),
+                                             headers={"Content-Type": "application/json"}, method="POST")
+                try:
+                    with urllib.request.urlopen(req, timeout=60) as resp:
+                        resp.read()
+                        code = resp.status
+                except urllib.error.HTTPError as e:
+                    code = e.code
+            else:
+                if not hasattr(local, "client"):
+                    local.client = Client()
+                code = local.client.post(path, body, content_type="application/json").status_code
+            return code, time.perf_counter() - started
+
+        total = max(1, opts["requests"])
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max(1, opts["concurrency"])) as pool:
+                results = list(pool.map(login, range(total)))
+        finally:
+            connections.close_all()
+        elapsed = time.perf_counter() - started
+
+        codes = Counter(code for code, _ in results)
+        latencies = sorted(t for _, t in results)
+
+        def pct(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        self.stdout.write(
+            f"{opts['endpoint']}: {total} logins, concurrency {opts['concurrency']}, {elapsed:.2f}s, "
+            f"{total / elapsed:.1f} logins/s"
+        )
+        self.stdout.write(
+            f"latency ms: mean={statistics.mean(latencies) * 1000:.0f} p50={pct(0.5):.0f} "
+            f"p95={pct(0.95):.0f} p99={pct(0.99):.0f} max={latencies[-1] * 1000:.0f}"
+        )
+        self.stdout.write("status: " + ", ".join(f"{code}={n}" for code, n in sorted(codes.items())))
+
+        if not opts["keep"]:
+            User.objects.filter(username__startswith=PREFIX).delete()
+        ok = codes.get(200, 0)
+        style = self.style.SUCCESS if ok == total else self.style.WARNING
+        self.stdout.write(style(f"ok={ok}/{total}"))
@@ -0,0 +1,23 @@
+# manage.py compact_changes [--retain-days 30]
+from django.core.management.base import BaseCommand
+
+from myassets import changefeed
+
+
+class Command(BaseCommand):
+    help = "压缩资产变更日志（每个资产/标签只留最新一条），并删除保留期之外的记录"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--retain-days", type=int, default=30,
+                            help="保留天数；更早的记录删除并设置 horizon（<0 表示只压缩不过期）")
+        parser.add_argument("--batch-size", type=int, default=10_000)
+
+    def handle(self, *args, **opts):
+        retain = opts["retain_days"]
+        stats = changefeed.compact(
+            retain_days=None if retain is None or retain < 0 else retain,
+            batch_size=opts["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"compacted={stats['compacted']} expired={stats['expired']} horizon={stats['horizon']}"
+        ))
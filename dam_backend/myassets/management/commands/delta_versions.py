@@ -0,0 +1,41 @@
+# manage.py delta_versions [--ids 1 2 3] [--now] [--report]
+from django.core.management.base import BaseCommand
+
+from myassets import deltas
+from myassets.models import Asset
+
+
+class Command(BaseCommand):
+    help = "把文档 / PDF 的历史版本编成相对关键帧的差量（settings.VERSION_DELTAS），或输出每个资产省下的空间"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ids", nargs="*", type=int, help="只处理这些资产")
+        parser.add_argument("--now", action="store_true", help="在当前进程里直接执行，不排队")
+        parser.add_argument("--report", action="store_true", help="只输出空间统计")
+
+    def handle(self, *args, **opts):
+        if opts["report"]:
+            total = 0
+            for row in deltas.space_report(opts["ids"] or None):
+                total += row["saved_bytes"]
+                self.stdout.write(
+                    f"asset {row['asset_id']}: {row['delta_versions']} delta version(s), "
+                    f"{row['full_bytes']} -> {row['stored_bytes']} bytes (saved {row['saved_bytes']})"
+                )
+            self.stdout.write(self.style.SUCCESS(f"total saved {total} bytes"))
+            return
+
+        qs = Asset.objects.filter(asset_type__in=deltas.asset_types(), versions__version__gt=1).distinct().order_by("id")
+        if opts["ids"]:
+            qs = qs.filter(pk__in=opts["ids"])
+        count, encoded = 0, 0
+        for asset_id in qs.values_list("id", flat=True).iterator(chunk_size=1000):
+            if opts["now"]:
+                encoded += deltas.run_for_asset(asset_id)["encoded"]
+            else:
+                deltas.enqueue_for_asset(asset_id)
+            count += 1
+        if opts["now"]:
+            self.stdout.write(self.style.SUCCESS(f"processed {count} asset(s), encoded {encoded} version(s)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"queued {count} asset(s)"))
@@ -0,0 +1,32 @@
+# manage.py extract_assets [--all] [--force] [--now] [--ids 1 2 3]
+from django.core.management.base import BaseCommand
+
+from myassets import extraction
+from myassets.models import Asset
+
+
+class Command(BaseCommand):
+    help = "为资产抽取文件正文和技术元数据（默认只处理还没抽取过的，排队给 run_worker 执行）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ids", nargs="*", type=int, help="只处理这些资产")
+        parser.add_argument("--all", action="store_true", help="包括已经抽取过的资产")
+        parser.add_argument("--force", action="store_true", help="文件没变也重新抽取")
+        parser.add_argument("--now", action="store_true", help="在当前进程里直接执行，不排队")
+
+    def handle(self, *args, **opts):
+        qs = Asset.objects.exclude(file="").order_by("id")
+        if opts["ids"]:
+            qs = qs.filter(pk__in=opts["ids"])
+        elif not opts["all"]:
+            qs = qs.filter(extracted_at__isnull=True)
+
+        count = 0
+        for asset_id in qs.values_list("id", flat=True).iterator(chunk_size=1000):
+            if opts["now"]:
+                extraction.run_for_asset(asset_id, force=opts["force"])
+            else:
+                extraction.enqueue_for_asset(asset_id, force=opts["force"])
+            count += 1
+        verb = "extracted" if opts["now"] else "queued"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {count} asset(s)"))
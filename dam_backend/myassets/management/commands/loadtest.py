@@ -0,0 +1,136 @@
+# manage.py loadtest [--assets 1000] [--concurrency 16] [--duration 60] [--mix detail=30,restore=0] [--url http://127.0.0.1:8000] [--compare benchmarks/results/<上一次>.json]
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from myassets import loadtest
+
+
+class Command(BaseCommand):
+    help = ("端到端压测：造一份 DAM 数据集，起本地服务按流量配比回放（列表 / 标签 AND·OR / 检索 / 详情 / "
+            "浏览计数 / 各档大小的下载 / 上传新版本 / 恢复版本），输出分接口 p50/p95/p99、吞吐、错误率并存成 JSON")
+
+    def add_arguments(self, parser):
+        g = parser.add_argument_group("数据集")
+        g.add_argument("--assets", type=int, default=1000, help="资产数（已有同规模数据集时复用）")
+        g.add_argument("--tags", type=int, default=40)
+        g.add_argument("--users", type=int, default=8, help="压测用户数（前 --editors 个是 editor，其余 viewer）")
+        g.add_argument("--editors", type=int, default=2)
+        g.add_argument("--sizes", default=loadtest.DEFAULT_SIZES, help="文件大小档位:占比，例如 16k:60,256k:28,2m:10,16m:2")
+        g.add_argument("--files-per-class", type=int, default=2, help="每个 (类型, 大小档) 的样本文件数")
+        g.add_argument("--upload-size", default="256k", help="上传新版本的文件大小")
+
+        g = parser.add_argument_group("回放")
+        g.add_argument("--mix", default="", help="覆盖默认配比，例如 detail=30,restore=0；可选：" + ", ".join(loadtest.DEFAULT_MIX))
+        g.add_argument("--concurrency", type=int, default=16, help="并发工作线程（每个一条 keep-alive 连接）")
+        g.add_argument("--duration", type=float, default=60, help="计入统计的秒数")
+        g.add_argument("--warmup", type=float, default=5, help="预热秒数（不计）")
+        g.add_argument("--seed", type=int, default=1, help="随机种子（同种子 = 同样的数据集和请求序列）")
+
+        g = parser.add_argument_group("服务")
+        g.add_argument("--url", help="压测已启动的服务；不给则在本机起一个")
+        g.add_argument("--server-cmd", help="自定义启动命令，{addr} / {host} / {port} 会被替换，"
+                                            "例如 \"gunicorn dam_backend.wsgi -b {addr} -w 4\"；默认 runserver --noreload")
+        g.add_argument("--server-log", help="本地服务的输出写到这个文件")
+        g.add_argument("--throttle", action="store_true", help="本地服务保留限流（默认关掉：THROTTLE_ENABLED=0）")
+
+        g = parser.add_argument_group("结果")
+        g.add_argument("--label", default="", help="写进结果，方便对比（例如 pool / no-pool）")
+        g.add_argument("--out", help="结果 JSON 路径（默认 benchmarks/results/loadtest-<时间>-<提交号>.json）")
+        g.add_argument("--compare", help="和这份旧结果逐项对比")
+        g.add_argument("--report", help="不压测，只打印这份结果（可配合 --compare）")
+        g.add_argument("--no-seed", action="store_true", help="不造数据（--url 指向别的库已造好的数据集时用）")
+        g.add_argument("--clean", action="store_true", help="删除压测数据集（用户 / 标签 / 资产 / 样本文件）后退出")
+
+    def handle(self, *args, **opts):
+        if opts["clean"]:
+            loadtest.clean(log=self.stdout.write)
+            return
+        baseline = self._load(opts["compare"])["endpoints"] if opts["compare"] else None
+        if opts["report"]:
+            result = self._load(opts["report"])
+            self.stdout.write(loadtest.format_table(result["endpoints"], baseline))
+            return
+
+        try:
+            mix = loadtest.parse_weights(opts["mix"], base=loadtest.DEFAULT_MIX)
+            sizes = loadtest.parse_weights(opts["sizes"], key=loadtest.parse_bytes)
+            upload_bytes = loadtest.parse_bytes(opts["upload_size"])
+        except ValueError as e:
+            raise CommandError(e)
+        if not mix or not sizes:
+            raise CommandError("the traffic mix and --sizes must have at least one positive weight")
+        if not 1 <= opts["editors"] <= opts["users"]:
+            raise CommandError("--editors must be between 1 and --users")
+
+        dataset = None
+        if not opts["no_seed"]:
+            dataset = loadtest.seed(
+                assets=max(1, opts["assets"]), tags=max(2, opts["tags"]), users=opts["users"],
+                editors=opts["editors"], sizes=sizes, per_class=max(1, opts["files_per_class"]),
+                rng_seed=opts["seed"], log=self.stdout.write,
+            )
+        try:
+            workload = loadtest.Workload(upload_bytes)
+        except RuntimeError as e:
+            raise CommandError(e)
+        skipped = set(mix) - set(workload.ops_available(mix))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"dataset cannot serve: {', '.join(sorted(skipped))}"))
+            mix = workload.ops_available(mix)
+
+        proc, base = None, opts["url"]
+        if not base:
+            try:
+                proc, base = loadtest.start_server(opts["server_cmd"], throttle=opts["throttle"],
+                                                   log_file=opts["server_log"])
+            except RuntimeError as e:
+                raise CommandError(e)
+        try:
+            samples = loadtest.run(base.rstrip("/"), workload, mix, concurrency=max(1, opts["concurrency"]),
+                                   duration=opts["duration"], warmup=opts["warmup"], rng_seed=opts["seed"],
+                                   log=self.stdout.write)
+        finally:
+            if proc:
+                loadtest.stop_server(proc)
+
+        endpoints = loadtest.summarize(samples, opts["duration"])
+        commit = loadtest.git_revision()
+        result = {
+            "label": opts["label"],
+            "commit": commit,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "server": opts["url"] or opts["server_cmd"] or "runserver",
+            "throttling": None if opts["url"] else opts["throttle"],  # 外部服务的限流配置不得而知
+            "concurrency": opts["concurrency"],
+            "duration": opts["duration"],
+            "warmup": opts["warmup"],
+            "seed": opts["seed"],
+            "mix": mix,
+            "upload_size": upload_bytes,
+            "dataset": dataset,
+            "environment": loadtest.environment(),
+            "endpoints": endpoints,
+        }
+        path = opts["out"] or os.path.join(
+            settings.BASE_DIR, "benchmarks", "results",
+            f"loadtest-{time.strftime('%Y%m%d-%H%M%S')}{'-' + commit if commit else ''}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(result, fh, ensure_ascii=False, indent=2)
+
+        self.stdout.write(loadtest.format_table(endpoints, baseline))
+        total = endpoints.get("ALL", {})
+        style = self.style.SUCCESS if not total.get("errors") else self.style.WARNING
+        self.stdout.write(style(f"{total.get('requests', 0)} requests, {total.get('rps', 0)} req/s, "
+                                f"errors {total.get('errors', 0)}, throttled {total.get('throttled', 0)} → {path}"))
+
+    def _load(self, path):
+        try:
+            with open(path, encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"cannot read {path}: {e}")
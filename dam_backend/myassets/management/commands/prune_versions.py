@@ -0,0 +1,23 @@
+# manage.py prune_versions --keep-last 10 [--older-than-days 365] [--dry-run]
+from django.core.management.base import BaseCommand, CommandError
+
+from myassets import tiering
+
+
+class Command(BaseCommand):
+    help = ("删除每个资产最近 K 个版本之外的版本记录；文件只在没有任何版本 / 资产再引用时删除"
+            "（恢复出来的版本与旧版本共用文件，不会误删）")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-last", type=int, required=True, help="每个资产保留的版本数（至少 1）")
+        parser.add_argument("--older-than-days", type=int, help="只删除早于 N 天的版本")
+        parser.add_argument("--dry-run", action="store_true", help="只统计，不删除")
+
+    def handle(self, *args, **opts):
+        if opts["keep_last"] < 1:
+            raise CommandError("--keep-last must be at least 1")
+        stats = tiering.prune(opts["keep_last"], older_than_days=opts["older_than_days"], dry_run=opts["dry_run"])
+        verb = "would prune" if opts["dry_run"] else "pruned"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} versions={stats['versions']} files={stats['files']} cold_files={stats['cold_files']}"
+        ))
@@ -0,0 +1,24 @@
+# manage.py recompute_usage [--fill-sizes] [--workers 16]
+from django.core.management.base import BaseCommand
+
+from myassets import quotas
+
+
+class Command(BaseCommand):
+    help = ("按数据库里记的文件大小重建用户 / 品牌存储用量汇总（不读文件；单独设的配额保留）；"
+            "--fill-sizes 先给旧数据补 size_bytes（要逐个 stat，只需升级后跑一次）。请在上传低峰运行")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fill-sizes", action="store_true", help="先补 size_bytes 为空的资产 / 版本")
+        parser.add_argument("--workers", type=int, default=16, help="补大小时并发 stat 的线程数")
+
+    def handle(self, *args, **opts):
+        if opts["fill_sizes"]:
+            stats = quotas.fill_sizes(workers=opts["workers"], log=self.stdout.write)
+            self.stdout.write(f"sized assets={stats['assets']} versions={stats['versions']} missing={stats['missing']}")
+        stats = quotas.recompute()
+        style = self.style.SUCCESS if not stats["unknown_sizes"] else self.style.WARNING
+        self.stdout.write(style(
+            f"recomputed {stats['rows']} usage rows from {stats['assets']} assets; "
+            f"files without a recorded size: {stats['unknown_sizes']}"
+        ))
@@ -0,0 +1,121 @@
+# manage.py run_worker --processes 4
+"""
+后台任务 worker：父进程负责拉起 / 守护 N 个子进程，每个子进程循环认领并执行任务。
+- SIGINT / SIGTERM：子进程做完手上的任务后退出
+- 子进程意外退出会被父进程重新拉起
+- --burst：队列空了就退出（适合 cron / 调试）
+- 每分钟回收一次超时的任务，并按 settings.JOB_SCHEDULE 补入到期的周期任务（jobs.enqueue_periodic）
+"""
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connections
+
+from myassets import jobs
+
+
+def _worker_loop(index, stop, opts):
+    import django
+    from django.apps import apps
+    if not apps.ready:  # spawn 启动方式下子进程需要重新初始化 Django
+        django.setup()
+
+    # 子进程自己处理信号：由父进程通过 stop 事件通知退出
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    jobs.autodiscover()
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    idle = opts["poll_interval"]
+    last_reap = 0.0
+
+    while not stop.is_set():
+        close_old_connections()
+        if time.monotonic() - last_reap > 60:
+            jobs.reap_stale()
+            jobs.enqueue_periodic()
+            last_reap = time.monotonic()
+
+        try:
+            claimed = jobs.claim(worker_id, batch=opts["batch"], names=opts["names"])
+        except DatabaseError:
+            # 数据库短暂不可用：丢掉连接，稍后重试
+            connections.close_all()
+            stop.wait(opts["max_poll_interval"])
+            continue
+        if not claimed:
+            if opts["burst"]:
+                break
+            stop.wait(idle)
+            idle = min(idle * 2, opts["max_poll_interval"])  # 空闲时逐步放慢轮询
+            continue
+
+        idle = opts["poll_interval"]
+        for job in claimed:
+            jobs.run(job)
+
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "运行数据库任务队列的 worker 进程池"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+        parser.add_argument("--batch", type=int, default=1, help="每次认领的任务数")
+        parser.add_argument("--name", action="append", dest="names", help="只处理指定名称的任务（可重复）")
+        parser.add_argument("--poll-interval", type=float, default=0.5)
+        parser.add_argument("--max-poll-interval", type=float, default=5.0)
+        parser.add_argument("--burst", action="store_true", help="队列清空后退出")
+
+    def handle(self, *args, **options):
+        n = max(1, options["processes"])
+        opts = {k: options[k] for k in ("batch", "names", "poll_interval", "max_poll_interval", "burst")}
+
+        jobs.autodiscover()
+        self.stdout.write(f"registered tasks: {', '.join(sorted(jobs.registered())) or '-'}")
+
+        if n == 1:
+            stop = multiprocessing.Event()
+            self._install_signals(stop)
+            _worker_loop(0, stop, opts)
+            return
+
+        # fork 之前关掉父进程的数据库连接，避免子进程共享同一个 socket
+        connections.close_all()
+        ctx = multiprocessing.get_context()
+        stop = ctx.Event()
+        self._install_signals(stop)
+
+        procs = {}
+        for i in range(n):
+            procs[i] = self._spawn(ctx, i, stop, opts)
+        self.stdout.write(self.style.SUCCESS(f"started {n} worker processes"))
+
+        while procs:
+            for i, p in list(procs.items()):
+                p.join(timeout=0.5)
+                if p.is_alive():
+                    continue
+                if stop.is_set() or opts["burst"]:
+                    procs.pop(i)
+                else:
+                    self.stderr.write(f"worker {i} exited with {p.exitcode}; restarting")
+                    procs[i] = self._spawn(ctx, i, stop, opts)
+
+    @staticmethod
+    def _spawn(ctx, index, stop, opts):
+        p = ctx.Process(target=_worker_loop, args=(index, stop, opts), name=f"dam-worker-{index}", daemon=False)
+        p.start()
+        return p
+
+    def _install_signals(self, stop):
+        def _graceful(signum, frame):
+            self.stdout.write("stopping workers after current jobs ...")
+            stop.set()
+        signal.signal(signal.SIGINT, _graceful)
+        signal.signal(signal.SIGTERM, _graceful)
@@ -0,0 +1,30 @@
+# manage.py s3_standin [--host 127.0.0.1] [--port 9000] [--root ./s3_standin] [--bucket dam-assets]
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myassets.s3_standin import StandinServer
+
+
+class Command(BaseCommand):
+    help = "本地 S3 兼容替身（不联网联调对象存储）：STORAGE_BACKEND=s3 S3_ENDPOINT_URL=http://127.0.0.1:9000 指过来即可"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=9000)
+        parser.add_argument("--root", default=getattr(settings, "S3_STANDIN_ROOT", "s3_standin"), help="数据目录")
+        parser.add_argument("--bucket", action="append",
+                            help="启动时建好的桶（可重复）；默认 settings.S3_BUCKET")
+        parser.add_argument("--verbose", action="store_true", help="打印每个请求")
+
+    def handle(self, *args, **opts):
+        server = StandinServer(opts["root"], opts["host"], opts["port"], verbose=opts["verbose"])
+        for bucket in opts["bucket"] or [getattr(settings, "S3_BUCKET", "") or "dam-assets"]:
+            server.store.create_bucket(bucket)
+            self.stdout.write(f"bucket {bucket}")
+        self.stdout.write(self.style.SUCCESS(f"S3 stand-in at {server.endpoint_url}, data in {server.store.root}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,47 @@
+# manage.py scrub_storage [--prefix assets/] [--workers 8] [--verify] [--delete-orphans] [--resume]
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from myassets.scrub import Scrubber
+
+
+class Command(BaseCommand):
+    help = ("巡检 MEDIA_ROOT：找出没有任何记录引用的孤儿文件、指向不存在文件的记录，"
+            "可选重新计算 sha256 与记录比对；大卷上可断点续跑")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--prefix", default="assets/", help="只检查这个前缀下的文件（默认 assets/）")
+        parser.add_argument("--workers", type=int, default=8, help="读目录 / 算校验和的线程数")
+        parser.add_argument("--verify", action="store_true", help="重新计算 sha256 并与 content_hash 比对（读全部文件）")
+        parser.add_argument("--delete-orphans", action="store_true", help="删除孤儿文件（默认只报告）")
+        parser.add_argument("--min-age-hours", type=float, default=24,
+                            help="最近 N 小时内修改过的文件不算孤儿（可能是还没提交的上传）")
+        parser.add_argument("--checkpoint", default=os.path.join(settings.BASE_DIR, ".scrub_storage.json"),
+                            help="断点文件（空字符串表示不记录）")
+        parser.add_argument("--resume", action="store_true", help="从断点文件记录的位置继续")
+        parser.add_argument("--quiet", action="store_true", help="只输出汇总")
+
+    def handle(self, *args, **opts):
+        def report(kind, path, detail):
+            if not opts["quiet"]:
+                self.stdout.write(f"{kind}\t{path}\t{detail}")
+
+        scrubber = Scrubber(
+            report,
+            prefix=opts["prefix"],
+            workers=opts["workers"],
+            verify=opts["verify"],
+            delete_orphans=opts["delete_orphans"],
+            min_age_seconds=opts["min_age_hours"] * 3600,
+            checkpoint=opts["checkpoint"] or None,
+            resume=opts["resume"],
+        )
+        if scrubber.after:
+            self.stdout.write(f"resuming after {scrubber.after}")
+        try:
+            stats = scrubber.run()
+        except RuntimeError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(" ".join(f"{k}={v}" for k, v in stats.items())))
@@ -0,0 +1,34 @@
+# manage.py tier_versions [--older-than-days 30] [--keep-last 3] [--limit N] [--dry-run]
+from django.core.management.base import BaseCommand
+
+from myassets import tiering
+
+
+class Command(BaseCommand):
+    help = "把过期的历史版本文件转入冷存储（能压缩的用 zstd 压缩）；默认策略见 settings.VERSION_TIERING"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than-days", type=int, help="早于 N 天的历史版本转冷（0 = 不按时间）")
+        parser.add_argument("--keep-last", type=int, help="每个资产最近 K 个版本留在主存储（0 = 不按数量）")
+        parser.add_argument("--limit", type=int, help="本次最多处理多少个文件")
+        parser.add_argument("--codec", choices=["zstd", "gzip", "none"], help="压缩方式（默认有 zstandard 用 zstd，否则 gzip）")
+        parser.add_argument("--dry-run", action="store_true", help="只统计，不移动文件")
+
+    def handle(self, *args, **opts):
+        codec = opts["codec"]
+        if codec == "zstd" and tiering.zstandard is None:
+            self.stderr.write("zstandard is not installed; falling back to gzip")
+            codec = "gzip"
+        stats = tiering.run(
+            older_than_days=opts["older_than_days"],
+            keep_last=opts["keep_last"],
+            limit=opts["limit"],
+            dry_run=opts["dry_run"],
+            codec="" if codec == "none" else codec,
+        )
+        verb = "would tier" if opts["dry_run"] else "tiered"
+        tiers = tiering.summary()
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb}={stats['tiered']} reused={stats['reused']} skipped={stats['skipped']} failed={stats['failed']} "
+            f"(versions hot={tiers['hot']} cold={tiers['cold']})"
+        ))
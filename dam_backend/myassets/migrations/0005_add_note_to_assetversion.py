@@ -1,5 +1,28 @@
 from django.db import migrations
 
+
+# 只对 PostgreSQL 执行：SQLite 不支持 ADD COLUMN IF NOT EXISTS，
+# 且新库在 0004 建表时已经带了 note 列，本地 SQLite 替身跳过即可。
+def _add_note(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # 前向：给现有表补上 note 列（若不存在）
+    schema_editor.execute("""
+        ALTER TABLE myassets_assetversion
+        ADD COLUMN IF NOT EXISTS note varchar(255) NULL;
+    """)
+
+
+def _drop_note(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # 回滚：删除 note（一般用不到）
+    schema_editor.execute("""
+        ALTER TABLE myassets_assetversion
+        DROP COLUMN IF EXISTS note;
+    """)
+
+
 class Migration(migrations.Migration):
 
     dependencies = [
@@ -7,16 +30,5 @@ class Migration(migrations.Migration):
     ]
 
     operations = [
-        migrations.RunSQL(
-            # 前向：给现有表补上 note 列（若不存在）
-            sql="""
-                ALTER TABLE myassets_assetversion
-                ADD COLUMN IF NOT EXISTS note varchar(255) NULL;
-            """,
-            # 回滚：删除 note（一般用不到）
-            reverse_sql="""
-                ALTER TABLE myassets_assetversion
-                DROP COLUMN IF EXISTS note;
-            """,
-        ),
+        migrations.RunPython(_add_note, _drop_note),
     ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0005_add_note_to_assetversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=500)),
+                ('status_code', models.PositiveSmallIntegerField(default=0)),
+                ('duration_ms', models.FloatField(db_index=True)),
+                ('trigger', models.CharField(choices=[('sample', 'Sampled'), ('slow', 'Slow request')], max_length=10)),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('query_count', models.PositiveIntegerField(default=0)),
+                ('sql_time_ms', models.FloatField(default=0)),
+                ('folded_stacks', models.TextField(blank=True)),
+                ('stats', models.TextField(blank=True)),
+                ('sql', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
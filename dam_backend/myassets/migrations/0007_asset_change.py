@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0006_request_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('create', 'Asset created'), ('update', 'Asset updated'), ('delete', 'Asset deleted'), ('tags', 'Asset tags changed'), ('version', 'Version added'), ('tag', 'Tag created/updated'), ('tag_delete', 'Tag deleted'), ('horizon', 'Retention horizon')], max_length=12)),
+                ('asset_id', models.BigIntegerField(blank=True, db_index=True, null=True)),
+                ('tag_id', models.BigIntegerField(blank=True, null=True)),
+                ('version', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:43
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0007_asset_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=100)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('priority', models.SmallIntegerField(default=0)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('max_attempts', models.PositiveIntegerField(default=5)),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('dedupe_key', models.CharField(blank=True, max_length=200, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['-priority', 'run_at', 'id'],
+                'indexes': [models.Index(condition=models.Q(('status', 'queued')), fields=['-priority', 'run_at', 'id'], name='myassets_job_claim_idx'), models.Index(fields=['status', 'finished_at'], name='myassets_job_status_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['queued', 'running'])), fields=('dedupe_key',), name='myassets_job_dedupe_active')],
+            },
+        ),
+    ]
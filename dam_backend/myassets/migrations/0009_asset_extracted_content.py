@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:44
+
+from django.db import migrations, models
+
+
+# 只在 PostgreSQL 上建 GIN 索引（SQLite 替身跳过）：
+# - metadata：jsonb_path_ops，支持 metadata @> {...} 之类的包含查询
+# - content_text：与 SearchVector("content_text", config="simple") 生成的表达式一致，全文检索走索引
+def _create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS myassets_asset_metadata_gin "
+        "ON myassets_asset USING gin (metadata jsonb_path_ops)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS myassets_asset_content_fts "
+        "ON myassets_asset USING gin (to_tsvector('simple'::regconfig, COALESCE(content_text, '')))"
+    )
+
+
+def _drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS myassets_asset_metadata_gin")
+    schema_editor.execute("DROP INDEX IF EXISTS myassets_asset_content_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0008_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='content_text',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='extracted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='asset',
+            name='metadata',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(_create_indexes, _drop_indexes),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0009_asset_extracted_content'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('algorithm', models.CharField(choices=[('phash', 'pHash (DCT)'), ('dhash', 'dHash (gradient)')], max_length=8)),
+                ('frame', models.PositiveIntegerField(default=0)),
+                ('value', models.BigIntegerField()),
+                ('h0', models.PositiveIntegerField()),
+                ('h1', models.PositiveIntegerField()),
+                ('h2', models.PositiveIntegerField()),
+                ('h3', models.PositiveIntegerField()),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hashes', to='myassets.asset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['algorithm', 'h0'], name='myassets_hash_h0_idx'), models.Index(fields=['algorithm', 'h1'], name='myassets_hash_h1_idx'), models.Index(fields=['algorithm', 'h2'], name='myassets_hash_h2_idx'), models.Index(fields=['algorithm', 'h3'], name='myassets_hash_h3_idx')],
+                'constraints': [models.UniqueConstraint(fields=('asset', 'algorithm', 'frame'), name='myassets_hash_unique_frame')],
+            },
+        ),
+    ]
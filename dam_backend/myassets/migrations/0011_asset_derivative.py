@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0010_asset_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssetDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('hls', 'HLS ladder'), ('preview_mp4', 'MP4 preview')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=12)),
+                ('source', models.CharField(blank=True, max_length=255)),
+                ('path', models.CharField(blank=True, max_length=255)),
+                ('files', models.JSONField(blank=True, default=list)),
+                ('info', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('asset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='derivatives', to='myassets.asset')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('asset', 'kind'), name='myassets_derivative_unique_kind')],
+            },
+        ),
+    ]
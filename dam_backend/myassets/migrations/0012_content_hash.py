@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0011_asset_derivative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='assetversion',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='assetderivative',
+            name='kind',
+            field=models.CharField(choices=[('hls', 'HLS ladder'), ('preview_mp4', 'MP4 preview'), ('preview_model', '3D web preview')], max_length=20),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0012_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assetversion',
+            name='cold_codec',
+            field=models.CharField(blank=True, max_length=8),
+        ),
+        migrations.AddField(
+            model_name='assetversion',
+            name='cold_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='assetversion',
+            name='storage_tier',
+            field=models.CharField(choices=[('hot', 'Primary storage'), ('cold', 'Cold storage')], db_index=True, default='hot', max_length=4),
+        ),
+        migrations.AddField(
+            model_name='assetversion',
+            name='tiered_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
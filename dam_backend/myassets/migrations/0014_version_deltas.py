@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0013_version_storage_tier'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assetversion',
+            name='delta_base',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='delta_children', to='myassets.assetversion'),
+        ),
+        migrations.AddField(
+            model_name='assetversion',
+            name='delta_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='assetversion',
+            name='delta_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='assetversion',
+            name='full_size',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0014_version_deltas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='mime_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='assetversion',
+            name='mime_type',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 14:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# 用户管理的前缀检索（SearchFilter "^username" / "^email" → istartswith）：
+# PostgreSQL 上生成 UPPER("auth_user"."username"::text) LIKE UPPER('abc%')，
+# 建同样表达式的 text_pattern_ops 索引才能走索引（auth_user 不归本应用管，只能在这里补；SQLite 替身跳过）
+def _create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS myassets_user_username_prefix "
+        "ON auth_user (UPPER(username::text) text_pattern_ops)"
+    )
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS myassets_user_email_prefix "
+        "ON auth_user (UPPER(email::text) text_pattern_ops)"
+    )
+
+
+def _drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS myassets_user_username_prefix")
+    schema_editor.execute("DROP INDEX IF EXISTS myassets_user_email_prefix")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0015_upload_mime_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userprofile',
+            index=models.Index(fields=['role', 'user'], name='myassets_profile_role_idx'),
+        ),
+        migrations.RunPython(_create_indexes, _drop_indexes),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-19 11:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0016_admin_user_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='asset',
+            name='size_bytes',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='assetversion',
+            name='size_bytes',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='StorageUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('user', 'User'), ('brand', 'Brand')], max_length=5)),
+                ('key', models.CharField(max_length=100)),
+                ('bytes', models.BigIntegerField(default=0)),
+                ('assets', models.IntegerField(default=0)),
+                ('quota_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'bytes'], name='myassets_usage_bytes_idx')],
+                'constraints': [models.UniqueConstraint(fields=('scope', 'key'), name='myassets_usage_unique_key')],
+            },
+        ),
+    ]
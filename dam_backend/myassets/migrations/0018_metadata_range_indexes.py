@@ -0,0 +1,35 @@
+from django.db import migrations
+
+
+# 元数据范围过滤（?meta__width__gte=1920）编译成 ("metadata" -> 'width') >= '1920'::jsonb，
+# 0009 的 GIN（jsonb_path_ops）只支持 @>，用不上：给 extraction.RANGE_KEYS 里的字段各建一个 btree 表达式索引。
+# 只在 PostgreSQL 上建（SQLite 替身跳过）；键列表照抄当时的 RANGE_KEYS，之后新增的键另开迁移
+RANGE_KEYS = ("width", "height", "duration", "fps", "page_count", "word_count", "slide_count",
+              "vertex_count", "polygon_count")
+
+
+def _create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for key in RANGE_KEYS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS myassets_asset_meta_{key} ON myassets_asset ((metadata -> '{key}'))"
+        )
+
+
+def _drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for key in RANGE_KEYS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS myassets_asset_meta_{key}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myassets', '0017_storage_usage'),
+    ]
+
+    operations = [
+        migrations.RunPython(_create_indexes, _drop_indexes),
+    ]
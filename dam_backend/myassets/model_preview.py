@@ -0,0 +1,135 @@
+# myassets/model_preview.py —— 3D 模型网页预览变体（后台任务 assets.model_preview）
+"""
+- 原文件（GLB / GLTF，OBJ 先转成 GLB）交给 settings.MODEL_PREVIEW_COMMAND 处理：
+  默认 gltf-transform optimize —— 网格简化、贴图缩到 1024、WebP 贴图、顶点量化（KHR_mesh_quantization）
+- 结果 preview.glb 放在版本文件旁边，记在 AssetDerivative(kind="preview_model")，
+  info 里有原始 / 预览的网格统计与字节数
+- 以内容哈希为准：文件名变了但内容没变（例如恢复到旧版本）不重新生成
+- 工具不存在 / 格式不支持时标记 failed，前端继续加载原文件
+"""
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+
+from . import derivatives, events
+from .extraction import gltf_stats, obj_stats, read_gltf_json
+from .fileutils import local_path, sha256_file
+from .jobs import enqueue
+from .models import Asset, AssetDerivative
+
+KIND = "preview_model"
+PREVIEW_NAME = "preview.glb"
+SUPPORTED_EXTENSIONS = {".glb", ".gltf", ".obj"}
+
+
+class PreviewUnavailable(Exception):
+    pass
+
+
+def _run_tool(template, input_path, output_path):
+    args = [a.format(input=input_path, output=output_path) for a in shlex.split(template)]
+    if not args or not shutil.which(args[0]):
+        raise PreviewUnavailable(f"command not found: {args[0] if args else template!r}")
+    subprocess.run(args, capture_output=True, check=True,
+                   timeout=int(getattr(settings, "MODEL_PREVIEW_TIMEOUT_SECONDS", 600)))
+
+
+def _stats(path, ext):
+    if ext == ".obj":
+        return obj_stats(path)
+    return gltf_stats(read_gltf_json(path, ext))
+
+
+def build_preview(src, ext, workdir):
+    """生成 preview.glb；返回 (本地路径, 原始统计, 预览统计)"""
+    original = _stats(src, ext)
+    source = src
+    if ext == ".obj":
+        source = os.path.join(workdir, "converted.glb")
+        _run_tool(getattr(settings, "MODEL_OBJ_CONVERT_COMMAND", "obj2gltf -i {input} -o {output} --binary"),
+                  src, source)
+    out_dir = os.path.join(workdir, "out")
+    os.makedirs(out_dir)
+    out = os.path.join(out_dir, PREVIEW_NAME)
+    _run_tool(settings.MODEL_PREVIEW_COMMAND, source, out)
+    return out, original, _stats(out, ".glb")
+
+
+def enqueue_for_asset(asset_id):
+    return enqueue("assets.model_preview", {"asset_id": asset_id}, priority=-5, dedupe_key=f"{KIND}:{asset_id}")
+
+
+def run_for_asset(asset_id, force=False, max_rounds=3):
+    for _ in range(max_rounds):
+        asset = (Asset.objects.filter(pk=asset_id)
+                 .only("id", "asset_type", "file", "metadata", "content_hash").first())
+        if asset is None or asset.asset_type != "3d_model" or not asset.file:
+            return None
+        current = AssetDerivative.objects.filter(asset_id=asset_id, kind=KIND).first()
+
+        # 抽取任务已经算过当前文件的哈希时，不用下载就能判断要不要重建
+        known = asset.content_hash if (asset.metadata or {}).get("source") == asset.file.name else ""
+        if not force and known and _reuse(asset, current, known):
+            return current
+        if not _build(asset, current, force):
+            return None
+        if Asset.objects.filter(pk=asset_id, file=asset.file.name).exists():
+            return AssetDerivative.objects.filter(asset_id=asset_id, kind=KIND).first()
+        force = False  # 生成期间又换了文件：按新文件再来一轮
+    return None
+
+
+def _reuse(asset, current, digest):
+    """内容没变：沿用已有预览（只更新它对应的文件名）"""
+    if current is None or current.status != "ready" or current.info.get("content_hash") != digest:
+        return False
+    if current.source != asset.file.name:
+        AssetDerivative.objects.filter(pk=current.pk).update(source=asset.file.name)
+        current.source = asset.file.name
+    return True
+
+
+def _build(asset, current, force):
+    asset_id, source = asset.pk, asset.file.name
+    ext = os.path.splitext(source)[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        derivatives.mark(asset_id, KIND, status="failed", source=source, error=f"unsupported format {ext or '?'}")
+        return False
+
+    try:
+        with local_path(asset.file) as src, tempfile.TemporaryDirectory(prefix="dam-3d-") as work:
+            digest = sha256_file(src)
+            if not force and _reuse(asset, current, digest):
+                return True
+            derivatives.mark(asset_id, KIND, status="processing", error="")
+            out, original, preview = build_preview(src, ext, work)
+            info = {
+                "content_hash": digest,
+                "original": original,
+                "preview": preview,
+                "bytes_original": os.path.getsize(src),
+                "bytes_preview": os.path.getsize(out),
+            }
+            prefix = derivatives.output_prefix(asset)
+            files = derivatives.upload_dir(os.path.dirname(out), prefix)
+    except Exception as e:
+        if isinstance(e, subprocess.CalledProcessError) and e.stderr:
+            detail = e.stderr.decode("utf-8", "ignore")[-2000:]
+        else:
+            detail = str(e)
+        derivatives.mark(asset_id, KIND, status="failed", source=source, error=detail)
+        if isinstance(e, PreviewUnavailable):
+            return False  # 没装工具：重试也没用
+        raise
+
+    with transaction.atomic():
+        stale = derivatives.replace(asset_id, KIND, current, files, status="ready", source=source,
+                                    path=f"{prefix}/{PREVIEW_NAME}", info=info, error="")
+        events.publish_asset("asset.updated", asset, with_tags=False, preview_model=True)
+    derivatives.delete_files(stale)
+    return True
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class UserProfile(models.Model):
     USER_ROLES = [
@@ -11,6 +12,12 @@ class UserProfile(models.Model):
     role = models.CharField(max_length=10, choices=USER_ROLES, default='viewer')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # 用户管理按角色筛选：role 定位后按 user_id 顺序连接 / 翻页
+            models.Index(fields=['role', 'user'], name='myassets_profile_role_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.role}"
 
@@ -40,6 +47,13 @@ class Asset(models.Model):
     tags = models.ManyToManyField(Tag, blank=True)
     view_count = models.IntegerField(default=0)
     download_count = models.IntegerField(default=0)
+    # 后台抽取（extraction.py）：技术元数据 + 文件正文，供过滤/全文检索，不用再读文件
+    metadata = models.JSONField(default=dict, blank=True)
+    content_text = models.TextField(blank=True)
+    extracted_at = models.DateTimeField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)  # 当前文件 sha256
+    mime_type = models.CharField(max_length=100, blank=True)  # 上传时按文件头识别（uploads.py）
+    size_bytes = models.BigIntegerField(null=True, blank=True)  # 当前文件大小：上传时记下；空 = 旧数据未补（recompute_usage）
 
     class Meta:
         ordering = ['-upload_date']
@@ -59,6 +73,24 @@ class AssetVersion(models.Model):
     note = models.CharField(max_length=255, blank=True, null=True)
     uploaded_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
     created_at = models.DateTimeField(auto_now_add=True)
+    content_hash = models.CharField(max_length=64, blank=True)  # sha256：上传时算好，旧数据由后台任务补写
+    mime_type = models.CharField(max_length=100, blank=True)
+    size_bytes = models.BigIntegerField(null=True, blank=True)  # 原文件大小（转冷 / 差量之前的逻辑大小）
+    # 存储分层（tiering.py）：cold 时主存储里没有这个文件，读取前先回温（rehydrate）
+    TIERS = [
+        ('hot', 'Primary storage'),
+        ('cold', 'Cold storage'),
+    ]
+    storage_tier = models.CharField(max_length=4, choices=TIERS, default='hot', db_index=True)
+    cold_name = models.CharField(max_length=255, blank=True)  # 冷存储对象名；回温后保留，再转冷不必重新压缩
+    cold_codec = models.CharField(max_length=8, blank=True)   # zstd / gzip / 空 = 原样
+    tiered_at = models.DateTimeField(null=True, blank=True)
+    # 差量存储（deltas.py）：delta_name 不为空时，主存储里只有相对关键帧 delta_base 的差量文件
+    delta_base = models.ForeignKey('self', null=True, blank=True, on_delete=models.PROTECT,
+                                   related_name='delta_children')
+    delta_name = models.CharField(max_length=255, blank=True)
+    delta_size = models.BigIntegerField(null=True, blank=True)
+    full_size = models.BigIntegerField(null=True, blank=True)
 
     class Meta:
         unique_together = ("asset", "version")
@@ -66,3 +98,187 @@ class AssetVersion(models.Model):
 
     def __str__(self):
         return f"{self.asset_id} v{self.version}"
+
+
+# 请求剖析记录（见 profiling.RequestProfilingMiddleware，默认关闭）
+class RequestProfile(models.Model):
+    TRIGGERS = [
+        ('sample', 'Sampled'),
+        ('slow', 'Slow request'),
+    ]
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    status_code = models.PositiveSmallIntegerField(default=0)
+    duration_ms = models.FloatField(db_index=True)
+    trigger = models.CharField(max_length=10, choices=TRIGGERS)
+    user_id = models.IntegerField(null=True, blank=True)
+    query_count = models.PositiveIntegerField(default=0)
+    sql_time_ms = models.FloatField(default=0)
+    folded_stacks = models.TextField(blank=True)   # flamegraph.pl / speedscope 的 collapsed 格式
+    stats = models.TextField(blank=True)           # cProfile 文本报告（仅抽样触发时有）
+    sql = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} {self.duration_ms:.0f}ms"
+
+
+# 变更日志（增量同步用）：id 单调递增即游标；asset_id 不做外键，删除后墓碑仍在
+class AssetChange(models.Model):
+    KINDS = [
+        ('create', 'Asset created'),
+        ('update', 'Asset updated'),
+        ('delete', 'Asset deleted'),
+        ('tags', 'Asset tags changed'),
+        ('version', 'Version added'),
+        ('tag', 'Tag created/updated'),
+        ('tag_delete', 'Tag deleted'),
+        ('horizon', 'Retention horizon'),
+    ]
+    kind = models.CharField(max_length=12, choices=KINDS)
+    asset_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    tag_id = models.BigIntegerField(null=True, blank=True)
+    version = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"#{self.pk} {self.kind} asset={self.asset_id} tag={self.tag_id}"
+
+
+# 后台任务队列（PostgreSQL：SELECT ... FOR UPDATE SKIP LOCKED；见 jobs.py / manage.py run_worker）
+class Job(models.Model):
+    STATUSES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    name = models.CharField(max_length=100, db_index=True)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)   # 越大越先执行
+    status = models.CharField(max_length=10, choices=STATUSES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    dedupe_key = models.CharField(max_length=200, null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-priority', 'run_at', 'id']
+        indexes = [
+            # 只索引排队中的任务，认领查询只扫这一小部分
+            models.Index(fields=['-priority', 'run_at', 'id'], condition=models.Q(status='queued'),
+                         name='myassets_job_claim_idx'),
+            models.Index(fields=['status', 'finished_at'], name='myassets_job_status_idx'),
+        ]
+        constraints = [
+            # 去重：同一个 dedupe_key 同时只能有一个排队/执行中的任务
+            models.UniqueConstraint(fields=['dedupe_key'], condition=models.Q(status__in=['queued', 'running']),
+                                    name='myassets_job_dedupe_active'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.name} ({self.status})"
+
+
+# 感知哈希（相似图 / 近重复检测，见 similarity.py）：
+# 64 位哈希拆成 4 段 16 位分别建索引（multi-index hashing），汉明距离 ≤ r 的候选
+# 至少有一段距离 ≤ r//4，只需查少量桶再精确校验
+class AssetHash(models.Model):
+    ALGORITHMS = [
+        ('phash', 'pHash (DCT)'),
+        ('dhash', 'dHash (gradient)'),
+    ]
+    asset = models.ForeignKey(Asset, related_name='hashes', on_delete=models.CASCADE)
+    algorithm = models.CharField(max_length=8, choices=ALGORITHMS)
+    frame = models.PositiveIntegerField(default=0)   # 图片为 0；视频为关键帧序号
+    value = models.BigIntegerField()                 # 有符号存储的 64 位哈希
+    h0 = models.PositiveIntegerField()
+    h1 = models.PositiveIntegerField()
+    h2 = models.PositiveIntegerField()
+    h3 = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['algorithm', 'h0'], name='myassets_hash_h0_idx'),
+            models.Index(fields=['algorithm', 'h1'], name='myassets_hash_h1_idx'),
+            models.Index(fields=['algorithm', 'h2'], name='myassets_hash_h2_idx'),
+            models.Index(fields=['algorithm', 'h3'], name='myassets_hash_h3_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['asset', 'algorithm', 'frame'], name='myassets_hash_unique_frame'),
+        ]
+
+    def __str__(self):
+        return f"{self.asset_id} {self.algorithm}[{self.frame}] {self.value & 0xFFFFFFFFFFFFFFFF:016x}"
+
+
+# 派生文件（转码结果等，见 transcoding.py）：与生成它的源文件绑定，源文件变了即视为过期
+class AssetDerivative(models.Model):
+    KINDS = [
+        ('hls', 'HLS ladder'),
+        ('preview_mp4', 'MP4 preview'),
+        ('preview_model', '3D web preview'),
+    ]
+    STATUSES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    asset = models.ForeignKey(Asset, related_name='derivatives', on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KINDS)
+    status = models.CharField(max_length=12, choices=STATUSES, default='pending')
+    source = models.CharField(max_length=255, blank=True)   # 生成时的 asset.file.name
+    path = models.CharField(max_length=255, blank=True)     # 入口文件（master.m3u8 / preview.mp4）
+    files = models.JSONField(default=list, blank=True)      # 全部输出文件，替换/清理用
+    info = models.JSONField(default=dict, blank=True)       # 档位、时长等
+    error = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['asset', 'kind'], name='myassets_derivative_unique_kind'),
+        ]
+
+    def __str__(self):
+        return f"{self.asset_id} {self.kind} ({self.status})"
+
+    def is_current(self, asset):
+        return self.status == 'ready' and self.source == asset.file.name
+
+
+# 存储用量汇总（quotas.py）：按资产所有者 / 品牌累计，资产、版本入库和删除时同一事务里增减
+class StorageUsage(models.Model):
+    SCOPES = [
+        ('user', 'User'),
+        ('brand', 'Brand'),
+    ]
+    scope = models.CharField(max_length=5, choices=SCOPES)
+    key = models.CharField(max_length=100)   # user：用户 id；brand：品牌名（空串 = 未填品牌）
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    bytes = models.BigIntegerField(default=0)
+    assets = models.IntegerField(default=0)
+    quota_bytes = models.BigIntegerField(null=True, blank=True)  # 单独设的配额；空 = 用 settings.STORAGE_QUOTAS
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='myassets_usage_unique_key'),
+        ]
+        indexes = [
+            models.Index(fields=['scope', 'bytes'], name='myassets_usage_bytes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope}:{self.key} {self.bytes}"
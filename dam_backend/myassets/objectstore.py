@@ -0,0 +1,311 @@
+# myassets/objectstore.py —— S3 兼容对象存储后端（STORAGE_BACKEND=s3 时 Asset / AssetVersion 文件存这里）
+"""
+- 写：文件超过 multipart_threshold 时用 s3transfer 分片并行上传（max_concurrency 个线程）；
+  uploads.py 的上传处理器已经把文件落在暂存目录，直接按路径分段读，不经过内存
+- 读：S3ReadFile 打开时只发一次 HEAD（拿大小 / ETag，不存在时抛 FileNotFoundError）；
+  read 时从当前位置发 Range GET 边收边给，seek 后下一次 read 从新位置重新发；
+  同时带 If-Match，读到一半对象被覆盖会报错，不会拼出两个版本混在一起的文件
+- url()：预签名 GET（有效期 url_expires）；redirect_downloads 打开时下载接口直接 302 过去
+- 客户端直传：presign_upload() 给出单个 PUT 地址，或分片上传的每片地址；complete_upload() 合并
+- 进程内按连接参数共用一个 client（boto3 client 线程安全），连接池大小 max_pool_connections
+- 本地替身：manage.py s3_standin（s3_standin.py），不联网也能跑通以上全部流程
+"""
+import io
+import math
+import mimetypes
+import posixpath
+import threading
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+from django.utils.functional import cached_property
+
+from .fileutils import CHUNK_SIZE
+
+try:  # 可选：只有 STORAGE_BACKEND=s3 时需要
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+    from botocore.exceptions import ClientError
+except ImportError:  # pragma: no cover
+    boto3 = None
+
+MB = 1024 * 1024
+MIN_PART_SIZE = 5 * MB  # S3 规定除最后一片外每片至少 5MB
+MAX_PARTS = 10000
+NOT_FOUND = {"404", "NoSuchKey", "NotFound"}
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def _missing(error):
+    return error.response.get("Error", {}).get("Code") in NOT_FOUND
+
+
+@deconstructible
+class S3Storage(Storage):
+    def __init__(self, bucket=None, endpoint_url=None, region=None, access_key=None, secret_key=None,
+                 location="", addressing_style="path", multipart_threshold=64 * MB, multipart_chunksize=16 * MB,
+                 max_concurrency=8, max_pool_connections=32, url_expires=3600, redirect_downloads=False,
+                 connect_timeout=5, read_timeout=60):
+        if boto3 is None:
+            raise ImproperlyConfigured("S3Storage needs boto3 (pip install boto3)")
+        if not bucket:
+            raise ImproperlyConfigured("S3Storage needs a bucket (S3_BUCKET)")
+        self.bucket = bucket
+        self.endpoint_url = endpoint_url or None
+        self.region = region or None
+        self.access_key = access_key or None
+        self.secret_key = secret_key or None
+        self.location = (location or "").strip("/")
+        self.addressing_style = addressing_style
+        self.multipart_threshold = max(MIN_PART_SIZE, int(multipart_threshold))
+        self.multipart_chunksize = max(MIN_PART_SIZE, int(multipart_chunksize))
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_pool_connections = max(self.max_concurrency, int(max_pool_connections))
+        self.url_expires = int(url_expires)
+        self.redirect_downloads = bool(redirect_downloads)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    # ---------- 连接 ----------
+    @cached_property
+    def client(self):
+        ident = (self.endpoint_url, self.region, self.access_key, self.addressing_style, self.max_pool_connections)
+        with _clients_lock:
+            client = _clients.get(ident)
+            if client is None:
+                options = {
+                    "max_pool_connections": self.max_pool_connections,
+                    "connect_timeout": self.connect_timeout,
+                    "read_timeout": self.read_timeout,
+                    "retries": {"max_attempts": 5, "mode": "standard"},
+                    "s3": {"addressing_style": self.addressing_style},
+                    "signature_version": "s3v4",
+                }
+                try:
+                    # 新版 botocore 默认给每次上传加 CRC 校验尾，不少 S3 兼容实现不认：只在必须时才加
+                    config = Config(**options, request_checksum_calculation="when_required",
+                                    response_checksum_validation="when_required")
+                except TypeError:  # 旧版 botocore 没有这两个选项
+                    config = Config(**options)
+                client = _clients[ident] = boto3.session.Session().client(
+                    "s3", endpoint_url=self.endpoint_url, region_name=self.region,
+                    aws_access_key_id=self.access_key, aws_secret_access_key=self.secret_key, config=config,
+                )
+            return client
+
+    @cached_property
+    def transfer_config(self):
+        return TransferConfig(multipart_threshold=self.multipart_threshold,
+                              multipart_chunksize=self.multipart_chunksize,
+                              max_concurrency=self.max_concurrency, use_threads=True)
+
+    def _key(self, name):
+        name = (name or "").replace("\\", "/")
+        key = posixpath.normpath(posixpath.join(self.location, name)) if name else self.location
+        if key in (".", "") and not self.location:
+            return ""
+        if key.startswith("../") or key == ".." or (self.location and not (key + "/").startswith(self.location + "/")):
+            raise SuspiciousFileOperation(f"{name!r} is outside the storage location")
+        return key.lstrip("/")
+
+    def _head(self, name):
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+        except ClientError as e:
+            if _missing(e):
+                raise FileNotFoundError(name) from e
+            raise
+
+    # ---------- Storage 接口 ----------
+    def _save(self, name, content):
+        key = self._key(name)
+        extra = {"ContentType": getattr(content, "content_type", None)
+                 or mimetypes.guess_type(name)[0] or "application/octet-stream"}
+        temp_path = getattr(content, "temporary_file_path", None)
+        if temp_path is not None:
+            # 上传处理器落盘的临时文件：s3transfer 按文件偏移分片并行读，比单一文件对象快
+            self.client.upload_file(temp_path(), self.bucket, key, ExtraArgs=extra, Config=self.transfer_config)
+        else:
+            if hasattr(content, "seek") and getattr(content, "seekable", lambda: True)():
+                content.seek(0)
+            self.client.upload_fileobj(content, self.bucket, key, ExtraArgs=extra, Config=self.transfer_config)
+        return name
+
+    def _open(self, name, mode="rb"):
+        if any(flag in mode for flag in "wa+"):
+            raise ValueError("S3Storage files are read-only; use storage.save() to write")
+        return S3ReadFile(self, name)
+
+    def exists(self, name):
+        try:
+            self._head(name)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete(self, name):
+        if name:
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+
+    def size(self, name):
+        return self._head(name)["ContentLength"]
+
+    def get_modified_time(self, name):
+        modified = self._head(name)["LastModified"]
+        return modified if settings.USE_TZ else timezone.make_naive(modified)
+
+    def listdir(self, path):
+        prefix = self._key(path)
+        prefix = prefix + "/" if prefix else ""
+        dirs, files = [], []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix, Delimiter="/"):
+            dirs.extend(p["Prefix"][len(prefix):].rstrip("/") for p in page.get("CommonPrefixes", ()))
+            files.extend(o["Key"][len(prefix):] for o in page.get("Contents", ()))
+        return dirs, files
+
+    def url(self, name, filename=None, expire=None):
+        params = {"Bucket": self.bucket, "Key": self._key(name)}
+        if filename:
+            params["ResponseContentDisposition"] = f"attachment; filename*=UTF-8''{quote(filename)}"
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expire or self.url_expires)
+
+    # ---------- 客户端直传 ----------
+    def presign_upload(self, name, size, content_type=None, expire=None):
+        """
+        小文件：{"method": "PUT", "url", "headers"}；
+        大文件：{"upload_id", "part_size", "parts": [{"part_number", "url"}]}，客户端每片 PUT 后记下 ETag
+        """
+        key, expire = self._key(name), expire or self.url_expires
+        content_type = content_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        if size <= self.multipart_threshold:
+            url = self.client.generate_presigned_url(
+                "put_object", Params={"Bucket": self.bucket, "Key": key, "ContentType": content_type},
+                ExpiresIn=expire)
+            return {"method": "PUT", "url": url, "headers": {"Content-Type": content_type}}
+        part_size = max(self.multipart_chunksize, math.ceil(size / MAX_PARTS))
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket, Key=key, ContentType=content_type)["UploadId"]
+        parts = [
+            {"part_number": n, "url": self.client.generate_presigned_url(
+                "upload_part", Params={"Bucket": self.bucket, "Key": key, "UploadId": upload_id, "PartNumber": n},
+                ExpiresIn=expire)}
+            for n in range(1, math.ceil(size / part_size) + 1)
+        ]
+        return {"upload_id": upload_id, "part_size": part_size, "parts": parts}
+
+    def complete_upload(self, name, upload_id, parts):
+        """parts: [{"part_number", "etag"}]"""
+        ordered = sorted(({"PartNumber": int(p["part_number"]), "ETag": str(p["etag"])} for p in parts),
+                         key=lambda p: p["PartNumber"])
+        self.client.complete_multipart_upload(Bucket=self.bucket, Key=self._key(name), UploadId=upload_id,
+                                              MultipartUpload={"Parts": ordered})
+
+    def abort_upload(self, name, upload_id):
+        try:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=self._key(name), UploadId=upload_id)
+        except ClientError as e:
+            if not _missing(e) and e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+                raise
+
+    def read_head(self, name, length):
+        """对象开头 length 个字节（识别文件类型用）"""
+        try:
+            resp = self.client.get_object(Bucket=self.bucket, Key=self._key(name), Range=f"bytes=0-{length - 1}")
+        except ClientError as e:
+            if _missing(e):
+                raise FileNotFoundError(name) from e
+            if e.response.get("Error", {}).get("Code") == "InvalidRange":  # 空对象
+                return b""
+            raise
+        with resp["Body"] as body:
+            return body.read()
+
+    def ensure_bucket(self):
+        try:
+            self.client.head_bucket(Bucket=self.bucket)
+        except ClientError as e:
+            if not _missing(e) and e.response.get("Error", {}).get("Code") != "NoSuchBucket":
+                raise
+            self.client.create_bucket(Bucket=self.bucket)
+
+
+# ---------------- 按需分段读取 ----------------
+class _RangeReader(io.RawIOBase):
+    def __init__(self, client, bucket, key, size, etag):
+        self.client, self.bucket, self.key = client, bucket, key
+        self.size, self.etag = size, etag
+        self._pos = 0
+        self._body = None  # 从 _pos 开始的一段 GET 响应
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.size + offset
+        else:
+            raise ValueError(f"invalid whence {whence}")
+        if pos < 0:
+            raise ValueError("negative seek position")
+        if pos != self._pos:
+            self._drop_body()
+            self._pos = pos
+        return self._pos
+
+    def _drop_body(self):
+        if self._body is not None:
+            self._body.close()
+            self._body = None
+
+    def readinto(self, buffer):
+        if self._pos >= self.size or not len(buffer):
+            return 0
+        for attempt in (1, 2):
+            if self._body is None:
+                params = {"Bucket": self.bucket, "Key": self.key, "Range": f"bytes={self._pos}-"}
+                if self.etag:
+                    params["IfMatch"] = self.etag
+                self._body = self.client.get_object(**params)["Body"]
+            data = self._body.read(len(buffer))
+            if data:
+                break
+            self._drop_body()  # 连接提前断了：从当前位置重新发一次
+        else:
+            raise OSError(f"unexpected end of s3://{self.bucket}/{self.key} at byte {self._pos}")
+        n = len(data)
+        buffer[:n] = data
+        self._pos += n
+        return n
+
+    def close(self):
+        self._drop_body()
+        super().close()
+
+
+class S3ReadFile(File):
+    def __init__(self, storage, name):
+        head = storage._head(name)
+        raw = _RangeReader(storage.client, storage.bucket, storage._key(name), head["ContentLength"], head.get("ETag"))
+        super().__init__(io.BufferedReader(raw, CHUNK_SIZE), name)
+        self.size = raw.size
+        self.mode = "rb"
+        self.content_type = head.get("ContentType")
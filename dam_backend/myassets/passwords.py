@@ -0,0 +1,152 @@
+# myassets/passwords.py —— 登录时的密码校验：放进有界线程池算哈希 + 登录时顺便升级哈希参数
+"""
+- PooledModelBackend 替代 ModelBackend（/api/login/、/api/token/、admin 登录都经过 authenticate()）：
+  PBKDF2 / Argon2 / bcrypt 计算时都会释放 GIL，所以用线程池就能并行跑满多核；
+  池大小 LOGIN_HASH_WORKERS，排队上限 LOGIN_HASH_QUEUE，再多直接 503 + Retry-After，
+  上班高峰的一波登录不会把所有 CPU 和工作线程都占住
+- 异步入口 aauthenticate()：在事件循环里 await 池里的结果，不占事件循环
+- 池里的线程只做纯计算、不碰数据库；哈希需要升级（算法换了 / 迭代次数变了）时，
+  新哈希也在池里算好，回到请求线程里只写一次 password 字段
+- TunedPBKDF2PasswordHasher：迭代次数取 settings.PBKDF2_ITERATIONS（不低于 Django 默认值）；
+  调高配置后，用户下次登录时自动按新参数重新哈希（同名算法，旧哈希照样能校验）；只升不降
+- 池满（Overloaded）/ 等哈希超时：DRF 入口抛 503 + Retry-After；admin 登录表单等其他入口按登录失败处理，不出 500
+"""
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password, verify_password
+from rest_framework.request import Request
+
+from .throttling import Overloaded
+
+logger = logging.getLogger(__name__)
+UserModel = get_user_model()
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """算法名不变（pbkdf2_sha256），只是迭代次数可配；低于 Django 默认值的配置按默认值算"""
+
+    @property
+    def iterations(self):
+        configured = int(getattr(settings, "PBKDF2_ITERATIONS", None) or 0)
+        return max(configured, PBKDF2PasswordHasher.iterations)
+
+    def must_update(self, encoded):
+        # 父类用 !=：配置调低后会把所有人的哈希“升级”成更弱的参数
+        return self.decode(encoded)["iterations"] < self.iterations
+
+
+# ---------------- 哈希线程池 ----------------
+_pool = None
+_slots = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool, _slots
+    with _pool_lock:
+        if _pool is None:
+            workers = max(1, int(getattr(settings, "LOGIN_HASH_WORKERS", 4)))
+            queue = max(0, int(getattr(settings, "LOGIN_HASH_QUEUE", 64)))
+            _pool = ThreadPoolExecutor(workers, thread_name_prefix="password-hash")
+            _slots = threading.BoundedSemaphore(workers + queue)
+        return _pool, _slots
+
+
+def _submit(fn, *args):
+    pool, slots = _executor()
+    if not slots.acquire(blocking=False):
+        raise Overloaded(wait=int(getattr(settings, "LOGIN_HASH_RETRY_AFTER", 2)),
+                         detail="Too many logins in progress, please retry shortly.")
+    future = pool.submit(fn, *args)
+    future.add_done_callback(lambda _f: slots.release())
+    return future
+
+
+def _verify(password, encoded):
+    """(是否正确, 需要升级时的新哈希 / None)"""
+    ok, must_update = verify_password(password, encoded)
+    return ok, (make_password(password) if ok and must_update else None)
+
+
+def _burn(password):
+    # 用户不存在时也算一次哈希，避免靠响应时间判断用户名是否存在
+    make_password(password)
+    return False, None
+
+
+def _timeout():
+    return float(getattr(settings, "LOGIN_HASH_TIMEOUT_SECONDS", 30))
+
+
+def _busy(request, error):
+    """池满 / 超时：DRF 视图里抛 Overloaded（503）；其他调用方拿到“校验失败”"""
+    if isinstance(request, Request):
+        if isinstance(error, Overloaded):
+            raise error
+        raise Overloaded(wait=int(getattr(settings, "LOGIN_HASH_RETRY_AFTER", 2)),
+                         detail="Login is taking too long, please retry shortly.")
+    logger.warning("password check skipped for a non-API login: %s", error or "timed out")
+    return False, None
+
+
+class PooledModelBackend(ModelBackend):
+    def _lookup(self, username, kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        return username
+
+    def _finish(self, user, ok, upgraded):
+        if not ok:
+            return None
+        if upgraded:
+            user.password = upgraded
+            user.save(update_fields=["password"])
+        return user if self.user_can_authenticate(user) else None
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        username = self._lookup(username, kwargs)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            self._run(request, _burn, password)
+            return None
+        ok, upgraded = self._run(request, _verify, password, user.password)
+        return self._finish(user, ok, upgraded)
+
+    def _run(self, request, fn, *args):
+        try:
+            return _submit(fn, *args).result(timeout=_timeout())
+        except (Overloaded, FutureTimeout) as e:
+            return _busy(request, e)
+
+    async def _arun(self, request, fn, *args):
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(_submit(fn, *args)), _timeout())
+        except (Overloaded, asyncio.TimeoutError) as e:
+            return _busy(request, e)
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        username = self._lookup(username, kwargs)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            await self._arun(request, _burn, password)
+            return None
+        ok, upgraded = await self._arun(request, _verify, password, user.password)
+        if not ok:
+            return None
+        if upgraded:
+            user.password = upgraded
+            await user.asave(update_fields=["password"])
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,257 @@
+# myassets/profiling.py —— 可选的请求剖析钩子（默认关闭）
+"""
+按需捕获“慢请求”的火焰图数据 + SQL，便于排查偶发的 4 秒列表请求。
+
+两种触发方式（可同时开启）：
+- 抽样：按 PROFILING_SAMPLE_RATE 的概率，用 cProfile 完整剖析该请求
+- 慢请求：请求开始时把当前线程和开始时间登记给后台采样线程（一次字典写入）；
+  采样线程只看已经跑了 SAMPLE_AFTER × SLOW_MS 的请求（sys._current_frames），SQL 详情也从这时起才记，
+  之前只计数。结束时若耗时 >= PROFILING_SLOW_MS 才写库，否则直接丢弃。
+  代价：大部分很快结束的请求不会被采样；慢请求的火焰图从越过门槛那一刻开始
+
+未开启时中间件抛 MiddlewareNotUsed，请求路径上完全没有额外开销。
+栈数据以 "collapsed/folded" 格式保存（flamegraph.pl / speedscope 可直接导入）。
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _fold(frame, max_depth: int = 128) -> str:
+    """把一个线程当前的调用栈折叠成 root;...;leaf"""
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return ";".join(labels)
+
+
+class _StackSampler:
+    """
+    进程内唯一的后台采样线程：只采样“已登记”且已经跑了 delay 秒的请求线程。
+    没有在途请求时阻塞在 Event 上；在途请求都还年轻时睡到最早的那个到点，都不占 CPU。
+    """
+
+    def __init__(self, interval: float, delay: float):
+        self.interval = interval
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._active = {}  # thread ident -> (开始时间, Counter(folded stack -> samples))
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self, ident: int):
+        with self._lock:
+            self._active[ident] = (time.monotonic(), Counter())
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="dam-stack-sampler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def stop(self, ident: int) -> Counter:
+        with self._lock:
+            entry = self._active.pop(ident, None)
+        return entry[1] if entry else Counter()
+
+    def _run(self):
+        me = threading.get_ident()
+        while True:
+            cutoff = time.monotonic() - self.delay
+            with self._lock:
+                starts = {i: t for i, (t, _) in self._active.items() if i != me}
+            if not starts:
+                self._wakeup.clear()
+                # 带超时，避免 start()/clear() 竞争时丢失唤醒
+                self._wakeup.wait(timeout=1.0)
+                continue
+            idents = [i for i, t in starts.items() if t <= cutoff]
+            if not idents:
+                time.sleep(min(min(starts.values()) - cutoff, 1.0))
+                continue
+
+            frames = sys._current_frames()
+            folded = {i: _fold(frames[i]) for i in idents if i in frames}
+            del frames
+            with self._lock:
+                for ident, stack in folded.items():
+                    entry = self._active.get(ident)
+                    if entry is not None:
+                        entry[1][stack] += 1
+            time.sleep(self.interval)
+
+
+class _QueryCollector:
+    """
+    connection.execute_wrapper：记录 SQL 与耗时（不依赖 DEBUG=True 的 connection.queries）。
+    detail_after 之前只计数（慢请求模式：还不知道这个请求会不会慢，不值得留 SQL 文本）
+    """
+
+    def __init__(self, alias: str, limit: int, detail_after: float = 0.0):
+        self.alias = alias
+        self.limit = limit
+        self.detail_after = detail_after
+        self.queries = []
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            if len(self.queries) < self.limit and time.perf_counter() >= self.detail_after:
+                self.queries.append({
+                    "db": self.alias,
+                    "sql": sql,
+                    "time_ms": round((time.perf_counter() - start) * 1000, 3),
+                })
+
+
+class RequestProfilingMiddleware:
+    """
+    settings.REQUEST_PROFILING = {
+        "ENABLED": False,
+        "SAMPLE_RATE": 0.0,      # 0~1：按比例用 cProfile 剖析
+        "SLOW_MS": 1000,         # >0：超过该耗时的请求保存栈采样；0 关闭
+        "INTERVAL_MS": 5,        # 栈采样间隔
+        "SAMPLE_AFTER": 0.5,     # 请求跑过 SLOW_MS 的这个比例后才开始采样 / 记 SQL 详情
+        "MAX_QUERIES": 500,      # 每个请求最多保存多少条 SQL
+        "SKIP_PREFIXES": ["/static/", "/media/"],
+    }
+    """
+
+    _sampler = None
+
+    def __init__(self, get_response):
+        conf = getattr(settings, "REQUEST_PROFILING", {}) or {}
+        if not conf.get("ENABLED"):
+            raise MiddlewareNotUsed("request profiling disabled")
+
+        self.get_response = get_response
+        self.sample_rate = float(conf.get("SAMPLE_RATE") or 0.0)
+        self.slow_ms = float(conf.get("SLOW_MS") or 0)
+        self.max_queries = int(conf.get("MAX_QUERIES") or 500)
+        self.skip_prefixes = tuple(conf.get("SKIP_PREFIXES") or ())
+
+        if self.sample_rate <= 0 and self.slow_ms <= 0:
+            raise MiddlewareNotUsed("request profiling has no trigger configured")
+
+        self.sample_after = self.slow_ms * min(max(float(conf.get("SAMPLE_AFTER", 0.5)), 0.0), 1.0) / 1000.0
+        if self.slow_ms > 0 and RequestProfilingMiddleware._sampler is None:
+            interval = max(float(conf.get("INTERVAL_MS") or 5), 1.0) / 1000.0
+            RequestProfilingMiddleware._sampler = _StackSampler(interval, self.sample_after)
+
+    def __call__(self, request):
+        if self.skip_prefixes and request.path.startswith(self.skip_prefixes):
+            return self.get_response(request)
+
+        sampled = self.sample_rate > 0 and random.random() < self.sample_rate
+        watch_slow = self.slow_ms > 0
+        if not (sampled or watch_slow):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        # cProfile 抽中的请求从头记 SQL；只盯慢请求时等越过采样门槛再记
+        detail_after = start if sampled else start + self.sample_after
+        collectors = [_QueryCollector(conn.alias, self.max_queries, detail_after) for conn in connections.all()]
+        profiler = cProfile.Profile() if sampled else None
+        ident = threading.get_ident()
+        sampler = self._sampler if watch_slow else None
+
+        if sampler:
+            sampler.start(ident)
+        try:
+            with ExitStack() as stack:
+                for conn, collector in zip(connections.all(), collectors):
+                    stack.enter_context(conn.execute_wrapper(collector))
+                if profiler:
+                    try:
+                        profiler.enable()
+                    except ValueError:
+                        # Python 3.12+ 同一时刻只能有一个 cProfile：别的线程正在剖析，这次放弃
+                        profiler, sampled = None, False
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler:
+                        profiler.disable()
+        finally:
+            samples = sampler.stop(ident) if sampler else Counter()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        slow = watch_slow and duration_ms >= self.slow_ms
+        if sampled or slow:
+            try:
+                self._store(request, response, duration_ms, "slow" if slow else "sample",
+                            profiler, samples, collectors)
+            except Exception:
+                # 剖析失败绝不能影响业务响应
+                logger.exception("failed to store request profile for %s", request.path)
+        return response
+
+    def _store(self, request, response, duration_ms, trigger, profiler, samples, collectors):
+        from .models import RequestProfile
+
+        stats_text = ""
+        if profiler is not None:
+            buf = io.StringIO()
+            pstats.Stats(profiler, stream=buf).sort_stats("cumulative").print_stats(60)
+            stats_text = buf.getvalue()
+
+        # cProfile 模式没有栈采样时，用 cProfile 的调用关系退化出一份“按函数”的 folded 数据
+        if not samples and profiler is not None:
+            samples = _folded_from_profiler(profiler)
+
+        queries = [q for c in collectors for q in c.queries]
+        user = getattr(request, "user", None)
+        user_id = getattr(user, "id", None) if getattr(user, "is_authenticated", False) else None
+
+        RequestProfile.objects.using("default").create(
+            method=request.method,
+            path=request.get_full_path()[:500],
+            status_code=getattr(response, "status_code", 0) or 0,
+            duration_ms=round(duration_ms, 3),
+            trigger=trigger,
+            user_id=user_id,
+            query_count=sum(c.count for c in collectors),
+            sql_time_ms=round(sum(q["time_ms"] for q in queries), 3),
+            folded_stacks="\n".join(f"{stack} {n}" for stack, n in samples.most_common()),
+            stats=stats_text,
+            sql=queries,
+        )
+
+
+def _folded_from_profiler(profiler) -> Counter:
+    """把 cProfile 的 (caller -> callee) 关系压成两层 folded 栈，单位为微秒"""
+    out = Counter()
+    stats = pstats.Stats(profiler).stats
+    for (filename, lineno, func), (_cc, _nc, tt, _ct, callers) in stats.items():
+        callee = f"{func} ({os.path.basename(filename)}:{lineno})"
+        weight = int(tt * 1_000_000)
+        if weight <= 0:
+            continue
+        if callers:
+            (c_file, c_line, c_func) = next(iter(callers))
+            out[f"{c_func} ({os.path.basename(c_file)}:{c_line});{callee}"] += weight
+        else:
+            out[callee] += weight
+    return out
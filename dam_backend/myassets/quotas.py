@@ -0,0 +1,225 @@
+# myassets/quotas.py —— 存储用量（按用户 / 品牌计费）与配额
+"""
+- 计逻辑字节：资产当前文件 + 各版本文件，按文件名去重（恢复出来的版本和旧版本共用文件，不重复计）；
+  转冷压缩、差量存储省下的空间不抵扣
+- 一个资产的全部字节记在它的所有者（uploaded_by）和品牌（brand）名下，汇总在 StorageUsage：
+  signals.py 在资产保存 / 删除、新版本入库时算出前后差额，同一事务里用 F() 累加；
+  换品牌 / 换所有者时整笔搬过去；prune_versions 删版本时走 tracking()
+- 差额只查这个资产自己的几行（size_bytes 上传时记好），不 stat 文件；报表直接读汇总行
+- 配额：StorageUsage.quota_bytes，空则用 settings.STORAGE_QUOTAS 的默认值（None = 不限；未填品牌的不套品牌默认配额）。
+  上传路径先 check() 快速拒绝（还没写文件），入库后在同一事务里 enforce() 再核一次——
+  累加时已持有汇总行的行锁，并发上传排队核对，不会一起挤过配额
+- recompute()：按数据库里的 size_bytes 重建全部汇总；fill_sizes()：给旧数据补 size_bytes（要 stat，线程池并发）
+"""
+import itertools
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import Asset, AssetVersion, StorageUsage
+
+USER, BRAND = "user", "brand"
+BATCH = 2000
+
+
+class QuotaExceeded(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = "Storage quota exceeded."
+    default_code = "quota_exceeded"
+
+
+def default_quota(scope):
+    return (getattr(settings, "STORAGE_QUOTAS", None) or {}).get(scope)
+
+
+def file_size(field_file):
+    """FieldFile 的大小：刚上传的取内存里的 size，已存储的问存储；拿不到返回 None"""
+    try:
+        return field_file.size if field_file else None
+    except (OSError, ValueError):
+        return None
+
+
+# ---------------- 记账 ----------------
+def footprint(asset_id):
+    """(所有者 id, 品牌, 字节数)；资产不存在返回 None"""
+    row = Asset.objects.filter(pk=asset_id).values_list("uploaded_by_id", "brand", "file", "size_bytes").first()
+    if row is None:
+        return None
+    owner, brand, name, size = row
+    sizes = dict(AssetVersion.objects.filter(asset_id=asset_id).values_list("file", "size_bytes"))
+    if name:
+        sizes.setdefault(name, size)
+    return owner, brand or "", sum(s or 0 for s in sizes.values())
+
+
+def apply(before, after):
+    """两个 footprint 之间的差额记到汇总上（None = 资产不存在，用于新建 / 删除）"""
+    deltas = defaultdict(lambda: [0, 0])
+    for fp, sign in ((before, -1), (after, 1)):
+        if fp is None:
+            continue
+        owner, brand, nbytes = fp
+        for key in ((BRAND, brand), (USER, str(owner))):
+            deltas[key][0] += sign * nbytes
+            deltas[key][1] += sign
+    _bump_all(deltas)
+
+
+def add(owner_id, brand, nbytes, nassets=0):
+    """直接加一笔（新版本文件、批量导入）"""
+    _bump_all({(BRAND, brand or ""): [nbytes, nassets], (USER, str(owner_id)): [nbytes, nassets]})
+
+
+def _bump_all(deltas):
+    # 固定顺序加锁（brand 在 user 前），并发事务不会互相等成死锁
+    for (scope, key), (nbytes, nassets) in sorted(deltas.items()):
+        if nbytes or nassets:
+            _bump(scope, key, nbytes, nassets)
+
+
+def _bump(scope, key, nbytes, nassets):
+    qs = StorageUsage.objects.filter(scope=scope, key=key)
+    changes = {"bytes": F("bytes") + nbytes, "assets": F("assets") + nassets, "updated_at": timezone.now()}
+    if not qs.update(**changes):
+        StorageUsage.objects.get_or_create(scope=scope, key=key,
+                                           defaults={"user_id": int(key) if scope == USER else None})
+        qs.update(**changes)
+
+
+@contextmanager
+def tracking(asset_ids):
+    """块内改了这些资产的文件 / 版本：退出时按前后 footprint 补记差额（须在事务里用）"""
+    before = {pk: footprint(pk) for pk in set(asset_ids)}
+    yield
+    for pk, fp in before.items():
+        apply(fp, footprint(pk))
+
+
+# ---------------- 配额 ----------------
+def _status(owner_id, brand, lock=False):
+    """[(scope, key, 已用, 配额)]；配额为 None 的不返回"""
+    keys = [(USER, str(owner_id)), (BRAND, brand or "")]
+    qs = StorageUsage.objects.filter(scope__in=[USER, BRAND], key__in=[k for _, k in keys])
+    if lock:
+        qs = qs.select_for_update().order_by("scope", "key")
+    rows = {(r.scope, r.key): r for r in qs}
+    out = []
+    for scope, key in keys:
+        row = rows.get((scope, key))
+        if row is not None and row.quota_bytes is not None:
+            quota = row.quota_bytes
+        elif scope == BRAND and not key:
+            quota = None  # 未填品牌的资产不套品牌默认配额
+        else:
+            quota = default_quota(scope)
+        if quota is not None:
+            out.append((scope, key, row.bytes if row else 0, quota))
+    return out
+
+
+def _message(scope, key, used, quota, incoming=0):
+    who = f"brand '{key}'" if scope == BRAND else "the asset owner"
+    need = f"; this upload needs {incoming} more" if incoming else ""
+    return f"Storage quota exceeded for {who}: {used} of {quota} bytes used{need}."
+
+
+def check(owner_id, brand, incoming):
+    """写文件之前的快速检查（不加锁）；超额抛 QuotaExceeded"""
+    for scope, key, used, quota in _status(owner_id, brand):
+        if used + (incoming or 0) > quota:
+            raise QuotaExceeded(_message(scope, key, used, quota, incoming))
+
+
+def enforce(owner_id, brand):
+    """入库之后、同一事务里核对（锁住汇总行）；超额抛 QuotaExceeded，调用方的事务随之回滚"""
+    for scope, key, used, quota in _status(owner_id, brand, lock=True):
+        if used > quota:
+            raise QuotaExceeded(_message(scope, key, used, quota))
+
+
+def quota_for(row):
+    if row.quota_bytes is not None:
+        return row.quota_bytes
+    if row.scope == BRAND and not row.key:
+        return None
+    return default_quota(row.scope)
+
+
+# ---------------- 重建 / 补数据 ----------------
+def recompute():
+    """
+    按 size_bytes 重建全部汇总（流式归并资产和版本两张表，不读文件），保留各行单独设的配额。
+    扫描期间的上传不在快照里：请在上传低峰跑。返回统计
+    """
+    totals = defaultdict(lambda: [0, 0])
+    stats = {"assets": 0, "unknown_sizes": 0}
+    versions = itertools.groupby(
+        AssetVersion.objects.order_by("asset_id").values_list("asset_id", "file", "size_bytes").iterator(chunk_size=BATCH),
+        key=itemgetter(0))
+    group = next(versions, None)
+    assets = Asset.objects.order_by("id").values_list("id", "uploaded_by_id", "brand", "file", "size_bytes")
+    for pk, owner, brand, name, size in assets.iterator(chunk_size=BATCH):
+        while group is not None and group[0] < pk:  # 资产已不存在的版本（不应有）跳过
+            group = next(versions, None)
+        sizes = {}
+        if group is not None and group[0] == pk:
+            sizes = {f: s for _, f, s in group[1]}
+            group = next(versions, None)
+        if name:
+            sizes.setdefault(name, size)
+        stats["assets"] += 1
+        stats["unknown_sizes"] += sum(1 for s in sizes.values() if s is None)
+        nbytes = sum(s or 0 for s in sizes.values())
+        for key in ((BRAND, brand or ""), (USER, str(owner))):
+            totals[key][0] += nbytes
+            totals[key][1] += 1
+
+    now = timezone.now()
+    with transaction.atomic():
+        StorageUsage.objects.update(bytes=0, assets=0, updated_at=now)
+        StorageUsage.objects.bulk_create(
+            [StorageUsage(scope=scope, key=key, user_id=int(key) if scope == USER else None,
+                          bytes=nbytes, assets=n, updated_at=now)
+             for (scope, key), (nbytes, n) in totals.items()],
+            update_conflicts=True, unique_fields=["scope", "key"], update_fields=["bytes", "assets", "updated_at"],
+            batch_size=1000,
+        )
+    stats["rows"] = len(totals)
+    return stats
+
+
+def fill_sizes(workers=16, log=print):
+    """给 size_bytes 为空的资产 / 版本补上文件大小（同名文件只 stat 一次；差量版本直接用 full_size）"""
+    stats = {"assets": 0, "versions": 0, "missing": 0}
+
+    def stat(name):
+        try:
+            return name, default_storage.size(name)
+        except (OSError, NotImplementedError):
+            return name, None  # 不在主存储（转冷的版本等）：留空，算作未知
+
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        for model, key in ((AssetVersion, "versions"), (Asset, "assets")):
+            qs = model.objects.filter(size_bytes__isnull=True).exclude(file="")
+            if model is AssetVersion:
+                stats[key] += qs.filter(full_size__isnull=False).update(size_bytes=F("full_size"))
+            last = 0
+            while rows := list(qs.filter(pk__gt=last).order_by("pk").values_list("pk", "file")[:BATCH]):
+                last = rows[-1][0]
+                sizes = dict(pool.map(stat, {name for _, name in rows}))
+                found = [model(pk=pk, size_bytes=sizes[name]) for pk, name in rows if sizes[name] is not None]
+                model.objects.bulk_update(found, ["size_bytes"], batch_size=500)
+                stats[key] += len(found)
+                stats["missing"] += len(rows) - len(found)
+                log(f"{key}: {stats[key]} sized, {stats['missing']} missing")
+    return stats
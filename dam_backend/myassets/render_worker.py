@@ -0,0 +1,42 @@
+# myassets/render_worker.py —— 缩略图进程池里执行的函数（只依赖 Pillow，不导入 Django）
+import os
+
+HUGE = 1 << 30
+
+
+def render_file(src, dest, width, height, fit, pil_format, quality):
+    """把 src 缩放后写到 dest（先写临时文件再改名）；返回文件大小"""
+    from PIL import Image, ImageOps
+
+    with Image.open(src) as img:
+        # JPEG 直接按接近目标的尺寸解码（比全尺寸解码再缩小快得多）
+        img.draft("RGB", (width or HUGE, height or HUGE))
+        img = ImageOps.exif_transpose(img)
+        if fit == "cover" and width and height:
+            img = ImageOps.fit(img, (width, height), Image.Resampling.LANCZOS)
+        else:
+            img.thumbnail((width or HUGE, height or HUGE), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+        has_alpha = "A" in img.getbands() or "transparency" in img.info
+        if pil_format == "JPEG" or not has_alpha:
+            if img.mode != "RGB" and img.mode != "L":
+                img = img.convert("RGBA").convert("RGB") if has_alpha else img.convert("RGB")
+        elif img.mode not in ("RGBA", "LA"):
+            img = img.convert("RGBA")
+
+        options = {"quality": quality}
+        if pil_format == "WEBP":
+            options["method"] = 4
+        elif pil_format == "JPEG":
+            options.update(optimize=True, progressive=True)
+        elif pil_format == "PNG":
+            options = {"optimize": False}
+
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        try:
+            img.save(tmp, pil_format, **options)
+            os.replace(tmp, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return os.path.getsize(dest)
@@ -0,0 +1,81 @@
+# myassets/renderers.py —— 基于 orjson 的快速 JSON 渲染（未安装 orjson 时自动退回 DRF 默认实现）
+import datetime
+import decimal
+
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:  # 可选依赖
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def _default(obj):
+    """orjson 不认识的类型：与 DRF JSONEncoder 的处理保持一致"""
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    if hasattr(obj, "__getitem__") and hasattr(obj, "keys"):
+        return dict(obj)
+    if hasattr(obj, "__iter__"):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+_FALLBACK_ENCODER = JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def dumps(data) -> bytes:
+    """
+    供渲染器 / 流式输出共用的编码函数。
+    datetime / date / time / UUID 由 orjson 原生处理（RFC 3339），不经过 Python 层。
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return _FALLBACK_ENCODER.encode(data).encode("utf-8")
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    与 JSONRenderer 同一个 media_type，可直接替换。
+    - 浏览器带 indent 参数（Browsable API / ?format=json 调试）时仍走父类，保持缩进输出
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return dumps(data)
+
+
+class NDJSONRenderer(JSONRenderer):
+    """
+    application/x-ndjson：每行一个 JSON 对象。
+    主要给流式列表（streaming.StreamingListMixin）做内容协商用；
+    非流式场景下列表按行输出，单个对象就是一行。
+    """
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if isinstance(data, (list, tuple)):
+            return b"".join(dumps(row) + b"\n" for row in data)
+        return dumps(data) + b"\n"
@@ -0,0 +1,284 @@
+# myassets/renditions.py —— 图片缩略图：按需缩放 + 磁盘缓存（/api/assets/{id}/render/）
+"""
+- 缓存路径 = 内容哈希 + 参数：{RENDER_CACHE_DIR}/{hash[:2]}/{hash}/{w}x{h}-{fit}-q{quality}.{fmt}；
+  内容哈希还没算出来（抽取任务没跑完）时用文件名的哈希（文件名对应的内容不会变）
+- 命中：打开缓存文件直接返回（一次磁盘读）；最近使用时间记在 mtime 上，超过一小时才更新一次
+- 未命中：进程池里缩放（render_worker.render_file）；同一结果在本进程内只生成一次（其他请求等它），
+  跨进程用文件锁（按结果路径分 256 把锁）
+- 缓存总大小超过 RENDER_CACHE_MAX_BYTES 时，按 mtime 从旧到新淘汰到 90%
+- 缩略图 URL 带 v=内容版本，内容变了 URL 就变，所以可以放心给 immutable 缓存头
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core import signing
+
+from . import render_worker
+from .fileutils import local_path
+
+try:  # 跨进程锁；没有 fcntl 的平台只做进程内去重
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+    "jpg": ("JPEG", "image/jpeg"),
+    "png": ("PNG", "image/png"),
+}
+FITS = ("contain", "cover")
+DEFAULT_QUALITY = 80
+TOUCH_INTERVAL = 3600
+LOCK_STRIPES = 256
+SIGNING_SALT = "myassets.render"
+
+
+class RenderError(ValueError):
+    """参数不合法（400）"""
+
+
+@dataclass(frozen=True)
+class RenderSpec:
+    width: int
+    height: int
+    fit: str
+    fmt: str
+    quality: int
+
+    @property
+    def pil_format(self):
+        return FORMATS[self.fmt][0]
+
+    @property
+    def content_type(self):
+        return FORMATS[self.fmt][1]
+
+    @property
+    def slug(self):
+        ext = "jpg" if self.fmt == "jpeg" else self.fmt
+        return f"{self.width}x{self.height}-{self.fit}-q{self.quality}.{ext}"
+
+
+def _int_param(query, name, low, high, default=0):
+    raw = query.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except (TypeError, ValueError):
+        raise RenderError(f"{name} must be an integer")
+    if not low <= value <= high:
+        raise RenderError(f"{name} must be between {low} and {high}")
+    return value
+
+
+def parse_spec(query):
+    limit = int(getattr(settings, "RENDER_MAX_DIMENSION", 4096))
+    width = _int_param(query, "w", 1, limit)
+    height = _int_param(query, "h", 1, limit)
+    if not width and not height:
+        raise RenderError("w or h is required")
+    fit = (query.get("fit") or "contain").lower()
+    if fit not in FITS:
+        raise RenderError(f"fit must be one of {', '.join(FITS)}")
+    fmt = (query.get("fmt") or "webp").lower()
+    if fmt not in FORMATS:
+        raise RenderError(f"fmt must be one of {', '.join(sorted(FORMATS))}")
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fit == "cover" and not (width and height):
+        fit = "contain"  # 只给一边时两种方式结果一样，统一成一个缓存键
+    quality = _int_param(query, "q", 1, 100, DEFAULT_QUALITY)
+    return RenderSpec(width, height, fit, fmt, quality)
+
+
+def source_key(asset):
+    if asset.content_hash:
+        return asset.content_hash
+    return "n" + hashlib.sha256(asset.file.name.encode("utf-8")).hexdigest()[:40]
+
+
+def version_tag(asset):
+    return source_key(asset)[:16]
+
+
+def sign(asset):
+    """缩略图链接的签名：<img src> 带不了 JWT（与原文件的 /media/ 链接同样不过期，内容一变就失效）"""
+    return signing.Signer(salt=SIGNING_SALT).sign(f"{asset.pk}:{version_tag(asset)}").rsplit(":", 1)[1]
+
+
+def check_signature(asset, sig):
+    try:
+        signing.Signer(salt=SIGNING_SALT).unsign(f"{asset.pk}:{version_tag(asset)}:{sig}")
+    except signing.BadSignature:
+        return False
+    return True
+
+
+# ---------------- 磁盘缓存 ----------------
+class RenderCache:
+    def __init__(self, root, max_bytes):
+        self.root, self.max_bytes = root, max_bytes
+        self._approx = None  # 本进程估算的缓存大小；第一次写入时扫描一次
+        self._lock = threading.Lock()
+
+    def path_for(self, key, spec):
+        return os.path.join(self.root, key[:2], key, spec.slug)
+
+    def open(self, path):
+        """命中时返回打开的文件，否则 None"""
+        try:
+            fh = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            if time.time() - os.fstat(fh.fileno()).st_mtime > TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+        return fh
+
+    def added(self, size):
+        with self._lock:
+            if self._approx is None:
+                self._approx = self.usage()
+            else:
+                self._approx += size
+            over = self._approx > self.max_bytes
+        if over:
+            self.evict()
+
+    def _entries(self):
+        for dirpath, _dirs, names in os.walk(self.root):
+            if os.path.basename(dirpath) == ".locks":
+                continue
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield st.st_mtime, st.st_size, path
+
+    def usage(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, target_ratio=0.9):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * target_ratio
+        removed = 0
+        for _mtime, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+        with self._lock:
+            self._approx = total
+        return removed
+
+    @contextmanager
+    def lock(self, path):
+        if fcntl is None:
+            yield
+            return
+        stripe = int(hashlib.md5(path.encode("utf-8")).hexdigest()[:4], 16) % LOCK_STRIPES
+        lock_dir = os.path.join(self.root, ".locks")
+        os.makedirs(lock_dir, exist_ok=True)
+        with open(os.path.join(lock_dir, f"{stripe:03d}.lock"), "a+b") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+_cache = None
+_executor = None
+_state_lock = threading.Lock()
+_inflight = {}
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = RenderCache(
+            getattr(settings, "RENDER_CACHE_DIR", os.path.join(settings.BASE_DIR, "render_cache")),
+            int(getattr(settings, "RENDER_CACHE_MAX_BYTES", 2 * 1024 ** 3)),
+        )
+    return _cache
+
+
+def _pool():
+    global _executor
+    with _state_lock:
+        if _executor is None:
+            # spawn：Web 进程里有线程，fork 出来的子进程可能带着别的线程持有的锁
+            _executor = ProcessPoolExecutor(
+                max_workers=max(1, int(getattr(settings, "RENDER_WORKERS", 2))),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def _timeout():
+    return int(getattr(settings, "RENDER_TIMEOUT_SECONDS", 60))
+
+
+def render(asset, spec):
+    """返回缩略图的打开文件（缓存命中时只有一次 open）"""
+    cache = get_cache()
+    path = cache.path_for(source_key(asset), spec)
+    fh = cache.open(path)
+    if fh is not None:
+        return fh
+
+    with _state_lock:
+        pending = _inflight.get(path)
+        leader = pending is None
+        if leader:
+            pending = _inflight[path] = Future()
+    if not leader:
+        pending.result(timeout=_timeout())  # 同一张图正在生成：等它
+        fh = cache.open(path)
+        if fh is None:
+            raise FileNotFoundError(path)
+        return fh
+
+    try:
+        with cache.lock(path):
+            fh = cache.open(path)  # 可能刚被别的进程生成
+            if fh is None:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with local_path(asset.file) as src:
+                    size = _pool().submit(
+                        render_worker.render_file, src, path, spec.width, spec.height,
+                        spec.fit, spec.pil_format, spec.quality,
+                    ).result(timeout=_timeout())
+                fh = cache.open(path)  # 先打开再淘汰：即使马上被淘汰，这次响应也不受影响
+                cache.added(size)
+        pending.set_result(True)
+        return fh
+    except BaseException as e:
+        pending.set_exception(e)
+        raise
+    finally:
+        with _state_lock:
+            _inflight.pop(path, None)
@@ -0,0 +1,471 @@
+# myassets/s3_standin.py —— 本地 S3 兼容替身：不联网联调 / 验证 objectstore.S3Storage
+"""
+- 路径风格（http://host:port/桶/键），数据放在本地目录：每个桶一个子目录，对象按键名转义后平铺存放，
+  旁边一个 .meta 目录存 Content-Type / ETag
+- 支持 S3Storage 用到的全部操作：建桶 / HEAD 桶、PUT / GET（Range、If-Match）/ HEAD / DELETE 对象、
+  ListObjectsV2（prefix / delimiter / 分页）、分片上传（发起 / 传片 / 合并 / 取消）
+- 预签名地址照常可用，但不校验签名和过期时间（只是替身）；对浏览器放开 CORS，前端直传也能联调
+- 同时兼容 aws-chunked（新版 SDK 的流式校验编码）和 Transfer-Encoding: chunked 的请求体
+- manage.py s3_standin 前台运行；脚本 / 测试里用 serve_in_thread() 起在随机端口
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+COPY_CHUNK = 1024 * 1024
+XMLNS = "http://s3.amazonaws.com/doc/2006-03-01/"
+RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class S3Error(Exception):
+    def __init__(self, status, code, message=""):
+        super().__init__(message or code)
+        self.status, self.code, self.message = status, code, message or code
+
+
+# ---------------- 本地目录布局 ----------------
+class Store:
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(os.path.join(self.root, ".multipart"), exist_ok=True)
+        self._lock = threading.Lock()
+
+    def bucket_dir(self, bucket, must_exist=True):
+        if not bucket or bucket.startswith(".") or "/" in bucket:
+            raise S3Error(400, "InvalidBucketName")
+        path = os.path.join(self.root, bucket)
+        if must_exist and not os.path.isdir(path):
+            raise S3Error(404, "NoSuchBucket")
+        return path
+
+    def create_bucket(self, bucket):
+        os.makedirs(os.path.join(self.bucket_dir(bucket, must_exist=False), ".meta"), exist_ok=True)
+
+    def _paths(self, bucket, key):
+        base = self.bucket_dir(bucket)
+        safe = quote(key, safe="")
+        return os.path.join(base, safe), os.path.join(base, ".meta", safe + ".json")
+
+    def head(self, bucket, key):
+        data, meta = self._paths(bucket, key)
+        try:
+            with open(meta, encoding="utf-8") as fh:
+                info = json.load(fh)
+            stat = os.stat(data)
+        except FileNotFoundError:
+            raise S3Error(404, "NoSuchKey") from None
+        info.update(size=stat.st_size, mtime=stat.st_mtime, path=data)
+        return info
+
+    def put(self, bucket, key, source_path, content_type, etag):
+        """source_path 是已经写好的临时文件：改名进来，读者要么看到旧文件要么看到新文件"""
+        data, meta = self._paths(bucket, key)
+        with self._lock:
+            os.replace(source_path, data)
+            tmp = meta + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({"content_type": content_type, "etag": etag}, fh)
+            os.replace(tmp, meta)
+
+    def delete(self, bucket, key):
+        data, meta = self._paths(bucket, key)
+        for path in (meta, data):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def keys(self, bucket):
+        base = self.bucket_dir(bucket)
+        return sorted(unquote(n) for n in os.listdir(base) if not n.startswith(".") and os.path.isfile(os.path.join(base, n)))
+
+    def tempfile(self, bucket):
+        fd, path = tempfile.mkstemp(prefix=".incoming-", dir=self.bucket_dir(bucket))
+        return os.fdopen(fd, "wb"), path
+
+    # ---------- 分片上传 ----------
+    def upload_dir(self, upload_id):
+        if not re.fullmatch(r"[0-9a-f]{32}", upload_id or ""):
+            raise S3Error(404, "NoSuchUpload")
+        path = os.path.join(self.root, ".multipart", upload_id)
+        if not os.path.isdir(path):
+            raise S3Error(404, "NoSuchUpload")
+        return path
+
+    def start_upload(self, bucket, key, content_type):
+        self.bucket_dir(bucket)
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self.root, ".multipart", upload_id)
+        os.makedirs(path)
+        with open(os.path.join(path, "upload.json"), "w", encoding="utf-8") as fh:
+            json.dump({"bucket": bucket, "key": key, "content_type": content_type}, fh)
+        return upload_id
+
+    def upload_info(self, upload_id, bucket, key):
+        with open(os.path.join(self.upload_dir(upload_id), "upload.json"), encoding="utf-8") as fh:
+            info = json.load(fh)
+        if (info["bucket"], info["key"]) != (bucket, key):
+            raise S3Error(404, "NoSuchUpload")
+        return info
+
+
+# ---------------- HTTP ----------------
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "dam-s3-standin"
+
+    @property
+    def store(self):
+        return self.server.store
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    # ---------- 请求解析 ----------
+    def _target(self):
+        parts = urlsplit(self.path)
+        bucket, _, key = parts.path.lstrip("/").partition("/")
+        query = {k: v[0] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+        return unquote(bucket), unquote(key), query
+
+    def _body_chunks(self):
+        """按块产出请求体（去掉 aws-chunked / chunked 编码）"""
+        encoding = (self.headers.get("Content-Encoding") or "").lower()
+        chunked = "aws-chunked" in encoding or (self.headers.get("Transfer-Encoding") or "").lower() == "chunked"
+        if not chunked:
+            remaining = int(self.headers.get("Content-Length") or 0)
+            while remaining > 0:
+                block = self.rfile.read(min(COPY_CHUNK, remaining))
+                if not block:
+                    raise S3Error(400, "IncompleteBody")
+                remaining -= len(block)
+                yield block
+            return
+        while True:
+            line = self.rfile.readline().strip()
+            size = int(line.split(b";")[0] or b"0", 16)
+            if size == 0:
+                while self.rfile.readline().strip():  # 尾部校验头，忽略
+                    pass
+                return
+            remaining = size
+            while remaining > 0:
+                block = self.rfile.read(min(COPY_CHUNK, remaining))
+                if not block:
+                    raise S3Error(400, "IncompleteBody")
+                remaining -= len(block)
+                yield block
+            self.rfile.readline()
+
+    def _receive(self, bucket):
+        """请求体写进桶目录下的临时文件，返回 (路径, md5 hex)"""
+        out, path = self.store.tempfile(bucket)
+        digest = hashlib.md5()
+        try:
+            with out:
+                for block in self._body_chunks():
+                    digest.update(block)
+                    out.write(block)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path, digest.hexdigest()
+
+    # ---------- 响应 ----------
+    def _cors(self):
+        self.send_header("Access-Control-Allow-Origin", self.headers.get("Origin") or "*")
+        self.send_header("Access-Control-Expose-Headers", "ETag, Content-Length, Content-Range")
+
+    def _reply(self, status, body=b"", headers=None, content_type="application/xml"):
+        self.send_response(status)
+        self._cors()
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if body or status not in (204, 304):
+            self.send_header("Content-Type", content_type)
+        if "Content-Length" not in (headers or {}):
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _xml(self, status, root, children, raw=""):
+        inner = "".join(f"<{k}>{escape(str(v))}</{k}>" for k, v in children) + raw
+        body = f'<?xml version="1.0" encoding="UTF-8"?><{root} xmlns="{XMLNS}">{inner}</{root}>'
+        self._reply(status, body.encode())
+
+    def _dispatch(self, method):
+        try:
+            bucket, key, query = self._target()
+            handler = getattr(self, f"_{method}_{'object' if key else 'bucket'}")
+            handler(bucket, key, query)
+        except S3Error as e:
+            if method == "head":
+                self._reply(e.status)
+            else:
+                self._xml(e.status, "Error", [("Code", e.code), ("Message", e.message)])
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_HEAD(self):
+        self._dispatch("head")
+
+    def do_GET(self):
+        self._dispatch("get")
+
+    def do_PUT(self):
+        self._dispatch("put")
+
+    def do_POST(self):
+        self._dispatch("post")
+
+    def do_DELETE(self):
+        self._dispatch("delete")
+
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self._cors()
+        self.send_header("Access-Control-Allow-Methods", "GET, HEAD, PUT, POST, DELETE")
+        self.send_header("Access-Control-Allow-Headers", self.headers.get("Access-Control-Request-Headers") or "*")
+        self.send_header("Access-Control-Max-Age", "3600")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    # ---------- 桶 ----------
+    def _head_bucket(self, bucket, key, query):
+        self.store.bucket_dir(bucket)
+        self._reply(200)
+
+    def _put_bucket(self, bucket, key, query):
+        for _ in self._body_chunks():  # CreateBucketConfiguration，忽略
+            pass
+        self.store.create_bucket(bucket)
+        self._reply(200, headers={"Location": f"/{bucket}"})
+
+    def _delete_bucket(self, bucket, key, query):
+        path = self.store.bucket_dir(bucket)
+        if self.store.keys(bucket):
+            raise S3Error(409, "BucketNotEmpty")
+        shutil.rmtree(path)
+        self._reply(204)
+
+    def _get_bucket(self, bucket, key, query):
+        """ListObjectsV2"""
+        prefix, delimiter = query.get("prefix", ""), query.get("delimiter", "")
+        max_keys = min(int(query.get("max-keys") or 1000), 1000)
+        after = query.get("continuation-token") or query.get("start-after") or ""
+        entries, truncated, last = [], False, ""
+        for name in self.store.keys(bucket):
+            # 续页令牌是上一页最后一个键或公共前缀；是公共前缀时整组跳过
+            if not name.startswith(prefix) or name <= after:
+                continue
+            if delimiter and after.endswith(delimiter) and name.startswith(after):
+                continue
+            common = None
+            if delimiter and delimiter in name[len(prefix):]:
+                common = name[:name.index(delimiter, len(prefix)) + len(delimiter)]
+                if common == last:
+                    continue
+            if len(entries) >= max_keys:
+                truncated = True
+                break
+            if common is not None:
+                entries.append(f"<CommonPrefixes><Prefix>{escape(common)}</Prefix></CommonPrefixes>")
+                last = common
+            else:
+                info = self.store.head(bucket, name)
+                entries.append(
+                    f"<Contents><Key>{escape(name)}</Key>"
+                    f"<LastModified>{_iso(info['mtime'])}</LastModified>"
+                    f"<ETag>{escape(info['etag'])}</ETag><Size>{info['size']}</Size>"
+                    "<StorageClass>STANDARD</StorageClass></Contents>")
+                last = name
+        children = [("Name", bucket), ("Prefix", prefix), ("KeyCount", len(entries)),
+                    ("MaxKeys", max_keys), ("IsTruncated", "true" if truncated else "false")]
+        if delimiter:
+            children.append(("Delimiter", delimiter))
+        if truncated:
+            children.append(("NextContinuationToken", last))
+        self._xml(200, "ListBucketResult", children, raw="".join(entries))
+
+    # ---------- 对象 ----------
+    def _head_object(self, bucket, key, query):
+        info = self.store.head(bucket, key)
+        self._check_match(info)
+        self._reply(200, headers=self._object_headers(info, info["size"]), content_type=info["content_type"])
+
+    def _object_headers(self, info, length):
+        return {
+            "ETag": info["etag"],
+            "Last-Modified": formatdate(info["mtime"], usegmt=True),
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(length),
+        }
+
+    def _check_match(self, info):
+        expected = self.headers.get("If-Match")
+        if expected and expected.strip() not in ("*", info["etag"]):
+            raise S3Error(412, "PreconditionFailed")
+
+    def _get_object(self, bucket, key, query):
+        info = self.store.head(bucket, key)
+        self._check_match(info)
+        size, start, end, status = info["size"], 0, info["size"] - 1, 200
+        raw_range = self.headers.get("Range")
+        if raw_range:
+            m = RANGE_RE.match(raw_range.strip())
+            if not m or (not m.group(1) and not m.group(2)):
+                raise S3Error(416, "InvalidRange")
+            if m.group(1):
+                start = int(m.group(1))
+                end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+            else:
+                start = max(0, size - int(m.group(2)))
+            if start >= size or start > end:
+                raise S3Error(416, "InvalidRange")
+            status = 206
+        length = end - start + 1
+        headers = self._object_headers(info, length)
+        if status == 206:
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        disposition = query.get("response-content-disposition")
+        if disposition:
+            headers["Content-Disposition"] = disposition
+        self.send_response(status)
+        self._cors()
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", query.get("response-content-type") or info["content_type"])
+        self.end_headers()
+        with open(info["path"], "rb") as fh:
+            fh.seek(start)
+            remaining = length
+            while remaining > 0:
+                block = fh.read(min(COPY_CHUNK, remaining))
+                if not block:
+                    break
+                self.wfile.write(block)
+                remaining -= len(block)
+
+    def _put_object(self, bucket, key, query):
+        if "x-amz-copy-source" in self.headers:
+            raise S3Error(501, "NotImplemented", "CopyObject is not supported by the stand-in")
+        if "uploadId" in query:
+            self.store.upload_info(query["uploadId"], bucket, key)
+            number = int(query.get("partNumber") or 0)
+            if not 1 <= number <= 10000:
+                raise S3Error(400, "InvalidArgument", "partNumber must be 1..10000")
+            path, md5 = self._receive(bucket)
+            os.replace(path, os.path.join(self.store.upload_dir(query["uploadId"]), f"part-{number:05d}"))
+            with open(os.path.join(self.store.upload_dir(query["uploadId"]), f"part-{number:05d}.etag"), "w") as fh:
+                fh.write(md5)
+            self._reply(200, headers={"ETag": f'"{md5}"'})
+            return
+        path, md5 = self._receive(bucket)
+        content_type = self.headers.get("Content-Type") or "application/octet-stream"
+        self.store.put(bucket, key, path, content_type, f'"{md5}"')
+        self._reply(200, headers={"ETag": f'"{md5}"'})
+
+    def _delete_object(self, bucket, key, query):
+        if "uploadId" in query:
+            self.store.upload_info(query["uploadId"], bucket, key)
+            shutil.rmtree(self.store.upload_dir(query["uploadId"]), ignore_errors=True)
+        else:
+            self.store.bucket_dir(bucket)
+            self.store.delete(bucket, key)
+        self._reply(204)
+
+    def _post_object(self, bucket, key, query):
+        if "uploads" in query:
+            for _ in self._body_chunks():
+                pass
+            upload_id = self.store.start_upload(bucket, key, self.headers.get("Content-Type") or "application/octet-stream")
+            self._xml(200, "InitiateMultipartUploadResult", [("Bucket", bucket), ("Key", key), ("UploadId", upload_id)])
+            return
+        if "uploadId" not in query:
+            raise S3Error(400, "InvalidRequest")
+        info = self.store.upload_info(query["uploadId"], bucket, key)
+        updir = self.store.upload_dir(query["uploadId"])
+        body = b"".join(self._body_chunks())
+        try:
+            tree = ElementTree.fromstring(body)
+        except ElementTree.ParseError:
+            raise S3Error(400, "MalformedXML") from None
+        parts = []
+        for part in tree.iter():
+            if part.tag.rsplit("}", 1)[-1] != "Part":
+                continue
+            fields = {child.tag.rsplit("}", 1)[-1]: (child.text or "").strip() for child in part}
+            parts.append((int(fields.get("PartNumber") or 0), fields.get("ETag", "").strip('"')))
+        if not parts or [n for n, _ in parts] != sorted({n for n, _ in parts}):
+            raise S3Error(400, "InvalidPartOrder")
+        out, path = self.store.tempfile(bucket)
+        digests = hashlib.md5()
+        try:
+            with out:
+                for number, etag in parts:
+                    part_path = os.path.join(updir, f"part-{number:05d}")
+                    try:
+                        with open(part_path + ".etag") as fh:
+                            stored = fh.read().strip()
+                    except FileNotFoundError:
+                        raise S3Error(400, "InvalidPart", f"part {number} was not uploaded") from None
+                    if etag and etag != stored:
+                        raise S3Error(400, "InvalidPart", f"part {number} ETag mismatch")
+                    digests.update(bytes.fromhex(stored))
+                    with open(part_path, "rb") as src:
+                        shutil.copyfileobj(src, out, COPY_CHUNK)
+        except BaseException:
+            os.remove(path)
+            raise
+        etag = f'"{digests.hexdigest()}-{len(parts)}"'
+        self.store.put(bucket, key, path, info["content_type"], etag)
+        shutil.rmtree(updir, ignore_errors=True)
+        self._xml(200, "CompleteMultipartUploadResult",
+                  [("Location", f"/{bucket}/{quote(key)}"), ("Bucket", bucket), ("Key", key), ("ETag", etag)])
+
+
+def _iso(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, root, host="127.0.0.1", port=9000, verbose=False):
+        self.store = Store(root)
+        self.verbose = verbose
+        super().__init__((host, port), Handler)
+
+    def handle_error(self, request, client_address):
+        # 客户端读到一半 seek / 放弃时会直接断开连接，不算错误
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def endpoint_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def serve_in_thread(root, host="127.0.0.1", port=0, buckets=()):
+    """在后台线程起一个替身（port=0 随机端口），返回 server；用完 server.shutdown()"""
+    server = StandinServer(root, host, port)
+    for bucket in buckets:
+        server.store.create_bucket(bucket)
+    threading.Thread(target=server.serve_forever, name="s3-standin", daemon=True).start()
+    return server
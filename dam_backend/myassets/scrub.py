@@ -0,0 +1,269 @@
+# myassets/scrub.py —— 存储巡检：孤儿文件 / 悬空引用 / 校验和（manage.py scrub_storage）
+"""
+磁盘和数据库两边都按路径排好序，再像归并排序一样并排比较，内存只和目录宽度、批大小有关：
+- 磁盘：深度优先遍历 MEDIA_ROOT，目录项按 "name/" / "name" 排序，产出的相对路径就是全局字典序；
+  线程池提前读取后面几个子目录（os.scandir + stat），大目录树上 IO 可以并行
+- 数据库：每个文件字段单独按名字排序，用 iterator() 流式读（PostgreSQL 上是服务端游标，
+  按 "C" 排序规则，与 Python 的字符串比较一致），heapq.merge 合成一条流；
+  AssetDerivative.files 是 JSON 列表，先外部排序（分段排序写临时文件再归并）
+- 校验和：Asset / AssetVersion 上有 content_hash 的文件重新算 sha256 比对（verify=True，线程池并发）
+- 断点：每处理一批记录一次最后的路径和统计，resume 时两边都从这个路径之后继续
+- 最近修改过的文件不算孤儿（上传中：文件先写、数据库行后提交）
+"""
+import heapq
+import itertools
+import json
+import os
+import pickle
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import F
+from django.db.models.functions import Collate
+from django.utils import timezone
+
+from .fileutils import sha256_file
+from .models import Asset, AssetDerivative, AssetVersion
+
+SORT_RUN_SIZE = 100_000
+CHECKPOINT_EVERY = 5_000
+
+
+# ---------------- 磁盘一侧 ----------------
+class TreeWalker:
+    """按全局字典序产出 (相对路径, 大小, 修改时间)"""
+
+    def __init__(self, root, pool, prefix="", after=None, lookahead=8):
+        self.root, self.pool = root, pool
+        self.prefix, self.after = prefix, after
+        self.lookahead = max(1, lookahead)
+
+    def _scan(self, rel):
+        out = []
+        try:
+            with os.scandir(os.path.join(self.root, rel) if rel else self.root) as it:
+                for e in it:
+                    path = f"{rel}/{e.name}" if rel else e.name
+                    if e.is_dir(follow_symlinks=False):
+                        out.append((path + "/", path, True, 0, 0.0))
+                    elif e.is_file(follow_symlinks=False):
+                        st = e.stat(follow_symlinks=False)
+                        out.append((path, path, False, st.st_size, st.st_mtime))
+        except FileNotFoundError:  # 扫描期间被删掉的目录
+            return []
+        out.sort()
+        return out
+
+    def _wanted_dir(self, key):
+        if not (key.startswith(self.prefix) or self.prefix.startswith(key)):
+            return False
+        # 整棵子树都在断点之前：跳过
+        return self.after is None or key > self.after or self.after.startswith(key)
+
+    def _wanted_file(self, path):
+        return path.startswith(self.prefix) and (self.after is None or path > self.after)
+
+    def _iter(self, listing):
+        dirs = [i for i, entry in enumerate(listing) if entry[2] and self._wanted_dir(entry[0])]
+        futures, submitted = {}, 0
+        for i, (key, path, is_dir, size, mtime) in enumerate(listing):
+            if not is_dir:
+                if self._wanted_file(path):
+                    yield path, size, mtime
+                continue
+            if not self._wanted_dir(key):
+                continue
+            while submitted < len(dirs) and len(futures) < self.lookahead:
+                j = dirs[submitted]
+                futures[j] = self.pool.submit(self._scan, listing[j][1])
+                submitted += 1
+            yield from self._iter(futures.pop(i).result())
+
+    def __iter__(self):
+        return self._iter(self._scan(""))
+
+
+# ---------------- 数据库一侧 ----------------
+def _ordered(qs, field, prefix, after):
+    # PostgreSQL 用 "C" 排序规则（按字节），和 Python 的字符串比较一致；SQLite 默认就是按字节
+    key = Collate(field, "C") if connection.vendor == "postgresql" else F(field)
+    qs = qs.exclude(**{field: ""}).annotate(_path=key)
+    if prefix:
+        qs = qs.filter(_path__startswith=prefix)
+    if after:
+        qs = qs.filter(_path__gt=after)
+    return qs.order_by("_path")
+
+
+def _external_sorted(items, run_size=SORT_RUN_SIZE):
+    """外部排序：每 run_size 条排好序写一个临时文件，最后归并"""
+    runs, buf = [], []
+
+    def spill():
+        fh = tempfile.TemporaryFile(prefix="dam-scrub-")
+        for item in sorted(buf):
+            pickle.dump(item, fh)
+        fh.seek(0)
+        runs.append(fh)
+        buf.clear()
+
+    for item in items:
+        buf.append(item)
+        if len(buf) >= run_size:
+            spill()
+    if not runs:
+        yield from sorted(buf)
+        return
+    if buf:
+        spill()
+
+    def read(fh):
+        with fh:
+            while True:
+                try:
+                    yield pickle.load(fh)
+                except EOFError:
+                    return
+
+    yield from heapq.merge(*(read(fh) for fh in runs))
+
+
+def _derivative_refs(prefix, after):
+    def gen():
+        for pk, files in AssetDerivative.objects.values_list("id", "files").iterator(chunk_size=500):
+            for name in files or ():
+                if name.startswith(prefix) and (after is None or name > after):
+                    yield name, "derivative", pk, ""
+    return _external_sorted(gen())
+
+
+def references(prefix="", after=None, chunk_size=2000):
+    """数据库里引用的主存储文件，按路径排序：(path, kind, id, content_hash)"""
+    streams = [
+        ((name, "asset", pk, digest) for name, pk, digest in
+         _ordered(Asset.objects.all(), "file", prefix, after)
+         .values_list("file", "id", "content_hash").iterator(chunk_size=chunk_size)),
+        # 冷存储 / 差量版本的完整文件本来就不在主存储里
+        ((name, "version", pk, digest) for name, pk, digest in
+         _ordered(AssetVersion.objects.filter(storage_tier="hot", delta_name=""), "file", prefix, after)
+         .values_list("file", "id", "content_hash").iterator(chunk_size=chunk_size)),
+        ((name, "delta", pk, "") for name, pk in
+         _ordered(AssetVersion.objects.all(), "delta_name", prefix, after)
+         .values_list("delta_name", "id").iterator(chunk_size=chunk_size)),
+        _derivative_refs(prefix, after),
+    ]
+    return heapq.merge(*streams)
+
+
+# ---------------- 比对 ----------------
+class Scrubber:
+    """
+    report(kind, path, detail) 回调接收发现的问题：
+    "orphan"（磁盘有、没有引用）/ "missing"（引用了、磁盘没有）/ "checksum"（内容和记录的 sha256 不一致）
+    """
+
+    def __init__(self, report, prefix="assets/", workers=8, verify=False, delete_orphans=False,
+                 min_age_seconds=24 * 3600, checkpoint=None, resume=False):
+        self.report = report
+        self.prefix, self.workers = prefix, max(1, workers)
+        self.verify, self.delete_orphans = verify, delete_orphans
+        self.min_age_seconds = min_age_seconds
+        self.checkpoint, self.after = checkpoint, None
+        self.stats = dict.fromkeys(
+            ("files", "bytes", "referenced", "orphans", "orphan_bytes", "deleted",
+             "missing", "verified", "checksum_errors"), 0)
+        if resume and checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint, encoding="utf-8") as fh:
+                state = json.load(fh)
+            if state.get("prefix") == prefix:
+                self.after = state.get("after")
+                self.stats.update(state.get("stats", {}))
+
+    def _root(self):
+        try:
+            return default_storage.path("")
+        except NotImplementedError:
+            raise RuntimeError("scrubbing needs a local filesystem storage (MEDIA_ROOT)")
+
+    def _save_checkpoint(self, path):
+        if not self.checkpoint:
+            return
+        tmp = self.checkpoint + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"prefix": self.prefix, "after": path, "stats": self.stats,
+                       "updated_at": timezone.now().isoformat()}, fh)
+        os.replace(tmp, self.checkpoint)
+
+    def _verify(self, path, refs):
+        digest = sha256_file(os.path.join(self._root(), path))
+        return path, [(kind, pk) for _, kind, pk, expected in refs if expected and expected != digest]
+
+    def _drain(self, pending, block):
+        while pending and (block or pending[0].done()):
+            path, bad = pending.popleft().result()
+            self.stats["verified"] += 1
+            for kind, pk in bad:
+                self.stats["checksum_errors"] += 1
+                self.report("checksum", path, f"{kind} {pk}")
+
+    def run(self):
+        root = self._root()
+        cutoff = time.time() - self.min_age_seconds
+        refs = itertools.groupby(references(self.prefix, self.after), key=lambda r: r[0])
+        pending = deque()
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="scrub-walk") as walk_pool, \
+                ThreadPoolExecutor(self.workers, thread_name_prefix="scrub-hash") as hash_pool:
+            files = iter(TreeWalker(root, walk_pool, self.prefix, self.after, lookahead=self.workers * 2))
+            f = next(files, None)
+            r = next(refs, None)
+            since_checkpoint, last = 0, self.after
+            while f is not None or r is not None:
+                if r is None or (f is not None and f[0] < r[0]):
+                    path, size, mtime = f
+                    self._orphan(path, size, mtime, cutoff)
+                    f = next(files, None)
+                elif f is None or r[0] < f[0]:
+                    path, group = r[0], list(r[1])
+                    for _, kind, pk, _digest in group:
+                        self.stats["missing"] += 1
+                        self.report("missing", path, f"{kind} {pk}")
+                    r = next(refs, None)
+                else:
+                    path, size, _mtime = f
+                    group = list(r[1])
+                    self.stats["files"] += 1
+                    self.stats["bytes"] += size
+                    self.stats["referenced"] += 1
+                    if self.verify and any(g[3] for g in group):
+                        pending.append(hash_pool.submit(self._verify, path, group))
+                        if len(pending) >= self.workers * 4:
+                            self._drain(pending, block=True)
+                    f, r = next(files, None), next(refs, None)
+                self._drain(pending, block=False)
+
+                last = path
+                since_checkpoint += 1
+                if since_checkpoint >= CHECKPOINT_EVERY:
+                    self._drain(pending, block=True)  # 断点之前的校验必须都做完
+                    self._save_checkpoint(last)
+                    since_checkpoint = 0
+            self._drain(pending, block=True)
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)  # 跑完了：下次从头开始
+        return self.stats
+
+    def _orphan(self, path, size, mtime, cutoff):
+        self.stats["files"] += 1
+        self.stats["bytes"] += size
+        if mtime > cutoff:
+            return  # 可能是还没提交的上传
+        self.stats["orphans"] += 1
+        self.stats["orphan_bytes"] += size
+        self.report("orphan", path, f"{size} bytes")
+        if self.delete_orphans:
+            default_storage.delete(path)
+            self.stats["deleted"] += 1
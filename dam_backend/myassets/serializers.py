@@ -1,7 +1,53 @@
 # serializers.py —— 保留原有功能，增加 tag_ids 写入支持与前端兼容字段
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.http import urlencode
 from rest_framework import serializers
-from .models import Asset, Tag, UserProfile, AssetVersion
+from . import quotas, renditions, tiering, uploads
+from .models import Asset, Tag, UserProfile, AssetVersion, RequestProfile, StorageUsage
+
+THUMBNAIL_WIDTH = 480  # 列表卡片用的缩略图宽度
+
+
+# -------- 稀疏字段集：?fields=a,b / ?omit=c --------
+def _csv_param(raw):
+    return [p.strip() for p in str(raw or "").split(",") if p.strip()]
+
+
+def sparse_fieldset(request, available):
+    """
+    根据 ?fields= / ?omit= 计算本次要输出的字段集合（只对 GET/HEAD 生效）。
+    未指定返回 None；"id" 总是保留，方便前端做 key。
+    """
+    if request is None or request.method not in ("GET", "HEAD"):
+        return None
+    q = getattr(request, "query_params", None) or request.GET
+    fields, omit = _csv_param(q.get("fields")), _csv_param(q.get("omit"))
+    if not fields and not omit:
+        return None
+
+    available = set(available)
+    keep = {f for f in fields if f in available} if fields else set(available)
+    keep -= set(omit)
+    if "id" in available:
+        keep.add("id")
+    return keep
+
+
+class SparseFieldsetMixin:
+    """ModelSerializer 混入：按请求裁掉不需要的读字段（写字段不受影响）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        readable = [name for name, f in self.fields.items() if not f.write_only]
+        keep = sparse_fieldset(self.context.get("request"), readable)
+        if keep is None:
+            return
+        for name in readable:
+            if name not in keep:
+                self.fields.pop(name)
+
 
 # -------- Tags --------
 class TagSerializer(serializers.ModelSerializer):
@@ -44,10 +90,18 @@ class AssetVersionSerializer(serializers.ModelSerializer):
             "uploaded_at",   # 兼容字段
             "uploaded_by",
             "note",
+            "storage_tier",  # hot / cold（cold 时 file_url 指向回温接口）
+            "content_hash",  # 上传时算好的 sha256
+            "mime_type",     # 按文件头识别的类型
+            "size_bytes",    # 原文件大小
         ]
 
     def get_file_url(self, obj):
         request = self.context.get("request")
+        if obj.storage_tier == "cold" or obj.delta_name:  # 冷存储 / 差量版本都走版本文件接口
+            url = reverse("assets-version-file", args=[obj.asset_id, obj.version])
+            url += "?sig=" + tiering.sign_version(obj)
+            return request.build_absolute_uri(url) if request else url
         file_field = getattr(obj, "file", None)
         if file_field is not None and hasattr(file_field, "url"):
             url = file_field.url
@@ -66,11 +120,13 @@ class AssetVersionSerializer(serializers.ModelSerializer):
 
 
 # -------- Asset --------
-class AssetSerializer(serializers.ModelSerializer):
+class AssetSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     # 读：保持原有的嵌套 tags 列表
     tags = TagSerializer(many=True, read_only=True)
     uploaded_by = serializers.SerializerMethodField()
     file_url = serializers.SerializerMethodField()
+    preview_model_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
 
     # 写：新增 tag_ids，可通过 multipart 多次传入 ?tag_ids=1&tag_ids=2 … 或 JSON 数组 / CSV 字符串
     tag_ids = serializers.ListField(
@@ -96,7 +152,17 @@ class AssetSerializer(serializers.ModelSerializer):
             "download_count",
             "view_count",
             "uploaded_by",
+            "metadata",      # 后台抽取的技术元数据（只读）
+            "extracted_at",
+            "preview_model_url",  # 3D 轻量预览（model_preview.py），没有时为 null
+            "thumbnail_url",      # 图片缩略图（renditions.py），非图片为 null
+            "content_hash",       # 上传时边收边算的 sha256（uploads.py）
+            "mime_type",          # 按文件头识别的真实类型
+            "size_bytes",         # 当前文件大小（计入存储用量，quotas.py）
         ]
+        read_only_fields = ["metadata", "extracted_at", "content_hash", "mime_type", "size_bytes"]
+        # 不传时按文件头识别出的类型填（validate）
+        extra_kwargs = {"asset_type": {"required": False}}
 
     # --------- 读字段保留原有逻辑 ---------
     def get_file_url(self, obj):
@@ -107,12 +173,56 @@ class AssetSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(url) if request else url
         return None
 
+    def get_preview_model_url(self, obj):
+        if obj.asset_type != "3d_model":
+            return None
+        # 视图里预取到 preview_models；其他地方（增量同步等）退回单独查询
+        found = getattr(obj, "preview_models", None)
+        if found is None:
+            found = obj.derivatives.filter(kind="preview_model", status="ready")
+        for d in found:
+            if d.is_current(obj):
+                request = self.context.get("request")
+                url = default_storage.url(d.path)
+                return request.build_absolute_uri(url) if request else url
+        return None
+
+    def get_thumbnail_url(self, obj):
+        if obj.asset_type != "image" or not obj.file:
+            return None
+        query = urlencode({"w": THUMBNAIL_WIDTH, "fmt": "webp", "v": renditions.version_tag(obj),
+                           "sig": renditions.sign(obj)})
+        url = reverse("assets-render", args=[obj.pk]) + "?" + query
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
     def get_uploaded_by(self, obj):
         u = getattr(obj, "uploaded_by", None)
         if not u:
             return None
         return {"id": u.id, "username": u.username}
 
+    # --------- 上传文件：核对类型、带上哈希 ---------
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        upload = attrs.get("file")
+        claimed = attrs.get("asset_type") or (self.instance.asset_type if self.instance else "")
+        if upload is not None:
+            asset_type, error = uploads.resolve_asset_type(claimed, upload)
+            if error:
+                raise serializers.ValidationError({"file": error})
+            if asset_type and upload.size > uploads.limit_for(asset_type):
+                raise serializers.ValidationError(
+                    {"file": f"{asset_type} uploads are limited to {uploads.limit_for(asset_type)} bytes."})
+            claimed = asset_type
+            attrs["content_hash"] = getattr(upload, "sha256", "")
+            attrs["mime_type"] = getattr(upload, "detected_mime", "")
+            attrs["size_bytes"] = upload.size
+        if not claimed:
+            raise serializers.ValidationError({"asset_type": "This field is required."})
+        attrs["asset_type"] = claimed
+        return attrs
+
     # --------- 写入标签的辅助 ---------
     def _extract_tag_ids(self, validated_data):
         """
@@ -178,6 +288,13 @@ class AssetSerializer(serializers.ModelSerializer):
         return instance
 
 
+class DirectUploadAssetSerializer(AssetSerializer):
+    """客户端直传对象存储后登记资产：文件已经在存储里，对象键由视图在 save(file=…) 时给出"""
+
+    class Meta(AssetSerializer.Meta):
+        extra_kwargs = {**AssetSerializer.Meta.extra_kwargs, "file": {"read_only": True}}
+
+
 # ===================== Admin 用户管理（新增） =====================
 
 class AdminUserReadSerializer(serializers.ModelSerializer):
@@ -256,3 +373,71 @@ class AdminUserWriteSerializer(serializers.ModelSerializer):
                 up.role = r
                 up.save()
         return instance
+
+
+class AdminUserBulkSerializer(serializers.Serializer):
+    """
+    管理端批量修改：{"ids": [...], "role": "editor", "is_active": false}，role / is_active 至少给一个
+    """
+    BULK_MAX = 5000
+
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=BULK_MAX)
+    role = serializers.ChoiceField(choices=[r for r, _ in UserProfile.USER_ROLES], required=False)
+    is_active = serializers.BooleanField(required=False)
+
+    def validate(self, attrs):
+        if "role" not in attrs and "is_active" not in attrs:
+            raise serializers.ValidationError("role or is_active is required")
+        attrs["ids"] = sorted(set(attrs["ids"]))
+        return attrs
+
+
+# ===================== 请求剖析（Admin 只读） =====================
+
+class RequestProfileListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RequestProfile
+        fields = [
+            "id",
+            "created_at",
+            "method",
+            "path",
+            "status_code",
+            "duration_ms",
+            "trigger",
+            "user_id",
+            "query_count",
+            "sql_time_ms",
+        ]
+
+
+class RequestProfileDetailSerializer(RequestProfileListSerializer):
+    class Meta(RequestProfileListSerializer.Meta):
+        fields = RequestProfileListSerializer.Meta.fields + ["folded_stacks", "stats", "sql"]
+
+
+# ===================== 存储用量（Admin） =====================
+
+class StorageUsageSerializer(serializers.ModelSerializer):
+    label = serializers.SerializerMethodField()            # 用户名 / 品牌名
+    effective_quota = serializers.SerializerMethodField()  # 单独设的或默认配额；null = 不限
+    used_ratio = serializers.SerializerMethodField()
+    quota_bytes = serializers.IntegerField(min_value=0, allow_null=True, required=False)
+
+    class Meta:
+        model = StorageUsage
+        fields = ["id", "scope", "key", "label", "bytes", "assets", "quota_bytes", "effective_quota",
+                  "used_ratio", "updated_at"]
+        read_only_fields = ["scope", "key", "bytes", "assets", "updated_at"]
+
+    def get_label(self, obj):
+        if obj.scope == quotas.USER:
+            return obj.user.username if obj.user else f"#{obj.key}"
+        return obj.key
+
+    def get_effective_quota(self, obj):
+        return quotas.quota_for(obj)
+
+    def get_used_ratio(self, obj):
+        quota = quotas.quota_for(obj)
+        return round(obj.bytes / quota, 4) if quota else None
@@ -1,7 +1,9 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, pre_save, m2m_changed
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from .models import UserProfile, Asset, AssetVersion, Tag
+from .changefeed import record_change
+from . import caching, deltas, events, extraction, model_preview, quotas, transcoding
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -9,5 +11,130 @@ def create_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.create(user=instance)
 
 @receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    instance.userprofile.save()
\ No newline at end of file
+def save_user_profile(sender, instance, created, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return  # 登录时只更新 last_login：角色、用户名都没变
+    caching.user_state.invalidate(instance.pk)
+    # 只有已经加载过、而且改了的 profile 才需要保存（不为此多查一次 / 多写一次）
+    if not created and User.userprofile.is_cached(instance):
+        profile = instance.userprofile
+        if profile.pk is None or profile.role != profile._saved_role:
+            profile.save()
+
+@receiver(post_init, sender=UserProfile)
+def remember_profile_role(sender, instance, **kwargs):
+    instance._saved_role = instance.__dict__.get("role")
+
+@receiver(post_save, sender=UserProfile)
+def profile_saved(sender, instance, raw=False, **kwargs):
+    instance._saved_role = instance.role
+    caching.user_state.invalidate(instance.user_id)
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    caching.user_state.invalidate(instance.pk)
+
+
+# ---------- 变更日志（增量同步）+ 事件推送（SSE） ----------
+# 计数器用 queryset.update() 自增，不触发这里，避免刷屏（计数事件由视图单独发）
+@receiver(post_save, sender=Asset)
+def log_asset_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    record_change("create" if created else "update", asset_id=instance.pk)
+    events.publish_asset("asset.created" if created else "asset.updated", instance)
+    # 新建 / 换了文件（上传新版本、恢复版本）时排队抽取文本和元数据（同一资产只排一个）
+    if instance.file and (created or instance.file.name != (instance.metadata or {}).get("source")):
+        extraction.enqueue_for_asset(instance.pk)
+        if instance.asset_type == "video":
+            transcoding.enqueue_for_asset(instance.pk)
+        elif instance.asset_type == "3d_model":
+            model_preview.enqueue_for_asset(instance.pk)
+
+@receiver(post_delete, sender=Asset)
+def log_asset_deleted(sender, instance, **kwargs):
+    record_change("delete", asset_id=instance.pk)
+    events.publish_asset("asset.deleted", instance, with_tags=False)
+
+@receiver(m2m_changed, sender=Asset.tags.through)
+def log_asset_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        record_change("tags", asset_id=instance.pk)
+        events.publish_asset("asset.updated", instance)
+    else:
+        # 从 Tag 一侧改关系：instance 是 Tag，pk_set 是受影响的资产
+        for asset_id in sorted(pk_set or ()):
+            record_change("tags", asset_id=asset_id)
+        caching.asset_detail.invalidate(*(pk_set or ()))
+
+@receiver(post_save, sender=AssetVersion)
+def log_version_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_change("version", asset_id=instance.asset_id, version=instance.version)
+        events.publish_asset("version.created", instance.asset, version=instance.version)
+        if deltas.enabled_for(instance.asset.asset_type):
+            # 新版本让上一个版本成为历史版本：排队编成差量
+            deltas.enqueue_for_asset(instance.asset_id)
+
+@receiver(post_save, sender=Tag)
+def log_tag_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_change("tag", tag_id=instance.pk)
+        _invalidate_tag_caches(instance)
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    # 删除时关系行会被级联删掉，所以在删除前取受影响的资产
+    _invalidate_tag_caches(instance)
+
+def _invalidate_tag_caches(tag):
+    # 标签列表 + 带这个标签的资产详情（详情里嵌着标签名）
+    caching.tag_list.invalidate("all")
+    caching.asset_detail.invalidate(
+        *Asset.tags.through.objects.filter(tag_id=tag.pk).values_list("asset_id", flat=True))
+
+@receiver(post_delete, sender=Tag)
+def log_tag_deleted(sender, instance, **kwargs):
+    record_change("tag_delete", tag_id=instance.pk)
+
+
+# ---------- 存储用量（quotas.py）：资产 / 版本入库、删除时同一事务里记差额 ----------
+USAGE_FIELDS = {"file", "size_bytes", "brand", "uploaded_by", "uploaded_by_id"}
+_UNTRACKED = object()
+
+@receiver(pre_save, sender=Asset)
+def usage_before_asset_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and not USAGE_FIELDS & set(update_fields)):
+        instance._usage_before = _UNTRACKED  # 计数器、抽取结果之类的保存不影响用量
+        return
+    if instance.size_bytes is None and instance.file:
+        instance.size_bytes = quotas.file_size(instance.file)  # 调用方没带大小（admin 等）时补上
+    instance._usage_before = quotas.footprint(instance.pk) if instance.pk else None
+
+@receiver(post_save, sender=Asset)
+def usage_after_asset_save(sender, instance, **kwargs):
+    before = instance.__dict__.pop("_usage_before", _UNTRACKED)
+    if before is not _UNTRACKED:
+        quotas.apply(before, quotas.footprint(instance.pk))
+
+@receiver(pre_delete, sender=Asset)
+def usage_asset_deleting(sender, instance, **kwargs):
+    # 版本行随资产级联删除，要在删之前算
+    quotas.apply(quotas.footprint(instance.pk), None)
+
+@receiver(pre_save, sender=AssetVersion)
+def usage_version_size(sender, instance, raw=False, **kwargs):
+    if not raw and instance.pk is None and instance.size_bytes is None and instance.file:
+        instance.size_bytes = quotas.file_size(instance.file)
+
+@receiver(post_save, sender=AssetVersion)
+def usage_version_created(sender, instance, created, raw=False, **kwargs):
+    if not created or raw or not instance.size_bytes:
+        return
+    name = instance.file.name
+    shared = (Asset.objects.filter(pk=instance.asset_id, file=name).exists()
+              or AssetVersion.objects.filter(asset_id=instance.asset_id, file=name).exclude(pk=instance.pk).exists())
+    if not shared:  # 恢复出来的版本和旧版本共用文件，不另计
+        quotas.add(instance.asset.uploaded_by_id, instance.asset.brand, instance.size_bytes)
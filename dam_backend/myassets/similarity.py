@@ -0,0 +1,300 @@
+# myassets/similarity.py —— 感知哈希：相似图片 / 近重复检测
+"""
+哈希：pHash（32x32 灰度 → 8x8 低频 DCT，和中位数比较）与 dHash（9x8 相邻像素梯度），
+      都是 64 位；视频取前若干个关键帧（ffmpeg -skip_frame nokey，只解关键帧）。
+      只依赖 Pillow；DCT 只算需要的 8x8 低频块，纯 Python 也只有约一万次乘法。
+
+索引：multi-index hashing —— 64 位拆成 4 段 16 位（AssetHash.h0..h3，各自有索引）。
+      汉明距离 ≤ r 的两个哈希，按抽屉原理至少有一段距离 ≤ r // 4，
+      于是查询只需要在 4 列上各查 “距离 ≤ r//4 的 16 位邻居” 这些桶（r ≤ 7 时每列 17 个值），
+      候选再用 XOR + popcount 精确校验（有 NumPy 时向量化）。
+      桶按段距离由近到远（0、1、2、3）一圈一圈查，候选累计到 MAX_CANDIDATES 就停，
+      并报告 truncated：热门桶（纯色 / 空白图）挤掉的是段距离最远的那些，而且调用方知道结果不全。
+
+近重复报告：r ≤ 3 时两个哈希至少有一段完全相同，按每一列排序流式扫描、
+      同值分组两两比较，并查集合并成组 —— 4 次顺序扫描，不做 N² 比较；
+      一个分组里不同哈希值超过 MAX_BUCKET_VALUES 个时只合并完全相同的，并报告 truncated。
+"""
+import itertools
+import logging
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+
+from .models import AssetHash
+
+try:  # 可选：候选较多时向量化计算距离
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+logger = logging.getLogger(__name__)
+
+MASK64 = (1 << 64) - 1
+MAX_DISTANCE = 12          # 4 段 × 每段半径 3
+DUPLICATE_MAX_DISTANCE = 3
+MAX_CANDIDATES = 20_000    # 纯色图之类的“热门桶”保护
+MAX_BUCKET_VALUES = 1_000  # 近重复报告里一个分组最多两两比较多少个不同值（约 50 万对）
+HASHED_TYPES = ("image", "video")
+
+
+# ---------------- 编码 ----------------
+def to_signed(value: int) -> int:
+    value &= MASK64
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def to_unsigned(value: int) -> int:
+    return value & MASK64
+
+
+def chunks(value: int):
+    u = to_unsigned(value)
+    return [(u >> shift) & 0xFFFF for shift in (48, 32, 16, 0)]
+
+
+def hamming(a: int, b: int) -> int:
+    return ((a ^ b) & MASK64).bit_count()
+
+
+@lru_cache(maxsize=4)
+def _flip_masks(radius: int):
+    masks = [0]
+    for r in range(1, radius + 1):
+        for bits in itertools.combinations(range(16), r):
+            masks.append(sum(1 << b for b in bits))
+    return masks
+
+
+@lru_cache(maxsize=4)
+def _shell_masks(radius: int):
+    """恰好翻转 radius 位的掩码"""
+    return [sum(1 << b for b in bits) for bits in itertools.combinations(range(16), radius)]
+
+
+def _neighbours(chunk: int, radius: int):
+    return {chunk ^ m for m in _flip_masks(radius)}
+
+
+# ---------------- 计算哈希 ----------------
+@lru_cache(maxsize=1)
+def _dct_matrix():
+    # DCT-II 的前 8 行（只需要低频部分）
+    return [[math.cos(math.pi * (2 * n + 1) * k / 64) for n in range(32)] for k in range(8)]
+
+
+def _bits_to_int(bits) -> int:
+    out = 0
+    for b in bits:
+        out = (out << 1) | (1 if b else 0)
+    return out
+
+
+def phash(img) -> int:
+    from PIL import Image
+
+    gray = img.convert("L").resize((32, 32), Image.Resampling.LANCZOS)
+    px = list(gray.getdata())
+    rows = [px[i * 32:(i + 1) * 32] for i in range(32)]
+    c = _dct_matrix()
+    # tmp = C · P（8x32），dct = tmp · Cᵀ（8x8）
+    tmp = [[sum(c[k][n] * rows[n][j] for n in range(32)) for j in range(32)] for k in range(8)]
+    dct = [sum(tmp[k][j] * c[m][j] for j in range(32)) for k in range(8) for m in range(8)]
+    median = sorted(dct)[32]
+    return _bits_to_int(v > median for v in dct)
+
+
+def dhash(img) -> int:
+    from PIL import Image
+
+    gray = img.convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+    px = list(gray.getdata())
+    return _bits_to_int(px[r * 9 + c] > px[r * 9 + c + 1] for r in range(8) for c in range(8))
+
+
+def hash_image(path):
+    from PIL import Image
+
+    with Image.open(path) as img:
+        img.draft("L", (64, 64))  # JPEG 直接按缩小尺寸解码
+        return {"phash": phash(img), "dhash": dhash(img)}
+
+
+def _video_keyframes(path, workdir, max_frames):
+    ffmpeg = shutil.which(getattr(settings, "FFMPEG_BINARY", "ffmpeg"))
+    if not ffmpeg:
+        return []
+    subprocess.run(
+        [ffmpeg, "-v", "error", "-skip_frame", "nokey", "-i", path, "-an", "-vsync", "vfr",
+         "-frames:v", str(max_frames), "-vf", "scale=64:-2", os.path.join(workdir, "%03d.png")],
+        capture_output=True, timeout=300, check=True,
+    )
+    return sorted(os.path.join(workdir, f) for f in os.listdir(workdir) if f.endswith(".png"))
+
+
+def compute_hashes(path, asset_type):
+    """返回 [(frame, {"phash": int, "dhash": int}), ...]；不支持的类型返回 []"""
+    if asset_type == "image":
+        return [(0, hash_image(path))]
+    if asset_type == "video":
+        max_frames = int(getattr(settings, "SIMILARITY_VIDEO_KEYFRAMES", 8))
+        with tempfile.TemporaryDirectory(prefix="dam-frames-") as workdir:
+            frames = _video_keyframes(path, workdir, max_frames)
+            out, last = [], None
+            for i, frame_path in enumerate(frames):
+                h = hash_image(frame_path)
+                # 连续几乎相同的关键帧（静止镜头）只留一个
+                if last is not None and hamming(h["phash"], last) <= 2:
+                    continue
+                out.append((i, h))
+                last = h["phash"]
+            return out
+    return []
+
+
+def store(asset_id, hashes):
+    """替换资产的哈希行（调用方负责事务）"""
+    AssetHash.objects.filter(asset_id=asset_id).delete()
+    rows = []
+    for frame, by_algo in hashes:
+        for algorithm, value in by_algo.items():
+            h0, h1, h2, h3 = chunks(value)
+            rows.append(AssetHash(asset_id=asset_id, algorithm=algorithm, frame=frame,
+                                  value=to_signed(value), h0=h0, h1=h1, h2=h2, h3=h3))
+    AssetHash.objects.bulk_create(rows)
+    return len(rows)
+
+
+# ---------------- 查询 ----------------
+def _distances(sources, candidates):
+    """每个候选到 sources 中最近一个的汉明距离"""
+    if np is not None and len(candidates) * len(sources) > 256:
+        src = np.array([to_unsigned(s) for s in sources], dtype=np.uint64)[:, None]
+        cand = np.array([to_unsigned(c) for c in candidates], dtype=np.uint64)[None, :]
+        x = src ^ cand
+        if hasattr(np, "bitwise_count"):
+            bits = np.bitwise_count(x)
+        else:
+            bits = np.unpackbits(x.view(np.uint8), axis=-1).reshape(x.shape + (64,)).sum(axis=-1)
+        return bits.min(axis=0).tolist()
+    return [min(hamming(s, c) for s in sources) for c in candidates]
+
+
+def nearest(values, algorithm="phash", max_distance=10, limit=20, exclude_asset=None):
+    """
+    values：查询哈希（视频是多帧）
+    返回 ([(asset_id, distance), ...] 按距离、id 排序, truncated)；
+    truncated 表示候选超过 MAX_CANDIDATES，段距离更远的桶没查完，可能漏掉真正的近邻
+    """
+    max_distance = max(0, min(int(max_distance), MAX_DISTANCE))
+    radius = max_distance // 4
+    columns = [chunks(v) for v in values]
+
+    rows, truncated = set(), False
+    for shell in range(radius + 1):
+        # 每列单独查再 UNION ALL：每个子查询都能走 (algorithm, hX) 索引；
+        # 写成一个 OR 条件时 SQLite 等会退化为按 algorithm 扫全表
+        parts = []
+        for i in range(4):
+            bucket = sorted({cols[i] ^ m for cols in columns for m in _shell_masks(shell)})
+            qs = AssetHash.objects.filter(algorithm=algorithm, **{f"h{i}__in": bucket})
+            if exclude_asset is not None:
+                qs = qs.exclude(asset_id=exclude_asset)
+            parts.append(qs.values_list("asset_id", "value"))
+        room = MAX_CANDIDATES - len(rows)
+        found = list(parts[0].union(*parts[1:], all=True)[:room])
+        rows.update(found)
+        if len(found) >= room:
+            truncated = True
+            logger.warning("similarity search hit %d candidates at chunk radius %d of %d; results are partial",
+                           MAX_CANDIDATES, shell, radius)
+            break
+    if not rows:
+        return [], truncated
+
+    rows = list(rows)
+    best = {}
+    for (asset_id, _), d in zip(rows, _distances(values, [v for _, v in rows])):
+        if d <= max_distance and d < best.get(asset_id, 65):
+            best[asset_id] = d
+    return sorted(best.items(), key=lambda kv: (kv[1], kv[0]))[:limit], truncated
+
+
+def similar_to(asset_id, algorithm="phash", max_distance=10, limit=20):
+    """(结果, truncated)，同 nearest()；资产还没有哈希（未处理完 / 类型不支持）时返回 None"""
+    values = list(AssetHash.objects.filter(asset_id=asset_id, algorithm=algorithm).values_list("value", flat=True))
+    if not values:
+        return None
+    return nearest(values, algorithm, max_distance, limit, exclude_asset=asset_id)
+
+
+# ---------------- 近重复报告 ----------------
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        parent = self.parent
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def duplicate_groups(algorithm="phash", max_distance=DUPLICATE_MAX_DISTANCE, chunk_size=5000):
+    """
+    返回 (近重复资产分组 [[asset_id, ...], ...]（组内按 id 排序，组按大小降序）, truncated)
+    max_distance 最大为 3（保证至少一段完全相同）；truncated 表示有分组太大，只合并了完全相同的哈希
+    """
+    max_distance = max(0, min(int(max_distance), DUPLICATE_MAX_DISTANCE))
+    uf = _UnionFind()
+    # 距离 0 时一列就够（整值相等则每段都相等）
+    columns = ["h0"] if max_distance == 0 else ["h0", "h1", "h2", "h3"]
+    truncated = False
+
+    def flush(group):
+        # group: {value: [asset_id, ...]}；同值直接合并，不同值两两校验
+        nonlocal truncated
+        for ids in group.values():
+            for other in ids[1:]:
+                uf.union(ids[0], other)
+        if max_distance and len(group) > MAX_BUCKET_VALUES:
+            truncated = True
+            logger.warning("duplicate report: a bucket with %d distinct hashes was only merged on exact matches",
+                           len(group))
+        elif max_distance and len(group) > 1:
+            values = list(group)
+            for a, b in itertools.combinations(values, 2):
+                if hamming(a, b) <= max_distance:
+                    uf.union(group[a][0], group[b][0])
+
+    for col in columns:
+        rows = (AssetHash.objects.filter(algorithm=algorithm).order_by(col)
+                .values_list(col, "value", "asset_id").iterator(chunk_size=chunk_size))
+        current, group = None, {}
+        for key, value, asset_id in rows:
+            if key != current:
+                if len(group) > 1 or any(len(v) > 1 for v in group.values()):
+                    flush(group)
+                current, group = key, {}
+            group.setdefault(value, []).append(asset_id)
+        if len(group) > 1 or any(len(v) > 1 for v in group.values()):
+            flush(group)
+
+    groups = {}
+    for asset_id in list(uf.parent):
+        groups.setdefault(uf.find(asset_id), set()).add(asset_id)
+    out = [sorted(g) for g in groups.values() if len(g) > 1]
+    out.sort(key=lambda g: (-len(g), g[0]))
+    return out, truncated
@@ -0,0 +1,87 @@
+# myassets/streaming.py —— 大列表流式输出（不分页的全量导出）
+"""
+?stream=1（JSON 数组）/ ?stream=ndjson / Accept: application/x-ndjson 时：
+- 服务端游标（queryset.iterator）按块读取，prefetch_related 也按块执行
+- 每块序列化后立刻编码并 yield，内存占用与总行数无关，首字节立即返回
+"""
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+
+from .renderers import NDJSONRenderer, dumps
+
+STREAM_CHUNK_SIZE = 500
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while True:
+        block = list(islice(it, size))
+        if not block:
+            return
+        yield block
+
+
+def stream_format(request):
+    """返回 'json' / 'ndjson' / None"""
+    flag = str(request.query_params.get("stream", "")).strip().lower()
+    if flag == "ndjson":
+        return "ndjson"
+    if flag in ("1", "true", "yes", "json"):
+        return "json"
+    renderer = getattr(request, "accepted_renderer", None)
+    if renderer is not None and getattr(renderer, "format", None) == NDJSONRenderer.format:
+        return "ndjson"
+    return None
+
+
+def stream_queryset(queryset, serializer_class, context, fmt="json", chunk_size=STREAM_CHUNK_SIZE):
+    # 生成器在视图返回后才执行，先把当前请求选定的库（主库/副本）固定下来
+    queryset = queryset.using(queryset.db)
+
+    def rows():
+        # iterator(chunk_size=...)：PostgreSQL 下走服务端游标；带 prefetch 时每块单独预取
+        for block in _chunks(queryset.iterator(chunk_size=chunk_size), chunk_size):
+            yield serializer_class(block, many=True, context=context).data
+
+    def ndjson():
+        for data in rows():
+            yield b"".join(dumps(row) + b"\n" for row in data)
+
+    def json_array():
+        yield b"["
+        first = True
+        for data in rows():
+            if not data:
+                continue
+            body = b",".join(dumps(row) for row in data)
+            yield body if first else b"," + body
+            first = False
+        yield b"]"
+
+    if fmt == "ndjson":
+        resp = StreamingHttpResponse(ndjson(), content_type=NDJSONRenderer.media_type)
+    else:
+        resp = StreamingHttpResponse(json_array(), content_type="application/json")
+    resp["Cache-Control"] = "no-store"
+    resp["X-Accel-Buffering"] = "no"  # 关闭 nginx 缓冲，保证逐块下发
+    return resp
+
+
+class StreamingListMixin:
+    """给 ModelViewSet 用：list 在请求流式时改走 stream_queryset，其余行为不变"""
+
+    stream_chunk_size = STREAM_CHUNK_SIZE
+
+    def list(self, request, *args, **kwargs):
+        fmt = stream_format(request)
+        if fmt is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_queryset(
+            queryset,
+            self.get_serializer_class(),
+            self.get_serializer_context(),
+            fmt=fmt,
+            chunk_size=self.stream_chunk_size,
+        )
@@ -0,0 +1,38 @@
+# myassets/tasks.py —— 后台任务处理函数（由 manage.py run_worker 执行）
+from .jobs import task, purge_finished
+from . import changefeed, deltas, extraction, model_preview, tiering, transcoding
+
+
+@task("jobs.purge_finished", max_attempts=1)
+def purge_finished_jobs(older_than_days=7):
+    purge_finished(older_than_days)
+
+
+@task("changes.compact", max_attempts=3)
+def compact_changes(retain_days=30):
+    changefeed.compact(retain_days=retain_days)
+
+
+@task("assets.extract", max_attempts=3)
+def extract_asset(asset_id, force=False):
+    extraction.run_for_asset(asset_id, force=force)
+
+
+@task("assets.transcode", max_attempts=2)
+def transcode_asset(asset_id, force=False):
+    transcoding.run_for_asset(asset_id, force=force)
+
+
+@task("assets.model_preview", max_attempts=2)
+def build_model_preview(asset_id, force=False):
+    model_preview.run_for_asset(asset_id, force=force)
+
+
+@task("versions.tier", max_attempts=1)
+def tier_versions(older_than_days=None, keep_last=None, limit=None):
+    tiering.run(older_than_days=older_than_days, keep_last=keep_last, limit=limit)
+
+
+@task("versions.delta", max_attempts=2)
+def delta_versions(asset_id):
+    deltas.run_for_asset(asset_id)
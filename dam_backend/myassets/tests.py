@@ -1,3 +1,642 @@
-from django.test import TestCase
+# myassets/tests.py —— 核心不变量的回归测试（manage.py test myassets；SQLite 替身即可跑：DB_ENGINE=django.db.backends.sqlite3）
+import io
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import caching, changefeed, db_routing, deltas, jobs, quotas, throttling
+from .models import Asset, AssetChange, AssetVersion, Job, StorageUsage, Tag
+
+WORDS = ["brand", "campaign", "poster", "logo", "hero", "banner", "catalog", "spec", "manual", "draft"]
+
+
+def _text(rng, size):
+    out = bytearray()
+    while len(out) < size:
+        out += (" ".join(rng.choice(WORDS) for _ in range(12)) + "\n").encode()
+    return bytes(out[:size])
+
+
+class MediaTestCase(TestCase):
+    """每个测试类一个临时 MEDIA_ROOT；editor 账号 + 已登录的 APIClient"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp(prefix="dam-test-media-")
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media, THROTTLING={"ENABLED": False})
+        media.enable()
+        self.addCleanup(media.disable)
+        self.editor = self.make_user("ed", "editor")
+        self.client = self.client_for(self.editor)
+
+    @staticmethod
+    def make_user(name, role):
+        user = User.objects.create_user(name, f"{name}@example.com", "pw123456")
+        user.userprofile.role = role
+        user.userprofile.save()
+        return user
+
+    @staticmethod
+    def client_for(user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def upload(self, data, name="doc.txt", **fields):
+        fields.setdefault("name", name)
+        fields.setdefault("asset_no", name)
+        fields.setdefault("asset_type", "document")
+        resp = self.client.post("/api/assets/", {**fields, "file": SimpleUploadedFile(name, data)}, format="multipart")
+        self.assertEqual(resp.status_code, 201, resp.data)
+        return resp.data["id"]
+
+    def upload_version(self, asset_id, data, name="doc.txt"):
+        resp = self.client.post(f"/api/assets/{asset_id}/versions/", {"file": SimpleUploadedFile(name, data)},
+                                format="multipart")
+        self.assertEqual(resp.status_code, 201, resp.data)
+        return resp
+
+
+# ---------------- 差量存储（deltas.py） ----------------
+class DeltaCodecTests(TestCase):
+    def roundtrip(self, base, target):
+        out = io.BytesIO()
+        size = deltas.encode(io.BytesIO(base), io.BytesIO(target), out)
+        delta_size = out.tell()
+        out.seek(0)
+        reader = deltas.DeltaReader(out, io.BytesIO(base))
+        with io.BufferedReader(reader) as fh:
+            rebuilt = fh.read()
+        return size, reader, rebuilt, delta_size
+
+    def test_roundtrip_with_edits(self):
+        rng = random.Random(1)
+        base = bytes(rng.getrandbits(8) for _ in range(300_000))
+        target = base[:100_000] + b"INSERTED" * 200 + base[100_000:250_000] + base[260_000:]
+        size, reader, rebuilt, delta_size = self.roundtrip(base, target)
+        self.assertEqual(rebuilt, target)
+        self.assertEqual(size, len(target))
+        self.assertEqual(reader.size, len(target))
+        self.assertLess(delta_size, len(target) // 4)  # 大部分块在关键帧里找得到
+
+    def test_roundtrip_edge_cases(self):
+        rng = random.Random(2)
+        data = bytes(rng.getrandbits(8) for _ in range(50_000))
+        for base, target in ((b"", data), (data, b""), (data, data), (b"tiny", b"tinier"), (data, data[::-1])):
+            self.assertEqual(self.roundtrip(base, target)[2], target)
+
+    def test_chunking_does_not_depend_on_read_size(self):
+        data = bytes(random.Random(3).getrandbits(8) for _ in range(200_000))
+
+        class Trickle(io.BytesIO):
+            def read(self, n=-1):
+                return super().read(min(n, 777) if n and n > 0 else 777)
+
+        self.assertEqual(list(deltas.iter_chunks(io.BytesIO(data))), list(deltas.iter_chunks(Trickle(data))))
+
+    def test_rejects_foreign_and_corrupt_input(self):
+        with self.assertRaises(deltas.DeltaError):
+            deltas.DeltaReader(io.BytesIO(b"not a delta"), io.BytesIO())
+        bad = io.BytesIO(deltas.MAGIC + deltas._HEADER.pack(3, bytes(32)) + b"X")
+        with self.assertRaises(deltas.DeltaError):
+            io.BufferedReader(deltas.DeltaReader(bad, io.BytesIO())).read()
+
+
+@override_settings(VERSION_DELTAS={"ENABLED": True, "ASSET_TYPES": ["document"], "KEYFRAME_INTERVAL": 2,
+                                   "MAX_RATIO": 0.5})
+class DeltaVersionTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        rng = random.Random(4)
+        doc = bytearray(_text(rng, 60_000))
+        self.asset_id = self.upload(bytes(doc))
+        self.contents = {}  # 版本号 → 内容（新建资产不产生版本，第一次上传新版本是 v1）
+        for n in range(1, 8):
+            doc[n * 3000:n * 3000] = f" revision {n} ".encode() * 10
+            resp = self.upload_version(self.asset_id, bytes(doc))
+            self.contents[resp.data["version"]] = bytes(doc)
+        self.stats = deltas.run_for_asset(self.asset_id)
+
+    def versions(self):
+        return {v.version: v for v in AssetVersion.objects.filter(asset_id=self.asset_id)}
+
+    def read(self, version):
+        with deltas.open_version(version) as fh:
+            return fh.read()
+
+    def test_keyframe_interval(self):
+        versions = self.versions()
+        latest = versions[max(versions)]
+        self.assertFalse(latest.delta_name)  # 当前文件始终是完整文件
+        self.assertEqual(latest.file.name, Asset.objects.get(pk=self.asset_id).file.name)
+        since = None
+        for n in sorted(versions)[:-1]:
+            v = versions[n]
+            if v.delta_name:
+                # 差量直接对着关键帧，且关键帧本身是完整文件
+                self.assertFalse(versions[AssetVersion.objects.get(pk=v.delta_base_id).version].delta_name)
+                since += 1
+                self.assertLessEqual(since, 2)
+            else:
+                since = 0
+        self.assertGreater(self.stats["encoded"], 0)
+        # 再跑一遍：不重复编码，布局不变
+        layout = {n: (v.delta_base_id, v.delta_name) for n, v in versions.items()}
+        self.assertEqual(deltas.run_for_asset(self.asset_id)["encoded"], 0)
+        self.assertEqual({n: (v.delta_base_id, v.delta_name) for n, v in self.versions().items()}, layout)
+
+    def test_every_version_reads_back(self):
+        for n, v in self.versions().items():
+            self.assertEqual(self.read(v), self.contents[n], f"v{n}")
+
+    def test_ensure_full_restores_original_name(self):
+        v = next(v for v in self.versions().values() if v.delta_name)
+        delta_name = v.delta_name
+        self.assertFalse(default_storage.exists(v.file.name))
+        with self.captureOnCommitCallbacks(execute=True):
+            deltas.ensure_full(v)
+        v.refresh_from_db()
+        self.assertEqual((v.delta_name, v.delta_base_id), ("", None))
+        with default_storage.open(v.file.name, "rb") as fh:
+            self.assertEqual(fh.read(), self.contents[v.version])
+        self.assertFalse(default_storage.exists(delta_name))
+
+    def test_ensure_full_checks_sha256(self):
+        v = next(v for v in self.versions().values() if v.delta_name)
+        with default_storage.open(v.delta_name, "rb") as fh:
+            raw = bytearray(fh.read())
+        offset = len(deltas.MAGIC) + 8  # 头部：大小（8 字节）之后是 sha256
+        raw[offset:offset + 32] = bytes(32)
+        with open(default_storage.path(v.delta_name), "wb") as fh:
+            fh.write(raw)
+        with self.assertRaises(deltas.DeltaError):
+            deltas.ensure_full(v)
+        v.refresh_from_db()
+        self.assertTrue(v.delta_name)  # 校验失败不改记录，也不留半截文件
+        self.assertFalse(default_storage.exists(v.file.name))
+
+
+# ---------------- 两级缓存（caching.py） ----------------
+class TwoTierCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cache = caching.TwoTierCache(f"test-{uuid.uuid4().hex[:8]}")
+        self.calls = []
+
+    def compute(self, value="v"):
+        def run():
+            self.calls.append(value)
+            return {"value": value}
+        return run
+
+    def test_local_then_shared_then_source(self):
+        self.assertEqual(self.cache.get_or_compute("k", self.compute()), {"value": "v"})
+        self.cache.get_or_compute("k", self.compute())
+        self.cache.drop_local()  # 另一个进程：本地层是空的，共享层有
+        self.cache.get_or_compute("k", self.compute())
+        self.assertEqual(len(self.calls), 1)
+
+    def test_invalidate_after_commit_bumps_generation(self):
+        self.cache.get_or_compute("k", self.compute("old"))
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.cache.invalidate("k")
+        self.assertEqual(self.cache.get_or_compute("k", self.compute("new")), {"value": "old"})  # 提交前不生效
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.cache.get_or_compute("k", self.compute("new")), {"value": "new"})
+
+    def test_fill_racing_an_invalidation_is_never_served(self):
+        def racing():
+            self.cache._invalidate_now(["k"])  # 回源期间数据变了
+            return {"value": "stale"}
+
+        self.assertEqual(self.cache.get_or_compute("k", racing), {"value": "stale"})
+        self.assertEqual(self.cache.get_or_compute("k", self.compute("fresh")), {"value": "fresh"})
+        self.cache.drop_local()
+        self.assertEqual(self.cache.get_or_compute("k", self.compute("again")), {"value": "fresh"})
+
+    def test_variants_share_invalidation(self):
+        self.cache.get_or_compute("k", self.compute("a"), variant="http://a/")
+        self.cache.get_or_compute("k", self.compute("b"), variant="http://b/")
+        self.cache._invalidate_now(["k"])
+        self.cache.get_or_compute("k", self.compute("a2"), variant="http://a/")
+        self.cache.get_or_compute("k", self.compute("b2"), variant="http://b/")
+        self.assertEqual(self.calls, ["a", "b", "a2", "b2"])
+
+    def test_single_flight(self):
+        gate = threading.Event()
+
+        def slow():
+            self.calls.append(1)
+            gate.wait(5)
+            return {"value": 1}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get_or_compute("k", slow)))
+                   for _ in range(8)]
+        for t in threads:
+            t.start()
+        time.sleep(0.2)
+        gate.set()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(results, [{"value": 1}] * 8)
+
+    def test_errors_are_not_cached(self):
+        def boom():
+            raise RuntimeError("source down")
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_compute("k", boom)
+        self.assertEqual(self.cache.get_or_compute("k", self.compute()), {"value": "v"})
+
+    def test_fill_reads_from_primary(self):
+        seen = []
+        token = db_routing._read_alias.set("replica1")
+        try:
+            self.cache.get_or_compute("k", lambda: seen.append(db_routing.current_read_alias()))
+            self.assertEqual(db_routing.current_read_alias(), "replica1")
+        finally:
+            db_routing._read_alias.reset(token)
+        self.assertEqual(seen, [None])
+
+
+class AssetDetailCacheTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        caching.asset_detail.drop_local()
+        self.asset_id = self.upload(b"plain text body\n")
+        self.url = f"/api/assets/{self.asset_id}/"
+
+    def test_edits_invalidate_detail(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(self.url, {"description": "edited"}, format="json")
+        self.assertEqual(self.client.get(self.url).data["description"], "edited")
+
+    def test_counter_events_keep_detail_cached(self):
+        self.client.get(self.url)
+        gen = caching.asset_detail._gen(str(self.asset_id))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"{self.url}track_view/")
+        self.assertEqual(caching.asset_detail._gen(str(self.asset_id)), gen)
+
+
+# ---------------- 存储用量 / 配额（quotas.py） ----------------
+class StorageUsageTests(MediaTestCase):
+    """增量记账的每一步都必须和 recompute() 从头算出来的一致"""
+
+    @staticmethod
+    def usage():
+        return {(r.scope, r.key): (r.bytes, r.assets) for r in StorageUsage.objects.all() if r.bytes or r.assets}
+
+    def assertMatchesRecompute(self):
+        running = self.usage()
+        quotas.recompute()
+        self.assertEqual(self.usage(), running)
+        return running
+
+    @staticmethod
+    def data(size, fill=b"x"):
+        return (b"hello " + fill * size)[:size]
+
+    def test_running_totals_match_recompute(self):
+        uid = str(self.editor.pk)
+        a = self.upload(self.data(1000), "a.txt", brand="Acme")
+        b = self.upload(self.data(500), "b.txt", brand="Beta")
+        self.assertEqual(self.assertMatchesRecompute(),
+                         {("brand", "Acme"): (1000, 1), ("brand", "Beta"): (500, 1), ("user", uid): (1500, 2)})
+
+        self.upload_version(a, self.data(3000, b"y"))
+        self.upload_version(a, self.data(2000, b"z"))
+        self.assertEqual(self.assertMatchesRecompute()[("brand", "Acme")], (5000, 1))
+
+        # 恢复 v1：和 v1 共用文件，不重复计
+        resp = self.client.post(f"/api/assets/{a}/versions/1/restore/", format="json")
+        self.assertLess(resp.status_code, 300, resp.data)
+        self.assertEqual(self.assertMatchesRecompute()[("brand", "Acme")], (5000, 1))
+
+        # 换品牌：整笔搬过去
+        resp = self.client.patch(f"/api/assets/{a}/", {"brand": "Beta"}, format="json")
+        self.assertEqual(resp.status_code, 200, resp.data)
+        expected = {("brand", "Beta"): (5500, 2), ("user", uid): (5500, 2)}
+        self.assertEqual(self.assertMatchesRecompute(), expected)
+
+        # 计数类写入不动用量
+        self.client.post(f"/api/assets/{b}/track_view/")
+        self.assertEqual(self.assertMatchesRecompute(), expected)
+
+        self.assertEqual(self.client.delete(f"/api/assets/{b}/").status_code, 204)
+        self.assertEqual(self.assertMatchesRecompute(), {("brand", "Beta"): (5000, 1), ("user", uid): (5000, 1)})
+        self.assertEqual(self.client.delete(f"/api/assets/{a}/").status_code, 204)
+        self.assertEqual(self.assertMatchesRecompute(), {})
+
+    def test_quota_rejects_without_charging(self):
+        self.upload(self.data(3000), "a.txt", brand="Acme")
+        with override_settings(STORAGE_QUOTAS={"user": None, "brand": 4000}):
+            resp = self.client.post("/api/assets/", {"name": "b", "asset_no": "b", "brand": "Acme",
+                                                     "asset_type": "document",
+                                                     "file": SimpleUploadedFile("b.txt", self.data(1500))},
+                                    format="multipart")
+            self.assertEqual(resp.status_code, 413)
+            self.assertFalse(Asset.objects.filter(asset_no="b").exists())
+            self.upload(self.data(1500), "c.txt", brand="Other")  # 别的品牌不受影响
+        usage = self.assertMatchesRecompute()
+        self.assertEqual(usage[("brand", "Acme")], (3000, 1))
+        self.assertEqual(usage[("user", str(self.editor.pk))], (4500, 2))
+
+
+# ---------------- 任务队列（jobs.py） ----------------
+_job_calls = []
+
+
+@jobs.task("tests.record")
+def _record_job(n=0):
+    _job_calls.append(n)
+
+
+@jobs.task("tests.fail", max_attempts=2)
+def _failing_job():
+    raise RuntimeError("boom")
+
+
+class JobQueueTests(TestCase):
+    """SQLite 上没有 SKIP LOCKED（select_for_update 被忽略），这里只测认领 / 租约 / 重试的状态机"""
+
+    def setUp(self):
+        _job_calls.clear()
+
+    def test_claim_order_and_lease_fields(self):
+        low = jobs.enqueue("tests.record", {"n": 1})
+        high = jobs.enqueue("tests.record", {"n": 2}, priority=5)
+        jobs.enqueue("tests.record", {"n": 3}, delay=3600)  # 还没到点
+        first = jobs.claim("w1")
+        self.assertEqual([j.pk for j in first], [high.pk])
+        self.assertEqual((first[0].status, first[0].locked_by, first[0].attempts), ("running", "w1", 1))
+        self.assertEqual([j.pk for j in jobs.claim("w2", batch=5)], [low.pk])
+        self.assertEqual(jobs.claim("w3", batch=5), [])
+
+    def test_dedupe_returns_existing_and_raises_priority(self):
+        job = jobs.enqueue("tests.record", {"n": 1}, dedupe_key="k")
+        again = jobs.enqueue("tests.record", {"n": 2}, priority=3, dedupe_key="k")
+        self.assertEqual(again.pk, job.pk)
+        self.assertEqual(Job.objects.get(pk=job.pk).priority, 3)
+        self.assertEqual(Job.objects.count(), 1)
+        [claimed] = jobs.claim("w1")
+        self.assertEqual(jobs.enqueue("tests.record", dedupe_key="k").pk, job.pk)  # running 也算
+        jobs.run(claimed)
+        self.assertNotEqual(jobs.enqueue("tests.record", dedupe_key="k").pk, job.pk)  # 做完了可以再排
+
+    def test_run_success_and_retry_backoff(self):
+        ok = jobs.enqueue("tests.record", {"n": 7})
+        [claimed] = jobs.claim("w1")
+        self.assertEqual(jobs.run(claimed), "done")
+        self.assertEqual(_job_calls, [7])
+        ok.refresh_from_db()
+        self.assertEqual((ok.status, ok.locked_by, ok.locked_at), ("done", "", None))
+
+        bad = jobs.enqueue("tests.fail")
+        self.assertEqual(bad.max_attempts, 2)
+        [claimed] = jobs.claim("w1")
+        before = timezone.now()
+        self.assertEqual(jobs.run(claimed), "queued")
+        bad.refresh_from_db()
+        self.assertIn("boom", bad.last_error)
+        self.assertGreater(bad.run_at, before + timedelta(seconds=5))  # 10s ± 20% 抖动
+        self.assertEqual(jobs.claim("w1"), [])  # 退避期间不会被认领
+
+        Job.objects.filter(pk=bad.pk).update(run_at=timezone.now())
+        [claimed] = jobs.claim("w1")
+        self.assertEqual(jobs.run(claimed), "failed")
+        self.assertEqual(Job.objects.get(pk=bad.pk).attempts, 2)
+
+    def test_reap_stale_requeues_or_fails(self):
+        alive = jobs.enqueue("tests.record", {"n": 1})
+        dead = jobs.enqueue("tests.record", {"n": 2})
+        spent = jobs.enqueue("tests.record", {"n": 3}, max_attempts=1)
+        jobs.claim("w1", batch=3)
+        old = timezone.now() - timedelta(seconds=jobs._lock_timeout() + 60)
+        Job.objects.filter(pk__in=[dead.pk, spent.pk]).update(locked_at=old)
+        self.assertEqual(jobs.reap_stale(), (1, 1))
+        status = dict(Job.objects.values_list("pk", "status"))
+        self.assertEqual(status, {alive.pk: "running", dead.pk: "queued", spent.pk: "failed"})
+
+    def test_reclaimed_job_is_not_run_or_overwritten_by_the_old_worker(self):
+        job = jobs.enqueue("tests.record", {"n": 1})
+        [stale] = jobs.claim("w1")
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        jobs.reap_stale()
+        [fresh] = jobs.claim("w2")
+        self.assertEqual(jobs.run(stale), "lost")
+        self.assertEqual(_job_calls, [])
+        self.assertEqual(Job.objects.get(pk=job.pk).locked_by, "w2")
+
+        # 跑到一半被回收、别人接手：旧 worker 的收尾不改状态
+        with mock.patch.object(jobs, "_REGISTRY", dict(jobs._REGISTRY, **{
+                "tests.record": lambda n=0: Job.objects.filter(pk=job.pk).update(locked_by="w3")})):
+            self.assertEqual(jobs.run(fresh), "lost")
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ("running", "w3"))
+
+    def test_run_refreshes_the_lease_before_starting(self):
+        job = jobs.enqueue("tests.record")
+        [claimed] = jobs.claim("w1")
+        old = timezone.now() - timedelta(minutes=10)
+        Job.objects.filter(pk=job.pk).update(locked_at=old)
+        seen = []
+        with mock.patch.object(jobs, "_REGISTRY", dict(jobs._REGISTRY, **{
+                "tests.record": lambda: seen.append(Job.objects.get(pk=job.pk).locked_at)})):
+            jobs.run(claimed)
+        self.assertGreater(seen[0], old + timedelta(minutes=9))
+
+    def test_retry_skips_jobs_whose_dedupe_key_is_live(self):
+        failed = jobs.enqueue("tests.fail", dedupe_key="same", max_attempts=1)
+        [claimed] = jobs.claim("w1")
+        self.assertEqual(jobs.run(claimed), "failed")
+        other = jobs.enqueue("tests.record", dedupe_key="lonely", max_attempts=1)
+        Job.objects.filter(pk=other.pk).update(status="failed")
+        live = jobs.enqueue("tests.record", dedupe_key="same")
+        self.assertEqual(jobs.retry([failed.pk, other.pk]), 1)
+        status = dict(Job.objects.values_list("pk", "status"))
+        self.assertEqual(status, {failed.pk: "failed", other.pk: "queued", live.pk: "queued"})
+
+    def test_enqueue_periodic_once_per_interval(self):
+        schedule = {"tests.record": 3600, "tests.fail": 0, "tests.missing": 60}
+        [job] = jobs.enqueue_periodic(schedule)
+        self.assertEqual((job.name, job.dedupe_key), ("tests.record", "periodic:tests.record"))
+        [claimed] = jobs.claim("w1")
+        jobs.run(claimed)
+        self.assertEqual(jobs.enqueue_periodic(schedule), [])  # 一个间隔内做过了
+        Job.objects.filter(pk=job.pk).update(created_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(len(jobs.enqueue_periodic(schedule)), 1)
+
+
+# ---------------- 限流 / 过载保护（throttling.py） ----------------
+class ThrottlingTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def throttle(self, max_inflight=32, **buckets):
+        conf = override_settings(THROTTLING={"ENABLED": True, "BUCKETS": buckets, "MAX_INFLIGHT": max_inflight,
+                                             "RETRY_AFTER": 7, "INFLIGHT_TTL": 600})
+        conf.enable()
+        self.addCleanup(conf.disable)
+
+    def test_bucket_refills_at_rate(self):
+        self.throttle(read={"rate": 2, "burst": 3})
+        now = [1000.0]
+        with mock.patch.object(throttling.time, "time", lambda: now[0]):
+            self.assertEqual([throttling.take("read", "u1") for _ in range(3)], [None] * 3)
+            self.assertAlmostEqual(throttling.take("read", "u1"), 0.5)
+            self.assertIsNone(throttling.take("read", "u2"))  # 每人一个桶
+            now[0] += 0.5
+            self.assertIsNone(throttling.take("read", "u1"))
+            self.assertIsNotNone(throttling.take("read", "u1"))
+            now[0] += 60  # 补满也不超过 burst
+            self.assertEqual([throttling.take("read", "u1") for _ in range(4)].count(None), 3)
+
+    def test_byte_charges_can_go_into_debt(self):
+        self.throttle(download={"rate": 100, "burst": 1000})
+        now = [1000.0]
+        with mock.patch.object(throttling.time, "time", lambda: now[0]):
+            self.assertIsNone(throttling.take("download", "u1", cost=0, need=1))
+            self.assertIsNone(throttling.take("download", "u1", cost=1500, need=0))  # 超过 burst 也整笔扣
+            self.assertAlmostEqual(throttling.take("download", "u1", cost=0, need=1), 5.01)
+            now[0] += 5.02
+            self.assertIsNone(throttling.take("download", "u1", cost=0, need=1))
+
+    def test_over_budget_is_429_with_retry_after(self):
+        self.throttle(read={"rate": 1, "burst": 2})
+        codes = [self.client.get("/api/tags/").status_code for _ in range(2)]
+        resp = self.client.get("/api/tags/")
+        self.assertEqual(codes, [200, 200])
+        self.assertEqual(resp.status_code, 429)
+        self.assertEqual(resp["Retry-After"], "1")
+        self.assertEqual(self.client_for(self.make_user("other", "viewer")).get("/api/tags/").status_code, 200)
+
+    def test_full_slots_shed_heavy_requests_with_503(self):
+        self.throttle(max_inflight=1)
+        slot = throttling.acquire("heavy", 1)
+        self.assertIsNotNone(slot)
+        resp = self.client.get("/api/assets/?search=logo")
+        self.assertEqual(resp.status_code, 503)
+        self.assertEqual(resp["Retry-After"], "7")
+        self.assertEqual(self.client.get("/api/tags/").status_code, 200)  # 轻请求不受影响
+        throttling.release(slot)
+        self.assertEqual(self.client.get("/api/assets/?search=logo").status_code, 200)
+
+    def test_slot_is_held_until_the_response_is_closed(self):
+        asset_id = self.upload(b"hello world" * 100)
+        self.throttle(max_inflight=1)
+        resp = self.client.get(f"/api/assets/{asset_id}/download/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertIsNone(throttling.acquire("heavy", 1))  # 还在发送
+        self.assertEqual(b"".join(resp.streaming_content), b"hello world" * 100)  # 读完即 close
+        slot = throttling.acquire("heavy", 1)
+        self.assertIsNotNone(slot)
+        throttling.release(slot)
+
+    def test_release_only_drops_its_own_slot(self):
+        key, token = slot = throttling.acquire("x", 1)
+        cache.set(key, token + 1)  # 过期后被别的请求占上
+        throttling.release(slot)
+        self.assertIsNone(throttling.acquire("x", 1))
+        self.assertIsNone(throttling.acquire("x", 0))
+
+
+# ---------------- 增量变更日志（changefeed.py） ----------------
+class ChangeFeedTests(MediaTestCase):
+    def feed(self, since=0, **params):
+        resp = self.client.get("/api/assets/changes/", {"since": since, **params})
+        self.assertEqual(resp.status_code, 200, resp.data)
+        return resp.data
+
+    @staticmethod
+    def ops(changes):
+        return [(c["op"], c.get("asset", {}).get("id") or c.get("asset_id") or c.get("tag", {}).get("id")
+                 or c.get("tag_id")) for c in changes]
+
+    def make_history(self):
+        a = self.upload(b"first", "a.txt")
+        b = self.upload(b"second", "b.txt")
+        self.client.patch(f"/api/assets/{a}/", {"name": "renamed"}, format="json")
+        self.upload_version(a, b"first v2")
+        self.assertEqual(self.client.delete(f"/api/assets/{b}/").status_code, 204)
+        tag = Tag.objects.create(name="campaign")
+        return a, b, tag
+
+    def test_page_folds_to_latest_state_with_tombstones(self):
+        a, b, tag = self.make_history()
+        data = self.feed()
+        self.assertEqual(self.ops(data["changes"]), [("upsert", a), ("delete", b), ("tag", tag.pk)])
+        self.assertEqual(data["changes"][0]["asset"]["name"], "renamed")
+        self.assertEqual(data["cursor"], changefeed.current_cursor())
+        self.assertFalse(data["has_more"])
+        self.assertEqual(self.feed(data["cursor"])["changes"], [])
+        self.assertEqual(self.client.get("/api/assets/changes/").data["cursor"], data["cursor"])
+
+    def test_paging_never_skips_a_change(self):
+        a, b, tag = self.make_history()
+        seen, cursor, pages = {}, 0, 0
+        while True:
+            data = self.feed(cursor, limit=2)
+            for change in data["changes"]:
+                seen[self.ops([change])[0][1], change["op"] in ("tag", "tag_delete")] = change["op"]
+            cursor, pages = data["cursor"], pages + 1
+            if not data["has_more"]:
+                break
+        self.assertGreater(pages, 1)
+        self.assertEqual(seen, {(a, False): "upsert", (b, False): "delete", (tag.pk, True): "tag"})
+
+    def test_compact_keeps_only_the_latest_row_per_key(self):
+        self.make_history()
+        before = self.feed()["changes"]
+        stats = changefeed.compact(batch_size=2)
+        self.assertGreater(stats["compacted"], 0)
+        self.assertEqual(AssetChange.objects.count(), 3)
+        self.assertEqual(self.feed()["changes"], before)
+        self.assertEqual(changefeed.compact()["compacted"], 0)
+
+    def test_compact_matches_a_full_scan(self):
+        rng = random.Random(7)
+        AssetChange.objects.bulk_create(
+            [AssetChange(kind="tag", tag_id=rng.randrange(5)) if rng.random() < 0.2
+             else AssetChange(kind=rng.choice(["update", "tags", "version"]), asset_id=rng.randrange(40))
+             for _ in range(500)])
+        latest = {}
+        for pk, kind, asset_id, tag_id in AssetChange.objects.order_by("id").values_list("id", "kind", "asset_id", "tag_id"):
+            latest[("tag", tag_id) if kind == "tag" else ("asset", asset_id)] = pk
+        changefeed.compact(batch_size=37)
+        self.assertEqual(set(AssetChange.objects.values_list("id", flat=True)), set(latest.values()))
+
+    def test_expired_cursor_after_retention(self):
+        self.upload(b"old", "a.txt")
+        self.upload(b"older", "c.txt")
+        old_cursor = changefeed.current_cursor()
+        AssetChange.objects.update(created_at=timezone.now() - timedelta(days=40))
+        b = self.upload(b"new", "b.txt")
+        stats = changefeed.compact(retain_days=30)
+        self.assertEqual((stats["expired"], stats["horizon"]), (1, old_cursor))  # 最后一条旧记录改成 horizon
+        with self.assertRaises(changefeed.CursorExpired):
+            changefeed.changes_since(0)
+        resp = self.client.get("/api/assets/changes/", {"since": 0})
+        self.assertEqual(resp.status_code, 410)
+        self.assertEqual(resp.data["horizon"], old_cursor)
+        self.assertEqual(self.ops(self.feed(old_cursor)["changes"]), [("upsert", b)])
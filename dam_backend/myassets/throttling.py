@@ -0,0 +1,267 @@
+# myassets/throttling.py —— 限流（令牌桶）+ 过载保护（重操作并发上限）
+"""
+- 令牌桶：登录用户按用户、匿名按 IP 各一个桶，每秒补充 rate、最多攒 burst；
+  预算分四类：read（普通读）/ search（检索、过滤列表）/ download（按字节）/ upload（按字节）
+- 桶状态放在 Django cache 里：Redis 后端用 Lua 脚本原子完成“补充 + 扣减”；
+  进程内存（LocMemCache）用进程内的锁，同样原子，但桶和并发名额都只在本进程有效——
+  多进程部署必须配 REDIS_URL（settings 里 DEBUG=0 且没配时拒绝启动，单进程可用 THROTTLE_LOCAL=1 放行）；
+  其他共享后端用 cache.add 做一把几毫秒的短锁，拿不到锁就放行（限流不能反过来拖慢请求）
+- 按字节计费时允许欠账：桶里只要还有余额就放行，下载 / 上传的实际大小整笔扣掉，
+  欠下的要等补回来才能发起下一次（大文件不会因为超过 burst 永远下不了）
+- 超出预算：429 + Retry-After（DRF Throttled）
+- 并发上限：download / render / 检索 / 上传等重操作全局（所有进程共享 cache 计数）同时最多
+  MAX_INFLIGHT 个，超出直接 503 + Retry-After，而不是排队把所有人的延迟拖上去；
+  每个名额是 cache 里一个单独的键，响应发送完（response.close）时删掉（Redis 上“是自己的才删”是原子的）；
+  进程崩溃漏还的名额各自 INFLIGHT_TTL 秒后过期（满载时占位要试遍 MAX_INFLIGHT 个键）
+"""
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = {
+    "read": {"rate": 20, "burst": 200},
+    "search": {"rate": 2, "burst": 20},
+    "download": {"rate": 20 * 1024 * 1024, "burst": 2 * 1024 ** 3},
+    "upload": {"rate": 10 * 1024 * 1024, "burst": 2 * 1024 ** 3},
+}
+SEARCH_PARAMS = ("search", "content", "tags", "tag_names")
+LOCK_TIMEOUT = 1
+LOCK_SPINS = 20
+_local_lock = threading.Lock()  # LocMemCache 的桶只在本进程：进程锁就够原子
+
+# KEYS[1] = 桶；ARGV = rate, burst, cost, need, ttl；返回 {放行 0/1, 需要等待的秒数}
+TAKE_SCRIPT = """
+local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+local cost, need, ttl = tonumber(ARGV[3]), tonumber(ARGV[4]), tonumber(ARGV[5])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local s = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(s[1]) or burst
+local ts = tonumber(s[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+if tokens < need then
+  return {0, tostring((need - tokens) / rate)}
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - cost), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ttl)
+return {1, '0'}
+"""
+
+# KEYS[1] = 名额；ARGV[1] = 占位时写入的令牌。还是自己的才删
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Server is busy, please retry shortly."
+    default_code = "overloaded"
+
+    def __init__(self, wait, detail=None):
+        super().__init__(detail)
+        self.wait = wait  # DRF 的异常处理据此写 Retry-After
+
+
+def _config():
+    return getattr(settings, "THROTTLING", None) or {}
+
+
+def enabled():
+    return bool(_config().get("ENABLED", True))
+
+
+def bucket_config(scope):
+    conf = dict(DEFAULT_BUCKETS.get(scope) or DEFAULT_BUCKETS["read"])
+    conf.update((_config().get("BUCKETS") or {}).get(scope) or {})
+    return float(conf["rate"]), float(conf["burst"])
+
+
+def ident(request):
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"u{user.pk}"
+    return "ip" + BaseThrottle().get_ident(request)
+
+
+# ---------------- 令牌桶 ----------------
+def _redis_client(key):
+    """Django 自带 Redis 后端时返回 (client, 真实 key)，否则 None"""
+    inner = getattr(cache, "_cache", None)
+    if type(cache).__name__ != "RedisCache" or not hasattr(inner, "get_client"):
+        return None
+    real_key = cache.make_and_validate_key(key)
+    return inner.get_client(real_key, write=True), real_key
+
+
+def take(scope, who, cost=1, need=None):
+    """
+    从 scope 桶里扣 cost 个令牌；余额不足 need（默认 min(cost, burst)）时不扣。
+    放行返回 None，否则返回需要等待的秒数。
+    """
+    rate, burst = bucket_config(scope)
+    need = min(cost, burst) if need is None else need
+    ttl = int(burst / rate) + 2  # 这么久没动静桶就满了，不必再存
+    key = f"throttle:{scope}:{who}"
+
+    redis = _redis_client(key)
+    if redis is not None:
+        client, real_key = redis
+        allowed, wait = client.eval(TAKE_SCRIPT, 1, real_key, rate, burst, cost, need, ttl)
+        return None if int(allowed) else float(wait)
+
+    if type(cache).__name__ == "LocMemCache":
+        with _local_lock:
+            return _refill_and_take(key, rate, burst, cost, need, ttl)
+
+    lock_key = key + ":lock"
+    for _ in range(LOCK_SPINS):
+        if cache.add(lock_key, 1, LOCK_TIMEOUT):
+            break
+        time.sleep(0.002)
+    else:
+        logger.warning("throttle bucket %s is contended, letting the request through", key)
+        return None
+    try:
+        return _refill_and_take(key, rate, burst, cost, need, ttl)
+    finally:
+        cache.delete(lock_key)
+
+
+def _refill_and_take(key, rate, burst, cost, need, ttl):
+    now = time.time()
+    tokens, ts = cache.get(key) or (burst, now)
+    tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+    if tokens < need:
+        return (need - tokens) / rate
+    cache.set(key, (tokens - cost, now), ttl)
+    return None
+
+
+def charge(request, scope, cost):
+    """事后按实际大小扣费（允许欠账）"""
+    if enabled() and cost:
+        take(scope, ident(request), cost, need=0)
+
+
+def scope_for(request, view):
+    """视图可以用 get_throttle_scope() / throttle_scope 指定；默认读请求算 read，写请求不限"""
+    getter = getattr(view, "get_throttle_scope", None)
+    scope = getter(request) if getter else getattr(view, "throttle_scope", None)
+    if scope is None and request.method in SAFE_METHODS:
+        scope = "read"
+    return scope
+
+
+class BucketThrottle(BaseThrottle):
+    """DEFAULT_THROTTLE_CLASSES 里的唯一一个限流类：按视图给出的 scope 选桶"""
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        scope = scope_for(request, view) if enabled() else None
+        if scope is None:
+            return True
+        if scope == "upload":
+            cost = int(request.META.get("CONTENT_LENGTH") or 0) or 1
+            need = None
+        elif scope == "download":
+            cost, need = 0, 1  # 先看有没有欠账，实际字节数在视图里 charge()
+        else:
+            cost, need = 1, None
+        self.wait_seconds = take(scope, ident(request), cost, need)
+        return self.wait_seconds is None
+
+    def wait(self):
+        return self.wait_seconds
+
+
+# ---------------- 并发上限 ----------------
+def _slot_key(name, index):
+    return f"inflight:{name}:{index}"
+
+
+def acquire(name, limit):
+    """
+    占一个并发名额，返回名额句柄（交给 release）；满了返回 None。
+    每个名额一个键、从占上那一刻起各自 INFLIGHT_TTL 过期：进程崩溃漏还的名额到时自己空出来，
+    不会因为别的请求一直在占用而续命
+    """
+    if limit <= 0:
+        return None
+    ttl = int(_config().get("INFLIGHT_TTL", 600))
+    token = random.getrandbits(62)  # 整数：Redis 后端原样存（不 pickle），release 的脚本能直接比较
+    start = random.randrange(limit)  # 从随机位置找空位，请求不会都挤在前几个键上
+    for i in range(limit):
+        key = _slot_key(name, (start + i) % limit)
+        if cache.add(key, token, ttl):
+            return key, token
+    return None
+
+
+def release(slot):
+    key, token = slot
+    # 超过 INFLIGHT_TTL 的请求名额已经过期、可能被别人占了：只删自己的
+    redis = _redis_client(key)
+    if redis is not None:
+        client, real_key = redis
+        client.eval(RELEASE_SCRIPT, 1, real_key, token)
+        return
+    # 其他后端先读后删不是原子的：中间恰好过期又被别人占上的名额会被多删一个，
+    # 只是短暂多放行一个请求，接受
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+class LoadSheddingMixin:
+    """
+    视图集混入：
+    - throttle_scopes：action → 桶；list 带检索 / 过滤参数时算 search
+    - heavy_actions：占用并发名额的 action（另外 search / upload 也算）
+    """
+
+    throttle_scopes = {}
+    heavy_actions = ()
+
+    def get_throttle_scope(self, request):
+        action = getattr(self, "action", None)
+        scope = self.throttle_scopes.get(action)
+        if scope is None and action == "list":
+            params = request.query_params
+            if any(params.get(p) for p in SEARCH_PARAMS) or any(k.startswith("meta__") for k in params):
+                scope = "search"
+        if scope is None and request.method in SAFE_METHODS:
+            scope = "read"
+        return scope
+
+    def initial(self, request, *args, **kwargs):
+        self._heavy_slot = None
+        super().initial(request, *args, **kwargs)  # 认证 → 权限 → 限流
+        if not enabled():
+            return
+        heavy = self.action in self.heavy_actions or self.get_throttle_scope(request) in ("search", "upload")
+        if heavy:
+            limit = int(_config().get("MAX_INFLIGHT", 32))
+            self._heavy_slot = acquire("heavy", limit)
+            if self._heavy_slot is None:
+                raise Overloaded(wait=int(_config().get("RETRY_AFTER", 5)))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        slot, self._heavy_slot = getattr(self, "_heavy_slot", None), None
+        if slot is not None:
+            # 文件下载等流式响应要到发送完才算结束
+            response._resource_closers.append(lambda: release(slot))
+        return response
@@ -0,0 +1,307 @@
+# myassets/tiering.py —— 历史版本文件分层：转入冷存储（压缩）/ 按需回温 / 保留期清理
+"""
+- 策略（settings.VERSION_TIERING，命令行可覆盖）：早于 N 天，或不在每个资产最近 K 个版本之内的
+  历史版本转冷；两个条件任一满足即可，设为 0 表示不启用该条件
+- 以文件名为单位处理：恢复版本（restore）会和旧版本共用同一个文件名，
+  只要还有一行需要留在主存储、或者某个资产的当前文件就是它，这个文件就不动
+- 冷存储是 STORAGES["cold"]（默认本地目录）；能压缩就用 zstd（没装 zstandard 时用 gzip），
+  先压缩开头一段估算收益，省不到 MIN_SAVING 的（JPEG / MP4 等已压缩格式）原样存
+- 顺序：先写冷存储 → 再改数据库 → 最后删主存储文件；任何一步失败，主存储里的文件都还在
+- 回温：解压回主存储原文件名，冷副本保留（之后再转冷不用重新压缩）
+"""
+import gzip
+import itertools
+import logging
+import shutil
+import tempfile
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core import signing
+from django.core.files.storage import default_storage, storages
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import quotas
+from .fileutils import CHUNK_SIZE
+from .models import Asset, AssetVersion
+
+try:  # 可选：没有时退回 gzip
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_BYTES = 1024 * 1024
+SUFFIXES = {"zstd": ".zst", "gzip": ".gz", "": ""}
+SIGNING_SALT = "myassets.version-file"
+SIGNED_URL_MAX_AGE = 3600
+
+
+def _config():
+    cfg = {"OLDER_THAN_DAYS": 30, "KEEP_LAST": 3, "ZSTD_LEVEL": 10, "MIN_SAVING": 0.1}
+    cfg.update(getattr(settings, "VERSION_TIERING", {}) or {})
+    return cfg
+
+
+def cold_storage():
+    return storages["cold"]
+
+
+# ---------------- 压缩 / 解压 ----------------
+def default_codec():
+    return "zstd" if zstandard is not None else "gzip"
+
+
+def _compress_bytes(data, codec, level):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, 6)
+
+
+def _compress_stream(src, dst, codec, level):
+    if codec == "zstd":
+        zstandard.ZstdCompressor(level=level).copy_stream(src, dst, read_size=CHUNK_SIZE)
+    else:
+        with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=6) as gz:
+            shutil.copyfileobj(src, gz, CHUNK_SIZE)
+
+
+def _decompress_stream(src, dst, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this cold copy")
+        zstandard.ZstdDecompressor().copy_stream(src, dst, read_size=CHUNK_SIZE)
+    elif codec == "gzip":
+        with gzip.GzipFile(fileobj=src, mode="rb") as gz:
+            shutil.copyfileobj(gz, dst, CHUNK_SIZE)
+    else:
+        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+
+def worth_compressing(sample, codec, level, min_saving):
+    if not sample:
+        return False
+    return 1 - len(_compress_bytes(sample, codec, level)) / len(sample) >= min_saving
+
+
+# ---------------- 选出要转冷的文件 ----------------
+def candidates(older_than_days=None, keep_last=None):
+    """
+    逐个资产扫描版本（按版本号倒序），产出 (file_name, [version_id, ...])：
+    这个文件名下所有还在主存储的版本都满足转冷条件
+    """
+    cfg = _config()
+    days = cfg["OLDER_THAN_DAYS"] if older_than_days is None else older_than_days
+    keep = cfg["KEEP_LAST"] if keep_last is None else keep_last
+    cutoff = timezone.now() - timedelta(days=days) if days and days > 0 else None
+
+    rows = (AssetVersion.objects.exclude(file="").order_by("asset_id", "-version")
+            .values_list("id", "asset_id", "file", "created_at", "storage_tier", "delta_name", "delta_base_id")
+            .iterator(chunk_size=2000))
+    for _asset_id, group in itertools.groupby(rows, key=lambda r: r[1]):
+        group = list(group)
+        # 差量版本（deltas.py）本身已经很小，它们的关键帧要留在主存储
+        bases = {r[6] for r in group if r[6]}
+        stay, move = set(), {}
+        for rank, (vid, _, name, created, tier, delta_name, _base) in enumerate(group):
+            superseded = (keep and keep > 0 and rank >= keep) or (cutoff and created and created < cutoff)
+            if not superseded or delta_name or vid in bases:
+                stay.add(name)
+            elif tier == "hot":
+                move.setdefault(name, []).append(vid)
+        names = [n for n in move if n not in stay]
+        if not names:
+            continue
+        current = set(Asset.objects.filter(file__in=names).values_list("file", flat=True))
+        for name in names:
+            if name not in current:
+                yield name, move[name]
+
+
+# ---------------- 转冷 ----------------
+def _upload_cold(name, codec, level, min_saving):
+    """把主存储里的文件写到冷存储；返回 (cold_name, codec)"""
+    cold = cold_storage()
+    with default_storage.open(name, "rb") as src, tempfile.TemporaryFile(prefix="dam-tier-") as tmp:
+        sample = src.read(SAMPLE_BYTES)
+        if not worth_compressing(sample, codec, level, min_saving):
+            codec = ""
+        src.seek(0)
+        if codec:
+            _compress_stream(src, tmp, codec, level)
+            size = tmp.tell()
+            original = default_storage.size(name)
+            if original and 1 - size / original < min_saving:  # 整体算下来不划算：原样存
+                codec = ""
+        if not codec:
+            tmp.seek(0)
+            tmp.truncate()
+            src.seek(0)
+            shutil.copyfileobj(src, tmp, CHUNK_SIZE)
+        tmp.seek(0)
+        return cold.save(name + SUFFIXES[codec], File(tmp)), codec
+
+
+def tier_file(name, version_ids=None, codec=None):
+    """
+    把一个文件名转入冷存储；返回 "tiered" / "reused"（沿用已有冷副本）/ "skipped"
+    """
+    cfg = _config()
+    cold = cold_storage()
+    previous = (AssetVersion.objects.filter(file=name).exclude(cold_name="")
+                .values_list("cold_name", "cold_codec").first())
+    if previous and cold.exists(previous[0]):
+        cold_name, used, outcome = previous[0], previous[1], "reused"
+    elif not default_storage.exists(name):
+        logger.warning("version file %s is missing from primary storage; not tiering", name)
+        return "skipped"
+    else:
+        cold_name, used = _upload_cold(name, codec if codec is not None else default_codec(),
+                                       int(cfg["ZSTD_LEVEL"]), float(cfg["MIN_SAVING"]))
+        outcome = "tiered"
+
+    with transaction.atomic():
+        qs = AssetVersion.objects.select_for_update().filter(file=name, storage_tier="hot")
+        if version_ids is not None:
+            qs = qs.filter(pk__in=version_ids)
+        locked = list(qs.values_list("id", flat=True))
+        # 扫描之后可能刚被恢复成当前文件 / 又有新版本指向它
+        still_needed = (Asset.objects.filter(file=name).exists()
+                        or AssetVersion.objects.filter(file=name, storage_tier="hot").exclude(pk__in=locked).exists()
+                        or AssetVersion.objects.filter(delta_base__file=name).exists())
+        if not locked or still_needed:
+            if outcome == "tiered":
+                transaction.on_commit(lambda: cold.delete(cold_name))
+            return "skipped"
+        AssetVersion.objects.filter(pk__in=locked).update(
+            storage_tier="cold", cold_name=cold_name, cold_codec=used, tiered_at=timezone.now())
+        # 持锁时删除：回温要等这把锁，不会在删除之前写回文件
+        default_storage.delete(name)
+    return outcome
+
+
+def run(older_than_days=None, keep_last=None, limit=None, dry_run=False, codec=None):
+    stats = {"tiered": 0, "reused": 0, "skipped": 0, "failed": 0}
+    for name, version_ids in itertools.islice(candidates(older_than_days, keep_last), limit):
+        if dry_run:
+            stats["tiered"] += 1
+            continue
+        try:
+            stats[tier_file(name, version_ids, codec=codec)] += 1
+        except Exception:
+            logger.exception("tiering %s failed", name)
+            stats["failed"] += 1
+    return stats
+
+
+# ---------------- 回温 ----------------
+def ensure_hot(version):
+    """
+    冷版本解压回主存储原文件名（同名的其他版本一起标记为 hot）；已经在主存储的直接返回
+    """
+    if version.storage_tier != "cold":
+        return version
+    name = version.file.name
+    with transaction.atomic():
+        rows = list(AssetVersion.objects.select_for_update().filter(file=name, storage_tier="cold")
+                    .values_list("id", "cold_name", "cold_codec"))
+        if rows and not default_storage.exists(name):
+            _, cold_name, codec = rows[0]
+            with cold_storage().open(cold_name, "rb") as src, tempfile.TemporaryFile(prefix="dam-rehydrate-") as tmp:
+                _decompress_stream(src, tmp, codec)
+                tmp.seek(0)
+                saved = default_storage.save(name, File(tmp))
+            if saved != name:  # 不应发生：前面确认过原文件名空着
+                default_storage.delete(saved)
+                raise RuntimeError(f"could not restore {name} to its original name")
+        if rows:
+            AssetVersion.objects.filter(pk__in=[r[0] for r in rows]).update(storage_tier="hot", tiered_at=None)
+    version.storage_tier, version.tiered_at = "hot", None
+    return version
+
+
+def sign_version(version):
+    """冷版本 file_url 用的签名（链接直接点开时带不了 JWT）"""
+    return signing.dumps([version.asset_id, version.version], salt=SIGNING_SALT, compress=True)
+
+
+def check_signature(token, asset_id, version_no):
+    try:
+        value = signing.loads(token, salt=SIGNING_SALT, max_age=SIGNED_URL_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return value == [int(asset_id), int(version_no)]
+
+
+# ---------------- 保留期清理 ----------------
+def prune(keep_last, older_than_days=None, dry_run=False):
+    """
+    删除每个资产最近 keep_last 个版本之外（并且早于 older_than_days 天，如果给了）的版本记录；
+    最新版本、以及仍被留下的差量版本当作关键帧的版本总是保留。文件只在没有任何剩余版本、
+    也不是某个资产的当前文件时才删除（恢复出来的版本和旧版本共用文件名）。返回统计
+    """
+    keep_last = max(1, int(keep_last))
+    cutoff = timezone.now() - timedelta(days=older_than_days) if older_than_days else None
+    stats = {"versions": 0, "files": 0, "cold_files": 0}
+
+    rows = (AssetVersion.objects.order_by("asset_id", "-version")
+            .values_list("id", "asset_id", "created_at", "delta_base_id").iterator(chunk_size=2000))
+    doomed, deltas = [], []
+    for _asset_id, group in itertools.groupby(rows, key=lambda r: r[1]):
+        group = list(group)
+        picked = {vid for rank, (vid, _, created, _b) in enumerate(group)
+                  if rank >= keep_last and (cutoff is None or (created and created < cutoff))}
+        # 还有留下来的差量版本以它为关键帧时不能删（deltas.py）
+        picked -= {base for vid, _, _, base in group if base and vid not in picked}
+        deltas += [vid for vid, _, _, base in group if vid in picked and base]
+        doomed += [vid for vid, _, _, base in group if vid in picked and not base]
+    doomed = deltas + doomed  # 先删差量版本，关键帧的 PROTECT 外键才不会挡住
+
+    for start in range(0, len(doomed), 500):
+        batch = doomed[start:start + 500]
+        with transaction.atomic():
+            victims = list(AssetVersion.objects.select_for_update().filter(pk__in=batch)
+                           .values_list("id", "file", "cold_name", "delta_name", "asset_id"))
+            ids = [v[0] for v in victims]
+            names = {v[1] for v in victims if v[1]}
+            colds = {v[2] for v in victims if v[2]}
+            delta_names = {v[3] for v in victims if v[3]}
+            if not dry_run:
+                with quotas.tracking({v[4] for v in victims}):  # 不再被引用的文件从存储用量里扣掉
+                    AssetVersion.objects.filter(pk__in=ids, delta_base__isnull=False).delete()
+                    AssetVersion.objects.filter(pk__in=ids).delete()
+            remaining = AssetVersion.objects.exclude(pk__in=ids)
+            in_use = set(remaining.filter(file__in=names).values_list("file", flat=True))
+            in_use |= set(Asset.objects.filter(file__in=names).values_list("file", flat=True))
+            in_use |= set(remaining.filter(delta_name__in=delta_names).values_list("delta_name", flat=True))
+            cold_in_use = set(remaining.filter(cold_name__in=colds).values_list("cold_name", flat=True))
+            orphans, cold_orphans = (names | delta_names) - in_use, colds - cold_in_use
+            if not dry_run:
+                transaction.on_commit(lambda o=orphans, c=cold_orphans: _delete_blobs(o, c))
+        stats["versions"] += len(victims)
+        stats["files"] += len(orphans)
+        stats["cold_files"] += len(cold_orphans)
+    return stats
+
+
+def _delete_blobs(names, cold_names):
+    cold = cold_storage()
+    for storage, items in ((default_storage, names), (cold, cold_names)):
+        for name in items:
+            try:
+                storage.delete(name)
+            except Exception:
+                logger.warning("could not delete %s", name)
+
+
+def summary():
+    """各存储层的版本数（给命令输出用）"""
+    counts = {"hot": 0, "cold": 0}
+    for row in AssetVersion.objects.values("storage_tier").annotate(n=Count("id")).order_by():
+        counts[row["storage_tier"]] = row["n"]
+    return counts
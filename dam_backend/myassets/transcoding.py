@@ -0,0 +1,168 @@
+# myassets/transcoding.py —— 视频转码：HLS 多码率阶梯 + 小尺寸 MP4 预览（后台任务 assets.transcode）
+"""
+- 输出放在版本文件旁边：assets/{asset_id}/v{n}/hls/…（没有版本记录的原始上传用 assets/{asset_id}/hls/）
+- 档位来自 settings.HLS_LADDER，只生成不高于原片的档位（不放大）
+- 一次 ffmpeg 调用编出全部档位（split 滤镜，只解码一次），再编一个 faststart 的 MP4 预览，
+  给不支持 HLS 的浏览器用
+- 状态记在 AssetDerivative；没转完 / 失败时，播放接口退回原始文件
+- HLS_TIMEOUT_SECONDS 是整个任务两遍 ffmpeg 共用的总时限（第二遍只拿剩下的时间）
+"""
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from django.conf import settings
+from django.db import transaction
+
+from . import derivatives, events
+from .extraction import probe_video
+from .fileutils import local_path
+from .jobs import enqueue
+from .models import Asset, AssetDerivative
+
+MASTER_PLAYLIST = "master.m3u8"
+PREVIEW_NAME = "preview.mp4"
+
+
+class TranscodeUnavailable(Exception):
+    pass
+
+
+def _ffmpeg():
+    binary = shutil.which(getattr(settings, "FFMPEG_BINARY", "ffmpeg"))
+    if not binary:
+        raise TranscodeUnavailable("ffmpeg not found")
+    return binary
+
+
+def _timeout():
+    return int(getattr(settings, "HLS_TIMEOUT_SECONDS", 25 * 60))
+
+
+def _remaining(cmd, deadline):
+    left = deadline - time.monotonic()
+    if left <= 0:
+        raise subprocess.TimeoutExpired(cmd, _timeout())
+    return left
+
+
+def ladder_for(height):
+    ladder = sorted(getattr(settings, "HLS_LADDER", [(720, 2800), (360, 800)]), reverse=True)
+    picked = [(h, kbps) for h, kbps in ladder if not height or h <= height]
+    if not picked:
+        # 原片比最低档还小：按原高度出一档
+        picked = [((height // 2) * 2 or ladder[-1][0], ladder[-1][1])]
+    return picked
+
+
+def hls_command(src, outdir, rungs, has_audio):
+    n = len(rungs)
+    split = f"[0:v]split={n}" + "".join(f"[s{i}]" for i in range(n))
+    scales = ";".join(f"[s{i}]scale=-2:{h}[v{i}]" for i, (h, _) in enumerate(rungs))
+    seg = int(getattr(settings, "HLS_SEGMENT_SECONDS", 6))
+    cmd = [_ffmpeg(), "-y", "-v", "error", "-i", src, "-filter_complex", f"{split};{scales}"]
+    stream_map = []
+    for i, (h, kbps) in enumerate(rungs):
+        cmd += ["-map", f"[v{i}]"]
+        if has_audio:
+            cmd += ["-map", "0:a:0"]
+        cmd += [f"-c:v:{i}", "libx264", f"-b:v:{i}", f"{kbps}k",
+                f"-maxrate:v:{i}", f"{int(kbps * 1.07)}k", f"-bufsize:v:{i}", f"{int(kbps * 1.5)}k"]
+        stream_map.append(f"v:{i},a:{i},name:{h}p" if has_audio else f"v:{i},name:{h}p")
+    if has_audio:
+        cmd += ["-c:a", "aac", "-b:a", "128k", "-ac", "2"]
+    cmd += [
+        "-preset", "veryfast", "-profile:v", "main", "-pix_fmt", "yuv420p",
+        # 固定 GOP，分段边界对齐各档位，播放器才能无缝切换
+        "-force_key_frames", f"expr:gte(t,n_forced*{seg})", "-sc_threshold", "0",
+        "-f", "hls", "-hls_time", str(seg), "-hls_playlist_type", "vod",
+        "-hls_flags", "independent_segments",
+        "-hls_segment_filename", os.path.join(outdir, "%v", "seg_%05d.ts"),
+        "-master_pl_name", MASTER_PLAYLIST,
+        "-var_stream_map", " ".join(stream_map),
+        os.path.join(outdir, "%v", "index.m3u8"),
+    ]
+    return cmd
+
+
+def preview_command(src, out_path, height, has_audio):
+    cmd = [_ffmpeg(), "-y", "-v", "error", "-i", src,
+           "-vf", f"scale=-2:'min({height},ih)'", "-c:v", "libx264", "-preset", "veryfast",
+           "-crf", "26", "-pix_fmt", "yuv420p", "-movflags", "+faststart"]
+    cmd += ["-c:a", "aac", "-b:a", "96k", "-ac", "2"] if has_audio else ["-an"]
+    return cmd + [out_path]
+
+
+# ---------------- 入队 / 执行 ----------------
+def enqueue_for_asset(asset_id):
+    # 转码耗时长，优先级低于抽取等轻任务
+    return enqueue("assets.transcode", {"asset_id": asset_id}, priority=-10, dedupe_key=f"transcode:{asset_id}")
+
+
+def run_for_asset(asset_id, force=False, max_rounds=3):
+    """转码期间又换了文件（同 dedupe_key 的新任务会被本任务吞掉）时，按新文件重做"""
+    for _ in range(max_rounds):
+        asset = Asset.objects.filter(pk=asset_id).only("id", "asset_type", "file", "metadata").first()
+        if asset is None or asset.asset_type != "video" or not asset.file:
+            return None
+        current = {d.kind: d for d in AssetDerivative.objects.filter(asset_id=asset_id)}
+        if not force and all(current.get(k) and current[k].is_current(asset) for k in ("hls", "preview_mp4")):
+            return current["hls"]
+        if not _transcode(asset, current):
+            return None
+        force = False
+    return None
+
+
+def _transcode(asset, current):
+    asset_id, source = asset.pk, asset.file.name
+    for kind in ("hls", "preview_mp4"):
+        derivatives.mark(asset_id, kind, status="processing", error="")
+    prefix = derivatives.output_prefix(asset)
+    deadline = time.monotonic() + _timeout()
+
+    try:
+        with local_path(asset.file) as src, tempfile.TemporaryDirectory(prefix="dam-hls-") as work:
+            probe = probe_video(src)
+            height = int(probe.get("height") or asset.metadata.get("height") or 0)
+            has_audio = bool(probe.get("audio_codec"))
+            rungs = ladder_for(height)
+
+            hls_dir = os.path.join(work, "hls")
+            for h, _ in rungs:
+                os.makedirs(os.path.join(hls_dir, f"{h}p"), exist_ok=True)
+            cmd = hls_command(src, hls_dir, rungs, has_audio)
+            subprocess.run(cmd, capture_output=True, timeout=_remaining(cmd, deadline), check=True)
+
+            preview_dir = os.path.join(work, "preview")
+            os.makedirs(preview_dir)
+            preview_height = int(getattr(settings, "HLS_PREVIEW_HEIGHT", 720))
+            cmd = preview_command(src, os.path.join(preview_dir, PREVIEW_NAME), preview_height, has_audio)
+            subprocess.run(cmd, capture_output=True, timeout=_remaining(cmd, deadline), check=True)
+
+            hls_files = derivatives.upload_dir(hls_dir, f"{prefix}/hls")
+            preview_files = derivatives.upload_dir(preview_dir, prefix)
+    except Exception as e:
+        if isinstance(e, subprocess.CalledProcessError) and e.stderr:
+            detail = e.stderr.decode("utf-8", "ignore")[-2000:]
+        else:
+            detail = str(e)
+        for kind in ("hls", "preview_mp4"):
+            derivatives.mark(asset_id, kind, status="failed", error=detail)
+        if isinstance(e, TranscodeUnavailable):
+            return False  # 本机没有 ffmpeg：重试也没用，播放接口继续用原文件
+        raise
+
+    info = {"renditions": [{"height": h, "video_kbps": kbps} for h, kbps in rungs],
+            "has_audio": has_audio, "duration": probe.get("duration")}
+    stale = []
+    with transaction.atomic():
+        for kind, path, files in (("hls", f"{prefix}/hls/{MASTER_PLAYLIST}", hls_files),
+                                  ("preview_mp4", f"{prefix}/{PREVIEW_NAME}", preview_files)):
+            stale += derivatives.replace(asset_id, kind, current.get(kind), files,
+                                         status="ready", source=source, path=path, info=info, error="")
+        events.publish_asset("asset.transcoded", asset, with_tags=False)
+    derivatives.delete_files(stale)
+    return True
@@ -0,0 +1,255 @@
+# myassets/uploads.py —— 上传处理器：一遍读完就算好 sha256、识别真实类型、写到最终存储所在的文件系统
+"""
+- 只挂在新建资产 / 上传新版本两个接口上（AssetViewSet.initialize_request），其他请求仍用默认处理器
+- 每块数据：更新 sha256 + 写入 UPLOAD_STAGING_DIR 下的临时文件（默认 MEDIA_ROOT/.uploads，同一文件系统）；
+  FileSystemStorage 保存时对有 temporary_file_path() 的文件直接 rename，文件只落盘一次
+- 类型：看前 SNIFF_BYTES 字节的文件头（magic bytes），不信客户端给的 Content-Type / asset_type；
+  识别不出（application/octet-stream）时才用客户端的 asset_type
+- 大小：按识别出的类型查 UPLOAD_MAX_BYTES，超过就丢弃这个文件（不再写盘），视图返回 413；
+  Content-Length 已经超过所有类型上限的请求不读请求体直接拒绝
+"""
+import codecs
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile, StopFutureHandlers
+from django.http import QueryDict
+from django.utils.datastructures import MultiValueDict
+
+SNIFF_BYTES = 4096
+UNKNOWN_MIME = "application/octet-stream"
+
+DEFAULT_LIMITS = {
+    "image": 200 * 1024 * 1024,
+    "video": 10 * 1024 ** 3,
+    "pdf": 500 * 1024 * 1024,
+    "document": 500 * 1024 * 1024,
+    "3d_model": 2 * 1024 ** 3,
+}
+
+# 文件头 → MIME（按顺序匹配；ISO BMFF / RIFF / ZIP 另外处理）
+SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+    (b"BM", "image/bmp"),
+    (b"8BPS", "image/vnd.adobe.photoshop"),
+    (b"%PDF-", "application/pdf"),
+    (b"\x1aE\xdf\xa3", "video/webm"),
+    (b"\x00\x00\x01\xba", "video/mpeg"),
+    (b"FLV\x01", "video/x-flv"),
+    (b"glTF", "model/gltf-binary"),
+    (b"Kaydara FBX Binary", "application/vnd.autodesk.fbx"),
+    (b"BLENDER", "application/x-blender"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "application/x-ole-storage"),  # 老版 doc / xls / ppt
+    (b"{\\rtf", "application/rtf"),
+]
+RIFF_TYPES = {b"WEBP": "image/webp", b"AVI ": "video/x-msvideo", b"WAVE": "audio/wav"}
+FTYP_BRANDS = {
+    b"avif": "image/avif", b"avis": "image/avif",
+    b"heic": "image/heic", b"heix": "image/heic", b"mif1": "image/heif", b"msf1": "image/heif",
+    b"qt  ": "video/quicktime", b"M4V ": "video/x-m4v",
+    b"3gp4": "video/3gpp", b"3gp5": "video/3gpp", b"3g2a": "video/3gpp2",
+}
+ZIP_TYPES = {
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+    ".usdz": "model/vnd.usdz+zip",
+}
+OLE_TYPES = {".doc": "application/msword", ".xls": "application/vnd.ms-excel",
+             ".ppt": "application/vnd.ms-powerpoint"}
+TEXT_TYPES = {
+    ".svg": "image/svg+xml",
+    ".gltf": "model/gltf+json",
+    ".obj": "model/obj",
+    ".stl": "model/stl",
+    ".ply": "model/ply",
+    ".csv": "text/csv",
+    ".md": "text/markdown",
+    ".json": "application/json",
+}
+BINARY_MODEL_TYPES = {".stl": "model/stl", ".ply": "model/ply", ".3ds": "application/x-3ds"}
+MODEL_MIMES = {"application/vnd.autodesk.fbx", "application/x-blender", "application/x-3ds"}
+
+
+# ---------------- 类型识别 ----------------
+def _is_text(head):
+    if b"\x00" in head:
+        return False
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)  # 末尾被截断的多字节字符不算错
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def sniff(head, filename=""):
+    """按文件头判断 MIME；扩展名只用来区分同一种容器里的具体格式（zip → docx / xlsx …）"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    for magic, mime in SIGNATURES:
+        if head.startswith(magic):
+            if mime == "application/x-ole-storage":
+                return OLE_TYPES.get(ext, mime)
+            return mime
+    if head[:4] == b"RIFF" and head[8:12] in RIFF_TYPES:
+        return RIFF_TYPES[head[8:12]]
+    if head[4:8] == b"ftyp":
+        return FTYP_BRANDS.get(head[8:12], "video/mp4")
+    if head[:4] in (b"PK\x03\x04", b"PK\x05\x06"):
+        return ZIP_TYPES.get(ext, "application/zip")
+    if head and _is_text(head):
+        stripped = head.lstrip()
+        if ext == ".svg" or (stripped.startswith(b"<") and b"<svg" in head):
+            return "image/svg+xml"
+        return TEXT_TYPES.get(ext, "text/plain")
+    if len(head) > 376 and head[0:377:188] == b"GGG":  # MPEG-TS：每 188 字节一个 0x47 同步字节
+        return "video/mp2t"
+    if head and ext in BINARY_MODEL_TYPES:  # 二进制 STL / PLY 等没有可靠的文件头
+        return BINARY_MODEL_TYPES[ext]
+    return UNKNOWN_MIME
+
+
+def asset_type_for(mime):
+    """MIME → Asset.asset_type；识别不出返回空串"""
+    if not mime or mime == UNKNOWN_MIME:
+        return ""
+    if mime.startswith("image/"):
+        return "image"
+    if mime.startswith("video/"):
+        return "video"
+    if mime == "application/pdf":
+        return "pdf"
+    if mime.startswith("model/") or mime in MODEL_MIMES:
+        return "3d_model"
+    return "document"
+
+
+def size_limits():
+    limits = dict(DEFAULT_LIMITS)
+    limits.update(getattr(settings, "UPLOAD_MAX_BYTES", None) or {})
+    return limits
+
+
+def limit_for(asset_type, limits=None):
+    limits = limits or size_limits()
+    return limits.get(asset_type) or max(limits.values())
+
+
+def resolve_asset_type(claimed, uploaded):
+    """
+    客户端声明的类型和识别结果对一下：返回 (asset_type, 错误信息)。
+    没声明就用识别结果；识别不出就信客户端；
+    识别成 document 而声明 3d_model 的放行（OBJ / glTF 之外的文本、zip 格式模型很多，文件头认不全）。
+    """
+    detected = getattr(uploaded, "detected_type", "")
+    if not detected:
+        return claimed, None
+    if not claimed or claimed == detected or (detected == "document" and claimed == "3d_model"):
+        return claimed or detected, None
+    return claimed, f"File content is {uploaded.detected_mime} ({detected}), not {claimed}."
+
+
+# ---------------- 上传处理器 ----------------
+def staging_dir():
+    return getattr(settings, "UPLOAD_STAGING_DIR", None) or os.path.join(settings.MEDIA_ROOT, ".uploads")
+
+
+class HashedUploadedFile(TemporaryUploadedFile):
+    """临时文件放在 staging_dir()（与 MEDIA_ROOT 同一文件系统）；附带 sha256 / detected_mime / detected_type"""
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        directory = staging_dir()
+        os.makedirs(directory, exist_ok=True)
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(suffix=".upload" + ext, dir=directory)
+        UploadedFile.__init__(self, file, name, content_type, size, charset, content_type_extra)
+        self.sha256 = ""
+        self.detected_mime = ""
+        self.detected_type = ""
+
+
+class HashingUploadHandler(FileUploadHandler):
+    chunk_size = 256 * 1024
+
+    def __init__(self, request=None, limits=None):
+        super().__init__(request)
+        self.limits = limits or size_limits()
+
+    def _reject(self, detail):
+        if self.request is not None:
+            rejected = getattr(self.request, "upload_rejections", None)
+            if rejected is None:
+                rejected = self.request.upload_rejections = []
+            rejected.append(detail)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        largest = max(self.limits.values())
+        if content_length and content_length > largest:
+            self._reject(f"Upload is {content_length} bytes; the largest allowed is {largest} bytes.")
+            return QueryDict(encoding=encoding), MultiValueDict()  # 不读请求体，直接当作空表单
+        return None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.file = HashedUploadedFile(
+            self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+        )
+        self.digest = hashlib.sha256()
+        self.head = b""
+        self.limit = None
+        self.received = 0
+        raise StopFutureHandlers()
+
+    def _detect(self):
+        mime = sniff(self.head, self.file_name)
+        self.file.detected_mime = mime
+        self.file.detected_type = asset_type_for(mime)
+        self.limit = limit_for(self.file.detected_type, self.limits)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.limit is None:
+            self.head += raw_data[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= SNIFF_BYTES:
+                self._detect()
+        if self.limit is not None and self.received > self.limit:
+            self._reject(f"{self.file_name}: {self.file.detected_type or 'file'} uploads are limited to "
+                         f"{self.limit} bytes.")
+            raise SkipFile()  # 解析器关闭（删除）临时文件，跳过剩下的数据
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.limit is None:  # 比 SNIFF_BYTES 还小的文件
+            self._detect()
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.digest.hexdigest()
+        return self.file
+
+    def upload_interrupted(self):
+        if hasattr(self, "file"):
+            try:
+                self.file.close()  # NamedTemporaryFile 关闭即删除
+            except FileNotFoundError:
+                pass
+
+
+def upload_handlers(request):
+    return [HashingUploadHandler(request)]
+
+
+def rejection(request):
+    """解析请求体（如果还没解析），返回第一条被拒绝的原因；没有返回 None"""
+    request.FILES
+    raw = getattr(request, "_request", request)
+    rejected = getattr(raw, "upload_rejections", None)
+    return rejected[0] if rejected else None
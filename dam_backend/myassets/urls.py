@@ -10,10 +10,14 @@ from .views import (
     user_login,
     user_logout,
     get_current_user,
+    asset_events,
+    asset_events_ticket,
     AssetViewSet,
     TagViewSet,
     UserProfileViewSet,
     AdminUserViewSet,
+    RequestProfileViewSet,
+    StorageUsageViewSet,
 )
 
 @api_view(["GET"])
@@ -26,6 +30,8 @@ router.register(r'assets', AssetViewSet, basename='assets')
 router.register(r'tags', TagViewSet, basename='tags')
 router.register(r'userprofiles', UserProfileViewSet, basename='userprofiles')
 router.register(r'admin/users', AdminUserViewSet, basename='admin-users')  # ★ 用户管理
+router.register(r'admin/profiles', RequestProfileViewSet, basename='admin-profiles')  # 慢请求剖析
+router.register(r'admin/storage', StorageUsageViewSet, basename='admin-storage')  # 存储用量 / 配额
 
 urlpatterns = [
     # 旧 session 登录系列（可选）
@@ -37,6 +43,10 @@ urlpatterns = [
     # 健康探针
     path('ping/', ping),
 
+    # 资产/版本事件推送（SSE，替代前端轮询）
+    path('events/', asset_events),
+    path('events/ticket/', asset_events_ticket),  # 换取事件流票据（不在 URL 里放访问令牌）
+
     # 视图集
     path('', include(router.urls)),
 ]
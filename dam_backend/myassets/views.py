@@ -1,7 +1,9 @@
 from django.contrib.auth import authenticate, login, logout, get_user_model
+from django.conf import settings
 from django.views.decorators.csrf import ensure_csrf_cookie
-from django.http import JsonResponse, FileResponse
-from rest_framework import viewsets, status
+from django.http import JsonResponse, FileResponse, HttpResponse, HttpResponseRedirect
+from django.core.files.storage import default_storage
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
@@ -11,31 +13,62 @@ from rest_framework.response import Response
 
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.pagination import CursorPagination
+import django_filters
 
-from django.db.models import Max, F, Count, Q
+from django.db.models import Max, F, Count, Q, Prefetch, Sum
 from django.db import transaction, IntegrityError, connection
 
 from rest_framework import viewsets, status
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.models import User
-from .serializers import AdminUserReadSerializer, AdminUserWriteSerializer
+from .serializers import AdminUserReadSerializer, AdminUserWriteSerializer, AdminUserBulkSerializer
 from .permissions import IsAdminRole
 
 from django.core.cache import cache  # ★ 新增：用于 view_count 去抖
+from django.core import signing
+from types import SimpleNamespace
+import json
+import math
 import mimetypes
 import os
 import urllib.parse
 import traceback
 import re
 
-from .models import Asset, Tag, UserProfile, AssetVersion
+from .models import Asset, AssetDerivative, AssetHash, Tag, UserProfile, AssetVersion, RequestProfile, StorageUsage
 from .serializers import (
     AssetSerializer,
     TagSerializer,
     UserProfileSerializer,
     AssetVersionSerializer,
+    DirectUploadAssetSerializer,
+    RequestProfileListSerializer,
+    RequestProfileDetailSerializer,
+    StorageUsageSerializer,
+    sparse_fieldset,
 )
 from .permissions import AssetPermission
+from .renderers import NDJSONRenderer
+from .streaming import StreamingListMixin
+from .throttling import LoadSheddingMixin
+from .db_routing import PRIMARY_DB, ReplicaReadMixin
+from . import caching
+from . import changefeed
+from . import events
+from . import extraction
+from . import quotas
+from . import renditions
+from . import similarity
+from . import deltas
+from . import throttling
+from . import tiering
+from . import uploads
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+from rest_framework.settings import api_settings
 
 
 User = get_user_model()
@@ -76,6 +109,17 @@ def user_logout(request):
     return Response({"success": True})
 
 
+def direct_upload_storage():
+    """资产文件存储支持预签名直传（STORAGE_BACKEND=s3）时返回它，否则 None"""
+    storage = Asset._meta.get_field("file").storage
+    return storage if hasattr(storage, "presign_upload") else None
+
+
+def _direct_upload_unavailable():
+    return Response({"detail": "Direct upload needs object storage (STORAGE_BACKEND=s3).",
+                     "code": "direct_upload_unavailable"}, status=400)
+
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_current_user(request):
@@ -85,198 +129,120 @@ def get_current_user(request):
         "id": user.id,
         "username": user.username,
         "role": role,
-        "is_active": user.is_active
+        "is_active": user.is_active,
+        "direct_upload": direct_upload_storage() is not None,  # 前端据此决定上传走直传还是普通上传
     })
 
 
-# ---------------- 辅助 ----------------
-def _client_ip(request) -> str:
-    """简易获取客户端 IP（作业环境够用）"""
-    xff = request.META.get("HTTP_X_FORWARDED_FOR")
-    if xff:
-        return xff.split(",")[0].strip()
-    return request.META.get("REMOTE_ADDR") or "0.0.0.0"
+get_current_user.cls.token_user_reads = True  # 只用到 id / username / role / is_active：令牌用户就够了
 
 
-def _role_of(user) -> str:
-    return getattr(getattr(user, "userprofile", None), "role", "viewer").lower()
+# ---------------- 事件推送（SSE） ----------------
+# EventSource 不能带自定义 Header。长期有效的访问令牌不放进 URL（会留在代理 / 访问日志和浏览器历史里），
+# 而是先用它换一张只能开事件流、EVENTS_TICKET_MAX_AGE 秒内有效的票据；断线重连要重新换
+EVENTS_TICKET_SALT = "myassets.events-ticket"
+EVENTS_TICKET_MAX_AGE = 60
 
 
-def _is_admin(user) -> bool:
-    # 允许 Django 超级用户 或 userprofile.role == admin
-    return bool(getattr(user, "is_superuser", False) or _role_of(user) == "admin")
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def asset_events_ticket(request):
+    """POST /api/events/ticket/ → {"ticket", "expires_in"}；之后 GET /api/events/?ticket=…"""
+    ticket = signing.dumps({"uid": request.user.pk}, salt=EVENTS_TICKET_SALT, compress=True)
+    return Response({"ticket": ticket, "expires_in": EVENTS_TICKET_MAX_AGE})
 
 
-# ---------------- Admin：用户管理 API（新增，不影响其它功能） ----------------
-@api_view(["GET", "POST"])
-@permission_classes([IsAuthenticated])
-def admin_users(request):
+def _sse_user(request):
+    """Authorization: Bearer / ?ticket=（asset_events_ticket 签发）/ Session 三种"""
+    header = request.META.get("HTTP_AUTHORIZATION", "")
+    if header.lower().startswith("bearer "):
+        jwt_auth = JWTAuthentication()
+        try:
+            return jwt_auth.get_user(jwt_auth.get_validated_token(header[7:].strip()))
+        except (InvalidToken, AuthenticationFailed):
+            return None
+    ticket = request.GET.get("ticket")
+    if ticket:
+        try:
+            uid = signing.loads(ticket, salt=EVENTS_TICKET_SALT, max_age=EVENTS_TICKET_MAX_AGE)["uid"]
+        except (signing.BadSignature, KeyError, TypeError):
+            return None
+        return User.objects.filter(pk=uid, is_active=True).first()
+    user = getattr(request, "user", None)
+    return user if user is not None and user.is_authenticated else None
+
+
+def asset_events(request):
     """
-    GET  /api/admin/users/          -> 列出用户（含 role）
-    POST /api/admin/users/          -> 创建用户（username, password, role=admin|editor|viewer, email 可选）
+    GET /api/events/?types=image,video&tags=1,2&events=asset.created,version.created
+    text/event-stream：asset.created / asset.updated / asset.deleted / version.created /
+    asset.counters / resync（需要重新拉取列表或 /api/assets/changes/）
     """
-    if not _is_admin(request.user):
-        return Response({"detail": "Permission denied."}, status=403)
-
-    if request.method == "GET":
-        # 带出 role、is_active、date_joined
-        profiles = {p.user_id: p.role for p in UserProfile.objects.all()}
-        data = []
-        for u in User.objects.all().order_by("id"):
-            data.append({
-                "id": u.id,
-                "username": u.username,
-                "email": getattr(u, "email", "") or "",
-                "role": profiles.get(u.id, "viewer"),
-                "is_active": u.is_active,
-                "date_joined": getattr(u, "date_joined", None),
-            })
-        return Response(data, status=200)
-
-    # POST
-    payload = request.data or {}
-    username = (payload.get("username") or "").strip()
-    password = payload.get("password") or ""
-    email = (payload.get("email") or "").strip()
-    role = (payload.get("role") or "viewer").strip().lower()
-    first_name = (payload.get("first_name") or "").strip()
-    last_name = (payload.get("last_name") or "").strip()
+    if request.method != "GET":
+        return JsonResponse({"detail": "Method not allowed."}, status=405)
+    if _sse_user(request) is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    params = request.GET.copy()
+    if isinstance(request, ASGIRequest):
+        stream = events.async_stream(params)   # ASGI：不占线程
+    else:
+        stream = events.sync_stream(params)    # WSGI：每个连接占一个工作线程
+    resp = StreamingHttpResponse(stream, content_type="text/event-stream")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"
+    return resp
 
-    if not username or not password:
-        return Response({"detail": "username and password are required"}, status=400)
 
-    if role not in ("admin", "editor", "viewer"):
-        return Response({"detail": "role must be one of: admin, editor, viewer"}, status=400)
+# ---------------- 辅助 ----------------
+def _client_ip(request) -> str:
+    """简易获取客户端 IP（作业环境够用）"""
+    xff = request.META.get("HTTP_X_FORWARDED_FOR")
+    if xff:
+        return xff.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR") or "0.0.0.0"
+
 
-    if email and not re.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", email):
-        return Response({"detail": "invalid email"}, status=400)
+_NUMBER_RE = re.compile(r"-?(0|[1-9][0-9]*)(\.[0-9]+)?")
 
+
+def _finite_number(raw):
+    """"12" / "-1.5" → 数字；nan / inf / 1e999 之类返回 None"""
     try:
-        with transaction.atomic():
-            if User.objects.filter(username=username).exists():
-                return Response({"detail": "username already exists"}, status=409)
-
-            user = User(username=username, email=email or "")
-            user.first_name = first_name
-            user.last_name = last_name
-            user.set_password(password)
-            user.is_active = True
-            user.save()
-
-            # 确保有 profile 并设置角色
-            profile, _ = UserProfile.objects.get_or_create(user=user, defaults={"role": role})
-            if not _:
-                profile.role = role
-                profile.save(update_fields=["role"])
+        return int(raw)
+    except ValueError:
+        pass
+    try:
+        value = float(raw)
+    except ValueError:
+        return None
+    return value if math.isfinite(value) else None
 
-        return Response({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "role": role,
-            "is_active": user.is_active,
-            "date_joined": getattr(user, "date_joined", None),
-        }, status=201)
-    except Exception as e:
-        traceback.print_exc()
-        return Response({"detail": f"create failed: {str(e)}"}, status=400)
-
-
-@api_view(["PATCH", "DELETE"])
-@permission_classes([IsAuthenticated])
-def admin_user_detail(request, user_id: int):
-    """
-    PATCH /api/admin/users/<id>/    -> 更新用户（role / is_active / password / email / name）
-    DELETE /api/admin/users/<id>/   -> 删除用户（禁止自删；禁止删除超级用户）
-    """
-    if not _is_admin(request.user):
-        return Response({"detail": "Permission denied."}, status=403)
 
-    try:
-        user = User.objects.get(pk=user_id)
-    except User.DoesNotExist:
-        return Response({"detail": "User not found"}, status=404)
-
-    # 禁止删除 / 修改超级用户的超级属性（但可改 profile.role，不建议）
-    if request.method == "DELETE":
-        if user.id == request.user.id:
-            return Response({"detail": "You cannot delete yourself."}, status=400)
-        if getattr(user, "is_superuser", False):
-            return Response({"detail": "Cannot delete superuser."}, status=400)
-        user.delete()
-        # 同步删除 profile（若存在）
-        UserProfile.objects.filter(user_id=user_id).delete()
-        return Response(status=204)
-
-    # PATCH
-    payload = request.data or {}
-    changed = False
-
-    # role
-    if "role" in payload:
-        role = (payload.get("role") or "").strip().lower()
-        if role not in ("admin", "editor", "viewer"):
-            return Response({"detail": "role must be one of: admin, editor, viewer"}, status=400)
-        profile, _ = UserProfile.objects.get_or_create(user=user, defaults={"role": role})
-        if profile.role != role:
-            profile.role = role
-            profile.save(update_fields=["role"])
-        changed = True
-
-    # is_active
-    if "is_active" in payload:
-        is_active = bool(payload.get("is_active"))
-        if user.is_active != is_active:
-            # 防止把自己禁用，导致尴尬
-            if user.id == request.user.id and not is_active:
-                return Response({"detail": "You cannot deactivate yourself."}, status=400)
-            user.is_active = is_active
-            changed = True
-
-    # email / first_name / last_name
-    if "email" in payload:
-        email = (payload.get("email") or "").strip()
-        if email and not re.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", email):
-            return Response({"detail": "invalid email"}, status=400)
-        user.email = email
-        changed = True
-    if "first_name" in payload:
-        user.first_name = (payload.get("first_name") or "").strip()
-        changed = True
-    if "last_name" in payload:
-        user.last_name = (payload.get("last_name") or "").strip()
-        changed = True
-
-    # password（可选重置）
-    if "password" in payload:
-        pwd = payload.get("password") or ""
-        if len(pwd) < 6:
-            return Response({"detail": "password too short (>=6)"}, status=400)
-        user.set_password(pwd)
-        changed = True
-
-    if changed:
-        user.save()
-
-    # 输出当前信息（含 role）
-    role_now = _role_of(user)
-    return Response({
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "role": role_now,
-        "is_active": user.is_active,
-        "date_joined": getattr(user, "date_joined", None),
-        "first_name": user.first_name,
-        "last_name": user.last_name,
-    }, status=200)
+def _canonical_number(raw):
+    """写法规范的数字字面量（没有前导零 / 空格 / 指数）才当数字，"0012" 只按字符串匹配"""
+    return _finite_number(raw) if _NUMBER_RE.fullmatch(raw) else None
 
 
 # ---------------- Assets ----------------
-class AssetViewSet(viewsets.ModelViewSet):
-    queryset = Asset.objects.all().select_related("uploaded_by").prefetch_related("tags")
+# 3D 轻量预览（AssetSerializer.preview_model_url）：一页一次查询，避免逐行查派生表
+PREVIEW_MODEL_PREFETCH = Prefetch(
+    "derivatives",
+    queryset=AssetDerivative.objects.filter(kind="preview_model", status="ready"),
+    to_attr="preview_models",
+)
+
+
+class AssetViewSet(LoadSheddingMixin, ReplicaReadMixin, StreamingListMixin, viewsets.ModelViewSet):
+    # content_text 只用于检索，不返回给前端
+    queryset = (
+        Asset.objects.all().defer("content_text").select_related("uploaded_by")
+        .prefetch_related("tags", PREVIEW_MODEL_PREFETCH)
+    )
     serializer_class = AssetSerializer
     permission_classes = [AssetPermission]
+    token_user_reads = True  # 只读请求用令牌用户（authentication.py），不查 User / UserProfile
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]  # ?stream=ndjson / Accept: application/x-ndjson
     filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
 
     # 搜索字段
@@ -291,11 +257,81 @@ class AssetViewSet(viewsets.ModelViewSet):
 
     ordering_fields = ["upload_date", "name", "download_count", "view_count"]
 
+    # 稀疏字段集：序列化字段 -> 需要从数据库取的列（tags/uploaded_by 另行处理）
+    sparse_columns = {
+        "id": ("id",),
+        "name": ("name",),
+        "brand": ("brand",),
+        "asset_no": ("asset_no",),
+        "description": ("description",),
+        "asset_type": ("asset_type",),
+        "file": ("file",),
+        "file_url": ("file",),
+        "upload_date": ("upload_date",),
+        "download_count": ("download_count",),
+        "view_count": ("view_count",),
+        "uploaded_by": ("uploaded_by", "uploaded_by__username"),
+        "tags": (),
+        "metadata": ("metadata",),
+        "extracted_at": ("extracted_at",),
+        "preview_model_url": ("asset_type", "file"),
+        "thumbnail_url": ("asset_type", "file", "content_hash"),
+        "content_hash": ("content_hash",),
+        "mime_type": ("mime_type",),
+        "size_bytes": ("size_bytes",),
+    }
+
+    # 元数据过滤：?meta__width__gte=1920 / ?meta__camera_model=Canon / ?meta__page_count__lte=10
+    meta_lookups = {"exact", "iexact", "icontains", "gt", "gte", "lt", "lte"}
+
     def get_serializer_context(self):
         ctx = super().get_serializer_context()
         ctx["request"] = self.request
         return ctx
 
+    # 限流预算 / 占并发名额的重操作（throttling.py）；其余读请求按 read，list 带检索参数按 search
+    throttle_scopes = {"download": "download", "version_file": "download", "create": "upload", "upload_url": "upload"}
+    heavy_actions = ("download", "version_file", "render_image", "similar", "duplicates")
+
+    def get_throttle_scope(self, request):
+        if self.action == "versions" and request.method == "POST":
+            return "upload"
+        return super().get_throttle_scope(request)
+
+    # 带文件的写接口：换成 uploads.py 的处理器（边收边算 sha256 / 识别类型，保存时只改名）
+    UPLOAD_ACTIONS = ("create", "update", "partial_update", "versions")
+
+    def initialize_request(self, request, *args, **kwargs):
+        drf_request = super().initialize_request(request, *args, **kwargs)  # 这里才确定 self.action
+        if request.method in ("POST", "PUT", "PATCH") and self.action in self.UPLOAD_ACTIONS:
+            request.upload_handlers = uploads.upload_handlers(request)
+        return drf_request
+
+    def _upload_rejected(self, request):
+        detail = uploads.rejection(request)
+        if detail:
+            return Response({"detail": detail}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        return None
+
+    def create(self, request, *args, **kwargs):
+        return self._upload_rejected(request) or super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        return self._upload_rejected(request) or super().update(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        # 详情走两级缓存（caching.py）；带参数（?fields= 等）的不缓存。
+        # 读权限只要求登录（AssetPermission），命中时不必再查对象
+        if request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+        load = super().retrieve
+        data = caching.asset_detail.get_or_compute(
+            kwargs[self.lookup_url_kwarg or self.lookup_field],
+            lambda: dict(load(request, *args, **kwargs).data),
+            variant=request.build_absolute_uri("/"),
+        )
+        return Response(data)
+
     def _role(self, user):
         return getattr(getattr(user, "userprofile", None), "role", "viewer").lower()
 
@@ -357,10 +393,330 @@ class AssetViewSet(viewsets.ModelViewSet):
             if names:
                 qs = qs.filter(tags__name__in=names).distinct()
 
+        # 抽取出的正文 / 元数据（不读文件）
+        content = (q.get("content") or "").strip()
+        if content:
+            qs = self._filter_content(qs, content)
+        qs = self._filter_metadata(qs, q)
+
+        if self.action in ("list", "retrieve"):
+            qs = self._apply_sparse_fieldset(qs)
+
+        return qs
+
+    def _filter_content(self, qs, content):
+        """?content= 全文检索：PostgreSQL 走 content_text 的 GIN 表达式索引（见 0009 迁移）"""
+        if connection.vendor == "postgresql":
+            from django.contrib.postgres.search import SearchQuery, SearchVector
+            return qs.annotate(
+                content_vector=SearchVector("content_text", config="simple")
+            ).filter(content_vector=SearchQuery(content, config="simple", search_type="websearch"))
+        return qs.filter(content_text__icontains=content)
+
+    def _filter_metadata(self, qs, q):
+        """
+        ?meta__k=v        → metadata @> {"k": v}，走 metadata 的 GIN 索引（jsonb_path_ops 只支持 @>）；
+                            v 按字符串匹配，写法规范的数字（"12"，不是 "0012"）同时按数字匹配
+        ?meta__k__gte=n   → 只限 extraction.RANGE_KEYS 里的数值字段，各有 btree 表达式索引；n 必须是有限数字
+        ?meta__k__iexact= / __icontains= 是文本比较，不走索引
+        """
+        for param, raw in q.items():
+            if not param.startswith("meta__") or raw == "":
+                continue
+            key, _, lookup = param[len("meta__"):].partition("__")
+            lookup = lookup or "exact"
+            if not re.fullmatch(r"[a-z0-9_]+", key) or lookup not in self.meta_lookups:
+                continue
+            if lookup == "exact":
+                # SQLite 替身不支持 JSON 的 contains，退回按键比较（同样的匹配语义）
+                field = "metadata__contains" if connection.vendor == "postgresql" else f"metadata__{key}"
+                wrap = (lambda v: {key: v}) if connection.vendor == "postgresql" else (lambda v: v)
+                cond = Q(**{field: wrap(raw)})
+                number = _canonical_number(raw)
+                if number is not None:
+                    cond |= Q(**{field: wrap(number)})
+                qs = qs.filter(cond)
+            elif lookup in ("iexact", "icontains"):
+                qs = qs.filter(**{f"metadata__{key}__{lookup}": raw})
+            else:
+                number = _finite_number(raw)
+                if key not in extraction.RANGE_KEYS or number is None:
+                    continue
+                qs = qs.filter(**{f"metadata__{key}__{lookup}": number})
         return qs
 
+    def _apply_sparse_fieldset(self, qs):
+        """?fields= / ?omit= 下推到查询：only() 只取需要的列，不要 tags 时跳过预取"""
+        keep = sparse_fieldset(self.request, self.sparse_columns.keys())
+        if keep is None:
+            return qs
+
+        columns = {"id"}
+        for name in keep:
+            columns.update(self.sparse_columns[name])
+        if "uploaded_by" not in keep:
+            qs = qs.select_related(None)
+        if "tags" not in keep:
+            qs = qs.prefetch_related(None)
+            if "preview_model_url" in keep:
+                qs = qs.prefetch_related(PREVIEW_MODEL_PREFETCH)
+        return qs.only(*sorted(columns))
+
+    # 写入与变更日志（signals -> changefeed）放在同一事务里
     def perform_create(self, serializer):
-        serializer.save(uploaded_by=self.request.user)
+        self._save_within_quota(serializer, self.request.user.pk, serializer.validated_data.get("brand", ""),
+                                uploaded_by=self.request.user)
+
+    def perform_update(self, serializer):
+        asset = serializer.instance
+        self._save_within_quota(serializer, asset.uploaded_by_id, serializer.validated_data.get("brand", asset.brand))
+
+    def _save_within_quota(self, serializer, owner_id, brand, **extra):
+        """带新文件时按所有者 / 品牌配额检查：写文件前先查一次，入库后同一事务里再核（quotas.py）"""
+        upload = serializer.validated_data.get("file")
+        if upload is None:
+            with transaction.atomic():
+                serializer.save(**extra)
+            return
+        quotas.check(owner_id, brand, upload.size)
+        try:
+            with transaction.atomic():
+                asset = serializer.save(**extra)
+                quotas.enforce(asset.uploaded_by_id, asset.brand)
+        except quotas.QuotaExceeded:
+            asset.file.storage.delete(asset.file.name)  # 事务回滚了，刚写的文件别留成孤儿
+            raise
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+
+    # ---------------- 增量变更（客户端同步） ----------------
+    @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated], url_path="changes")
+    def changes(self, request):
+        """
+        GET /api/assets/changes/?since=<cursor>&limit=500
+        - 不带 since：只返回当前游标（先全量拉一次列表，再从这里开始增量）
+        - upsert：资产当前完整数据（支持 ?fields= 稀疏字段）；delete：墓碑
+        - tag / tag_delete：标签本身的变化
+        - 410：游标早于保留期，需要全量重拉
+        """
+        raw_since = request.query_params.get("since")
+        if raw_since in (None, ""):
+            return Response({"cursor": changefeed.current_cursor(), "has_more": False, "changes": []})
+        try:
+            since = int(raw_since)
+            limit = int(request.query_params.get("limit") or changefeed.DEFAULT_PAGE_SIZE)
+        except (TypeError, ValueError):
+            return Response({"detail": "since/limit must be integers"}, status=400)
+
+        try:
+            rows, cursor, has_more = changefeed.changes_since(since, limit)
+        except changefeed.CursorExpired as e:
+            return Response({"detail": "Cursor expired, full resync required.", "horizon": e.horizon}, status=410)
+
+        asset_ids = [r.asset_id for r in rows if r.asset_id is not None and r.kind != "delete"]
+        tag_ids = [r.tag_id for r in rows if r.kind == "tag"]
+        assets = {a.pk: a for a in self._apply_sparse_fieldset(
+            Asset.objects.filter(pk__in=asset_ids).select_related("uploaded_by").prefetch_related("tags", PREVIEW_MODEL_PREFETCH)
+        )}
+        tags = {t.pk: t for t in Tag.objects.filter(pk__in=tag_ids)}
+        ctx = self.get_serializer_context()
+
+        out = []
+        for r in rows:
+            if r.kind in ("tag", "tag_delete"):
+                tag = tags.get(r.tag_id)
+                if tag is None:
+                    out.append({"id": r.id, "op": "tag_delete", "tag_id": r.tag_id})
+                else:
+                    out.append({"id": r.id, "op": "tag", "tag": TagSerializer(tag).data})
+                continue
+            asset = assets.get(r.asset_id)
+            if asset is None:
+                out.append({"id": r.id, "op": "delete", "asset_id": r.asset_id})
+            else:
+                out.append({"id": r.id, "op": "upsert", "kind": r.kind,
+                            "asset": AssetSerializer(asset, context=ctx).data})
+        return Response({"cursor": cursor, "has_more": has_more, "changes": out})
+
+    # ---------------- 相似图片 / 近重复（感知哈希，见 similarity.py） ----------------
+    def _hash_params(self, request, default_distance):
+        q = request.query_params
+        algorithm = q.get("algorithm") or "phash"
+        if algorithm not in dict(AssetHash.ALGORITHMS):
+            raise ValueError("algorithm must be phash or dhash")
+        return algorithm, int(q.get("distance") or default_distance), int(q.get("limit") or 20)
+
+    def _asset_summaries(self, ids):
+        ctx = self.get_serializer_context()
+        qs = self._apply_sparse_fieldset(
+            Asset.objects.filter(pk__in=ids).defer("content_text").select_related("uploaded_by").prefetch_related("tags", PREVIEW_MODEL_PREFETCH)
+        )
+        return {a.pk: AssetSerializer(a, context=ctx).data for a in qs}
+
+    @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated], url_path="similar")
+    def similar(self, request, pk=None):
+        """
+        GET /api/assets/{id}/similar/?distance=10&limit=20&algorithm=phash
+        - distance：汉明距离上限（0~12）；indexed=false 表示该资产还没算出哈希；
+          truncated=true 表示候选太多（热门桶），较远的桶没查完，结果可能不全
+        """
+        asset = self.get_object()
+        try:
+            algorithm, distance, limit = self._hash_params(request, 10)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+        found = similarity.similar_to(asset.pk, algorithm, distance, max(1, min(limit, 100)))
+        if found is None:
+            return Response({"indexed": False, "truncated": False, "results": []})
+        found, truncated = found
+        assets = self._asset_summaries([aid for aid, _ in found])
+        return Response({
+            "indexed": True,
+            "truncated": truncated,
+            "results": [{"distance": d, "asset": assets[aid]} for aid, d in found if aid in assets],
+        })
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAuthenticated], url_path="duplicates")
+    def duplicates(self, request):
+        """
+        GET /api/assets/duplicates/?distance=2&limit=20&offset=0
+        近重复分组报告（distance ≤ 3）；全库扫描结果缓存 SIMILARITY_REPORT_CACHE_SECONDS 秒；
+        truncated=true 表示有热门桶只按完全相同的哈希合并了
+        """
+        if self._role(request.user) not in ("admin", "editor"):
+            return Response({"detail": "Permission denied."}, status=403)
+        try:
+            algorithm, distance, limit = self._hash_params(request, 2)
+            offset = max(0, int(request.query_params.get("offset") or 0))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+        distance = max(0, min(distance, similarity.DUPLICATE_MAX_DISTANCE))
+        limit = max(1, min(limit, 200))
+
+        cache_key = f"duplicates:v2:{algorithm}:{distance}"  # v2：缓存值是 (分组, truncated)
+        report = cache.get(cache_key)
+        if report is None:
+            report = similarity.duplicate_groups(algorithm, distance)
+            cache.set(cache_key, report, int(getattr(settings, "SIMILARITY_REPORT_CACHE_SECONDS", 300)))
+        groups, truncated = report
+
+        page = groups[offset:offset + limit]
+        assets = self._asset_summaries([aid for g in page for aid in g])
+        return Response({
+            "count": len(groups),
+            "distance": distance,
+            "truncated": truncated,
+            "results": [{"size": len(g), "assets": [assets[aid] for aid in g if aid in assets]} for g in page],
+        })
+
+    # ---------------- 视频播放（HLS 阶梯，见 transcoding.py） ----------------
+    def _derivatives(self, asset):
+        return {d.kind: d for d in AssetDerivative.objects.filter(asset_id=asset.pk)}
+
+    @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated], url_path="stream")
+    def stream(self, request, pk=None):
+        """
+        GET /api/assets/{id}/stream/
+        返回播放地址：hls_url / playlist_url（转码完成后）、preview_url（MP4 预览）、
+        fallback_url（原文件，始终有）
+        """
+        asset = self.get_object()
+        if not asset.file:
+            return Response({"detail": "No file"}, status=404)
+        fallback = request.build_absolute_uri(asset.file.url)
+        if asset.asset_type != "video":
+            return Response({"status": "none", "hls_url": None, "preview_url": None, "fallback_url": fallback})
+
+        found = self._derivatives(asset)
+        hls, mp4 = found.get("hls"), found.get("preview_mp4")
+        ready = hls is not None and hls.is_current(asset)
+        if ready:
+            status_ = "ready"
+        elif hls is None or hls.status == "ready":  # 还没排到 / 换了文件、旧结果已过期
+            status_ = "pending"
+        else:
+            status_ = hls.status
+        return Response({
+            "status": status_,
+            # hls_url 是媒体目录下的主列表（<video> 原生 HLS 直接用，不需要带 token）；
+            # playlist_url 是需要认证的同一份列表（hls.js 等可以带 Authorization 头的播放器）
+            "hls_url": request.build_absolute_uri(default_storage.url(hls.path)) if ready else None,
+            "playlist_url": self.reverse_action("stream-playlist", args=[asset.pk]) if ready else None,
+            "preview_url": request.build_absolute_uri(default_storage.url(mp4.path))
+            if mp4 is not None and mp4.is_current(asset) else None,
+            "fallback_url": fallback,
+            "renditions": hls.info.get("renditions", []) if ready else [],
+        })
+
+    @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated],
+            url_path="stream/playlist", url_name="stream-playlist")
+    def stream_playlist(self, request, pk=None):
+        """
+        HLS 主播放列表（各档位地址改写成媒体 URL）；还没转码完时 302 到原文件
+        """
+        asset = self.get_object()
+        if not asset.file:
+            return Response({"detail": "No file"}, status=404)
+        hls = self._derivatives(asset).get("hls")
+        if hls is None or not hls.is_current(asset):
+            return HttpResponseRedirect(request.build_absolute_uri(asset.file.url))
+
+        base = hls.path.rsplit("/", 1)[0]
+        with default_storage.open(hls.path, "rb") as fh:
+            lines = fh.read().decode("utf-8").splitlines()
+        out = [
+            line if not line.strip() or line.startswith("#")
+            else request.build_absolute_uri(default_storage.url(f"{base}/{line.strip()}"))
+            for line in lines
+        ]
+        resp = HttpResponse("\n".join(out) + "\n", content_type="application/vnd.apple.mpegurl")
+        resp["Cache-Control"] = "private, max-age=60"
+        return resp
+
+    # ---------------- 图片缩略图（按需缩放，磁盘缓存，见 renditions.py） ----------------
+    @action(detail=True, methods=["get"], permission_classes=[AllowAny], url_path="render", url_name="render")
+    def render_image(self, request, pk=None):
+        """
+        GET /api/assets/{id}/render/?w=400&h=300&fit=cover|contain&fmt=webp|jpeg|png&q=80
+        登录用户或带有效签名（AssetSerializer.thumbnail_url）可访问；带 v=内容版本 时返回 immutable 缓存头
+        """
+        # 不走 get_object()（匿名签名访问），pk 得自己校验：非数字和详情接口一样 404
+        asset = None
+        if str(pk).isdigit():
+            asset = Asset.objects.filter(pk=pk).only("id", "asset_type", "file", "content_hash").first()
+        if asset is None or not asset.file:
+            return Response({"detail": "Not found."}, status=404)
+        if not (request.user and request.user.is_authenticated) and \
+                not renditions.check_signature(asset, request.query_params.get("sig", "")):
+            return Response({"detail": "Authentication credentials were not provided."}, status=401)
+        if asset.asset_type != "image":
+            return Response({"detail": "Only image assets can be rendered."}, status=400)
+        try:
+            spec = renditions.parse_spec(request.query_params)
+        except renditions.RenderError as e:
+            return Response({"detail": str(e)}, status=400)
+
+        version = renditions.version_tag(asset)
+        etag = f'"{version}-{spec.slug}"'
+        if request.headers.get("If-None-Match") == etag:
+            resp = HttpResponse(status=304)
+        else:
+            try:
+                fh = renditions.render(asset, spec)
+            except TimeoutError:
+                return Response({"detail": "Rendering timed out, retry later."}, status=503)
+            except Exception as e:
+                traceback.print_exc()
+                return Response({"detail": f"Cannot render this file: {e}"}, status=415)
+            resp = FileResponse(fh, content_type=spec.content_type)
+        resp["ETag"] = etag
+        if request.query_params.get("v") == version:
+            resp["Cache-Control"] = "private, max-age=31536000, immutable"
+        else:
+            resp["Cache-Control"] = "private, no-cache"
+        return resp
 
     @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated])
     def preview(self, request, pk=None):
@@ -391,11 +747,25 @@ class AssetViewSet(viewsets.ModelViewSet):
         mime, _ = mimetypes.guess_type(asset.file.name)
         mime = mime or "application/octet-stream"
 
-        # 原子自增下载数
-        Asset.objects.filter(pk=asset.pk).update(download_count=F("download_count") + 1)
-        asset.refresh_from_db(fields=["download_count"])
+        # 原子自增下载数（写主库；回读也走主库，副本可能还没同步）
+        Asset.objects.using(PRIMARY_DB).filter(pk=asset.pk).update(download_count=F("download_count") + 1)
+        asset.refresh_from_db(using=PRIMARY_DB, fields=["download_count"])
+        events.publish_asset("asset.counters", asset, with_tags=False, invalidate=False,
+                             view_count=asset.view_count, download_count=asset.download_count)
 
-        fh = asset.file.open("rb")
+        if getattr(asset.file.storage, "redirect_downloads", False):
+            # 对象存储：302 到预签名地址，字节不经过应用服务器（文件不在主存储时照旧重建输出）
+            try:
+                throttling.charge(request, "download", asset.file.size)
+                return HttpResponseRedirect(asset.file.storage.url(asset.file.name, filename=base_name))
+            except FileNotFoundError:
+                pass
+
+        try:
+            fh = asset.file.open("rb")
+        except FileNotFoundError:
+            # 主存储里没有完整文件（差量版本，见 deltas.py）：流式重建
+            fh = deltas.open_name(asset.file.name)
         resp = FileResponse(fh, as_attachment=True, filename=base_name)
         resp["Content-Type"] = mime
         resp["Access-Control-Expose-Headers"] = "Content-Disposition, Content-Length"
@@ -407,10 +777,118 @@ class AssetViewSet(viewsets.ModelViewSet):
                 size = os.path.getsize(asset.file.path)
             if size is not None:
                 resp["Content-Length"] = str(size)
+                throttling.charge(request, "download", size)  # 按字节扣下载预算
         except Exception:
             pass
         return resp
 
+    # ---------------- 客户端直传对象存储（STORAGE_BACKEND=s3） ----------------
+    DIRECT_UPLOAD_SALT = "myassets.direct-upload"
+
+    @action(detail=False, methods=["post"], url_path="upload_url")
+    def upload_url(self, request):
+        """
+        POST /api/assets/upload_url/ {"filename", "size", "content_type"?}
+        返回对象键 + token + 预签名上传地址（小文件一个 PUT 地址；大文件 upload_id + 每片地址，每片 part_size 字节）；
+        传完后调 upload_complete 登记资产。没登记的对象 / 没合并的分片交给桶的生命周期规则清理
+        """
+        storage = direct_upload_storage()
+        if storage is None:
+            return _direct_upload_unavailable()
+        filename = os.path.basename(str(request.data.get("filename") or "").replace("\\", "/")).strip()
+        try:
+            size = int(request.data.get("size"))
+        except (TypeError, ValueError):
+            size = 0
+        if not filename or size <= 0:
+            return Response({"detail": "filename and size are required"}, status=400)
+        limit = max(uploads.size_limits().values())
+        if size > limit:
+            return Response({"detail": f"Uploads are limited to {limit} bytes."},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        quotas.check(request.user.pk, request.data.get("brand") or "", size)  # 品牌要到登记时才确定，这里给了就一起查
+
+        field = Asset._meta.get_field("file")
+        name = storage.get_available_name(field.generate_filename(None, filename), max_length=field.max_length)
+        upload = storage.presign_upload(name, size, request.data.get("content_type"))
+        throttling.charge(request, "upload", size)  # 字节不经过这里，也照样占上传预算
+        token = signing.dumps({"key": name, "size": size, "uid": request.user.pk, "upload_id": upload.get("upload_id")},
+                              salt=self.DIRECT_UPLOAD_SALT)
+        return Response({"key": name, "token": token, "expires_in": storage.url_expires, **upload}, status=201)
+
+    @action(detail=False, methods=["post"], url_path="upload_complete")
+    def upload_complete(self, request):
+        """
+        POST /api/assets/upload_complete/ {"token", "parts"?: [{"part_number", "etag"}], name, asset_no, ...}
+        合并分片 → 读对象开头识别类型、查大小上限（不合格的删掉）→ 登记资产；其余字段同普通上传。
+        sha256 由后台抽取任务补（extraction.py），这里不把整个文件读一遍
+        """
+        storage = direct_upload_storage()
+        if storage is None:
+            return _direct_upload_unavailable()
+        try:
+            ticket = signing.loads(str(request.data.get("token") or ""), salt=self.DIRECT_UPLOAD_SALT,
+                                   max_age=storage.url_expires * 2)
+        except signing.BadSignature:
+            return Response({"detail": "Invalid or expired upload token."}, status=400)
+        if ticket["uid"] != request.user.pk:
+            return Response({"detail": "Permission denied."}, status=403)
+        key = ticket["key"]
+
+        # token 只能登记一次：重放会在同一个对象上再建一个资产（配额也会重复计）。
+        # 登记期间用 cache 占住这个键，挡住同时到达的两次提交；登记失败就放开，允许客户端重试
+        claim = f"upload-complete:{key}"
+        if Asset.objects.using(PRIMARY_DB).filter(file=key).exists() or not cache.add(claim, 1, 300):
+            return Response({"detail": "This upload has already been registered."}, status=409)
+        try:
+            return self._complete_direct_upload(request, storage, ticket, key)
+        finally:
+            cache.delete(claim)
+
+    def _complete_direct_upload(self, request, storage, ticket, key):
+
+        # 已经合并过（上次登记没通过校验、客户端重试）就不再合并
+        if ticket.get("upload_id") and not storage.exists(key):
+            try:
+                parts = request.data.get("parts") or []
+                if isinstance(parts, str):  # multipart 表单里是 JSON 字符串
+                    parts = json.loads(parts)
+                storage.complete_upload(key, ticket["upload_id"], parts)
+            except Exception as e:
+                return Response({"detail": f"Cannot complete the upload: {e}"}, status=400)
+        try:
+            size = storage.size(key)
+            head = storage.read_head(key, uploads.SNIFF_BYTES)
+        except FileNotFoundError:
+            return Response({"detail": "Uploaded object not found."}, status=400)
+
+        mime = uploads.sniff(head, key)
+        detected = SimpleNamespace(detected_type=uploads.asset_type_for(mime), detected_mime=mime)
+        asset_type, error = uploads.resolve_asset_type(request.data.get("asset_type") or "", detected)
+        if error:
+            storage.delete(key)
+            return Response({"file": [error]}, status=400)
+        if asset_type and size > uploads.limit_for(asset_type):
+            storage.delete(key)
+            return Response({"detail": f"{asset_type} uploads are limited to {uploads.limit_for(asset_type)} bytes."},
+                            status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        data = {k: v for k, v in request.data.items() if k not in ("token", "parts")}
+        if hasattr(request.data, "getlist") and "tag_ids" in request.data:
+            data["tag_ids"] = request.data.getlist("tag_ids")
+        data["asset_type"] = asset_type
+        serializer = DirectUploadAssetSerializer(data=data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        try:
+            quotas.check(request.user.pk, serializer.validated_data.get("brand", ""), size)
+            with transaction.atomic():
+                asset = serializer.save(uploaded_by=request.user, file=key, mime_type=mime, size_bytes=size)
+                quotas.enforce(asset.uploaded_by_id, asset.brand)
+        except quotas.QuotaExceeded:
+            storage.delete(key)
+            raise
+        return Response(AssetSerializer(asset, context=self.get_serializer_context()).data, status=201)
+
     # ---------------- 版本历史（列表 / 新版上传） ----------------
     @action(detail=True, methods=["get", "post"], permission_classes=[IsAuthenticated], url_path="versions")
     def versions(self, request, pk=None):
@@ -424,6 +902,10 @@ class AssetViewSet(viewsets.ModelViewSet):
         if self._role(request.user) not in ("admin", "editor"):
             return Response({"detail": "Permission denied."}, status=403)
 
+        rejected = self._upload_rejected(request)
+        if rejected:
+            return rejected
+
         uploaded_file = (
             request.FILES.get("file")
             or request.FILES.get("version_file")
@@ -440,6 +922,18 @@ class AssetViewSet(viewsets.ModelViewSet):
                 "received_keys": list(request.FILES.keys()),
             }, status=400)
 
+        # 新版本必须和资产是同一类内容（识别不出类型时不拦）
+        _, type_error = uploads.resolve_asset_type(asset.asset_type, uploaded_file)
+        if type_error:
+            return Response({"detail": type_error}, status=400)
+        if uploaded_file.size > uploads.limit_for(asset.asset_type):
+            return Response({"detail": f"{asset.asset_type} uploads are limited to "
+                                       f"{uploads.limit_for(asset.asset_type)} bytes."}, status=413)
+        quotas.check(asset.uploaded_by_id, asset.brand, uploaded_file.size)  # 新版本记在资产所有者 / 品牌名下
+        digest = getattr(uploaded_file, "sha256", "")
+        mime = getattr(uploaded_file, "detected_mime", "")
+
+        v = None
         try:
             with transaction.atomic():
                 last = asset.versions.aggregate(mx=Max("version")).get("mx") or 0
@@ -451,6 +945,9 @@ class AssetViewSet(viewsets.ModelViewSet):
                         file=uploaded_file,
                         uploaded_by=request.user,
                         note=note.strip() or None,
+                        content_hash=digest,
+                        mime_type=mime,
+                        size_bytes=uploaded_file.size,
                     )
                 except Exception as inner:
                     msg = str(inner).lower()
@@ -471,9 +968,16 @@ class AssetViewSet(viewsets.ModelViewSet):
                     else:
                         raise
 
-                asset.file = v.file
-                asset.save(update_fields=["file"])
+                asset.file = v.file  # 同一个存储文件，不再复制
+                asset.content_hash, asset.mime_type = v.content_hash, v.mime_type
+                asset.size_bytes = v.size_bytes if v.size_bytes is not None else uploaded_file.size
+                asset.save(update_fields=["file", "content_hash", "mime_type", "size_bytes"])
+                quotas.enforce(asset.uploaded_by_id, asset.brand)
 
+        except quotas.QuotaExceeded:
+            if v is not None:
+                v.file.storage.delete(v.file.name)  # 事务回滚了，刚写的文件别留成孤儿
+            raise
         except IntegrityError:
             return Response({"detail": "Version conflict. Please retry."}, status=409)
         except Exception as e:
@@ -492,6 +996,51 @@ class AssetViewSet(viewsets.ModelViewSet):
         ser = AssetVersionSerializer(ver, context={"request": request})
         return Response(ser.data)
 
+    @action(
+        detail=True,
+        methods=["get"],
+        permission_classes=[AllowAny],
+        url_path=r"versions/(?P<ver>\d+)/file",
+        url_name="version-file",
+    )
+    def version_file(self, request, pk=None, ver=None):
+        """
+        GET /api/assets/{id}/versions/{ver}/file/?sig=…
+        版本文件在冷存储时先回温，再 302 到媒体地址；登录用户或带有效签名（见 AssetVersionSerializer.file_url）可访问
+        """
+        # 和 render_image 一样不走 get_object()：非数字 pk 直接 404
+        if not str(pk).isdigit():
+            return Response({"detail": "Version not found"}, status=404)
+        if not (request.user and request.user.is_authenticated) and not tiering.check_signature(
+                request.query_params.get("sig", ""), pk, ver):
+            return Response({"detail": "Authentication credentials were not provided."}, status=401)
+
+        target = AssetVersion.objects.using(PRIMARY_DB).filter(asset_id=pk, version=ver).first()
+        if target is None or not target.file:
+            return Response({"detail": "Version not found"}, status=404)
+        if target.delta_name:
+            # 差量版本：边重建边输出，不写回主存储
+            fh = deltas.open_version(target)
+            throttling.charge(request, "download", fh.raw.size)
+            resp = FileResponse(fh, filename=os.path.basename(target.file.name))
+            resp["Content-Length"] = str(fh.raw.size)
+            return resp
+        try:
+            tiering.ensure_hot(target)
+        except Exception as e:
+            traceback.print_exc()
+            return Response({"detail": f"Version file unavailable: {e}"}, status=503)
+        throttling.charge(request, "download", target.full_size or target.file.size)
+        return HttpResponseRedirect(request.build_absolute_uri(target.file.url))
+
+    @action(detail=True, methods=["get"], permission_classes=[IsAuthenticated], url_path="versions/storage")
+    def version_storage(self, request, pk=None):
+        """GET /api/assets/{id}/versions/storage/ —— 差量存储省下的空间（deltas.space_report）"""
+        asset = self.get_object()
+        report = deltas.space_report([asset.pk])
+        return Response(report[0] if report else {
+            "asset_id": asset.pk, "delta_versions": 0, "full_bytes": 0, "stored_bytes": 0, "saved_bytes": 0})
+
     @action(
         detail=True,
         methods=["post"],
@@ -511,19 +1060,33 @@ class AssetViewSet(viewsets.ModelViewSet):
         target = asset.versions.filter(version=ver_num).first()
         if not target:
             return Response({"detail": "Version not found"}, status=404)
-
-        with transaction.atomic():
-            last = asset.versions.aggregate(mx=Max("version")).get("mx") or 0
-            new_ver = int(last) + 1
-            new_v = AssetVersion.objects.create(
-                asset=asset,
-                version=new_ver,
-                file=target.file,
-                note=f"restore to v{ver_num}",
-                uploaded_by=request.user,
-            )
-            asset.file = new_v.file
-            asset.save(update_fields=["file"])
+        try:
+            with transaction.atomic():
+                # 旧版本可能已转入冷存储 / 存成了差量：先还原成完整文件；
+                # 和切换 asset.file 放在同一事务里，期间不会被再次转冷 / 编码
+                tiering.ensure_hot(target)
+                deltas.ensure_full(target)
+                last = asset.versions.aggregate(mx=Max("version")).get("mx") or 0
+                new_ver = int(last) + 1
+                new_v = AssetVersion.objects.create(
+                    asset=asset,
+                    version=new_ver,
+                    file=target.file,
+                    note=f"restore to v{ver_num}",
+                    uploaded_by=request.user,
+                    content_hash=target.content_hash,
+                    mime_type=target.mime_type,
+                    size_bytes=target.size_bytes,
+                )
+                asset.file = new_v.file
+                asset.content_hash, asset.mime_type = new_v.content_hash, new_v.mime_type
+                asset.size_bytes = new_v.size_bytes
+                asset.save(update_fields=["file", "content_hash", "mime_type", "size_bytes"])
+        except IntegrityError:
+            return Response({"detail": "Version conflict. Please retry."}, status=409)
+        except (OSError, RuntimeError, deltas.DeltaError) as e:
+            traceback.print_exc()
+            return Response({"detail": f"Version file unavailable: {e}"}, status=503)
 
         ser = AssetVersionSerializer(new_v, context={"request": request})
         return Response(ser.data, status=201)
@@ -557,35 +1120,184 @@ class AssetViewSet(viewsets.ModelViewSet):
         if cache.get(cache_key):
             return Response({"ok": True, "view_count": asset.view_count}, status=status.HTTP_200_OK)
 
-        Asset.objects.filter(pk=asset.pk).update(view_count=F("view_count") + 1)
+        Asset.objects.using(PRIMARY_DB).filter(pk=asset.pk).update(view_count=F("view_count") + 1)
         cache.set(cache_key, 1, ttl_seconds)
-        asset.refresh_from_db(fields=["view_count"])
+        asset.refresh_from_db(using=PRIMARY_DB, fields=["view_count"])
+        events.publish_asset("asset.counters", asset, with_tags=False, invalidate=False,
+                             view_count=asset.view_count, download_count=asset.download_count)
         return Response({"ok": True, "view_count": asset.view_count}, status=status.HTTP_200_OK)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [IsAuthenticated]
+    token_user_reads = True
+
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        load = super().list
+        return Response(caching.tag_list.get_or_compute("all", lambda: list(load(request, *args, **kwargs).data)))
 
 
-class UserProfileViewSet(viewsets.ReadOnlyModelViewSet):
+class UserProfileViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     queryset = UserProfile.objects.select_related("user").all()
     serializer_class = UserProfileSerializer
     permission_classes = [IsAuthenticated]
+    token_user_reads = True
+
+
+
+class AdminUserFilter(django_filters.FilterSet):
+    """?role=admin|editor|viewer（连接 UserProfile；没有 profile 的算 viewer）&is_active=true|false"""
+    role = django_filters.ChoiceFilter(choices=UserProfile.USER_ROLES, method="filter_role")
+
+    class Meta:
+        model = User
+        fields = ["is_active"]
 
+    def filter_role(self, queryset, name, value):
+        cond = Q(userprofile__role=value)
+        if value == "viewer":
+            cond |= Q(userprofile__isnull=True)
+        return queryset.filter(cond)
 
 
-class AdminUserViewSet(viewsets.ModelViewSet):
+class AdminUserPagination(CursorPagination):
     """
-    /api/admin/users/  列表/创建
+    键集分页：WHERE id > 上一页最后一个 ORDER BY id LIMIT n，翻到第几页都是一次索引范围扫描；
+    不做 COUNT(*)（几万用户时每页都全表计数）。响应 {next, previous, results}
+    """
+    ordering = "id"
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+
+class AdminUserViewSet(StreamingListMixin, viewsets.ModelViewSet):
+    """
+    /api/admin/users/  列表（键集分页；?stream=1 或 ndjson 时流式输出全量）/ 创建
+      ?search=  用户名或邮箱前缀（不区分大小写，走前缀索引）
+      ?role= / ?is_active=  数据库里连接 UserProfile 过滤
+      ?ordering=id|username|-id|-username
     /api/admin/users/<id>/  读/改/删
+    /api/admin/users/bulk/  批量改角色 / 启用状态
     仅 Admin 角色可访问
     """
     queryset = User.objects.all().order_by("id").select_related("userprofile")
     permission_classes = [IsAuthenticated, IsAdminRole]
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+    pagination_class = AdminUserPagination
+    filterset_class = AdminUserFilter
+    search_fields = ["^username", "^email"]
+    ordering_fields = ["id", "username"]
+    ordering = "id"  # 键集分页要求固定排序；OrderingFilter 没有参数时用它
 
     def get_serializer_class(self):
         if self.request.method in ("POST", "PUT", "PATCH"):
             return AdminUserWriteSerializer
         return AdminUserReadSerializer
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """
+        POST {"ids": [...], "role": "editor", "is_active": false}
+        每项各一条 UPDATE / upsert，不逐个 save；用户状态缓存（authentication.user_state）一并失效
+        """
+        ser = AdminUserBulkSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        ids, role, is_active = ser.validated_data["ids"], ser.validated_data.get("role"), ser.validated_data.get("is_active")
+        if request.user.pk in ids and (is_active is False or role not in (None, "admin")):
+            return Response({"detail": "You cannot deactivate or demote yourself."}, status=400)
+
+        with transaction.atomic(using=PRIMARY_DB):
+            found = list(User.objects.filter(id__in=ids).values_list("id", flat=True))
+            if is_active is not None:
+                User.objects.filter(id__in=found).update(is_active=is_active)
+            if role is not None:
+                UserProfile.objects.bulk_create(
+                    [UserProfile(user_id=uid, role=role) for uid in found],
+                    update_conflicts=True, unique_fields=["user"], update_fields=["role"], batch_size=1000,
+                )
+            caching.user_state.invalidate(*found)
+
+        missing = sorted(set(ids) - set(found))
+        return Response({"updated": len(found), "missing": missing}, status=200)
+
+
+class RequestProfileViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    /api/admin/profiles/                 慢请求/抽样剖析列表（不含大字段）
+    /api/admin/profiles/<id>/            详情：folded 栈 + cProfile 报告 + SQL
+    /api/admin/profiles/<id>/flamegraph/ 纯文本 folded 栈（可直接喂给 flamegraph.pl / speedscope）
+    仅 Admin 角色可访问
+    """
+    queryset = RequestProfile.objects.all()
+    permission_classes = [IsAuthenticated, IsAdminRole]
+    filterset_fields = {
+        "trigger": ["exact"],
+        "method": ["exact"],
+        "duration_ms": ["gte", "lte"],
+        "created_at": ["gte", "lte"],
+    }
+    search_fields = ["path"]
+    ordering_fields = ["created_at", "duration_ms", "query_count"]
+
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action == "list":
+            qs = qs.defer("folded_stacks", "stats", "sql")
+        return qs
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return RequestProfileListSerializer
+        return RequestProfileDetailSerializer
+
+    @action(detail=True, methods=["get"], url_path="flamegraph")
+    def flamegraph(self, request, pk=None):
+        prof = self.get_object()
+        resp = HttpResponse(prof.folded_stacks or "", content_type="text/plain; charset=utf-8")
+        resp["Content-Disposition"] = f'attachment; filename="profile-{prof.pk}.folded"'
+        return resp
+
+
+class StorageUsagePagination(CursorPagination):
+    ordering = ("-bytes", "id")
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+class StorageUsageViewSet(ReplicaReadMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin,
+                          mixins.UpdateModelMixin, viewsets.GenericViewSet):
+    """
+    /api/admin/storage/            存储用量报表：直接读汇总行（quotas.py 增量维护），不扫资产、不读文件
+      ?scope=user|brand  ?search=用户名 / 品牌  ?ordering=-bytes|assets|updated_at（默认字节数倒序，键集分页）
+    /api/admin/storage/<id>/       PATCH {"quota_bytes": n}（null = 用默认配额）
+    /api/admin/storage/summary/    总字节数、资产数、用户数、品牌数，以及默认配额
+    仅 Admin 角色可访问
+    """
+    queryset = StorageUsage.objects.select_related("user")
+    serializer_class = StorageUsageSerializer
+    permission_classes = [IsAuthenticated, IsAdminRole]
+    pagination_class = StorageUsagePagination
+    filterset_fields = {"scope": ["exact"], "key": ["exact"]}
+    search_fields = ["key", "user__username"]
+    ordering_fields = ["bytes", "assets", "updated_at"]
+    ordering = ("-bytes", "id")
+
+    @action(detail=False, methods=["get"], url_path="summary")
+    def summary(self, request):
+        # 每个资产在 user、brand 两边各记一次；合计取 brand 一侧
+        totals = StorageUsage.objects.filter(scope=quotas.BRAND).aggregate(bytes=Sum("bytes"), assets=Sum("assets"))
+        counts = dict(StorageUsage.objects.filter(assets__gt=0).values_list("scope").annotate(n=Count("id")))
+        return Response({
+            "bytes": totals["bytes"] or 0,
+            "assets": totals["assets"] or 0,
+            "users": counts.get(quotas.USER, 0),
+            "brands": counts.get(quotas.BRAND, 0),
+            "default_quotas": {quotas.USER: quotas.default_quota(quotas.USER),
+                               quotas.BRAND: quotas.default_quota(quotas.BRAND)},
+        })